@@ -8,9 +8,19 @@ import pandas as pd
 import numpy as np
 import pickle
 from pathlib import Path
-from datetime import datetime, timedelta
 import logging
 
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from user_profiles import ShortTermProfileStore
+from trending import get_trending_engine
+from article_store import ArticleStore, normalize_facet, partition_key, recency_blend
+from facet_index import FACET_INDEX_FILE, FacetIndex
+from search_index import SEARCH_INDEX_FILE, SearchIndex
+from tracing import span
+from admission import deadline_expired, mark_degraded
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +30,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 ML_DIR = Path(__file__).resolve().parent
 MODELS_DIR = ML_DIR / 'models'
 
+# Number of recently read articles used as content seeds by hybrid scoring
+MAX_HYBRID_SEEDS = 3
+
+# Window of the per-topic/place trending list that cold-start users with a preference get
+COLD_START_PARTITION_DAYS = 30
+
+# Share of the collaborative profile taken from the real-time short-term profile
+REALTIME_PROFILE_WEIGHT = float(os.getenv('REALTIME_PROFILE_WEIGHT', 0.3))
+REALTIME_PROFILES_ENABLED = os.getenv('REALTIME_PROFILES', 'true').lower() == 'true'
+TRENDING_ENGINE_ENABLED = os.getenv('TRENDING_ENGINE', 'true').lower() == 'true'
+
 class RecommendationService:
     def __init__(self):
         self.models_loaded = False
@@ -31,6 +52,16 @@ class RecommendationService:
         self.article_features = None
         self.article_metadata = None
         self.mlb = None
+        self.short_term_profiles = None
+        self.profile_cache = None
+        self.model_version = None
+        self.trending = None
+        self.article_store = None
+        self.facet_index = None
+        self.search_index = None
+        # Metadata frame facet_index was verified against / (article_features, store, rows) cache
+        self._facet_metadata = None
+        self._feature_rows = None
         
     def load_models(self):
         """Load pre-trained models from disk"""
@@ -49,6 +80,25 @@ class RecommendationService:
                     self.indices = pickle.load(f)
                 
                 self.article_metadata = pd.read_csv(MODELS_DIR / 'article_metadata.csv')
+                
+                # Facet bitmaps built at training time (rebuilt from the metadata if missing or stale)
+                self.facet_index = None
+                self._facet_metadata = None
+                if (MODELS_DIR / FACET_INDEX_FILE).exists():
+                    try:
+                        self.facet_index = FacetIndex.load(MODELS_DIR / FACET_INDEX_FILE)
+                    except Exception as e:
+                        logger.warning(f"⚠️  Could not load facet index: {e}")
+                
+                self.search_index = None
+                if (MODELS_DIR / SEARCH_INDEX_FILE).exists():
+                    try:
+                        self.search_index = SearchIndex.load(MODELS_DIR / SEARCH_INDEX_FILE)
+                        if len(self.search_index) != len(self.article_metadata):
+                            logger.warning("⚠️  Search index does not match article metadata; search disabled")
+                            self.search_index = None
+                    except Exception as e:
+                        logger.warning(f"⚠️  Could not load search index: {e}")
                 logger.info("Content-based models loaded")
             else:
                 logger.warning("Content-based models not found")
@@ -67,10 +117,32 @@ class RecommendationService:
                 with open(MODELS_DIR / 'mlb_encoder.pkl', 'rb') as f:
                     self.mlb = pickle.load(f)
                 
+                if REALTIME_PROFILES_ENABLED:
+                    # Optional: a failure here must not take the trained models down with it
+                    try:
+                        # Profiles are keyed by feature name, so they survive a vocabulary change
+                        self.short_term_profiles = ShortTermProfileStore(
+                            self.article_features, cache=self.profile_cache
+                        )
+                    except Exception as e:
+                        logger.warning(f"⚠️  Short-term profiles disabled: {e}")
+                        self.short_term_profiles = None
+                
                 logger.info(" Collaborative filtering models loaded")
             else:
                 logger.warning("⚠️  Collaborative filtering models not found")
             
+            if TRENDING_ENGINE_ENABLED and self.trending is None:
+                try:
+                    self.trending = get_trending_engine(cache=self.profile_cache)
+                except Exception as e:
+                    logger.warning(f"⚠️  Trending engine disabled: {e}")
+                    self.trending = None
+            
+            self.article_store = None
+            if self.article_metadata is not None:
+                self._get_article_store()
+            self.model_version = self._read_model_version()
             self.models_loaded = True
             logger.info("All models loaded successfully")
             return True
@@ -79,7 +151,88 @@ class RecommendationService:
             logger.error(f"Error loading models: {e}")
             return False
     
-    def get_similar_articles(self, article_id, top_n=10, exclude_ids=None):
+    def _read_model_version(self):
+        """Training timestamp from training_metadata.csv, used as the model version"""
+        metadata_path = MODELS_DIR / 'training_metadata.csv'
+        if not metadata_path.exists():
+            return None
+        try:
+            metadata = pd.read_csv(metadata_path)
+            if 'trained_at' in metadata and len(metadata) > 0:
+                return str(metadata['trained_at'].iloc[0])
+        except Exception as e:
+            logger.warning(f"Could not read model version: {e}")
+        return None
+    
+    def is_known_user(self, user_id):
+        """Whether the collaborative model has a row for this user"""
+        if not self.models_loaded:
+            self.load_models()
+        if self.user_sim_matrix is not None and user_id in self.user_sim_matrix.index:
+            return True
+        # Users unseen at training time become known once they have tracked activity
+        return self.short_term_profiles is not None and self.short_term_profiles.has_profile(user_id)
+    
+    def attach_profile_cache(self, cache):
+        """Mirror short-term profiles (and sketch-based trending counts) through a CacheManager so all workers share them"""
+        self.profile_cache = cache
+        if self.short_term_profiles is not None:
+            self.short_term_profiles.cache = cache
+        if hasattr(self.trending, 'cache'):
+            self.trending.cache = cache
+    
+    def record_activity(self, user_id, article_id, activity_type='view'):
+        """
+        Fold a tracked activity into trending scores and, for a known user, the short-term profile
+        
+        Returns:
+            True if the user's short-term profile was updated
+        """
+        if not self.models_loaded:
+            self.load_models()
+        # Activity on a collapsed near-duplicate counts for the article representing its story
+        article_id = self.canonical_article_id(article_id)
+        if self.trending is not None:
+            self.trending.record(article_id, activity_type, partitions=self._article_partitions(article_id))
+        if not user_id or self.short_term_profiles is None:
+            return False
+        return self.short_term_profiles.update(user_id, article_id, activity_type)
+    
+    def canonical_article_id(self, article_id):
+        """Id of the article a near-duplicate was collapsed into at training time (else article_id)"""
+        if self.indices is None or self.article_metadata is None:
+            return article_id
+        row = self.indices.get(article_id)
+        if row is None or row >= len(self.article_metadata):
+            return article_id
+        return self.article_metadata['id'].iloc[row]
+    
+    def _article_partitions(self, article_id):
+        """Trending partitions (topic/place) of an article, empty when it is not in the metadata"""
+        if self.article_metadata is None:
+            return ()
+        try:
+            store = self._get_article_store()
+        except Exception as e:
+            logger.warning(f"⚠️  Article store unavailable: {e}")
+            return ()
+        row = store.row(article_id)
+        return store.partitions(row) if row is not None else ()
+    
+    def profile_version(self, user_id):
+        """Short-term profile version, part of personalized cache keys (None without a profile)"""
+        if self.short_term_profiles is None:
+            return None
+        return self.short_term_profiles.version(user_id)
+    
+    def is_known_article(self, article_id):
+        """Whether the content-based model has a row for this article"""
+        if not self.models_loaded:
+            self.load_models()
+        return self.indices is not None and article_id in self.indices.index
+    
+    def get_similar_articles(self, article_id, top_n=10, exclude_ids=None,
+                             max_age_days=None, recency_boost=0.0, filters=None):
         """
         Get articles similar to the given article (Content-Based)
         
@@ -87,6 +240,9 @@ class RecommendationService:
             article_id: ID of the article
             top_n: Number of recommendations to return
             exclude_ids: List of article IDs to exclude (e.g., already read)
+            max_age_days: Only recommend articles published in the last N days
+            recency_boost: 0-1 weight of article freshness in the ranking (see article_store.recency_blend)
+            filters: Facet filters, column -> values (see facet_index.parse_facet_filters)
         
         Returns:
             List of recommended article dictionaries
@@ -107,12 +263,16 @@ class RecommendationService:
             idx = self.indices[article_id]
             
             # Get similarity scores
-            sig_scores = list(enumerate(self.sig_matrix[idx]))
-            sig_scores = sorted(sig_scores, key=lambda x: x[1], reverse=True)
+            with span('similarity_sort'):
+                if max_age_days is None and not recency_boost and not filters:
+                    sig_scores = list(enumerate(self.sig_matrix[idx]))
+                    sig_scores = sorted(sig_scores, key=lambda x: x[1], reverse=True)[1:]  # Skip first (itself)
+                else:
+                    sig_scores = self._rank_candidates(idx, max_age_days, recency_boost, filters)
             
-            # Filter out the article itself and excluded articles
+            # Filter out excluded articles
             recommendations = []
-            for i, score in sig_scores[1:]:  # Skip first (itself)
+            for i, score in sig_scores:
                 article_id_rec = self.article_metadata.iloc[i]['id']
                 
                 # Skip if in exclude list
@@ -132,7 +292,54 @@ class RecommendationService:
             logger.error(f"Error getting similar articles: {e}")
             return []
 
-    def get_collaborative_recommendations(self, user_id, top_k=5, top_n=10, exclude_ids=None):
+    def _rank_candidates(self, idx, max_age_days, recency_boost, filters):
+        """
+        Similarity row of article idx restricted to the time window and facet filters,
+        optionally blended with freshness
+        
+        Returns:
+            List of (row, similarity score), best ranked first, without idx itself
+        """
+        store = self._get_article_store()
+        row_scores = np.asarray(self.sig_matrix[idx], dtype=np.float64)
+        if max_age_days is not None:
+            rows = store.rows_since(store.cutoff(max_age_days))
+        else:
+            rows = np.arange(len(row_scores))
+        rows = rows[rows != idx]
+        mask = self._facet_mask(filters)
+        if mask is not None:
+            rows = rows[mask[rows]]
+        scores = row_scores[rows]
+        ranking = recency_blend(scores, store.recency_weights(rows), recency_boost) if recency_boost else scores
+        order = np.argsort(-ranking, kind='stable')
+        return [(int(rows[j]), scores[j]) for j in order]
+    
+    def _facet_mask(self, filters):
+        """Boolean mask over article_metadata rows matching the facet filters (None without filters)"""
+        if not filters:
+            return None
+        if self.facet_index is None or self._facet_metadata is not self.article_metadata:
+            index = self.facet_index
+            if index is None or not index.matches(self.article_metadata):
+                index = FacetIndex.build(self.article_metadata)
+            self.facet_index, self._facet_metadata = index, self.article_metadata
+        return self.facet_index.mask(filters)
+    
+    def _article_feature_mask(self, filters):
+        """Facet mask aligned with article_features rows (articles without metadata never match)"""
+        store = self._get_article_store()
+        cached = self._feature_rows
+        if cached is None or cached[0] is not self.article_features or cached[1] is not store:
+            rows = np.array([
+                -1 if store.row(a) is None else store.row(a) for a in self.article_features.index
+            ], dtype=np.int64)
+            cached = self._feature_rows = (self.article_features, store, rows)
+        rows = cached[2]
+        mask = self._facet_mask(filters)
+        return (rows >= 0) & mask[np.maximum(rows, 0)]
+    
+    def get_collaborative_recommendations(self, user_id, top_k=5, top_n=10, exclude_ids=None, filters=None):
         """
         Get personalized recommendations based on similar users (Collaborative Filtering)
         
@@ -141,6 +348,7 @@ class RecommendationService:
             top_k: Number of similar users to consider
             top_n: Number of recommendations to return
             exclude_ids: List of article IDs to exclude
+            filters: Facet filters, column -> values (see facet_index.parse_facet_filters)
         
         Returns:
             List of recommended article dictionaries
@@ -153,36 +361,56 @@ class RecommendationService:
             return []
         
         try:
-            # Check if user exists
-            if user_id not in self.user_sim_matrix.index:
-                logger.warning(f"User {user_id} not found in similarity matrix")
-                return []
-            
-            # Get top-K similar users
-            similar_users = (
-                self.user_sim_matrix.loc[user_id]
-                .drop(user_id, errors='ignore')
-                .sort_values(ascending=False)
-                .head(top_k)
+            realtime_profile = (
+                self.short_term_profiles.get_vector(user_id)
+                if self.short_term_profiles is not None else None
             )
             
-            if len(similar_users) == 0:
-                logger.warning(f"No similar users found for {user_id}")
-                return []
-            
-            # Aggregate preferences from similar users
-            agg_profile = np.zeros(self.article_features.shape[1])
-            for sim_user, sim_score in similar_users.items():
-                if sim_user in self.user_features.index:
-                    agg_profile += sim_score * self.user_features.loc[sim_user].values
-            
-            # Normalize
-            if np.linalg.norm(agg_profile) > 0:
-                agg_profile = agg_profile / np.linalg.norm(agg_profile)
+            # Check if user exists
+            if user_id not in self.user_sim_matrix.index:
+                if realtime_profile is None:
+                    logger.warning(f"User {user_id} not found in similarity matrix")
+                    return []
+                # New user: score on what they have read since the last retrain
+                agg_profile = realtime_profile
+            else:
+                # Get top-K similar users
+                with span('similar_users'):
+                    similar_users = (
+                        self.user_sim_matrix.loc[user_id]
+                        .drop(user_id, errors='ignore')
+                        .sort_values(ascending=False)
+                        .head(top_k)
+                    )
+                
+                if len(similar_users) == 0 and realtime_profile is None:
+                    logger.warning(f"No similar users found for {user_id}")
+                    return []
+                
+                # Aggregate preferences from similar users
+                agg_profile = np.zeros(self.article_features.shape[1])
+                for sim_user, sim_score in similar_users.items():
+                    if sim_user in self.user_features.index:
+                        agg_profile += sim_score * self.user_features.loc[sim_user].values
+                
+                # Normalize
+                if np.linalg.norm(agg_profile) > 0:
+                    agg_profile = agg_profile / np.linalg.norm(agg_profile)
+                
+                # Blend in recent activity
+                if realtime_profile is not None:
+                    agg_profile = (
+                        (1 - REALTIME_PROFILE_WEIGHT) * agg_profile
+                        + REALTIME_PROFILE_WEIGHT * realtime_profile
+                    )
+                    agg_profile = agg_profile / np.linalg.norm(agg_profile)
             
             # Score all articles
-            scores = self.article_features.dot(agg_profile)
-            top_article_ids = scores.sort_values(ascending=False).head(top_n * 3).index
+            with span('collaborative_sort'):
+                scores = self.article_features.dot(agg_profile)
+                if filters:
+                    scores = scores[self._article_feature_mask(filters)]
+                top_article_ids = scores.sort_values(ascending=False).head(top_n * 3).index
             
             # Get article details and filter
             recommendations = []
@@ -210,8 +438,125 @@ class RecommendationService:
             traceback.print_exc()
             return []
     
-    def get_hybrid_recommendations(self, user_id, recent_article_ids=None, 
-                                   alpha=0.6, beta=0.4, top_n=10, exclude_ids=None):
+    def get_similar_articles_batch(self, article_ids, top_n=10):
+        """
+        Batch variant of get_similar_articles (used for cache warming)
+
+        Scores every seed article with a single row gather on the similarity
+        matrix and a partial sort per row instead of a full sort.
+
+        Returns:
+            Dict mapping article_id -> list of recommended article dictionaries
+            (unknown article ids are omitted)
+        """
+        if not self.models_loaded:
+            self.load_models()
+
+        if self.sig_matrix is None or self.indices is None:
+            logger.error("Content-based models not available")
+            return {}
+
+        known_ids = [a for a in dict.fromkeys(article_ids) if a in self.indices.index]
+        if not known_ids:
+            return {}
+
+        rows = np.asarray([self.indices[a] for a in known_ids])
+        scores = np.asarray(self.sig_matrix)[rows].astype(float)
+        # Never recommend an article to itself
+        scores[np.arange(len(rows)), rows] = -np.inf
+
+        k = min(top_n, scores.shape[1] - 1)
+        if k <= 0:
+            return {a: [] for a in known_ids}
+
+        results = {}
+        for seed_id, row_scores in zip(known_ids, scores):
+            top = np.argpartition(-row_scores, k - 1)[:k]
+            top = top[np.argsort(-row_scores[top], kind='stable')]
+            recommendations = []
+            for i in top:
+                article_info = self.article_metadata.iloc[i].to_dict()
+                article_info['similarity_score'] = float(row_scores[i])
+                recommendations.append(article_info)
+            results[seed_id] = recommendations
+
+        return results
+
+    def get_collaborative_recommendations_batch(self, user_ids, top_k=5, top_n=10):
+        """
+        Batch variant of get_collaborative_recommendations (used for cache warming)
+
+        Builds the aggregated preference profile of every user at once and
+        scores all articles with one matrix product.
+
+        Returns:
+            Dict mapping user_id -> list of recommended article dictionaries
+            (unknown user ids are omitted)
+        """
+        if not self.models_loaded:
+            self.load_models()
+
+        if self.user_sim_matrix is None or self.article_features is None:
+            logger.error("Collaborative filtering models not available")
+            return {}
+
+        known_ids = [u for u in dict.fromkeys(user_ids) if u in self.user_sim_matrix.index]
+        if not known_ids:
+            return {}
+
+        # Similarities to every other user, with self-similarity masked out
+        sims = self.user_sim_matrix.loc[known_ids].to_numpy(dtype=float, copy=True)
+        self_cols = self.user_sim_matrix.columns.get_indexer(known_ids)
+        sims[np.arange(len(known_ids)), self_cols] = -np.inf
+
+        k = min(top_k, sims.shape[1] - 1)
+        if k <= 0:
+            return {u: [] for u in known_ids}
+
+        # Keep only the top-K neighbours per user as weights
+        neighbour_cols = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        weights = np.zeros_like(sims)
+        row_idx = np.arange(len(known_ids))[:, None]
+        weights[row_idx, neighbour_cols] = sims[row_idx, neighbour_cols]
+
+        neighbour_features = (
+            self.user_features
+            .reindex(self.user_sim_matrix.columns)
+            .fillna(0)
+            .to_numpy(dtype=float)
+        )
+        profiles = weights @ neighbour_features
+        norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+        profiles = np.divide(profiles, norms, out=profiles, where=norms > 0)
+
+        # (articles x users) score matrix
+        scores = self.article_features.to_numpy(dtype=float) @ profiles.T
+        article_ids = self.article_features.index
+        metadata_pos = pd.Index(self.article_metadata['id']).get_indexer(article_ids)
+
+        n_candidates = min(top_n * 3, len(article_ids))
+        results = {}
+        for col, user_id in enumerate(known_ids):
+            user_scores = scores[:, col]
+            recommendations = []
+            if n_candidates > 0:
+                top = np.argpartition(-user_scores, n_candidates - 1)[:n_candidates]
+                top = top[np.argsort(-user_scores[top], kind='stable')]
+                for i in top:
+                    if metadata_pos[i] < 0:
+                        continue
+                    article_info = self.article_metadata.iloc[metadata_pos[i]].to_dict()
+                    article_info['relevance_score'] = float(user_scores[i])
+                    recommendations.append(article_info)
+                    if len(recommendations) >= top_n:
+                        break
+            results[user_id] = recommendations
+
+        return results
+
+    def get_hybrid_recommendations(self, user_id, recent_article_ids=None,
+                                   alpha=0.6, beta=0.4, top_n=10, exclude_ids=None,
+                                   max_age_days=None, recency_boost=0.0, filters=None):
         """
         Get hybrid recommendations combining collaborative and content-based
         
@@ -222,6 +567,9 @@ class RecommendationService:
             beta: Weight for content-based (0-1, should equal 1-alpha)
             top_n: Number of recommendations to return
             exclude_ids: List of article IDs to exclude
+            max_age_days: Only recommend articles published in the last N days
+            recency_boost: 0-1 weight of article freshness in the hybrid score
+            filters: Facet filters, column -> values (see facet_index.parse_facet_filters)
         
         Returns:
             List of recommended article dictionaries
@@ -232,9 +580,20 @@ class RecommendationService:
         recommendations = {}
         
         # Get collaborative recommendations
-        collab_recs = self.get_collaborative_recommendations(
-            user_id, top_n=top_n*2, exclude_ids=exclude_ids
-        )
+        with span('collaborative'):
+            collab_recs = self.get_collaborative_recommendations(
+                user_id, top_n=top_n*2, exclude_ids=exclude_ids, filters=filters
+            )
+        
+        store = None
+        if max_age_days is not None or recency_boost:
+            store = self._get_article_store()
+        if max_age_days is not None:
+            since = store.cutoff(max_age_days)
+            collab_recs = [
+                rec for rec in collab_recs
+                if store.row(rec['id']) is not None and store.published_since(store.row(rec['id']), since)
+            ]
         
         for rec in collab_recs:
             article_id = rec['id']
@@ -245,10 +604,17 @@ class RecommendationService:
         
         # Get content-based recommendations from recent articles
         if recent_article_ids and self.sig_matrix is not None:
-            for article_id in recent_article_ids[:3]:  # Use up to 3 recent articles
-                content_recs = self.get_similar_articles(
-                    article_id, top_n=top_n, exclude_ids=exclude_ids
-                )
+            for article_id in recent_article_ids[:MAX_HYBRID_SEEDS]:
+                if deadline_expired():
+                    # Out of time: answer with what we have rather than time out
+                    logger.warning(f"Deadline reached, skipping remaining hybrid seeds for {user_id}")
+                    mark_degraded()
+                    break
+                with span('content_similar'):
+                    content_recs = self.get_similar_articles(
+                        article_id, top_n=top_n, exclude_ids=exclude_ids, max_age_days=max_age_days,
+                        filters=filters
+                    )
                 
                 for rec in content_recs:
                     rec_id = rec['id']
@@ -263,6 +629,12 @@ class RecommendationService:
                             'hybrid_score': beta * rec.get('similarity_score', 0)
                         }
         
+        if recency_boost and recommendations:
+            rows = [store.row(rec_id) for rec_id in recommendations]
+            weights = store.recency_weights([row if row is not None else 0 for row in rows])
+            for rec, row, weight in zip(recommendations.values(), rows, weights):
+                rec['hybrid_score'] = recency_blend(rec['hybrid_score'], weight if row is not None else 0.0, recency_boost)
+        
         # Sort by hybrid score
         sorted_recs = sorted(
             recommendations.values(),
@@ -272,36 +644,144 @@ class RecommendationService:
         
         return sorted_recs[:top_n]
     
-    def get_trending_articles(self, top_n=10, time_window_days=7):
+    def _get_article_store(self):
+        """ArticleStore for the current article_metadata, rebuilt when the frame is replaced"""
+        if self.article_store is None or self.article_store.metadata is not self.article_metadata:
+            self.article_store = ArticleStore(self.article_metadata)
+        return self.article_store
+    
+    def search_articles(self, query, top_n=10, filters=None):
+        """
+        Free-text article search over the trained TF-IDF model
+        
+        Args:
+            query: Search text, vectorised with the saved TF-IDF vectorizer
+            top_n: Number of articles to return
+            filters: Facet filters, column -> values (see facet_index.parse_facet_filters)
+        
+        Returns:
+            List of article dictionaries with a search_score, best match first
+        """
+        if not self.models_loaded:
+            self.load_models()
+        
+        if self.tfv is None or self.search_index is None or self.article_metadata is None:
+            logger.warning("Search index not loaded")
+            return []
+        
+        try:
+            with span('search_vectorize'):
+                query_vector = self.tfv.transform([query])
+            with span('search_retrieve'):
+                rows, scores = self.search_index.search(query_vector, top_n, self._facet_mask(filters))
+            return self._get_article_store().records(rows, search_score=scores.astype(float))
+            
+        except Exception as e:
+            logger.error(f"Error searching articles: {e}")
+            return []
+    
+    def get_trending_articles(self, top_n=10, time_window_days=7, topic=None, place=None, filters=None):
         """
         Get trending articles (fallback for cold start)
         
+        Ranked by /api/track activity (see trending.TRENDING_BACKEND); when fewer than
+        top_n articles in the window have activity, the newest articles fill the rest.
+        
         Args:
             top_n: Number of articles to return
             time_window_days: Consider articles from last N days
+            topic: Only articles of this topic (case-insensitive)
+            place: Only articles of this place (case-insensitive)
+            filters: Facet filters, column -> values (see facet_index.parse_facet_filters)
         
         Returns:
-            List of article dictionaries
+            List of article dictionaries with a trending_score
         """
         try:
-            # This would typically query the database for view counts
-            # For now, return most recent articles
-            if self.article_metadata is not None:
-                recent = self.article_metadata.copy()
-                recent['published_at'] = pd.to_datetime(recent['published_at'])
-                
-                cutoff_date = datetime.now() - timedelta(days=time_window_days)
-                recent = recent[recent['published_at'] >= cutoff_date]
-                recent = recent.sort_values('published_at', ascending=False)
-                
-                return recent.head(top_n).to_dict('records')
+            if self.article_metadata is None:
+                return []
             
-            return []
+            store = self._get_article_store()
+            since = store.cutoff(time_window_days)
+            wanted = dict(filters or {})
+            for column, value in (('topic', topic), ('place', place)):
+                if normalize_facet(value) is not None:
+                    wanted[column] = (normalize_facet(value),)
+            # Rank within a single topic (else place) partition; the facet mask does the rest
+            partition = next(
+                (partition_key(c, wanted[c][0]) for c in ('topic', 'place') if len(wanted.get(c, ())) == 1),
+                None
+            )
+            mask = self._facet_mask(wanted)
+            
+            def matches(row):
+                return mask is None or mask[row]
+            
+            picked = []
+            scores = []
+            if self.trending is not None:
+                def accept(article_id):
+                    row = store.row(article_id)
+                    return row is not None and store.published_since(row, since) and matches(row)
+                window_seconds = time_window_days * 86400
+                for article_id, score in self.trending.top(
+                    top_n, accept, window_seconds=window_seconds, partition=partition
+                ):
+                    picked.append(store.row(article_id))
+                    scores.append(score)
+            
+            if len(picked) < top_n:
+                seen = set(picked)
+                for row in store.newest(since, partition):
+                    if len(picked) >= top_n:
+                        break
+                    if row not in seen and matches(row):
+                        picked.append(row)
+                        scores.append(0.0)
+            
+            return store.records(picked, trending_score=scores)
             
         except Exception as e:
             logger.error(f"Error getting trending articles: {e}")
             return []
 
+    
+    def get_cold_start_recommendations(self, top_n=10, topic=None, place=None, filters=None):
+        """
+        Fallback list for users/articles the models don't know yet
+        
+        Args:
+            top_n: Number of articles to return
+            topic: Optional topic to prefer (e.g. from the user's profile)
+            place: Optional place to prefer
+            filters: Facet filters every article must match
+        
+        Returns:
+            Trending articles matching topic/place (over the longer partition window),
+            topped up with trending articles matching only the filters
+        """
+        try:
+            recommendations = []
+            if topic or place or filters:
+                recommendations = self.get_trending_articles(
+                    top_n=top_n, time_window_days=COLD_START_PARTITION_DAYS, topic=topic, place=place,
+                    filters=filters
+                )
+            
+            if len(recommendations) < top_n:
+                seen = {rec['id'] for rec in recommendations}
+                for rec in self.get_trending_articles(top_n=top_n + len(seen), filters=filters):
+                    if rec['id'] not in seen:
+                        recommendations.append(rec)
+                    if len(recommendations) >= top_n:
+                        break
+            
+            return recommendations
+            
+        except Exception as e:
+            logger.error(f"Error getting cold-start recommendations: {e}")
+            return []
+
 
 # Singleton instance
 _recommendation_service = None
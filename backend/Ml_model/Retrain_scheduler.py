@@ -16,6 +16,8 @@ sys.path.append(str(Path(__file__).resolve().parent))
 from Train_modules import ModelTrainer
 
 from cache_manager import get_cache_manager
+from cache_warmer import CacheWarmer
+from activity_loader import ActivityBulkLoader
 
 # Setup logging
 logging.basicConfig(
@@ -41,6 +43,10 @@ class RetrainingScheduler:
         logger.info("=" * 60)
         
         try:
+            # Get tracked activity into Postgres before the trainer queries it
+            if os.getenv('ACTIVITY_LOAD_ON_RETRAIN', 'true').lower() == 'true':
+                self.load_activity()
+            
             # Train models
             success = self.trainer.train_all()
             
@@ -52,6 +58,10 @@ class RetrainingScheduler:
                 self.cache_manager.delete_pattern("rec:*")
                 logger.info("✅ Caches cleared")
                 
+                # Precompute hot entries so the first requests don't all miss
+                if os.getenv('CACHE_WARM_ON_RETRAIN', 'true').lower() == 'true':
+                    self.warm_caches()
+                
                 # Reload models in running services (they will auto-reload on next request)
                 logger.info("Models will be reloaded on next API request")
                 
@@ -63,6 +73,31 @@ class RetrainingScheduler:
             import traceback
             traceback.print_exc()
     
+    def load_activity(self):
+        """Bulk load tracked activity segments into user_activities"""
+        try:
+            logger.info("Loading tracked activity into the database...")
+            report = ActivityBulkLoader().run()
+            logger.info(f"✅ Activity load report: {report}")
+        except Exception as e:
+            # Training still works from the logs directly; see ModelTrainer.load_activity_log
+            logger.warning(f"⚠️  Activity bulk load failed: {e}")
+    
+    def warm_caches(self):
+        """Warm recommendation caches from the data the trainer just used"""
+        try:
+            logger.info("Warming recommendation caches...")
+            warmer = CacheWarmer(self.cache_manager)
+            report = warmer.warm(
+                user_activities=self.trainer.user_activities,
+                articles=self.trainer.articles,
+            )
+            logger.info(f"✅ Cache warming report: {report}")
+            return report
+        except Exception as e:
+            logger.warning(f"⚠️  Cache warming failed: {e}")
+            return None
+    
     def run_daily(self, hour=2, minute=0):
         """Schedule daily retraining"""
         schedule_time = f"{hour:02d}:{minute:02d}"
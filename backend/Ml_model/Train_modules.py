@@ -14,6 +14,14 @@ from pathlib import Path
 from datetime import datetime
 import logging
 
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from activity_compaction import compact_closed_segments, load_compacted_activities
+from facet_index import FACET_INDEX_FILE, FacetIndex
+from search_index import SEARCH_INDEX_FILE, SearchIndex
+from near_duplicates import cluster_near_duplicates
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,6 +49,8 @@ class ModelTrainer:
         self.user_sim_matrix = None
         self.article_features = None
         self.indices = None
+        # Collapsed article id -> id of the article representing its cluster
+        self.duplicates = None
         
     def load_data_from_db(self):
         """Load data from PostgreSQL database"""
@@ -62,7 +72,8 @@ class ModelTrainer:
                     place,
                     topic,
                     published_at,
-                    source_id::text
+                    source_id::text,
+                    language_code
                 FROM articles
                 WHERE summary IS NOT NULL AND summary != ''
                 ORDER BY published_at DESC
@@ -153,6 +164,67 @@ class ModelTrainer:
             logger.error(f"Error loading data from CSV: {e}")
             return False
     
+    def load_activity_log(self, log_dir=None):
+        """
+        Merge tracked activity from the compacted /api/track log into user_activities
+
+        Closed JSONL segments are compacted first; the binary segments are then
+        memory-mapped, so only the interned ids are decoded.
+        """
+        try:
+            compact_closed_segments(log_dir)
+            # Segments already bulk-loaded into Postgres came in through the DB query
+            logged = load_compacted_activities(log_dir, include_loaded=False)
+            if len(logged) == 0:
+                return 0
+
+            # Same shape as the DB query: known users and articles, reads over 5 seconds
+            # (like SQL's duration_seconds > 5, rows without a duration are dropped)
+            logged = logged[logged['user_id'].notna()]
+            logged = logged[logged['duration_seconds'] > 5]
+            if self.articles is not None and 'id' in self.articles:
+                article_cols = [c for c in ('id', 'topic', 'place', 'actors') if c in self.articles]
+                logged = logged.merge(
+                    self.articles[article_cols].astype({'id': str}),
+                    left_on='article_id', right_on='id', how='inner'
+                ).drop(columns=['id'])
+
+            logged = logged.sort_values('timestamp', ascending=False).drop(columns=['timestamp'])
+            if self.user_activities is None or len(self.user_activities) == 0:
+                self.user_activities = logged.reset_index(drop=True)
+            else:
+                self.user_activities = pd.concat([self.user_activities, logged], ignore_index=True)
+            logger.info(f"Loaded {len(logged)} user activities from the activity log")
+            return len(logged)
+
+        except Exception as e:
+            logger.warning(f"Could not load activity log: {e}")
+            return 0
+
+    def collapse_near_duplicates(self):
+        """
+        Keep one article per near-duplicate cluster (the same story from several sources)
+        
+        The newest article of each cluster stays; the others are remembered in
+        self.duplicates and resolve to it in the content index.
+        """
+        logger.info("Detecting near-duplicate articles...")
+        try:
+            texts = (self.articles['title'].fillna('') + ' ' + self.articles['summary'].fillna('')).tolist()
+            roots = cluster_near_duplicates(texts)
+            ids = self.articles['id'].to_numpy()
+            self.articles['cluster_id'] = ids[roots]
+            self.articles['cluster_size'] = np.bincount(roots, minlength=len(roots))[roots]
+            
+            keep = roots == np.arange(len(roots))
+            self.duplicates = pd.Series(ids[roots][~keep], index=ids[~keep])
+            self.articles = self.articles[keep].reset_index(drop=True)
+            n_clusters = int((self.articles['cluster_size'] > 1).sum())
+            logger.info(f"Collapsed {len(self.duplicates)} near-duplicates into {n_clusters} clusters")
+        except Exception as e:
+            logger.warning(f"Near-duplicate detection failed, keeping all articles: {e}")
+            self.duplicates = None
+    
     def train_content_based_model(self):
         """Train content-based recommendation model using TF-IDF"""
         logger.info("=" * 60)
@@ -193,6 +265,9 @@ class ModelTrainer:
                 self.articles.index, 
                 index=self.articles['id']
             ).drop_duplicates()
+            if self.duplicates is not None and len(self.duplicates):
+                # Collapsed duplicates resolve to the row of their cluster's article
+                self.indices = pd.concat([self.indices, self.duplicates.map(self.indices).dropna().astype(int)])
             
             # Save models
             logger.info("Saving content-based models...")
@@ -206,9 +281,19 @@ class ModelTrainer:
                 pickle.dump(self.indices, f)
             
             # Save article metadata
-            article_metadata = self.articles[['id', 'title', 'topic', 'place', 'published_at']]
+            metadata_columns = [
+                'id', 'title', 'topic', 'place', 'published_at', 'source_id', 'language_code',
+                'cluster_id', 'cluster_size'
+            ]
+            article_metadata = self.articles[[c for c in metadata_columns if c in self.articles]]
             article_metadata.to_csv(MODELS_DIR / 'article_metadata.csv', index=False)
             
+            # Facet bitmaps for filtered recommendations, over the same rows
+            FacetIndex.build(article_metadata).save(MODELS_DIR / FACET_INDEX_FILE)
+            
+            # Inverted index over the TF-IDF rows for /api/search
+            SearchIndex.build(tfv_matrix).save(MODELS_DIR / SEARCH_INDEX_FILE)
+            
             logger.info("Content-based model trained and saved successfully!")
             return True
             
@@ -357,6 +442,7 @@ class ModelTrainer:
             'trained_at': datetime.now().isoformat(),
             'num_articles': len(self.articles) if self.articles is not None else 0,
             'num_users': len(self.users) if self.users is not None else 0,
+            'near_duplicates': len(self.duplicates) if self.duplicates is not None else 0,
             'content_based_trained': os.path.exists(MODELS_DIR / 'tfidf_vectorizer.pkl'),
             'collaborative_trained': os.path.exists(MODELS_DIR / 'user_similarity_matrix.pkl'),
         }
@@ -375,6 +461,12 @@ class ModelTrainer:
             logger.error("Failed to load data. Exiting.")
             return False
         
+        # Events tracked since the last DB export
+        self.load_activity_log()
+        
+        # One article per story before anything is indexed
+        self.collapse_near_duplicates()
+        
         # Train content-based model
         content_success = self.train_content_based_model()
         
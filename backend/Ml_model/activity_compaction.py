@@ -0,0 +1,260 @@
+"""
+Activity Log Compaction
+Converts closed JSONL activity segments into columnar binary files that
+ModelTrainer memory-maps and scans directly instead of parsing JSON:
+
+    activity-<window>-<host>-<pid>.npy       one structured row per event
+    activity-<window>-<host>-<pid>.ids.json  interned user/article ids and activity types
+
+Run with: python activity_compaction.py [--log-dir DIR]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from activity_log import DEFAULT_LOG_DIR, SEGMENT_SECONDS, parse_segment_window
+
+logger = logging.getLogger(__name__)
+
+# user/article/activity columns index into the .ids.json tables
+ACTIVITY_DTYPE = np.dtype([
+    ('user', '<u4'),
+    ('article', '<u4'),
+    ('activity', 'u1'),
+    ('timestamp', '<i8'),          # epoch milliseconds (UTC)
+    ('duration_seconds', '<f4'),
+    ('scroll_percentage', '<f4'),
+])
+# Anonymous events (no user_id) and missing numeric fields
+NO_ID = np.iinfo(np.uint32).max
+MAX_ACTIVITY_TYPES = np.iinfo(np.uint8).max
+
+# Seconds after a window ends before its segment counts as closed, so the
+# writers' last flush into it has landed
+CLOSE_GRACE_SECONDS = int(os.getenv('ACTIVITY_LOG_CLOSE_GRACE', 60))
+
+
+def _timestamp_ms(value):
+    """Epoch milliseconds from an ISO string or epoch number (naive = UTC), 0 if unparseable"""
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        # Epoch seconds vs milliseconds
+        return int(value * 1000) if value < 1e11 else int(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def _float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class _Interner:
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def compact_segment(segment_path):
+    """
+    Convert one JSONL segment into <name>.npy + <name>.ids.json
+
+    Args:
+        segment_path: Path to a closed .jsonl segment
+
+    Returns:
+        Number of events written (malformed lines are skipped)
+    """
+    segment_path = Path(segment_path)
+    users, articles, activities = _Interner(), _Interner(), _Interner()
+    rows = []
+
+    with open(segment_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            article_id = event.get('article_id')
+            if not article_id:
+                continue
+            user_id = event.get('user_id')
+            activity = activities.code(str(event.get('activity_type') or 'view'))
+            if activity >= MAX_ACTIVITY_TYPES:
+                logger.warning(f"Too many activity types in {segment_path.name}, skipping event")
+                continue
+            rows.append((
+                users.code(str(user_id)) if user_id else NO_ID,
+                articles.code(str(article_id)),
+                activity,
+                _timestamp_ms(event.get('timestamp')),
+                _float_or_nan(event.get('duration_seconds')),
+                _float_or_nan(event.get('scroll_percentage')),
+            ))
+
+    table = np.array(rows, dtype=ACTIVITY_DTYPE)
+    ids = {
+        'user_ids': users.values,
+        'article_ids': articles.values,
+        'activity_types': activities.values,
+    }
+
+    # Write both files under temporary names first; the .npy rename publishes the pair
+    npy_path = segment_path.with_suffix('.npy')
+    ids_path = segment_path.with_suffix('.ids.json')
+    tmp_npy = npy_path.with_name(npy_path.name + '.tmp')
+    tmp_ids = ids_path.with_name(ids_path.name + '.tmp')
+    with open(tmp_npy, 'wb') as f:
+        np.save(f, table)
+    with open(tmp_ids, 'w', encoding='utf-8') as f:
+        json.dump(ids, f)
+    os.replace(tmp_ids, ids_path)
+    os.replace(tmp_npy, npy_path)
+    return len(table)
+
+
+def closed_segments(log_dir=None, now=None, segment_seconds=None):
+    """JSONL segments whose time window has ended (oldest first)"""
+    log_dir = Path(log_dir or DEFAULT_LOG_DIR)
+    now = time.time() if now is None else now
+    segment_seconds = segment_seconds or SEGMENT_SECONDS
+    closed = []
+    for path in sorted(log_dir.glob('activity-*.jsonl')):
+        window = parse_segment_window(path)
+        if window is not None and window + segment_seconds + CLOSE_GRACE_SECONDS <= now:
+            closed.append(path)
+    return closed
+
+
+def compact_closed_segments(log_dir=None, now=None, segment_seconds=None, remove_source=True):
+    """
+    Compact every closed segment in log_dir
+
+    Returns:
+        Report dict with segments and events compacted
+    """
+    report = {"segments_compacted": 0, "events_compacted": 0, "errors": 0}
+    for path in closed_segments(log_dir, now, segment_seconds):
+        try:
+            report["events_compacted"] += compact_segment(path)
+            report["segments_compacted"] += 1
+            if remove_source:
+                path.unlink()
+        except Exception as e:
+            report["errors"] += 1
+            logger.error(f"Could not compact {path.name}: {e}")
+    if report["segments_compacted"]:
+        logger.info(
+            f"Compacted {report['segments_compacted']} activity segments "
+            f"({report['events_compacted']} events)"
+        )
+    return report
+
+
+def mark_segment_loaded(npy_path):
+    """Record that activity_loader has loaded this segment into Postgres"""
+    Path(npy_path).with_suffix('.loaded').touch()
+
+
+def is_segment_loaded(npy_path):
+    return Path(npy_path).with_suffix('.loaded').exists()
+
+
+def load_compacted_segment(npy_path, mmap=True):
+    """Memory-mapped event table plus its id tables for one compacted segment"""
+    npy_path = Path(npy_path)
+    table = np.load(npy_path, mmap_mode='r' if mmap else None)
+    with open(npy_path.with_suffix('.ids.json'), encoding='utf-8') as f:
+        ids = json.load(f)
+    return table, ids
+
+
+def load_compacted_activities(log_dir=None, since_ms=None, include_loaded=True):
+    """
+    Load every compacted segment as one activity DataFrame
+
+    Args:
+        log_dir: Directory holding compacted segments
+        since_ms: Only keep events at or after this epoch-millisecond timestamp
+        include_loaded: Include segments activity_loader already put into Postgres
+
+    Returns:
+        DataFrame with user_id, article_id, activity_type, timestamp,
+        duration_seconds, scroll_percentage columns
+    """
+    log_dir = Path(log_dir or DEFAULT_LOG_DIR)
+    frames = []
+    for npy_path in sorted(log_dir.glob('activity-*.npy')):
+        if not include_loaded and is_segment_loaded(npy_path):
+            continue
+        try:
+            table, ids = load_compacted_segment(npy_path)
+        except Exception as e:
+            logger.warning(f"Skipping unreadable segment {npy_path.name}: {e}")
+            continue
+        if since_ms is not None:
+            table = table[table['timestamp'] >= since_ms]
+        if len(table) == 0:
+            continue
+
+        # Decode through the id tables; NO_ID maps to the trailing None slot
+        user_ids = np.array(ids['user_ids'] + [None], dtype=object)
+        article_ids = np.array(ids['article_ids'], dtype=object)
+        activity_types = np.array(ids['activity_types'], dtype=object)
+        user_codes = np.minimum(table['user'], len(ids['user_ids']))
+        frames.append(pd.DataFrame({
+            'user_id': user_ids[user_codes],
+            'article_id': article_ids[table['article']],
+            'activity_type': activity_types[table['activity']],
+            'timestamp': pd.to_datetime(table['timestamp'], unit='ms', utc=True),
+            'duration_seconds': np.asarray(table['duration_seconds']),
+            'scroll_percentage': np.asarray(table['scroll_percentage']),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=[
+            'user_id', 'article_id', 'activity_type', 'timestamp',
+            'duration_seconds', 'scroll_percentage'
+        ])
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact closed activity log segments')
+    parser.add_argument('--log-dir', default=None, help='Segment directory (default: data/activity_logs)')
+    parser.add_argument('--keep-source', action='store_true', help='Keep JSONL segments after compaction')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    report = compact_closed_segments(args.log_dir, remove_source=not args.keep_source)
+    print(json.dumps(report))
+
+
+if __name__ == '__main__':
+    main()
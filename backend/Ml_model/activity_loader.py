@@ -0,0 +1,246 @@
+"""
+Activity Bulk Loader
+Loads compacted /api/track activity segments into Postgres user_activities
+with COPY FROM STDIN instead of row-by-row INSERTs.
+
+Each segment is loaded in one transaction: rows are COPYed into a temporary
+staging table, then inserted into user_activities skipping rows that already
+exist or reference unknown profiles/articles. The segment name is recorded
+in activity_ingest_checkpoints in the same transaction, so re-running the
+job never loads a segment twice.
+
+Run with: python activity_loader.py [--log-dir DIR]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+import logging
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from activity_compaction import (
+    compact_closed_segments,
+    load_compacted_segment,
+    mark_segment_loaded,
+)
+from activity_log import DEFAULT_LOG_DIR
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+LOAD_BATCH_ROWS = int(os.getenv('ACTIVITY_LOAD_BATCH_ROWS', 50000))
+# Written to user_activities.source for rows that came through this loader
+ACTIVITY_SOURCE = 'ml_track'
+
+STAGING_COLUMNS = ('user_id', 'article_id', 'activity_type', 'duration_seconds',
+                   'scroll_percentage', 'created_at')
+
+CREATE_CHECKPOINTS_SQL = """
+    CREATE TABLE IF NOT EXISTS activity_ingest_checkpoints (
+        segment TEXT PRIMARY KEY,
+        rows_loaded INTEGER NOT NULL,
+        loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+"""
+
+CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS activity_staging (
+        user_id UUID,
+        article_id UUID,
+        activity_type TEXT,
+        duration_seconds INTEGER,
+        scroll_percentage REAL,
+        created_at TIMESTAMPTZ
+    ) ON COMMIT DELETE ROWS
+"""
+
+COPY_STAGING_SQL = (
+    f"COPY activity_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+)
+
+INSERT_FROM_STAGING_SQL = """
+    INSERT INTO user_activities (
+        id, user_id, article_id, activity_type, duration_seconds,
+        scroll_percentage, source, created_at, updated_at
+    )
+    SELECT DISTINCT ON (s.user_id, s.article_id, s.activity_type, s.created_at)
+        gen_random_uuid(), s.user_id, s.article_id, s.activity_type, s.duration_seconds,
+        s.scroll_percentage, %s, s.created_at, s.created_at
+    FROM activity_staging s
+    JOIN profiles p ON p.id = s.user_id
+    JOIN articles a ON a.id = s.article_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM user_activities ua
+        WHERE ua.user_id = s.user_id
+          AND ua.article_id = s.article_id
+          AND ua.activity_type = s.activity_type
+          AND ua.created_at = s.created_at
+    )
+"""
+
+
+def _is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def prepare_rows(table, ids):
+    """
+    Decode a compacted segment into de-duplicated staging rows
+
+    Anonymous events and ids that are not UUIDs (user_activities references
+    profiles/articles by UUID) are dropped.
+
+    Returns:
+        List of tuples in STAGING_COLUMNS order
+    """
+    user_ids, article_ids, activity_types = ids['user_ids'], ids['article_ids'], ids['activity_types']
+    valid_users = np.array([_is_uuid(u) for u in user_ids] + [False], dtype=bool)
+    valid_articles = np.array([_is_uuid(a) for a in article_ids], dtype=bool)
+    if len(table) == 0 or not valid_articles.any():
+        return []
+
+    user_codes = np.minimum(table['user'], len(user_ids))
+    keep = valid_users[user_codes] & valid_articles[table['article']] & (table['timestamp'] > 0)
+    rows = table[keep]
+
+    # Same event tracked twice (client retries) collapses to one row
+    _, first = np.unique(rows[['user', 'article', 'activity', 'timestamp']], return_index=True)
+    rows = rows[np.sort(first)]
+
+    prepared = []
+    for row in rows:
+        duration = row['duration_seconds']
+        scroll = row['scroll_percentage']
+        prepared.append((
+            user_ids[row['user']],
+            article_ids[row['article']],
+            activity_types[row['activity']],
+            '' if np.isnan(duration) else int(round(float(duration))),
+            '' if np.isnan(scroll) else float(scroll),
+            datetime.fromtimestamp(int(row['timestamp']) / 1000, tz=timezone.utc).isoformat(),
+        ))
+    return prepared
+
+
+def rows_to_csv(rows):
+    """CSV buffer for COPY ... WITH (FORMAT csv); empty fields load as NULL"""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+
+def _default_connection():
+    sys.path.append(str(BASE_DIR))
+    from config.db_python import get_db_connection
+    return get_db_connection()
+
+
+class ActivityBulkLoader:
+    def __init__(self, connect=None, log_dir=None, batch_rows=None):
+        """
+        Args:
+            connect: Callable returning a psycopg2 connection (config/db_python by default)
+            log_dir: Directory holding compacted activity segments
+            batch_rows: Rows sent per COPY
+        """
+        self.connect = connect or _default_connection
+        self.log_dir = Path(log_dir or DEFAULT_LOG_DIR)
+        self.batch_rows = batch_rows or LOAD_BATCH_ROWS
+
+    def loaded_segments(self, cursor):
+        cursor.execute("SELECT segment FROM activity_ingest_checkpoints")
+        return {row[0] for row in cursor.fetchall()}
+
+    def load_segment(self, conn, npy_path):
+        """
+        Load one compacted segment and checkpoint it atomically
+
+        Returns:
+            (rows_staged, rows_inserted)
+        """
+        table, ids = load_compacted_segment(npy_path)
+        rows = prepare_rows(table, ids)
+        inserted = 0
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_SQL)
+            for start in range(0, len(rows), self.batch_rows):
+                cursor.copy_expert(COPY_STAGING_SQL, rows_to_csv(rows[start:start + self.batch_rows]))
+            if rows:
+                cursor.execute(INSERT_FROM_STAGING_SQL, (ACTIVITY_SOURCE,))
+                inserted = cursor.rowcount
+            cursor.execute(
+                "INSERT INTO activity_ingest_checkpoints (segment, rows_loaded) VALUES (%s, %s) "
+                "ON CONFLICT (segment) DO NOTHING",
+                (Path(npy_path).name, inserted)
+            )
+        conn.commit()
+        return len(rows), inserted
+
+    def run(self):
+        """
+        Compact closed segments and load every segment not yet checkpointed
+
+        Returns:
+            Report dict with segment and row counts
+        """
+        started = time.perf_counter()
+        report = {"segments_loaded": 0, "rows_staged": 0, "rows_inserted": 0, "errors": 0}
+        compact_closed_segments(self.log_dir)
+
+        conn = self.connect()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(CREATE_CHECKPOINTS_SQL)
+                done = self.loaded_segments(cursor)
+            conn.commit()
+
+            for npy_path in sorted(self.log_dir.glob('activity-*.npy')):
+                if npy_path.name in done:
+                    mark_segment_loaded(npy_path)
+                    continue
+                try:
+                    staged, inserted = self.load_segment(conn, npy_path)
+                except Exception as e:
+                    conn.rollback()
+                    report["errors"] += 1
+                    logger.error(f"Could not load {npy_path.name}: {e}")
+                    continue
+                mark_segment_loaded(npy_path)
+                report["segments_loaded"] += 1
+                report["rows_staged"] += staged
+                report["rows_inserted"] += inserted
+        finally:
+            conn.close()
+
+        report["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Activity bulk load: {report}")
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk load tracked activity into user_activities')
+    parser.add_argument('--log-dir', default=None, help='Segment directory (default: data/activity_logs)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(json.dumps(ActivityBulkLoader(log_dir=args.log_dir).run()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""
+Buffered Activity Log Writer
+Collects /api/track events in memory and appends them to a per-worker JSONL
+segment in batches from a background thread (group commit), instead of an
+open/write/close per request. Each gunicorn worker writes its own segment so
+workers never contend on one file.
+
+Segments roll over every ACTIVITY_LOG_SEGMENT_SECONDS; closed segments are
+compacted into memory-mappable binary files by activity_compaction.py.
+
+A batch that fails to write goes back to the front of the buffer and is
+retried by the next flush (at most once per flush interval while writes keep
+failing). Only events beyond max_buffer_events are dropped, oldest first.
+"""
+import atexit
+import calendar
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_DIR = Path(__file__).resolve().parent / 'data' / 'activity_logs'
+SEGMENT_SECONDS = int(os.getenv('ACTIVITY_LOG_SEGMENT_SECONDS', 3600))
+SEGMENT_TIME_FORMAT = '%Y%m%dT%H%M%S'
+
+
+def segment_window(timestamp, segment_seconds=SEGMENT_SECONDS):
+    """Start (epoch seconds) of the segment window containing timestamp"""
+    return int(timestamp // segment_seconds) * segment_seconds
+
+
+def segment_name(window_start, host, pid):
+    """Segment file name; the UTC window start leads so names sort by time"""
+    started = time.strftime(SEGMENT_TIME_FORMAT, time.gmtime(window_start))
+    return f"activity-{started}-{host}-{pid}.jsonl"
+
+
+def parse_segment_window(path):
+    """Window start (epoch seconds) encoded in a segment file name, or None"""
+    parts = Path(path).stem.split('-')
+    if len(parts) < 4 or parts[0] != 'activity':
+        return None
+    try:
+        return int(calendar.timegm(time.strptime(parts[1], SEGMENT_TIME_FORMAT)))
+    except ValueError:
+        return None
+
+
+class ActivityLogWriter:
+    def __init__(self, log_dir=None, flush_max_events=None, flush_interval_seconds=None,
+                 max_buffer_events=None, fsync=None, segment_seconds=None, clock=time.time):
+        """
+        Args:
+            log_dir: Directory holding the per-worker segment files
+            flush_max_events: Buffered events that trigger an early flush
+            flush_interval_seconds: Maximum time an event waits in the buffer
+            max_buffer_events: Buffer size at which append() flushes inline (back-pressure);
+                               also the most events kept for retry while writes fail
+            fsync: fsync segment files after each flush
+            segment_seconds: Length of the time window covered by one segment file
+            clock: Wall-clock time source in epoch seconds (overridable in tests)
+        """
+        self.log_dir = Path(log_dir or os.getenv('ACTIVITY_LOG_DIR', DEFAULT_LOG_DIR))
+        self.flush_max_events = flush_max_events or int(os.getenv('ACTIVITY_LOG_FLUSH_EVENTS', 1000))
+        self.flush_interval_seconds = (
+            flush_interval_seconds if flush_interval_seconds is not None
+            else float(os.getenv('ACTIVITY_LOG_FLUSH_INTERVAL', 1.0))
+        )
+        self.max_buffer_events = max_buffer_events or int(os.getenv('ACTIVITY_LOG_MAX_BUFFER', 100000))
+        self.fsync = fsync if fsync is not None else os.getenv('ACTIVITY_LOG_FSYNC', 'false').lower() == 'true'
+        self.segment_seconds = segment_seconds or SEGMENT_SECONDS
+        self._clock = clock
+
+        self.stats = {'events_written': 0, 'flushes': 0, 'write_errors': 0, 'events_dropped': 0}
+        # Wall-clock time of the last failed write; retries wait a flush interval
+        self._failed_at = None
+        self._pid = None
+        self._buffer = []
+        # Guards the buffer; the condition wakes the flusher early on a full batch
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # Serializes file writes between the flusher thread and inline/exit flushes
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._file_window = None
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def _segment_path(self, window_start):
+        return self.log_dir / segment_name(window_start, socket.gethostname(), os.getpid())
+
+    @property
+    def segment_path(self):
+        """Current segment file for this worker process"""
+        return self._segment_path(segment_window(self._clock(), self.segment_seconds))
+
+    def _open_segment(self):
+        """File for the current window, rolling over to a new segment when it has ended"""
+        window = segment_window(self._clock(), self.segment_seconds)
+        if self._file is not None and self._file_window != window:
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            self._file = open(self._segment_path(window), 'a', encoding='utf-8')
+            self._file_window = window
+        return self._file
+
+    def _ensure_started(self):
+        # Workers forked after import (gunicorn --preload) must not share the
+        # parent's buffer, file handle or (dead) flusher thread
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._buffer = []
+        self._file = None
+        self._thread = threading.Thread(target=self._run, name='activity-log-flusher', daemon=True)
+        self._thread.start()
+
+    def append(self, event):
+        """Queue one activity event (dict) for writing"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Activity log writer is closed")
+            self._ensure_started()
+            self._buffer.append(event)
+            pending = len(self._buffer)
+            if pending >= self.flush_max_events:
+                self._wakeup.notify()
+
+        if pending >= self.max_buffer_events:
+            # Flusher is falling behind; write from the request thread instead of growing unbounded
+            self.flush()
+            with self._lock:
+                self._trim_buffer()
+
+    def _take_buffer(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        return batch
+
+    def _trim_buffer(self):
+        """Drop the oldest events beyond max_buffer_events (only while writes are failing); caller holds _lock"""
+        excess = len(self._buffer) - self.max_buffer_events
+        if excess > 0:
+            del self._buffer[:excess]
+            self.stats['events_dropped'] += excess
+            logger.error(f"Activity log buffer full, dropped {excess} oldest events")
+
+    def _requeue(self, batch):
+        """Put a batch that failed to write back in front of newer events"""
+        with self._lock:
+            self._buffer = batch + self._buffer
+            self._trim_buffer()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                # After a failed write, wait out the retry interval even with a full batch
+                if not self._closed and (len(self._buffer) < self.flush_max_events or self._failed_at is not None):
+                    self._wakeup.wait(self.flush_interval_seconds)
+                if self._closed:
+                    return
+            self.flush()
+
+    def flush(self, force=False):
+        """
+        Write all buffered events to the segment file in one append
+
+        Args:
+            force: Retry right away even if the last write failed less than a flush interval ago
+
+        Returns:
+            Number of events written (0 when the write failed; they stay buffered)
+        """
+        with self._write_lock:
+            if (not force and self._failed_at is not None
+                    and self._clock() - self._failed_at < self.flush_interval_seconds):
+                return 0
+            batch = self._take_buffer()
+            if not batch:
+                return 0
+            try:
+                payload = ''.join(json.dumps(event, default=str) + '\n' for event in batch)
+                segment = self._open_segment()
+                segment.write(payload)
+                segment.flush()
+                if self.fsync:
+                    os.fsync(segment.fileno())
+                self.stats['events_written'] += len(batch)
+                self.stats['flushes'] += 1
+                self._failed_at = None
+                return len(batch)
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                self._failed_at = self._clock()
+                logger.error(f"Could not write {len(batch)} activity events, will retry: {e}")
+                # Reopen on the next attempt (the directory or disk may have come back)
+                if self._file is not None:
+                    try:
+                        self._file.close()
+                    except Exception:
+                        pass
+                    self._file = None
+                self._requeue(batch)
+                return 0
+
+    def close(self):
+        """Stop the flusher and write out everything still buffered"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wakeup.notify()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush(force=True)
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# Singleton instance
+_activity_writer = None
+
+def get_activity_writer():
+    """Get or create activity log writer instance"""
+    global _activity_writer
+    if _activity_writer is None:
+        _activity_writer = ActivityLogWriter()
+    return _activity_writer
+
+
+if __name__ == '__main__':
+    # Quick throughput check: python activity_log.py [events]
+    import tempfile
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = ActivityLogWriter(log_dir=tmp)
+        event = {'user_id': 'u1', 'article_id': 'a1', 'activity_type': 'view',
+                 'timestamp': '2025-01-01T00:00:00'}
+        start = time.perf_counter()
+        for _ in range(count):
+            writer.append(event)
+        writer.close()
+        elapsed = time.perf_counter() - start
+        print(f"{count} events in {elapsed:.2f}s ({count / elapsed:,.0f} events/s), "
+              f"{writer.stats['flushes']} flushes")
@@ -0,0 +1,243 @@
+"""
+Admission Control
+Bounds how many recommendation computations run at once in a worker and how
+long requests may queue for a slot, so a traffic spike sheds load instead of
+pushing every request past the Node layer's 5-second timeout.
+
+Only cache misses go through admission; cache hits never wait. A request
+carries a deadline (contextvars, like tracing) that RecommendationService
+checks between scoring stages, skipping optional work once it has run out.
+AsyncAdmissionController is the event-loop counterpart used by the ASGI app.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Concurrent scoring computations per worker process
+MAX_CONCURRENT_SCORING = int(os.getenv('ML_MAX_CONCURRENT_SCORING', os.cpu_count() or 4))
+# Requests allowed to wait for a slot; beyond this they are shed immediately
+SCORING_QUEUE_SIZE = int(os.getenv('ML_SCORING_QUEUE_SIZE', 16))
+SCORING_QUEUE_TIMEOUT_MS = float(os.getenv('ML_SCORING_QUEUE_TIMEOUT_MS', 1000))
+
+# Time budget per request, kept under the Node layer's 5s axios timeout.
+# Callers can send a smaller remaining budget in BUDGET_HEADER.
+REQUEST_BUDGET_MS = float(os.getenv('ML_REQUEST_BUDGET_MS', 4000))
+BUDGET_HEADER = 'X-Request-Budget-Ms'
+
+
+class Overloaded(Exception):
+    """The request could not be admitted (queue full, queue wait timed out or deadline spent)"""
+
+    def __init__(self, reason):
+        super().__init__(f"Over capacity: {reason}")
+        self.reason = reason
+
+
+class Deadline:
+    def __init__(self, budget_ms, clock=time.monotonic):
+        """
+        Args:
+            budget_ms: Milliseconds the request may take from now
+            clock: Monotonic clock in seconds (injectable for tests)
+        """
+        self.clock = clock
+        self.expires_at = clock() + budget_ms / 1000.0
+        # Set when work was skipped because the deadline ran out; such results are not cached
+        self.degraded = False
+
+    def remaining(self):
+        """Seconds left (negative once expired)"""
+        return self.expires_at - self.clock()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+_current_deadline = contextvars.ContextVar('current_deadline', default=None)
+
+
+def parse_budget_ms(header_value):
+    """Request budget from the caller's header, capped at REQUEST_BUDGET_MS"""
+    try:
+        budget = float(header_value)
+    except (TypeError, ValueError):
+        return REQUEST_BUDGET_MS
+    return min(max(budget, 0.0), REQUEST_BUDGET_MS)
+
+
+def start_deadline(budget_ms):
+    """
+    Create a Deadline and make it current for this context
+
+    Returns:
+        (deadline, token) - pass the token to end_deadline()
+    """
+    deadline = Deadline(budget_ms)
+    return deadline, _current_deadline.set(deadline)
+
+
+def end_deadline(token):
+    _current_deadline.reset(token)
+
+
+def current_deadline():
+    return _current_deadline.get()
+
+
+def deadline_expired():
+    """Whether the current request is out of time (False outside a request)"""
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.expired()
+
+
+def mark_degraded():
+    """Record that the current request returned partial results"""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.degraded = True
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=None, max_queue=None, queue_timeout_ms=None):
+        """
+        Args:
+            max_concurrent: Computations allowed to run at once
+            max_queue: Requests allowed to wait for a slot
+            queue_timeout_ms: Longest wait for a slot (further capped by the request deadline)
+        """
+        self.max_concurrent = max_concurrent or MAX_CONCURRENT_SCORING
+        self.max_queue = SCORING_QUEUE_SIZE if max_queue is None else max_queue
+        self.queue_timeout = (SCORING_QUEUE_TIMEOUT_MS if queue_timeout_ms is None else queue_timeout_ms) / 1000.0
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Take a slot, waiting in the bounded queue if needed; raises Overloaded"""
+        deadline = current_deadline()
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded('queue_full')
+            if timeout <= 0:
+                self.rejected += 1
+                raise Overloaded('deadline')
+
+            self.waiting += 1
+            try:
+                admitted = self._cond.wait_for(lambda: self.active < self.max_concurrent, timeout=timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                raise Overloaded('queue_timeout')
+            self.active += 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def run(self, fn, *args):
+        """Call fn(*args) inside an admission slot"""
+        self.acquire()
+        try:
+            return fn(*args)
+        finally:
+            self.release()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "rejected": self.rejected,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+            }
+
+
+class AsyncAdmissionController(AdmissionController):
+    """AdmissionController for the ASGI event loop: queued requests wait on the loop, not a thread"""
+
+    def __init__(self, max_concurrent=None, max_queue=None, queue_timeout_ms=None):
+        super().__init__(max_concurrent, max_queue, queue_timeout_ms)
+        # Created on first use so it binds to the running loop
+        self._cond = None
+
+    async def acquire(self):
+        """Take a slot, waiting in the bounded queue if needed; raises Overloaded"""
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        deadline = current_deadline()
+        timeout = self.queue_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline.remaining())
+
+        async with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded('queue_full')
+            if timeout <= 0:
+                self.rejected += 1
+                raise Overloaded('deadline')
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._cond.wait_for(lambda: self.active < self.max_concurrent), timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise Overloaded('queue_timeout')
+            finally:
+                self.waiting -= 1
+            self.active += 1
+
+    async def release(self):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    async def run(self, fn, *args):
+        """Await fn(*args) inside an admission slot"""
+        await self.acquire()
+        try:
+            return await fn(*args)
+        finally:
+            await self.release()
+
+    def snapshot(self):
+        # Only touched from the event loop thread
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+_admission_controller = None
+
+
+def get_admission_controller():
+    """Get or create the per-process admission controller"""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
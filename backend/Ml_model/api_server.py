@@ -2,10 +2,13 @@
 Flask API Server for ML Recommendations
 Provides REST API endpoints for personalized recommendation service
 """
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
+import hmac
 import os
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
 import logging
 
@@ -13,7 +16,17 @@ import logging
 sys.path.append(str(Path(__file__).resolve().parent))
 
 from Recommender_Models import get_recommendation_service
-from cache_manager import get_cache_manager, cached
+from cache_manager import get_cache_manager, cached, build_cache_key
+from recommendation_requests import RecommendationRequest, clamp_top_n, normalize_query, recommendation_cache_key, search_cache_key, serve_degraded, serve_recommendations
+from compression import PrecompressedCache, choose_encoding, compress, should_compress
+from http_caching import CONTENT_MAX_AGE, NO_STORE, TRENDING_MAX_AGE, cache_control, etag_matches, make_etag, trending_bucket
+from admission import BUDGET_HEADER, Overloaded, current_deadline, end_deadline, get_admission_controller, parse_budget_ms, start_deadline
+from activity_log import get_activity_writer
+from facet_index import FACET_COLUMNS, facet_key_fields, parse_facet_filters
+from metrics import CONTENT_TYPE, IN_FLIGHT, SHED_REQUESTS, observe_request, render_metrics, time_stage
+from profiler import MAX_PROFILE_SECONDS, PROFILE_HISTORY, PROFILE_RESULT_TTL, ProfilerBusy, SamplingProfiler
+from response_encoder import encode, parse_fields, project_fields
+from tracing import DEBUG_HEADER, DEBUG_PARAM, current_trace, debug_requested, end_trace, get_slow_log, start_trace, tag
 
 
 # Setup logging
@@ -41,13 +54,241 @@ def create_app(config: dict = None):
     # Initialize services lazily and attach to app for easy testing
     app.recommendation_service = get_recommendation_service()
     app.cache_manager = get_cache_manager()
+    app.activity_writer = get_activity_writer()
+    app.admission = get_admission_controller()
+    app.precompressed = PrecompressedCache()
+    app.recommendation_service.attach_profile_cache(app.cache_manager)
 
     # Register routes using closures to access app services
     register_routes(app)
+    register_metrics(app)
+    register_tracing(app)
+    register_admission(app)
+    register_compression(app)
+    register_admin_routes(app)
 
     return app
 
 
+def register_metrics(app):
+    """Per-request timing hooks and the Prometheus /metrics endpoint"""
+    from flask import current_app
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        # Route template (not the raw path) keeps label cardinality bounded
+        g.metrics_route = request.url_rule.rule if request.url_rule else 'unmatched'
+        IN_FLIGHT.inc(route=g.metrics_route)
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            observe_request(
+                g.metrics_route, g.get('rec_method'), response.status_code,
+                time.perf_counter() - started
+            )
+        return response
+
+    @app.teardown_request
+    def finish_request(exc=None):
+        route = g.pop('metrics_route', None)
+        if route is not None:
+            IN_FLIGHT.dec(route=route)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus metrics for this worker"""
+        svc = current_app.recommendation_service
+        cache = current_app.cache_manager
+        body = render_metrics(
+            cache_stats={"enabled": cache.enabled, **cache.stats.snapshot()},
+            models_loaded=svc.models_loaded,
+            model_version=svc.model_version,
+        )
+        return Response(body, content_type=CONTENT_TYPE)
+
+
+def register_tracing(app):
+    """
+    Per-request span trace: returned to the client on request (X-Debug-Timing
+    header or debug_timing=1) and written to the slow-log when over the threshold
+    """
+    @app.before_request
+    def start_request_trace():
+        g.trace, g.trace_token = start_trace(f"{request.method} {request.path}")
+        g.debug_timing = debug_requested(request.headers.get(DEBUG_HEADER), request.args.get(DEBUG_PARAM))
+
+    @app.after_request
+    def finish_request_trace(response):
+        trace = g.get('trace')
+        if trace is not None:
+            trace.finish()
+            if g.get('debug_timing'):
+                # Unlike the body breakdown, the header also covers serialization
+                response.headers['Server-Timing'] = trace.server_timing()
+            # Profiling requests are slow by design
+            if not request.path.startswith('/api/admin/'):
+                get_slow_log().maybe_record(trace)
+        return response
+
+    @app.teardown_request
+    def end_request_trace(exc=None):
+        token = g.pop('trace_token', None)
+        if token is not None:
+            end_trace(token)
+
+
+def register_admission(app):
+    """Per-request deadline from X-Request-Budget-Ms (capped at ML_REQUEST_BUDGET_MS)"""
+    @app.before_request
+    def start_request_deadline():
+        _, g.deadline_token = start_deadline(parse_budget_ms(request.headers.get(BUDGET_HEADER)))
+
+    @app.teardown_request
+    def end_request_deadline(exc=None):
+        token = g.pop('deadline_token', None)
+        if token is not None:
+            end_deadline(token)
+
+
+def serve_admitted(svc, cache, rec_request, key_fields, compute, ttl, fallback):
+    """
+    serve_recommendations() behind the worker's admission controller, falling
+    back to stale or trending results when the request cannot be admitted
+
+    Returns:
+        (recommendations, from_cache, degraded) - degraded is None, 'stale',
+        'trending' or 'partial' (deadline hit mid-computation)
+    """
+    from flask import current_app
+    try:
+        recommendations, from_cache = serve_recommendations(
+            cache, key_fields, compute, rec_request.top_n, rec_request.exclude_ids, ttl,
+            admission=current_app.admission, keep_stale=not fallback
+        )
+    except Overloaded as e:
+        recommendations, degraded = serve_degraded(
+            cache, svc, key_fields, rec_request.top_n, rec_request.exclude_ids
+        )
+        SHED_REQUESTS.inc(reason=e.reason, served=degraded)
+        logger.warning(f"⚠️  Shed {key_fields['method']} request ({e.reason}), served {degraded}")
+        return recommendations, True, degraded
+
+    deadline = current_deadline()
+    return recommendations, from_cache, 'partial' if deadline is not None and deadline.degraded else None
+
+
+def json_response(payload, status=200):
+    """Recommendation payload encoded with response_encoder (NumPy/Timestamp aware)"""
+    return Response(encode(payload), status=status, mimetype='application/json')
+
+
+def conditional_etag(etag):
+    """
+    ETag to use for this request, and whether If-None-Match already matches it
+
+    Debug-timing requests always get a full, uncached response.
+    """
+    if g.get('debug_timing'):
+        return None, False
+    return etag, etag_matches(request.headers.get('If-None-Match'), etag)
+
+
+def register_compression(app):
+    """gzip/brotli for JSON/text responses above ML_COMPRESS_MIN_BYTES, negotiated via Accept-Encoding"""
+    @app.after_request
+    def compress_response(response):
+        if response.direct_passthrough or not 200 <= response.status_code < 300 or response.status_code == 204:
+            return response
+        if 'Content-Encoding' in response.headers:
+            # Served from the precompressed cache
+            return response
+        body = response.get_data()
+        if not should_compress(response.content_type, len(body)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        with time_stage('compress', g.get('rec_method')):
+            response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def precompressed_hit(etag, max_age):
+    """
+    Already-compressed body for this ETag and the client's Accept-Encoding
+
+    Returns:
+        Complete Response, or None on a miss (including identity-only clients)
+    """
+    from flask import current_app
+    if not etag:
+        return None
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return None
+    body = current_app.precompressed.get(etag, encoding)
+    if body is None:
+        return None
+    response = Response(body, mimetype='application/json')
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return with_http_caching(response, etag, max_age)
+
+
+def not_modified(etag, max_age):
+    response = Response(status=304)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control(max_age)
+    return response
+
+
+def with_http_caching(response, etag, max_age):
+    """ETag + Cache-Control on a full response; degraded or unversioned responses are not stored"""
+    if etag:
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = cache_control(max_age)
+    else:
+        response.headers['Cache-Control'] = NO_STORE
+    return response
+
+
+def cacheable_response(response, etag, max_age):
+    """
+    with_http_caching(), also compressing the body once into the precompressed
+    cache so later hits for the same ETag skip Redis, encoding and compression
+    """
+    from flask import current_app
+    response = with_http_caching(response, etag, max_age)
+    if not etag:
+        return response
+    body = response.get_data()
+    if not should_compress(response.content_type, len(body)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None:
+        return response
+    with time_stage('compress', g.get('rec_method')):
+        compressed = compress(body, encoding)
+    current_app.precompressed.put(etag, encoding, compressed)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def with_timing(response):
+    """Add the trace breakdown to a JSON response dict when debug timing was requested"""
+    trace = current_trace()
+    if trace is not None and g.get('debug_timing'):
+        response["timing"] = trace.to_dict()
+    return response
+
+
 def register_routes(app):
     from flask import current_app
     
@@ -60,84 +301,55 @@ def register_routes(app):
             "status": "healthy",
             "service": "NewsXpress ML Recommendation API",
             "models_loaded": svc.models_loaded,
-            "cache_enabled": cache.enabled
+            "cache_enabled": cache.enabled,
+            "admission": current_app.admission.snapshot(),
+            "precompressed": current_app.precompressed.snapshot()
         })
 
 
     # Unified recommendations endpoint - supports all methods
     @app.route('/api/recommendations', methods=['GET', 'POST'])
-    def get_recommendations():
+    def get_recommendations(user_id=None):
         try:
             svc = current_app.recommendation_service
             cache = current_app.cache_manager
             
-            # Parse params from GET or POST
+            # Query params apply to GET and POST; a JSON body overrides them
+            params = request.args.to_dict()
+            params['exclude'] = request.args.getlist('exclude')
+            params['recent_articles'] = request.args.getlist('recent_articles')
+            params['fields'] = request.args.getlist('fields')
             if request.method == 'POST':
-                params = request.json or {}
-            else:
-                params = request.args.to_dict()
-                params['exclude'] = request.args.getlist('exclude')
+                params.update(request.get_json(silent=True) or {})
             
-            user_id = params.get('user_id')
-            article_id = params.get('article_id')
-            method = params.get('method', 'hybrid')
-            top_n = int(params.get('top_n', 10))
-            exclude_ids = params.get('exclude', [])
+            # Legacy /personalized/<user_id> route carries the user in the path
+            if user_id is not None:
+                params['user_id'] = user_id
             
-            # Build cache key
-            cache_key = f"rec:{method}:u={user_id}:a={article_id}:n={top_n}"
-            cached_result = cache.get(cache_key)
-            
-            if cached_result:
-                logger.info(f"Cache hit: {cache_key}")
-                return jsonify({
-                    "success": True,
-                    "recommendations": cached_result,
-                    "method": method,
-                    "from_cache": True
-                })
-            
-            # Route to appropriate method
-            if method == 'content' and article_id:
-                recommendations = svc.get_similar_articles(
-                    article_id=article_id,
-                    top_n=top_n,
-                    exclude_ids=exclude_ids
-                )
-            elif method == 'collaborative' and user_id:
-                recommendations = svc.get_collaborative_recommendations(
-                    user_id=user_id,
-                    top_n=top_n,
-                    exclude_ids=exclude_ids
-                )
-            elif method == 'hybrid' and user_id:
-                recent_articles = params.get('recent_articles', [])
-                recommendations = svc.get_hybrid_recommendations(
-                    user_id=user_id,
-                    recent_article_ids=recent_articles,
-                    top_n=top_n,
-                    exclude_ids=exclude_ids
-                )
-            elif method == 'trending':
-                recommendations = svc.get_trending_articles(
-                    top_n=top_n,
-                    time_window_days=int(params.get('days', 7))
-                )
-            else:
-                # Fallback to trending if invalid params
-                logger.warning(f"Invalid method/params: {method}, user_id={user_id}, article_id={article_id}")
-                recommendations = svc.get_trending_articles(top_n=top_n)
+            rec_request = RecommendationRequest(params)
+            method = g.rec_method = rec_request.method
+            key_fields, compute, ttl, fallback = rec_request.plan(svc, cache)
             
-            # Cache with appropriate TTL
-            ttl = 900 if user_id else 1800  # 15 min for personalized, 30 min for others
-            cache.set(cache_key, recommendations, ttl_seconds=ttl)
+            recommendations, from_cache, degraded = serve_admitted(
+                svc, cache, rec_request, key_fields, compute, ttl, fallback
+            )
+            if fallback:
+                cache.stats.record_tier('negative', from_cache)
             
-            return jsonify({
+            response = {
                 "success": True,
-                "recommendations": recommendations,
+                "recommendations": project_fields(recommendations, rec_request.fields),
                 "method": method,
-                "from_cache": False
-            })
+                "from_cache": from_cache
+            }
+            if fallback:
+                response["fallback"] = "cold_start"
+            if degraded:
+                response["degraded"] = degraded
+            tag(method=method, user_id=rec_request.user_id, article_id=rec_request.article_id,
+                top_n=rec_request.top_n, from_cache=from_cache, degraded=degraded)
+            with time_stage('serialize', method):
+                return json_response(with_timing(response))
             
         except Exception as e:
             logger.error(f"Error in get_recommendations: {e}")
@@ -151,43 +363,60 @@ def register_routes(app):
 
     @app.route('/api/recommendations/similar/<article_id>', methods=['GET'])
     def get_similar_articles(article_id):
-        """Content-based recommendations for a given article_id (SPA-friendly)."""
+        """Content-based recommendations for a given article_id (SPA-friendly, supports If-None-Match)."""
         try:
             svc = current_app.recommendation_service
             cache = current_app.cache_manager
 
-            top_n = int(request.args.get('top_n', 10))
-            exclude_ids = request.args.getlist('exclude')
-
-            # Force content method and build cache key aligned with cache manager patterns
-            method = 'content'
-            cache_key = f"rec:{method}:a={article_id}:n={top_n}"
-
-            cached_result = cache.get(cache_key)
-            if cached_result:
-                logger.info(f"Cache hit: {cache_key}")
-                return jsonify({
-                    "success": True,
-                    "recommendations": cached_result,
-                    "method": method,
-                    "from_cache": True
-                })
-
-            recommendations = svc.get_similar_articles(
-                article_id=article_id,
-                top_n=top_n,
-                exclude_ids=exclude_ids
+            # Force content method; shares cache entries with /api/recommendations?method=content
+            method = g.rec_method = 'content'
+            rec_request = RecommendationRequest({
+                'method': method,
+                'article_id': article_id,
+                'top_n': request.args.get('top_n', 10),
+                'exclude': request.args.getlist('exclude'),
+                **{column: request.args.get(column) for column in FACET_COLUMNS},
+                'max_age_days': request.args.get('max_age_days'),
+                'recency_boost': request.args.get('recency_boost'),
+                'fields': request.args.getlist('fields'),
+            })
+            key_fields, compute, ttl, fallback = rec_request.plan(svc, cache)
+
+            # Validate against the model version before touching Redis or the models.
+            # Cold-start answers only last NEGATIVE_CACHE_TTL, so they get no ETag.
+            etag, matched = None, False
+            if not fallback:
+                cache_key, _ = recommendation_cache_key(key_fields, rec_request.top_n, rec_request.exclude_ids)
+                etag, matched = conditional_etag(make_etag(
+                    svc.model_version, cache_key, sorted(rec_request.exclude_ids), rec_request.fields
+                ))
+            if matched:
+                return not_modified(etag, CONTENT_MAX_AGE)
+            hit = precompressed_hit(etag, CONTENT_MAX_AGE)
+            if hit is not None:
+                return hit
+
+            # Cached for 30 minutes (content-based)
+            recommendations, from_cache, degraded = serve_admitted(
+                svc, cache, rec_request, key_fields, compute, ttl, fallback
             )
+            if fallback:
+                cache.stats.record_tier('negative', from_cache)
 
-            # Cache for 30 minutes (content-based)
-            cache.set(cache_key, recommendations, ttl_seconds=1800)
-
-            return jsonify({
+            response = {
                 "success": True,
-                "recommendations": recommendations,
+                "recommendations": project_fields(recommendations, rec_request.fields),
                 "method": method,
-                "from_cache": False
-            })
+                "from_cache": from_cache
+            }
+            if fallback:
+                response["fallback"] = "cold_start"
+            if degraded:
+                response["degraded"] = degraded
+            tag(method=method, article_id=article_id, top_n=rec_request.top_n, from_cache=from_cache, degraded=degraded)
+            with time_stage('serialize', method):
+                body = json_response(with_timing(response))
+            return cacheable_response(body, None if degraded else etag, CONTENT_MAX_AGE)
 
         except Exception as e:
             logger.error(f"Error in get_similar_articles: {e}")
@@ -204,7 +433,7 @@ def register_routes(app):
 
     @app.route('/api/recommendations/personalized/<user_id>', methods=['GET', 'POST'])
     def get_personalized_recommendations_legacy(user_id):
-        return get_recommendations()
+        return get_recommendations(user_id=user_id)
 
     @app.route('/api/track', methods=['POST'])
     def track_activity():
@@ -224,24 +453,25 @@ def register_routes(app):
                     "error": "Missing required fields: article_id, activity_type"
                 }), 400
             
-            # Log activity (eventually to DB, for now to JSON log)
-            activity_log_path = Path(__file__).resolve().parent / 'data' / 'activity_logs.jsonl'
-            activity_log_path.parent.mkdir(exist_ok=True)
-            
             # Add timestamp if missing
             if 'timestamp' not in data:
-                from datetime import datetime
                 data['timestamp'] = datetime.utcnow().isoformat()
             
-            # Append to JSONL file
+            # Buffered append to this worker's JSONL segment (eventually to DB)
             try:
-                import json
-                with open(activity_log_path, 'a') as f:
-                    f.write(json.dumps(data) + '\n')
-                logger.info(f"Tracked {data['activity_type']} on article {data['article_id']}")
+                current_app.activity_writer.append(data)
+                logger.debug(f"Tracked {data['activity_type']} on article {data['article_id']}")
             except Exception as log_err:
                 logger.warning(f"Could not write to activity log: {log_err}")
             
+            # Update trending scores (anonymous events count too) and the user's short-term profile right away
+            try:
+                current_app.recommendation_service.record_activity(
+                    data.get('user_id'), data['article_id'], data['activity_type']
+                )
+            except Exception as profile_err:
+                logger.warning(f"Could not update trending/short-term profile: {profile_err}")
+            
             return jsonify({
                 "success": True,
                 "message": "Activity tracked successfully"
@@ -260,42 +490,119 @@ def register_routes(app):
     def get_trending():
         """
         Get trending articles
-        Query params: top_n (default: 10), days (default: 7)
+        Query params: top_n (default: 10), days (default: 7), topic, place, source_id, language_code
+        Supports If-None-Match (ETag keyed on model version)
         """
         try:
             svc = current_app.recommendation_service
             cache = current_app.cache_manager
             
-            top_n = int(request.args.get('top_n', 10))
+            top_n = clamp_top_n(request.args.get('top_n', 10))
             days = int(request.args.get('days', 7))
+            filters = parse_facet_filters(request.args.to_dict())
+            fields = parse_fields(request.args.getlist('fields'))
+            g.rec_method = 'trending'
+            
+            cache_key = build_cache_key('trending', top_n=top_n, days=days, **facet_key_fields(filters))
+            etag, matched = conditional_etag(make_etag(svc.model_version, cache_key, fields, trending_bucket()))
+            if matched:
+                return not_modified(etag, TRENDING_MAX_AGE)
+            hit = precompressed_hit(etag, TRENDING_MAX_AGE)
+            if hit is not None:
+                return hit
             
             # Check cache
-            cache_key = f"rec:trending:n={top_n}:days={days}"
-            cached_result = cache.get(cache_key)
+            with time_stage('cache_lookup', 'trending'):
+                cached_result = cache.get(cache_key)
             
             if cached_result:
-                return jsonify({
+                with time_stage('serialize', 'trending'):
+                    body = json_response({
+                        "success": True,
+                        "recommendations": project_fields(cached_result, fields),
+                        "from_cache": True
+                    })
+                return cacheable_response(body, etag, TRENDING_MAX_AGE)
+            
+            start = time.perf_counter()
+            with time_stage('scoring', 'trending'):
+                recommendations = svc.get_trending_articles(
+                    top_n=top_n,
+                    time_window_days=days,
+                    filters=filters
+                )
+            cache.stats.record_compute('trending', time.perf_counter() - start)
+            
+            # Cache for 5 minutes
+            with time_stage('cache_store', 'trending'):
+                cache.set(cache_key, recommendations, ttl_seconds=300)
+            
+            with time_stage('serialize', 'trending'):
+                body = json_response({
                     "success": True,
-                    "recommendations": cached_result,
-                    "from_cache": True
+                    "recommendations": project_fields(recommendations, fields),
+                    "from_cache": False
                 })
+            return cacheable_response(body, etag, TRENDING_MAX_AGE)
             
-            recommendations = svc.get_trending_articles(
-                top_n=top_n,
-                time_window_days=days
-            )
+        except Exception as e:
+            logger.error(f"Error in get_trending: {e}")
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 500
+
+    @app.route('/api/search', methods=['GET'])
+    def search_articles():
+        """
+        Free-text article search
+        Query params: q (required), top_n (default: 10), topic, place, source_id, language_code
+        """
+        try:
+            svc = current_app.recommendation_service
+            cache = current_app.cache_manager
+            
+            query = normalize_query(request.args.get('q'))
+            if not query:
+                return jsonify({
+                    "success": False,
+                    "error": "Missing required parameter: q"
+                }), 400
+            top_n = clamp_top_n(request.args.get('top_n', 10))
+            filters = parse_facet_filters(request.args.to_dict())
+            fields = parse_fields(request.args.getlist('fields'))
+            g.rec_method = 'search'
+            
+            cache_key = search_cache_key(query, top_n, filters)
+            with time_stage('cache_lookup', 'search'):
+                cached_result = cache.get(cache_key)
+            
+            if cached_result:
+                with time_stage('serialize', 'search'):
+                    return json_response({
+                        "success": True,
+                        "results": project_fields(cached_result, fields),
+                        "from_cache": True
+                    })
+            
+            start = time.perf_counter()
+            with time_stage('scoring', 'search'):
+                results = svc.search_articles(query, top_n=top_n, filters=filters)
+            cache.stats.record_compute('search', time.perf_counter() - start)
             
             # Cache for 5 minutes
-            cache.set(cache_key, recommendations, ttl_seconds=300)
+            with time_stage('cache_store', 'search'):
+                cache.set(cache_key, results, ttl_seconds=300)
             
-            return jsonify({
-                "success": True,
-                "recommendations": recommendations,
-                "from_cache": False
-            })
+            with time_stage('serialize', 'search'):
+                return json_response({
+                    "success": True,
+                    "results": project_fields(results, fields),
+                    "from_cache": False
+                })
             
         except Exception as e:
-            logger.error(f"Error in get_trending: {e}")
+            logger.error(f"Error in search_articles: {e}")
             return jsonify({
                 "success": False,
                 "error": str(e)
@@ -391,6 +698,100 @@ def register_routes(app):
             }), 500
 
 
+def admin_authorized():
+    """Check X-Admin-Token against ML_ADMIN_TOKEN; admin routes are off when it is unset"""
+    expected = os.getenv('ML_ADMIN_TOKEN')
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(expected) and hmac.compare_digest(supplied.encode('utf-8'), expected.encode('utf-8'))
+
+
+def profile_cache_key(profile_id):
+    return f"cpu_profile:{profile_id}"
+
+
+def register_admin_routes(app):
+    # profile id -> SamplingProfiler of the profiles this worker ran (latest few)
+    app.profiles = {}
+
+    def publish_profile(profiler, ttl_seconds=PROFILE_RESULT_TTL):
+        result = {**profiler.summary(), "collapsed": profiler.collapsed()}
+        app.cache_manager.set(profile_cache_key(profiler.profile_id), result, ttl_seconds=ttl_seconds)
+
+    def profile_finished(profiler):
+        logger.info(f"🔬 Profiled worker {os.getpid()} for {profiler.duration:.1f}s ({profiler.samples} samples)")
+        publish_profile(profiler)
+
+    @app.route('/api/admin/profile', methods=['POST'])
+    def profile_worker():
+        """
+        Start sampling this worker's threads for N seconds in the background
+        Query params: seconds (default: 10), interval_ms (default: 10), include_idle (default: 0)
+        The request returns at once; fetch the result from GET /api/admin/profile/<profile_id>
+        """
+        if not admin_authorized():
+            return jsonify({"success": False, "error": "Unauthorized"}), 403
+        try:
+            seconds = float(request.args.get('seconds', 10))
+            interval = float(request.args.get('interval_ms', 10)) / 1000.0
+            if seconds <= 0 or interval <= 0:
+                raise ValueError("seconds and interval_ms must be positive")
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+
+        profiler = SamplingProfiler(
+            interval=interval,
+            include_idle=request.args.get('include_idle') in ('1', 'true'),
+        )
+        try:
+            profiler.start(seconds, on_done=profile_finished)
+        except ProfilerBusy as e:
+            return jsonify({"success": False, "error": str(e)}), 409
+        app.profiles[profiler.profile_id] = profiler
+        while len(app.profiles) > PROFILE_HISTORY:
+            app.profiles.pop(next(iter(app.profiles)))
+        # Other workers answer polls from the cache while it runs
+        publish_profile(profiler, ttl_seconds=MAX_PROFILE_SECONDS + PROFILE_RESULT_TTL)
+
+        return jsonify({
+            "success": True,
+            "profile_id": profiler.profile_id,
+            "status": "running",
+            "pid": os.getpid(),
+            "seconds": min(seconds, MAX_PROFILE_SECONDS),
+        }), 202, {'X-Worker-Pid': str(os.getpid())}
+
+    @app.route('/api/admin/profile/<profile_id>', methods=['GET', 'DELETE'])
+    def profile_result(profile_id):
+        """
+        Status or result of a profile started with POST /api/admin/profile
+        Query params: format (json | collapsed, default: json); DELETE stops it early
+        (only on the worker running it)
+        """
+        if not admin_authorized():
+            return jsonify({"success": False, "error": "Unauthorized"}), 403
+        profiler = app.profiles.get(profile_id)
+        if request.method == 'DELETE':
+            if profiler is None:
+                return jsonify({"success": False, "error": "Profile is not running in this worker"}), 404
+            profiler.stop()
+            profiler.join()
+            return jsonify({"success": True, **profiler.summary()}), 200
+
+        if profiler is not None:
+            result = {**profiler.summary(), "collapsed": profiler.collapsed()}
+        else:
+            result = app.cache_manager.get(profile_cache_key(profile_id))
+        if not result:
+            return jsonify({"success": False, "error": "Unknown or expired profile"}), 404
+
+        headers = {'X-Worker-Pid': str(result["pid"])}
+        if result["status"] == "running":
+            return jsonify({"success": True, "profile_id": profile_id, "status": "running"}), 202, headers
+        if request.args.get('format') == 'collapsed':
+            return Response(result["collapsed"], content_type='text/plain; charset=utf-8', headers=headers)
+        return jsonify({"success": True, **result}), 200, headers
+
+
 # Create default app instance for running the server directly or for WSGI servers
 app = create_app()
 
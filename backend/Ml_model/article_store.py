@@ -0,0 +1,162 @@
+"""
+Article Store
+Read-only view over article_metadata built once per loaded model: an
+id -> row map and published_at as an int64 epoch-seconds array kept in sorted
+order, so "articles published since t" is a binary search plus a slice
+(O(log N + K)) instead of parsing and filtering the whole frame per request.
+
+Used by trending (time window), and by the recency filter/boost on content and
+hybrid recommendations.
+
+Articles are also partitioned by topic and place: each partition keeps its rows
+in publication order, so "newest sports articles this week" is again a binary
+search plus a slice.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Half-life of the recency boost: an article this old keeps half its boost
+RECENCY_HALF_LIFE_DAYS = float(os.getenv('REC_RECENCY_HALF_LIFE_DAYS', 2))
+
+# article_metadata columns articles are partitioned by
+PARTITION_COLUMNS = ('topic', 'place')
+
+SECONDS_PER_DAY = 86400
+# Epoch given to rows without a parseable published_at; sorts before every window
+MISSING_EPOCH = np.iinfo(np.int64).min
+
+
+def normalize_facet(value):
+    """Facet value as matched in partitions (stripped, lowercase), or None when empty"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    value = str(value).strip().lower()
+    return value or None
+
+
+def partition_key(column, value):
+    """Partition key for a column value, e.g. 'topic=sports' (None when the value is empty)"""
+    value = normalize_facet(value)
+    return f"{column}={value}" if value is not None else None
+
+
+class ArticleStore:
+    def __init__(self, metadata):
+        """
+        Args:
+            metadata: article_metadata DataFrame (one row per article, 'id' and 'published_at' columns)
+        """
+        self.metadata = metadata
+        self.published = pd.to_datetime(metadata['published_at'])
+        # Naive timestamps are compared with the local wall clock, as before the store existed
+        self.tz_aware = getattr(self.published.dt, 'tz', None) is not None
+        origin = pd.Timestamp(0, tz='UTC') if self.tz_aware else pd.Timestamp(0)
+        seconds = (self.published - origin) // pd.Timedelta(seconds=1)
+        self.epoch = seconds.fillna(MISSING_EPOCH).to_numpy(dtype=np.int64)
+
+        # Rows ordered by publication time, oldest first
+        self.by_time = np.argsort(self.epoch, kind='stable')
+        self.sorted_epoch = self.epoch[self.by_time]
+
+        rows = pd.Series(np.arange(len(metadata)), index=metadata['id'].astype(str))
+        self.rows = rows[~rows.index.duplicated()].to_dict()
+
+        # column -> normalized value per row; partition key -> (rows oldest first, their epochs)
+        self.facets = {}
+        self._partitions = {}
+        for column in PARTITION_COLUMNS:
+            if column in metadata:
+                self._index_partitions(column)
+
+    def _index_partitions(self, column):
+        values = np.array([normalize_facet(v) for v in self.metadata[column]], dtype=object)
+        self.facets[column] = values
+        # Group rows by value while keeping each group in publication order
+        codes, uniques = pd.factorize(values[self.by_time], use_na_sentinel=True)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        for code, value in enumerate(uniques):
+            start, end = np.searchsorted(sorted_codes, [code, code + 1])
+            group = self.by_time[order[start:end]]
+            self._partitions[f"{column}={value}"] = (group, self.epoch[group])
+
+    def __len__(self):
+        return len(self.epoch)
+
+    def row(self, article_id):
+        """Row of an article, or None when unknown"""
+        return self.rows.get(str(article_id))
+
+    def now(self):
+        """Current time in the store's epoch seconds"""
+        if self.tz_aware:
+            return int(time.time())
+        return int((pd.Timestamp.now() - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+
+    def cutoff(self, days):
+        """Epoch of the oldest publication time inside a window of the last `days` days"""
+        return self.now() - int(days * SECONDS_PER_DAY)
+
+    def rows_since(self, since, partition=None):
+        """Rows published at or after epoch `since`, oldest first (only in `partition` if given)"""
+        if partition is None:
+            rows, epochs = self.by_time, self.sorted_epoch
+        else:
+            rows, epochs = self._partitions.get(partition, (self.by_time[:0], self.sorted_epoch[:0]))
+        start = np.searchsorted(epochs, since, side='left')
+        return rows[start:]
+
+    def newest(self, since=None, partition=None):
+        """Rows newest first, optionally only those published at or after `since` / in `partition`"""
+        return self.rows_since(MISSING_EPOCH + 1 if since is None else since, partition)[::-1]
+
+    def partitions(self, row):
+        """Partition keys of a row, e.g. ('topic=sports', 'place=india')"""
+        return tuple(
+            f"{column}={values[row]}" for column, values in self.facets.items() if values[row] is not None
+        )
+
+    def in_partition(self, row, key):
+        column, _, value = key.partition('=')
+        values = self.facets.get(column)
+        return values is not None and values[row] == value
+
+    def published_since(self, row, since):
+        return self.epoch[row] >= since
+
+    def recency_weights(self, rows, half_life_days=None):
+        """
+        2^(-age / half-life) for each row: 1 for articles published now, 0 without a date
+
+        Args:
+            rows: Row numbers
+            half_life_days: Defaults to RECENCY_HALF_LIFE_DAYS
+        """
+        half_life = (half_life_days or RECENCY_HALF_LIFE_DAYS) * SECONDS_PER_DAY
+        epoch = self.epoch[np.asarray(rows, dtype=np.int64)]
+        age = np.maximum(self.now() - epoch.astype(np.float64), 0.0)
+        weights = np.exp2(-age / half_life)
+        weights[epoch == MISSING_EPOCH] = 0.0
+        return weights
+
+    def records(self, rows, **columns):
+        """
+        Rows as article dicts with published_at parsed
+
+        Args:
+            rows: Row numbers
+            columns: Extra per-row values added to each dict (e.g. trending_score=[...])
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        frame = self.metadata.iloc[rows].assign(published_at=self.published.iloc[rows].array)
+        for name, values in columns.items():
+            frame[name] = values
+        return frame.to_dict('records')
+
+
+def recency_blend(score, weight, boost):
+    """Score scaled towards its recency weight: boost=0 keeps it, boost=1 multiplies it by weight"""
+    return score * ((1.0 - boost) + boost * weight)
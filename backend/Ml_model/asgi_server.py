@@ -0,0 +1,541 @@
+"""
+ASGI API Server for ML Recommendations
+Async serving mode for cache-heavy traffic: Redis access goes through
+redis.asyncio and CPU-bound scoring runs in a bounded thread pool, so one
+worker keeps serving cache hits while misses are being computed.
+Shares RecommendationService and request handling with the Flask app,
+including request deadlines, admission control of misses, stale copies and
+the degraded (stale / trending) answers to requests that are shed.
+
+Run with: uvicorn asgi_server:app --host 0.0.0.0 --port $PORT
+"""
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs
+import logging
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from Recommender_Models import get_recommendation_service
+from cache_manager import AsyncCacheManager, get_cache_manager, build_cache_key, cached_list_size, apply_exclusions
+from recommendation_requests import (
+    STALE_TTL, DEGRADED_TRENDING_DAYS, RecommendationRequest, clamp_top_n, degraded_trending_plan, normalize_query,
+    recommendation_cache_key, search_cache_key, stale_key,
+)
+from admission import (
+    BUDGET_HEADER, AsyncAdmissionController, Overloaded, current_deadline, deadline_expired, end_deadline,
+    parse_budget_ms, start_deadline,
+)
+from metrics import CONTENT_TYPE, IN_FLIGHT, SHED_REQUESTS, STAGE_LATENCY, method_label, observe_request, render_metrics, time_stage
+from tracing import DEBUG_HEADER, DEBUG_PARAM, debug_requested, end_trace, get_slow_log, span, start_trace, tag
+from response_encoder import encode, parse_fields, project_fields
+from compression import choose_encoding, compress, should_compress
+from facet_index import FACET_COLUMNS, facet_key_fields, parse_facet_filters
+from http_caching import CONTENT_MAX_AGE, NO_STORE, TRENDING_MAX_AGE, cache_control, etag_matches, make_etag, trending_bucket
+
+logger = logging.getLogger(__name__)
+
+
+class Request:
+    """Minimal HTTP request view over an ASGI scope and its body"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        self.headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        self.body = body
+        # Recommendation method, set by handlers for metrics labels
+        self.rec_method = None
+        self.trace = None
+        self.debug_timing = False
+        # Extra response headers set by handlers (ETag, Cache-Control)
+        self.response_headers = []
+
+    @classmethod
+    async def read(cls, scope, receive):
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        return cls(scope, b''.join(chunks))
+
+    def arg(self, name, default=None):
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def arg_list(self, name):
+        return list(self.query.get(name, []))
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return {}
+
+
+class ScoringExecutor:
+    """Thread pool with a bounded number of running + queued scoring jobs"""
+
+    def __init__(self, max_workers=4, max_pending=64):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scoring')
+        self.max_pending = max_pending
+        self._slots = None
+
+    async def run(self, fn, *args):
+        # Callers beyond max_pending wait on the loop instead of piling up in the pool queue
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            # run_in_executor does not carry contextvars over; copy them so the
+            # request's trace sees spans opened inside RecommendationService
+            call = functools.partial(contextvars.copy_context().run, fn, *args)
+            return await loop.run_in_executor(self._executor, call)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RecommendationASGIApp:
+    def __init__(self, recommendation_service, cache_manager, executor, allowed_origins=None, admission=None):
+        self.recommendation_service = recommendation_service
+        self.cache_manager = cache_manager
+        self.executor = executor
+        # Gates cache misses like the Flask app's AdmissionController
+        self.admission = admission or AsyncAdmissionController()
+        self.allowed_origins = allowed_origins
+        self._started = False
+        self._start_lock = None
+        # Flask-style templates; the template doubles as the metrics route label
+        routes = [
+            ({'GET'}, '/health', self.health_check),
+            ({'GET'}, '/metrics', self.get_metrics),
+            ({'GET', 'POST'}, '/api/recommendations', self.get_recommendations),
+            ({'GET', 'POST'}, '/api/recommendations/personalized/<user_id>', self.get_recommendations),
+            ({'GET'}, '/api/recommendations/similar/<article_id>', self.get_similar_articles),
+            ({'GET'}, '/api/recommendations/trending', self.get_trending),
+            ({'GET'}, '/api/search', self.search_articles),
+            ({'GET'}, '/api/cache/stats', self.get_cache_stats),
+        ]
+        self.routes = [
+            (methods, re.compile(re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', template) + r'/?$'), template, handler)
+            for methods, template, handler in routes
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        await self._ensure_started()
+        started = time.perf_counter()
+        request = await Request.read(scope, receive)
+        handler, route, path_params = self._match(request)
+        request.trace, trace_token = start_trace(f"{request.method} {request.path}")
+        request.debug_timing = debug_requested(request.headers.get(DEBUG_HEADER.lower()), request.arg(DEBUG_PARAM))
+        _, deadline_token = start_deadline(parse_budget_ms(request.headers.get(BUDGET_HEADER.lower())))
+        IN_FLIGHT.inc(route=route)
+        try:
+            if handler is None:
+                status, payload = 404, {"success": False, "error": "Not found"}
+            else:
+                try:
+                    status, payload = await handler(request, **path_params)
+                except Exception as e:
+                    logger.error(f"Error in {handler.__name__}: {e}")
+                    status, payload = 500, {"success": False, "error": str(e)}
+                    request.response_headers = []
+            if payload is None:
+                await self._send(send, request, status, b'', None)
+            elif isinstance(payload, str):
+                await self._send(send, request, status, payload.encode('utf-8'), CONTENT_TYPE)
+            else:
+                await self._send_json(send, request, status, payload)
+        finally:
+            IN_FLIGHT.dec(route=route)
+            end_deadline(deadline_token)
+            end_trace(trace_token)
+        observe_request(route, request.rec_method, status, time.perf_counter() - started)
+        get_slow_log().maybe_record(request.trace)
+
+    # Plumbing -------------------------------------------------------------
+
+    def _conditional(self, request, etag, max_age):
+        """
+        Set ETag/Cache-Control for a cacheable response
+
+        Returns:
+            True if If-None-Match matched and a 304 should be sent
+        """
+        if etag is None or request.debug_timing:
+            request.response_headers.append(('Cache-Control', NO_STORE))
+            return False
+        request.response_headers += [('ETag', etag), ('Cache-Control', cache_control(max_age))]
+        return etag_matches(request.headers.get('if-none-match'), etag)
+
+    async def _ensure_started(self):
+        """Connect Redis on first request when the server has no lifespan support"""
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if not self._started:
+                await self.cache_manager.connect()
+                self._started = True
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self._ensure_started()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.cache_manager.close()
+                self.executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _match(self, request):
+        for methods, pattern, template, handler in self.routes:
+            match = pattern.match(request.path)
+            if match and request.method in methods:
+                return handler, template, match.groupdict()
+        return None, 'unmatched', {}
+
+    async def _send_json(self, send, request, status, payload):
+        with time_stage('serialize', request.rec_method):
+            body = encode(payload)
+        await self._send(send, request, status, body, 'application/json')
+
+    async def _send(self, send, request, status, body, content_type):
+        headers = []
+        if 200 <= status < 300 and should_compress(content_type, len(body)):
+            headers.append((b'vary', b'Accept-Encoding'))
+            encoding = choose_encoding(request.headers.get('accept-encoding'))
+            if encoding is not None:
+                with time_stage('compress', request.rec_method):
+                    body = compress(body, encoding)
+                headers.append((b'content-encoding', encoding.encode('latin-1')))
+        headers.append((b'content-length', str(len(body)).encode('latin-1')))
+        if content_type:
+            headers.append((b'content-type', content_type.encode('latin-1')))
+        headers.extend(
+            (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in request.response_headers
+        )
+        if request.debug_timing:
+            request.trace.finish()
+            headers.append((b'server-timing', request.trace.server_timing().encode('latin-1')))
+        origin = request.headers.get('origin')
+        if self.allowed_origins is None:
+            headers.append((b'access-control-allow-origin', b'*'))
+        elif origin in self.allowed_origins:
+            headers.append((b'access-control-allow-origin', origin.encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def serve_recommendations(self, key_fields, compute, top_n, exclude_ids, ttl_seconds, keep_stale=True):
+        """
+        Async counterpart of recommendation_requests.serve_recommendations
+
+        Raises:
+            Overloaded: a miss could not be admitted; answer with serve_degraded()
+        """
+        cache = self.cache_manager
+
+        method = key_fields['method']
+
+        async def run(exclude, n):
+            if deadline_expired():
+                raise Overloaded('deadline')
+            with time_stage('admission_wait', method):
+                await self.admission.acquire()
+            try:
+                start = time.perf_counter()
+                with span('scoring'):
+                    recommendations = await self.executor.run(compute, exclude, n)
+                elapsed = time.perf_counter() - start
+                cache.stats.record_compute(method, elapsed)
+                STAGE_LATENCY.observe(elapsed, stage='scoring', method=method_label(method))
+                return recommendations
+            finally:
+                await self.admission.release()
+
+        async def store(cache_key, recommendations):
+            deadline = current_deadline()
+            if deadline is not None and deadline.degraded:
+                # Partial results from a request that ran out of time
+                return
+            with time_stage('cache_store', method):
+                await cache.set(cache_key, recommendations, ttl_seconds=ttl_seconds)
+                if keep_stale and STALE_TTL > 0:
+                    await cache.set(stale_key(cache_key), recommendations, ttl_seconds=STALE_TTL)
+
+        cache_key, exact = recommendation_cache_key(key_fields, top_n, exclude_ids)
+        if exact:
+            with time_stage('cache_lookup', method):
+                cached_result = await cache.get(cache_key)
+            if cached_result:
+                return cached_result, True
+            recommendations = await run(exclude_ids, top_n)
+            await store(cache_key, recommendations)
+            return recommendations, False
+
+        # Candidate mode: one unfiltered top-(n + slack) list serves every exclusion set
+        n_cached = cached_list_size(top_n)
+        with time_stage('cache_lookup', method):
+            candidates = await cache.get(cache_key)
+        from_cache = bool(candidates)
+        if not from_cache:
+            candidates = await run(None, n_cached)
+            await store(cache_key, candidates)
+
+        recommendations = apply_exclusions(candidates, exclude_ids, top_n)
+        if len(recommendations) < top_n and len(candidates) >= n_cached:
+            # Exclusions removed more items than the slack covers; compute exactly
+            return await run(exclude_ids, top_n), False
+        return recommendations, from_cache
+
+    async def serve_degraded(self, key_fields, top_n, exclude_ids):
+        """Async counterpart of recommendation_requests.serve_degraded"""
+        cache = self.cache_manager
+        cache_key, _ = recommendation_cache_key(key_fields, top_n, exclude_ids)
+        stale = await cache.get(stale_key(cache_key))
+        if stale:
+            return apply_exclusions(stale, exclude_ids, top_n), 'stale'
+
+        n, filters, trending_key = degraded_trending_plan(key_fields, top_n, exclude_ids)
+        trending = await cache.get(trending_key)
+        if not trending:
+            # A heap read, run on the loop so it does not queue behind the scoring it is standing in for
+            trending = self.recommendation_service.get_trending_articles(
+                top_n=n, time_window_days=DEGRADED_TRENDING_DAYS, filters=filters
+            )
+            await cache.set(trending_key, trending, ttl_seconds=300)
+        return apply_exclusions(trending, exclude_ids, top_n), 'trending'
+
+    async def serve_admitted(self, rec_request, key_fields, compute, ttl, fallback):
+        """
+        Async counterpart of api_server.serve_admitted
+
+        Returns:
+            (recommendations, from_cache, degraded) - degraded is None, 'stale',
+            'trending' or 'partial' (deadline hit mid-computation)
+        """
+        try:
+            recommendations, from_cache = await self.serve_recommendations(
+                key_fields, compute, rec_request.top_n, rec_request.exclude_ids, ttl, keep_stale=not fallback
+            )
+        except Overloaded as e:
+            recommendations, degraded = await self.serve_degraded(
+                key_fields, rec_request.top_n, rec_request.exclude_ids
+            )
+            SHED_REQUESTS.inc(reason=e.reason, served=degraded)
+            logger.warning(f"⚠️  Shed {key_fields['method']} request ({e.reason}), served {degraded}")
+            return recommendations, True, degraded
+
+        deadline = current_deadline()
+        return recommendations, from_cache, 'partial' if deadline is not None and deadline.degraded else None
+
+    async def _respond_recommendations(self, request, rec_request, max_age=None):
+        """
+        Args:
+            max_age: Make the response HTTP-cacheable (ETag + Cache-Control) for this many seconds
+        """
+        request.rec_method = rec_request.method
+        svc = self.recommendation_service
+        if rec_request.user_id:
+            # Planning a user request reads the shared profile store through the
+            # sync Redis client, so keep it off the event loop
+            key_fields, compute, ttl, fallback = await self.executor.run(rec_request.plan, svc)
+        else:
+            key_fields, compute, ttl, fallback = rec_request.plan(svc)
+        if max_age is not None:
+            etag = None
+            # Cold-start answers only last NEGATIVE_CACHE_TTL, so they get no ETag
+            if not fallback:
+                cache_key, _ = recommendation_cache_key(key_fields, rec_request.top_n, rec_request.exclude_ids)
+                etag = make_etag(svc.model_version, cache_key, sorted(rec_request.exclude_ids), rec_request.fields)
+            if self._conditional(request, etag, max_age):
+                return 304, None
+        recommendations, from_cache, degraded = await self.serve_admitted(
+            rec_request, key_fields, compute, ttl, fallback
+        )
+        if fallback:
+            self.cache_manager.stats.record_tier('negative', from_cache)
+        if degraded and max_age is not None:
+            # Not the list the ETag stands for
+            request.response_headers = [('Cache-Control', NO_STORE)]
+
+        response = {
+            "success": True,
+            "recommendations": project_fields(recommendations, rec_request.fields),
+            "method": rec_request.method,
+            "from_cache": from_cache
+        }
+        if fallback:
+            response["fallback"] = "cold_start"
+        if degraded:
+            response["degraded"] = degraded
+        tag(method=rec_request.method, user_id=rec_request.user_id, article_id=rec_request.article_id,
+            top_n=rec_request.top_n, from_cache=from_cache, degraded=degraded)
+        if request.debug_timing:
+            response["timing"] = request.trace.to_dict()
+        return 200, response
+
+    # Routes ---------------------------------------------------------------
+
+    async def health_check(self, request):
+        """Health check endpoint"""
+        return 200, {
+            "status": "healthy",
+            "service": "NewsXpress ML Recommendation API",
+            "models_loaded": self.recommendation_service.models_loaded,
+            "cache_enabled": self.cache_manager.enabled,
+            "admission": self.admission.snapshot(),
+            "server": "asgi",
+        }
+
+    async def get_recommendations(self, request, user_id=None):
+        """Unified recommendations endpoint - supports all methods"""
+        # Query params apply to GET and POST; a JSON body overrides them
+        params = {name: values[0] for name, values in request.query.items()}
+        params['exclude'] = request.arg_list('exclude')
+        params['recent_articles'] = request.arg_list('recent_articles')
+        params['fields'] = request.arg_list('fields')
+        if request.method == 'POST':
+            params.update(request.json() or {})
+
+        # Legacy /personalized/<user_id> route carries the user in the path
+        if user_id is not None:
+            params['user_id'] = user_id
+
+        return await self._respond_recommendations(request, RecommendationRequest(params))
+
+    async def get_similar_articles(self, request, article_id):
+        """Content-based recommendations for a given article_id"""
+        return await self._respond_recommendations(request, RecommendationRequest({
+            'method': 'content',
+            'article_id': article_id,
+            'top_n': request.arg('top_n', 10),
+            'exclude': request.arg_list('exclude'),
+            **{column: request.arg(column) for column in FACET_COLUMNS},
+            'max_age_days': request.arg('max_age_days'),
+            'recency_boost': request.arg('recency_boost'),
+            'fields': request.arg_list('fields'),
+        }), max_age=CONTENT_MAX_AGE)
+
+    async def get_trending(self, request):
+        """Trending articles; query params: top_n (default: 10), days (default: 7), topic, place, source_id, language_code"""
+        top_n = clamp_top_n(request.arg('top_n', 10))
+        days = int(request.arg('days', 7))
+        filters = parse_facet_filters({column: request.arg(column) for column in FACET_COLUMNS})
+        fields = parse_fields(request.arg_list('fields'))
+        request.rec_method = 'trending'
+        cache = self.cache_manager
+
+        cache_key = build_cache_key('trending', top_n=top_n, days=days, **facet_key_fields(filters))
+        etag = make_etag(self.recommendation_service.model_version, cache_key, fields, trending_bucket())
+        if self._conditional(request, etag, TRENDING_MAX_AGE):
+            return 304, None
+
+        cached_result = await cache.get(cache_key)
+        if cached_result:
+            return 200, {"success": True, "recommendations": project_fields(cached_result, fields), "from_cache": True}
+
+        start = time.perf_counter()
+        recommendations = await self.executor.run(
+            functools.partial(self.recommendation_service.get_trending_articles, filters=filters), top_n, days
+        )
+        cache.stats.record_compute('trending', time.perf_counter() - start)
+
+        # Cache for 5 minutes
+        await cache.set(cache_key, recommendations, ttl_seconds=300)
+        return 200, {"success": True, "recommendations": project_fields(recommendations, fields), "from_cache": False}
+
+    async def search_articles(self, request):
+        """Free-text article search; query params: q (required), top_n (default: 10), facet filters"""
+        query = normalize_query(request.arg('q'))
+        if not query:
+            return 400, {"success": False, "error": "Missing required parameter: q"}
+        top_n = clamp_top_n(request.arg('top_n', 10))
+        filters = parse_facet_filters({column: request.arg(column) for column in FACET_COLUMNS})
+        fields = parse_fields(request.arg_list('fields'))
+        request.rec_method = 'search'
+        cache = self.cache_manager
+
+        cache_key = search_cache_key(query, top_n, filters)
+        cached_result = await cache.get(cache_key)
+        if cached_result:
+            return 200, {"success": True, "results": project_fields(cached_result, fields), "from_cache": True}
+
+        start = time.perf_counter()
+        results = await self.executor.run(
+            functools.partial(self.recommendation_service.search_articles, filters=filters), query, top_n
+        )
+        cache.stats.record_compute('search', time.perf_counter() - start)
+
+        # Cache for 5 minutes
+        await cache.set(cache_key, results, ttl_seconds=300)
+        return 200, {"success": True, "results": project_fields(results, fields), "from_cache": False}
+
+    async def get_metrics(self, request):
+        """Prometheus metrics for this worker"""
+        cache = self.cache_manager
+        svc = self.recommendation_service
+        return 200, render_metrics(
+            cache_stats={"enabled": cache.enabled, **cache.stats.snapshot()},
+            models_loaded=svc.models_loaded,
+            model_version=svc.model_version,
+        )
+
+    async def get_cache_stats(self, request):
+        """Get cache statistics"""
+        return 200, {"success": True, "stats": await self.cache_manager.get_cache_stats()}
+
+
+def create_asgi_app(config: dict = None):
+    """Create the ASGI application (same services as api_server.create_app)."""
+    config = config or {}
+
+    allowed = os.getenv('ML_API_ALLOWED_ORIGINS')
+    origins = [o.strip() for o in allowed.split(',') if o.strip()] if allowed else None
+
+    executor = ScoringExecutor(
+        max_workers=int(config.get('scoring_threads', os.getenv('ASGI_SCORING_THREADS', 4))),
+        max_pending=int(config.get('scoring_queue', os.getenv('ASGI_SCORING_QUEUE', 64))),
+    )
+    service = get_recommendation_service()
+    # Short-term profiles are written by the Flask /api/track workers; read them from the Redis mirror
+    service.attach_profile_cache(get_cache_manager())
+    return RecommendationASGIApp(
+        service,
+        AsyncCacheManager(),
+        executor,
+        allowed_origins=origins,
+    )
+
+
+# Default app instance for ASGI servers: uvicorn asgi_server:app
+app = create_asgi_app()
@@ -0,0 +1,120 @@
+"""
+Activity load benchmark
+Compares COPY FROM STDIN (activity_loader) with row-by-row INSERTs for
+loading tracked activity into Postgres. Both runs write into a temporary
+table shaped like activity_loader's staging table, so nothing persists.
+
+Needs DATABASE_URL (or the DB_* variables used by config/db_python).
+
+Usage:
+    python benchmarks/activity_load_benchmark.py --rows 100000
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Add Ml_model and backend directories to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent.parent.parent))
+
+from activity_loader import STAGING_COLUMNS, rows_to_csv
+from config.db_python import get_db_connection
+
+CREATE_SQL = """
+    CREATE TEMP TABLE bench_activities (
+        user_id UUID,
+        article_id UUID,
+        activity_type TEXT,
+        duration_seconds INTEGER,
+        scroll_percentage REAL,
+        created_at TIMESTAMPTZ
+    )
+"""
+INSERT_SQL = (
+    f"INSERT INTO bench_activities ({', '.join(STAGING_COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(STAGING_COLUMNS))})"
+)
+COPY_SQL = f"COPY bench_activities ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+
+def synthetic_rows(n, rng):
+    users = [str(uuid.uuid4()) for _ in range(max(1, n // 50))]
+    articles = [str(uuid.uuid4()) for _ in range(max(1, n // 20))]
+    types = ['view', 'view', 'view', 'like', 'share']
+    now = time.time()
+    return [
+        (
+            users[rng.integers(len(users))],
+            articles[rng.integers(len(articles))],
+            types[rng.integers(len(types))],
+            int(rng.integers(1, 300)),
+            float(rng.random() * 100),
+            datetime.fromtimestamp(now - float(rng.random() * 86400), tz=timezone.utc).isoformat(),
+        )
+        for _ in range(n)
+    ]
+
+
+def run_inserts(conn, rows, commit_every):
+    start = time.perf_counter()
+    with conn.cursor() as cursor:
+        for i, row in enumerate(rows, 1):
+            cursor.execute(INSERT_SQL, row)
+            if i % commit_every == 0:
+                conn.commit()
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def run_copy(conn, rows, batch_rows):
+    start = time.perf_counter()
+    with conn.cursor() as cursor:
+        for offset in range(0, len(rows), batch_rows):
+            cursor.copy_expert(COPY_SQL, rows_to_csv(rows[offset:offset + batch_rows]))
+    conn.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='COPY vs INSERT load throughput')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=50000, help='Rows per COPY')
+    parser.add_argument('--commit-every', type=int, default=1000, help='INSERTs per commit')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rows = synthetic_rows(args.rows, np.random.default_rng(args.seed))
+    conn = get_db_connection()
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(CREATE_SQL)
+        conn.commit()
+
+        results = {}
+        for name, runner in (
+            ('insert', lambda: run_inserts(conn, rows, args.commit_every)),
+            ('copy', lambda: run_copy(conn, rows, args.batch)),
+        ):
+            with conn.cursor() as cursor:
+                cursor.execute("TRUNCATE bench_activities")
+            conn.commit()
+            elapsed = runner()
+            results[name] = {
+                'rows_per_sec': round(len(rows) / elapsed),
+                'elapsed_seconds': round(elapsed, 3),
+            }
+        results['speedup'] = round(results['insert']['elapsed_seconds'] / results['copy']['elapsed_seconds'], 1)
+        print(json.dumps(results, indent=2))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
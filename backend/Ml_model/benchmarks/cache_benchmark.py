@@ -0,0 +1,137 @@
+"""
+Cache benchmark
+Replays a Zipf-distributed recommendation key workload against CacheManager
+and reports throughput, hit rates and per-family statistics.
+
+Runs against the in-process LocalRedis by default; set REDIS_BACKEND=redis
+(plus REDIS_URL / REDIS_HOST) to measure a real server.
+
+Usage:
+    python benchmarks/cache_benchmark.py --requests 50000 --keys 20000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add Ml_model directory to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+os.environ.setdefault('REDIS_BACKEND', 'local')
+
+from cache_manager import CacheManager, build_cache_key, cached_list_size
+
+# Share of traffic per key family, roughly what the Node layer sends
+FAMILY_MIX = {
+    'content': 0.50,
+    'hybrid': 0.25,
+    'collaborative': 0.15,
+    'trending': 0.10,
+}
+TTLS = {'content': 1800, 'hybrid': 900, 'collaborative': 900, 'trending': 300}
+
+
+def fake_recommendations(n, rng):
+    """Payload shaped like article_metadata rows plus a score"""
+    return [
+        {
+            'id': f"{rng.integers(1 << 62):016x}",
+            'title': 'Lorem ipsum dolor sit amet consectetur adipiscing elit',
+            'topic': 'sports',
+            'place': 'india',
+            'published_at': '2025-01-01T10:00:00+00:00',
+            'similarity_score': float(rng.random()),
+        }
+        for _ in range(n)
+    ]
+
+
+def build_workload(num_requests, num_keys, zipf_a, top_n, rng):
+    """Zipf-ranked key ids per request, with families drawn from FAMILY_MIX"""
+    families = rng.choice(list(FAMILY_MIX), size=num_requests, p=list(FAMILY_MIX.values()))
+    ranks = np.minimum(rng.zipf(zipf_a, size=num_requests), num_keys) - 1
+    n = cached_list_size(top_n)
+    keys = []
+    for family, rank in zip(families, ranks):
+        if family == 'content':
+            keys.append(build_cache_key('content', article_id=f"a{rank}", top_n=n))
+        elif family == 'trending':
+            keys.append(build_cache_key('trending', top_n=top_n, days=int(rank % 3) * 3 + 1))
+        else:
+            keys.append(build_cache_key(family, user_id=f"u{rank}", top_n=n))
+    return keys
+
+
+def run_single(cache, keys, payload):
+    """One GET per request, SET on miss (the api_server request path)"""
+    hits = 0
+    start = time.perf_counter()
+    for key in keys:
+        if cache.get(key):
+            hits += 1
+        else:
+            cache.set(key, payload, ttl_seconds=TTLS.get(key.split(':')[1], 900))
+    return time.perf_counter() - start, hits
+
+
+def run_batched(cache, keys, payload, batch_size):
+    """MGET per batch, pipelined SET for the misses (the warming/fan-out path)"""
+    hits = 0
+    start = time.perf_counter()
+    for offset in range(0, len(keys), batch_size):
+        batch = keys[offset:offset + batch_size]
+        found = cache.get_many(batch)
+        misses = {key: payload for key, value in found.items() if not value}
+        hits += len(batch) - len(misses)
+        if misses:
+            cache.set_many(misses, ttl_seconds={k: TTLS.get(k.split(':')[1], 900) for k in misses})
+    return time.perf_counter() - start, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recommendation cache workload')
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--keys', type=int, default=20000, help='Distinct users/articles')
+    parser.add_argument('--zipf', type=float, default=1.2, help='Zipf exponent (>1)')
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=50, help='Batch size for get_many/set_many')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    cache = CacheManager()
+    if not cache.enabled:
+        print("Cache backend unavailable")
+        sys.exit(1)
+
+    keys = build_workload(args.requests, args.keys, args.zipf, args.top_n, rng)
+    payload = fake_recommendations(cached_list_size(args.top_n), rng)
+    print(f"Backend: {type(cache.redis_client).__name__}, payload {len(json.dumps(payload))} bytes")
+
+    results = {}
+    for name, runner in (
+        ('single', lambda: run_single(cache, keys, payload)),
+        ('batched', lambda: run_batched(cache, keys, payload, args.batch)),
+    ):
+        cache.delete_pattern('rec:*')
+        cache.stats.reset()
+        elapsed, hits = runner()
+        results[name] = {
+            'requests_per_sec': round(len(keys) / elapsed),
+            'hit_rate': round(hits / len(keys) * 100, 2),
+            'elapsed_seconds': round(elapsed, 3),
+            'families': {
+                family: {k: round(v, 2) for k, v in counters.items()}
+                for family, counters in cache.stats.snapshot()['families'].items()
+            },
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Response encoding benchmark
+Measures the cost of encoding recommendation payloads per 100 items with
+Flask's jsonify provider, the stdlib json module and response_encoder
+(orjson when installed), plus the effect of a fields= projection.
+
+Items are built the way RecommendationService builds them: DataFrame rows
+turned into dicts with iloc[...].to_dict(), plus a float score.
+
+Usage:
+    python benchmarks/response_encoding_benchmark.py --items 100 --repeat 2000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+
+# Add Ml_model directory to path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from response_encoder import HAS_ORJSON, encode, parse_fields, project_fields
+
+
+def fake_recommendations(n, rng):
+    """Rows shaped like article_metadata, including Timestamps and NumPy-backed scores"""
+    frame = pd.DataFrame({
+        'id': [f"{rng.integers(1 << 62):016x}" for _ in range(n)],
+        'title': ['Lorem ipsum dolor sit amet consectetur adipiscing elit'] * n,
+        'topic': rng.choice(['sports', 'politics', 'tech', 'business'], size=n),
+        'place': rng.choice(['india', 'world'], size=n),
+        'published_at': pd.Timestamp('2025-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 86400, n), unit='s'),
+    })
+    items = []
+    for i in range(n):
+        item = frame.iloc[i].to_dict()
+        item['similarity_score'] = np.float64(rng.random())
+        items.append(item)
+    return items
+
+
+def time_per_call(fn, payload, repeat):
+    fn(payload)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommendation response encoding cost')
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--fields', default='id,title,similarity_score')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    items = fake_recommendations(args.items, np.random.default_rng(args.seed))
+    payload = {"success": True, "recommendations": items, "method": "content", "from_cache": False}
+    projected = {**payload, "recommendations": project_fields(items, parse_fields(args.fields))}
+
+    app = Flask(__name__)
+    scale = 100 / args.items
+    results = {"items": args.items, "orjson": HAS_ORJSON, "us_per_100_items": {}}
+    with app.app_context():
+        runners = [
+            ('flask_jsonify', lambda p: app.json.response(p).get_data(), payload),
+            ('stdlib_json', lambda p: json.dumps(p, default=str).encode('utf-8'), payload),
+            ('response_encoder', encode, payload),
+            ('response_encoder_projected', encode, projected),
+        ]
+        for name, fn, body in runners:
+            seconds = time_per_call(fn, body, args.repeat)
+            results["us_per_100_items"][name] = round(seconds * 1e6 * scale, 1)
+        results["bytes"] = {
+            'full': len(encode(payload)),
+            'projected': len(encode(projected)),
+        }
+
+    base = results["us_per_100_items"]['flask_jsonify']
+    results["speedup_vs_jsonify"] = round(base / results["us_per_100_items"]['response_encoder'], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,64 +3,269 @@ Redis Cache Manager for Recommendations
 Caches recommendation results to reduce computation time
 """
 import os
+import sys
 import json
+import hashlib
+import threading
 import redis
+import redis.asyncio as redis_asyncio
 import logging
 from datetime import timedelta
 from functools import wraps
+from pathlib import Path
+from urllib.parse import urlparse
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from local_redis import LocalRedis, AsyncLocalRedis
+from response_encoder import encode
 
 logger = logging.getLogger(__name__)
 
+# Recommendation list caching mode:
+#   'candidates' - cache the unfiltered top-(n + slack) list once per input and
+#                  apply exclusions after the lookup (higher hit rate)
+#   'exact'      - cache exactly what was requested, exclusions included in the key
+CACHE_MODE = os.getenv('REC_CACHE_MODE', 'candidates').lower()
+CANDIDATE_SLACK = int(os.getenv('REC_CACHE_CANDIDATE_SLACK', 20))
+
+
+def _id_set_digest(ids):
+    """Order-insensitive short hash of a set of ids"""
+    canonical = ",".join(sorted({str(i).strip() for i in ids}))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def build_cache_key(method, user_id=None, article_id=None, top_n=None,
+                    exclude_ids=None, seed_ids=None, **extra):
+    """
+    Build the canonical recommendation cache key
+    
+    Layout: rec:{method}[:u={user_id}][:a={article_id}][:n={top_n}][:x={hash}][:s={hash}][:k=v...]
+    Only the inputs that affect the result should be passed; exclusion and
+    seed-article sets are sorted and hashed so equivalent requests share a key.
+    The u=/a= segments keep the layout matched by clear_user_cache/clear_article_cache.
+    """
+    parts = ['rec', method]
+    if user_id is not None:
+        parts.append(f"u={str(user_id).strip()}")
+    if article_id is not None:
+        parts.append(f"a={str(article_id).strip()}")
+    if top_n is not None:
+        parts.append(f"n={int(top_n)}")
+    if exclude_ids:
+        parts.append(f"x={_id_set_digest(exclude_ids)}")
+    if seed_ids:
+        parts.append(f"s={_id_set_digest(seed_ids)}")
+    for name, value in sorted(extra.items()):
+        if value is not None:
+            parts.append(f"{name}={value}")
+    return ":".join(parts)
+
+
+def cached_list_size(top_n):
+    """Number of items stored in the cache for a request of top_n items"""
+    return top_n + CANDIDATE_SLACK if CACHE_MODE == 'candidates' else top_n
+
+
+def apply_exclusions(recommendations, exclude_ids, top_n):
+    """Drop excluded article ids from a cached candidate list and truncate to top_n"""
+    if exclude_ids:
+        excluded = {str(i) for i in exclude_ids}
+        recommendations = [
+            rec for rec in recommendations
+            if not (isinstance(rec, dict) and str(rec.get('id')) in excluded)
+        ]
+    return recommendations[:top_n]
+
+
+def serialize(value):
+    """JSON text for a cached value; NumPy scalars and Timestamps from DataFrame rows are handled"""
+    return encode(value).decode('utf-8')
+
+
+def create_redis_client(use_asyncio=False):
+    """
+    Build a Redis client from environment settings
+    
+    Args:
+        use_asyncio: Return a redis.asyncio client (for the ASGI app)
+    
+    Returns:
+        (client, description of the target for logging)
+    """
+    # Connection pool tuning shared by every gunicorn thread in this worker
+    pool_kwargs = dict(
+        max_connections=int(os.getenv('REDIS_MAX_CONNECTIONS', 50)),
+        socket_keepalive=os.getenv('REDIS_SOCKET_KEEPALIVE', 'true').lower() == 'true',
+        health_check_interval=int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', 30)),
+    )
+    redis_module = redis_asyncio if use_asyncio else redis
+
+    # Prefer a full connection URL when available (e.g., Upstash/Redis Cloud)
+    redis_url = os.getenv('REDIS_URL')
+
+    if os.getenv('REDIS_BACKEND', 'redis').lower() == 'local':
+        # In-process stand-in for tests/benchmarks without a Redis server
+        client = LocalRedis(max_keys=int(os.getenv('LOCAL_REDIS_MAX_KEYS', 100000)))
+        if use_asyncio:
+            client = AsyncLocalRedis(client)
+        return client, "in-process LocalRedis"
+
+    if redis_url:
+        # Example: rediss://:password@host:port/0
+        client = redis_module.from_url(
+            redis_url,
+            decode_responses=True,
+            socket_timeout=5,
+            socket_connect_timeout=5,
+            **pool_kwargs,
+        )
+        return client, urlparse(redis_url).hostname
+
+    # Fallback to discrete host/port/password/db
+    redis_host = os.getenv('REDIS_HOST', 'localhost')
+    redis_port = int(os.getenv('REDIS_PORT', 6379))
+    redis_password = os.getenv('REDIS_PASSWORD', None)
+    redis_db = int(os.getenv('REDIS_DB', 0))
+    use_ssl = os.getenv('REDIS_SSL', 'false').lower() == 'true'
+
+    client_kwargs = dict(
+        host=redis_host,
+        port=redis_port,
+        password=redis_password,
+        db=redis_db,
+        decode_responses=True,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+        **pool_kwargs,
+    )
+    if use_ssl:
+        # Many managed providers require TLS
+        client_kwargs.update({
+            'ssl': True,
+            'ssl_cert_reqs': None,  # accept provider certs (adjust if you need strict)
+        })
+
+    return redis_module.Redis(**client_kwargs), f"{redis_host}:{redis_port}"
+
+
+def key_family(key):
+    """Key family used for statistics: rec:{family}:... -> family"""
+    parts = key.split(':', 2)
+    if parts[0] == 'rec' and len(parts) > 1:
+        return parts[1]
+    return parts[0]
+
+
+class CacheStats:
+    """
+    In-process cache counters per key family and per cache tier
+    
+    Redis INFO counters are shared by every client of the instance; these only
+    reflect this worker's traffic, which is what TTL/capacity sizing needs.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}
+        self._tiers = {}
+    
+    def _family(self, family):
+        counters = self._families.get(family)
+        if counters is None:
+            counters = self._families[family] = {
+                'hits': 0, 'misses': 0, 'stores': 0,
+                'payload_bytes': 0, 'payloads': 0,
+                'computes': 0, 'compute_seconds': 0.0,
+            }
+        return counters
+    
+    def record_lookup(self, key, hit, payload_bytes=0, tier='redis'):
+        """Count a cache lookup for the key's family and the given tier"""
+        with self._lock:
+            counters = self._family(key_family(key))
+            if hit:
+                counters['hits'] += 1
+                counters['payload_bytes'] += payload_bytes
+                counters['payloads'] += 1
+            else:
+                counters['misses'] += 1
+            self._count_tier(tier, hit)
+    
+    def record_tier(self, tier, hit):
+        """Count a lookup against a tier only (e.g. negative entries, in-process caches)"""
+        with self._lock:
+            self._count_tier(tier, hit)
+    
+    def _count_tier(self, tier, hit):
+        tier_counters = self._tiers.setdefault(tier, {'hits': 0, 'misses': 0})
+        tier_counters['hits' if hit else 'misses'] += 1
+    
+    def record_store(self, key, payload_bytes):
+        """Count a cache write and its serialized size"""
+        with self._lock:
+            counters = self._family(key_family(key))
+            counters['stores'] += 1
+            counters['payload_bytes'] += payload_bytes
+            counters['payloads'] += 1
+    
+    def record_compute(self, family, seconds):
+        """Record how long a cache miss took to compute"""
+        with self._lock:
+            counters = self._family(family)
+            counters['computes'] += 1
+            counters['compute_seconds'] += seconds
+    
+    def snapshot(self):
+        """Hit ratios, payload sizes and compute-time-saved estimates"""
+        with self._lock:
+            families = {}
+            for family, c in self._families.items():
+                lookups = c['hits'] + c['misses']
+                avg_compute = c['compute_seconds'] / c['computes'] if c['computes'] else 0.0
+                families[family] = {
+                    'hits': c['hits'],
+                    'misses': c['misses'],
+                    'stores': c['stores'],
+                    'hit_rate': (c['hits'] / lookups) * 100 if lookups else 0.0,
+                    'avg_payload_bytes': c['payload_bytes'] / c['payloads'] if c['payloads'] else 0.0,
+                    'avg_compute_ms': avg_compute * 1000,
+                    # Every hit avoided one compute of average cost
+                    'compute_time_saved_seconds': c['hits'] * avg_compute,
+                }
+            tiers = {}
+            for tier, c in self._tiers.items():
+                lookups = c['hits'] + c['misses']
+                tiers[tier] = {
+                    'hits': c['hits'],
+                    'misses': c['misses'],
+                    'hit_rate': (c['hits'] / lookups) * 100 if lookups else 0.0,
+                }
+            return {'families': families, 'tiers': tiers}
+    
+    def reset(self):
+        with self._lock:
+            self._families.clear()
+            self._tiers.clear()
+
+
 class CacheManager:
     def __init__(self):
         self.redis_client = None
         self.enabled = False
+        self.stats = CacheStats()
         self.connect()
     
     def connect(self):
         """Connect to Redis server"""
         try:
-            # Prefer a full connection URL when available (e.g., Upstash/Redis Cloud)
-            redis_url = os.getenv('REDIS_URL')
-
-            if redis_url:
-                # Example: rediss://:password@host:port/0
-                self.redis_client = redis.from_url(
-                    redis_url,
-                    decode_responses=True,
-                    socket_timeout=5,
-                    socket_connect_timeout=5,
-                )
-            else:
-                # Fallback to discrete host/port/password/db
-                redis_host = os.getenv('REDIS_HOST', 'localhost')
-                redis_port = int(os.getenv('REDIS_PORT', 6379))
-                redis_password = os.getenv('REDIS_PASSWORD', None)
-                redis_db = int(os.getenv('REDIS_DB', 0))
-                use_ssl = os.getenv('REDIS_SSL', 'false').lower() == 'true'
-
-                client_kwargs = dict(
-                    host=redis_host,
-                    port=redis_port,
-                    password=redis_password,
-                    db=redis_db,
-                    decode_responses=True,
-                    socket_timeout=5,
-                    socket_connect_timeout=5,
-                )
-                if use_ssl:
-                    # Many managed providers require TLS
-                    client_kwargs.update({
-                        'ssl': True,
-                        'ssl_cert_reqs': None,  # accept provider certs (adjust if you need strict)
-                    })
-
-                self.redis_client = redis.Redis(**client_kwargs)
+            self.redis_client, redis_target = create_redis_client()
             
             # Test connection
             self.redis_client.ping()
             self.enabled = True
-            logger.info(f"✅ Connected to Redis at {redis_host}:{redis_port}")
+            logger.info(f"✅ Connected to Redis at {redis_target}")
             
         except Exception as e:
             logger.warning(f"⚠️  Redis connection failed: {e}. Caching disabled.")
@@ -73,6 +278,7 @@ class CacheManager:
         
         try:
             value = self.redis_client.get(key)
+            self.stats.record_lookup(key, bool(value), len(value) if value else 0)
             if value:
                 return json.loads(value)
             return None
@@ -86,13 +292,63 @@ class CacheManager:
             return False
         
         try:
-            serialized = json.dumps(value)
+            serialized = serialize(value)
             self.redis_client.setex(key, ttl_seconds, serialized)
+            self.stats.record_store(key, len(serialized))
             return True
         except Exception as e:
             logger.error(f"Cache SET error: {e}")
             return False
     
+    def get_many(self, keys):
+        """
+        Get several values in one round trip (MGET)
+
+        Returns a dict mapping every requested key to its value, or None on a miss.
+        """
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return {key: None for key in keys}
+        
+        try:
+            values = self.redis_client.mget(keys)
+            for key, value in zip(keys, values):
+                self.stats.record_lookup(key, bool(value), len(value) if value else 0)
+            return {
+                key: json.loads(value) if value else None
+                for key, value in zip(keys, values)
+            }
+        except Exception as e:
+            logger.error(f"Cache MGET error: {e}")
+            return {key: None for key in keys}
+    
+    def set_many(self, items, ttl_seconds=3600):
+        """
+        Set several values in one pipelined round trip
+        
+        Args:
+            items: dict mapping cache key -> value
+            ttl_seconds: TTL applied to every key, or a dict mapping key -> TTL
+                         (keys missing from the dict get the default 3600s)
+        """
+        if not self.enabled:
+            return False
+        if not items:
+            return True
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in items.items():
+                ttl = ttl_seconds.get(key, 3600) if isinstance(ttl_seconds, dict) else ttl_seconds
+                serialized = serialize(value)
+                pipe.setex(key, ttl, serialized)
+                self.stats.record_store(key, len(serialized))
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache MSET error: {e}")
+            return False
+    
     def delete(self, key):
         """Delete key from cache"""
         if not self.enabled:
@@ -119,6 +375,120 @@ class CacheManager:
             logger.error(f"Cache DELETE PATTERN error: {e}")
             return False
     
+    def register_key(self, registry_key, key, ttl_seconds=None):
+        """
+        List key in a registry set (SADD) so it can be found without KEYS
+        
+        The registry's TTL is refreshed to ttl_seconds when given.
+        """
+        if not self.enabled:
+            return False
+        
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.sadd(registry_key, key)
+                if ttl_seconds is not None:
+                    pipe.expire(registry_key, int(ttl_seconds))
+                pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache SADD error: {e}")
+            return False
+    
+    def get_registered(self, registry_key):
+        """
+        Get the values of every key listed in a registry set (SMEMBERS + MGET)
+        
+        Returns a dict mapping each live key to its value (empty when disabled).
+        Keys that expired are removed from the registry.
+        """
+        if not self.enabled:
+            return {}
+        
+        try:
+            keys = sorted(self.redis_client.smembers(registry_key))
+        except Exception as e:
+            logger.error(f"Cache SMEMBERS error: {e}")
+            return {}
+        values = self.get_many(keys)
+        expired = [key for key, value in values.items() if value is None]
+        if expired:
+            try:
+                self.redis_client.srem(registry_key, *expired)
+            except Exception as e:
+                logger.error(f"Cache SREM error: {e}")
+        return {key: value for key, value in values.items() if value is not None}
+    
+    def hash_get(self, key, field):
+        """One field of a hash (None when missing or disabled)"""
+        if not self.enabled:
+            return None
+        
+        try:
+            return self.redis_client.hget(key, field)
+        except Exception as e:
+            logger.error(f"Cache HGET error: {e}")
+            return None
+    
+    def hash_get_all(self, key):
+        """All fields of a hash (empty dict when missing or disabled)"""
+        if not self.enabled:
+            return {}
+        
+        try:
+            return self.redis_client.hgetall(key) or {}
+        except Exception as e:
+            logger.error(f"Cache HGETALL error: {e}")
+            return {}
+    
+    def hash_update(self, key, set_if_missing=None, increments=None, counters=None, ttl_seconds=None):
+        """
+        Update fields of a hash in one MULTI/EXEC transaction
+        
+        Args:
+            set_if_missing: field -> value, only set when the field does not exist (HSETNX)
+            increments: field -> float added to the field (HINCRBYFLOAT)
+            counters: field -> int added to the field (HINCRBY)
+            ttl_seconds: TTL (re)applied to the hash
+        
+        Returns:
+            List of the command results in that order, or None on error/when disabled
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            for field, value in (set_if_missing or {}).items():
+                pipe.hsetnx(key, field, value)
+            for field, amount in (increments or {}).items():
+                pipe.hincrbyfloat(key, field, amount)
+            for field, amount in (counters or {}).items():
+                pipe.hincrby(key, field, amount)
+            if ttl_seconds:
+                pipe.expire(key, ttl_seconds)
+            return pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache HASH UPDATE error: {e}")
+            return None
+    
+    def hash_replace(self, key, mapping, ttl_seconds=None):
+        """Replace a hash with mapping in one transaction"""
+        if not self.enabled:
+            return False
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            if ttl_seconds:
+                pipe.expire(key, ttl_seconds)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache HASH REPLACE error: {e}")
+            return False
+    
     def clear_user_cache(self, user_id):
         """Clear all cached recommendations for a user"""
         # Align with api_server cache keys: rec:{method}:u={user_id}:...
@@ -148,7 +518,125 @@ class CacheManager:
                 "hit_rate": (
                     info.get('keyspace_hits', 0) / 
                     (info.get('keyspace_hits', 0) + info.get('keyspace_misses', 1))
-                ) * 100
+                ) * 100,
+                # This worker's own traffic, broken down by key family and tier
+                **self.stats.snapshot(),
+            }
+        except Exception as e:
+            logger.error(f"Error getting cache stats: {e}")
+            return {"enabled": True, "error": str(e)}
+
+
+class AsyncCacheManager:
+    """
+    Non-blocking counterpart of CacheManager for the ASGI app
+    
+    Same keys, serialization and statistics; Redis I/O goes through
+    redis.asyncio so the event loop is never blocked on the network.
+    """
+    def __init__(self):
+        self.redis_client = None
+        self.enabled = False
+        self.stats = CacheStats()
+    
+    async def connect(self):
+        """Connect to Redis server (call from the ASGI lifespan startup)"""
+        try:
+            self.redis_client, redis_target = create_redis_client(use_asyncio=True)
+            await self.redis_client.ping()
+            self.enabled = True
+            logger.info(f"✅ Connected to Redis (asyncio) at {redis_target}")
+        except Exception as e:
+            logger.warning(f"⚠️  Redis connection failed: {e}. Caching disabled.")
+            self.enabled = False
+    
+    async def close(self):
+        if self.redis_client is not None:
+            await self.redis_client.aclose()
+        self.enabled = False
+    
+    async def get(self, key):
+        """Get value from cache"""
+        if not self.enabled:
+            return None
+        
+        try:
+            value = await self.redis_client.get(key)
+            self.stats.record_lookup(key, bool(value), len(value) if value else 0)
+            if value:
+                return json.loads(value)
+            return None
+        except Exception as e:
+            logger.error(f"Cache GET error: {e}")
+            return None
+    
+    async def set(self, key, value, ttl_seconds=3600):
+        """Set value in cache with TTL"""
+        if not self.enabled:
+            return False
+        
+        try:
+            serialized = serialize(value)
+            await self.redis_client.setex(key, ttl_seconds, serialized)
+            self.stats.record_store(key, len(serialized))
+            return True
+        except Exception as e:
+            logger.error(f"Cache SET error: {e}")
+            return False
+    
+    async def get_many(self, keys):
+        """Get several values in one round trip (MGET)"""
+        keys = list(keys)
+        if not self.enabled or not keys:
+            return {key: None for key in keys}
+        
+        try:
+            values = await self.redis_client.mget(keys)
+            for key, value in zip(keys, values):
+                self.stats.record_lookup(key, bool(value), len(value) if value else 0)
+            return {
+                key: json.loads(value) if value else None
+                for key, value in zip(keys, values)
+            }
+        except Exception as e:
+            logger.error(f"Cache MGET error: {e}")
+            return {key: None for key in keys}
+    
+    async def set_many(self, items, ttl_seconds=3600):
+        """Set several values in one pipelined round trip (see CacheManager.set_many)"""
+        if not self.enabled:
+            return False
+        if not items:
+            return True
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in items.items():
+                ttl = ttl_seconds.get(key, 3600) if isinstance(ttl_seconds, dict) else ttl_seconds
+                serialized = serialize(value)
+                pipe.setex(key, ttl, serialized)
+                self.stats.record_store(key, len(serialized))
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Cache MSET error: {e}")
+            return False
+    
+    async def get_cache_stats(self):
+        """Get cache statistics"""
+        if not self.enabled:
+            return {"enabled": False}
+        
+        try:
+            info = await self.redis_client.info('stats')
+            hits = info.get('keyspace_hits', 0)
+            misses = info.get('keyspace_misses', 0)
+            return {
+                "enabled": True,
+                "keyspace_hits": hits,
+                "keyspace_misses": misses,
+                "hit_rate": (hits / (hits + misses)) * 100 if hits + misses else 0.0,
+                **self.stats.snapshot(),
             }
         except Exception as e:
             logger.error(f"Error getting cache stats: {e}")
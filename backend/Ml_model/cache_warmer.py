@@ -0,0 +1,206 @@
+"""
+Post-retrain Cache Warmer
+Precomputes recommendations for the most active users and the hottest
+articles so the first wave of traffic after a retrain hits Redis. Keys come
+from the same RecommendationRequest plan the API serves with, so they carry
+the short-term profile version (pv) and are hit by real requests.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+import logging
+
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from Recommender_Models import RecommendationService
+from cache_manager import build_cache_key, cached_list_size
+from recommendation_requests import RecommendationRequest, recommendation_cache_key
+
+logger = logging.getLogger(__name__)
+
+# TTLs mirror the ones used by api_server for the same keys
+PERSONALIZED_TTL = 900
+CONTENT_TTL = 1800
+TRENDING_TTL = 300
+
+
+class CacheWarmer:
+    def __init__(self, cache_manager, service=None, top_users=None, top_articles=None,
+                 top_n=10, batch_size=64, time_budget_seconds=None, cpu_budget_seconds=None):
+        """
+        Args:
+            cache_manager: CacheManager used to store warmed entries
+            service: RecommendationService to score with (a fresh one that loads
+                     the newly trained models from disk is created if omitted)
+            top_users: Number of most active users to warm
+            top_articles: Number of most viewed / most recent articles to warm
+            top_n: List size to precompute (matches the API default)
+            batch_size: Number of users/articles scored per batch
+            time_budget_seconds: Wall-clock budget for the whole warming run
+            cpu_budget_seconds: CPU-time budget for the whole warming run
+        """
+        self.cache_manager = cache_manager
+        self.service = service
+        self.top_users = top_users if top_users is not None else int(os.getenv('CACHE_WARM_TOP_USERS', 500))
+        self.top_articles = top_articles if top_articles is not None else int(os.getenv('CACHE_WARM_TOP_ARTICLES', 500))
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.time_budget_seconds = (
+            time_budget_seconds if time_budget_seconds is not None
+            else float(os.getenv('CACHE_WARM_TIME_BUDGET', 120))
+        )
+        self.cpu_budget_seconds = (
+            cpu_budget_seconds if cpu_budget_seconds is not None
+            else float(os.getenv('CACHE_WARM_CPU_BUDGET', 60))
+        )
+
+    def select_users(self, user_activities):
+        """Most active users first, by number of tracked activities"""
+        if user_activities is None or len(user_activities) == 0 or 'user_id' not in user_activities:
+            return []
+        counts = user_activities['user_id'].dropna().astype(str).value_counts()
+        return counts.head(self.top_users).index.tolist()
+
+    def select_articles(self, user_activities, articles):
+        """Most viewed articles first, topped up with the most recent ones"""
+        selected = []
+        if user_activities is not None and len(user_activities) > 0 and 'article_id' in user_activities:
+            counts = user_activities['article_id'].dropna().astype(str).value_counts()
+            selected.extend(counts.head(self.top_articles).index.tolist())
+
+        if articles is not None and len(articles) > 0 and 'published_at' in articles:
+            recent = articles.assign(
+                _published=pd.to_datetime(articles['published_at'], errors='coerce', utc=True)
+            ).sort_values('_published', ascending=False)
+            selected.extend(recent['id'].astype(str).head(self.top_articles).tolist())
+
+        return list(dict.fromkeys(selected))[:self.top_articles]
+
+    def _plan(self, svc, params):
+        """
+        How the API would answer a default request with these parameters
+
+        Returns:
+            (cache_key, key_fields, compute), or None for ids answered with the cold-start list
+        """
+        rec_request = RecommendationRequest({**params, 'top_n': self.top_n})
+        key_fields, compute, _, fallback = rec_request.plan(svc)
+        if fallback:
+            return None
+        cache_key, _ = recommendation_cache_key(key_fields, self.top_n, [])
+        return cache_key, key_fields, compute
+
+    def _budget_exhausted(self, wall_start, cpu_start):
+        if time.perf_counter() - wall_start >= self.time_budget_seconds:
+            return True
+        return time.process_time() - cpu_start >= self.cpu_budget_seconds
+
+    def warm(self, user_activities=None, articles=None):
+        """
+        Precompute and store recommendations within the configured budget
+
+        Args:
+            user_activities: DataFrame with user_id/article_id columns
+            articles: DataFrame with id/published_at columns
+
+        Returns:
+            Report dict with counts of warmed users, articles and keys
+        """
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        report = {
+            "users_warmed": 0,
+            "articles_warmed": 0,
+            "keys_warmed": 0,
+            "budget_exhausted": False,
+        }
+
+        if not self.cache_manager.enabled:
+            logger.warning("Cache disabled, skipping cache warming")
+            report["elapsed_seconds"] = 0.0
+            return report
+
+        if self.service is None:
+            self.service = RecommendationService()
+            self.service.load_models()
+            # Short-term profiles live in Redis; their versions are part of personalized keys
+            self.service.attach_profile_cache(self.cache_manager)
+        svc = self.service
+        # Lists are stored at the size api_server caches for a top_n request
+        n = cached_list_size(self.top_n)
+
+        # Trending list shown to every cold-start user
+        trending = svc.get_trending_articles(top_n=self.top_n, time_window_days=7)
+        trending_key = build_cache_key('trending', top_n=self.top_n, days=7)
+        if trending and self.cache_manager.set(trending_key, trending, ttl_seconds=TRENDING_TTL):
+            report["keys_warmed"] += 1
+
+        user_ids = self.select_users(user_activities)
+        for start in range(0, len(user_ids), self.batch_size):
+            if self._budget_exhausted(wall_start, cpu_start):
+                report["budget_exhausted"] = True
+                break
+            plans = {
+                user_id: (self._plan(svc, {'method': 'collaborative', 'user_id': user_id}),
+                          self._plan(svc, {'method': 'hybrid', 'user_id': user_id}))
+                for user_id in user_ids[start:start + self.batch_size]
+            }
+            # Users with a short-term profile (pv in the key) get realtime blending,
+            # which only the per-request path applies
+            batch_ids = [u for u, (collab, _) in plans.items() if collab is not None and 'pv' not in collab[1]]
+            batch = svc.get_collaborative_recommendations_batch(batch_ids, top_n=n) if batch_ids else {}
+            entries = {}
+            users = 0
+            for user_id, (collab, hybrid) in plans.items():
+                if collab is None:
+                    continue
+                if user_id in batch:
+                    recs = batch[user_id]
+                    # Hybrid without seed articles reduces to the collaborative ranking
+                    hybrid_recs = [{**rec, 'hybrid_score': 0.6 * rec.get('relevance_score', 0)} for rec in recs]
+                elif 'pv' in collab[1]:
+                    recs = collab[2](None, n)
+                    hybrid_recs = hybrid[2](None, n) if hybrid is not None else None
+                else:
+                    continue
+                if not recs:
+                    continue
+                entries[collab[0]] = recs
+                if hybrid is not None and hybrid_recs:
+                    entries[hybrid[0]] = hybrid_recs
+                users += 1
+            if entries and self.cache_manager.set_many(entries, ttl_seconds=PERSONALIZED_TTL):
+                report["users_warmed"] += users
+                report["keys_warmed"] += len(entries)
+
+        article_ids = [] if report["budget_exhausted"] else self.select_articles(user_activities, articles)
+        for start in range(0, len(article_ids), self.batch_size):
+            if self._budget_exhausted(wall_start, cpu_start):
+                report["budget_exhausted"] = True
+                break
+            plans = {
+                article_id: self._plan(svc, {'method': 'content', 'article_id': article_id})
+                for article_id in article_ids[start:start + self.batch_size]
+            }
+            batch = svc.get_similar_articles_batch(
+                [article_id for article_id, plan in plans.items() if plan is not None], top_n=n
+            )
+            entries = {
+                plans[article_id][0]: recs
+                for article_id, recs in batch.items() if recs and plans.get(article_id) is not None
+            }
+            if entries and self.cache_manager.set_many(entries, ttl_seconds=CONTENT_TTL):
+                report["articles_warmed"] += len(entries)
+                report["keys_warmed"] += len(entries)
+
+        report["elapsed_seconds"] = round(time.perf_counter() - wall_start, 3)
+        logger.info(
+            f"Cache warming done: {report['keys_warmed']} keys "
+            f"({report['users_warmed']} users, {report['articles_warmed']} articles) "
+            f"in {report['elapsed_seconds']}s"
+        )
+        return report
@@ -0,0 +1,126 @@
+"""
+Response Compression
+Negotiated gzip/brotli compression for JSON responses above a size threshold,
+plus an in-process LRU of already-compressed bodies for the hottest
+HTTP-cacheable payloads (similar articles, trending), keyed by ETag so a
+repeated hit skips Redis, JSON encoding and compression altogether.
+
+Brotli is optional; without the brotli package only gzip is offered.
+"""
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    brotli = None
+    HAS_BROTLI = False
+
+# Bodies smaller than this are sent as-is; compression overhead isn't worth it
+MIN_COMPRESS_BYTES = int(os.getenv('ML_COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('ML_GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('ML_BROTLI_QUALITY', 5))
+PRECOMPRESSED_CACHE_BYTES = int(os.getenv('ML_PRECOMPRESSED_CACHE_BYTES', 32 * 1024 * 1024))
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/plain')
+
+
+def _accepted(accept_encoding):
+    """coding -> q-value from an Accept-Encoding header"""
+    accepted = {}
+    for item in (accept_encoding or '').split(','):
+        parts = [p.strip() for p in item.split(';')]
+        coding = parts[0].lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """
+    Best content coding we support for an Accept-Encoding header
+
+    Returns:
+        'br', 'gzip' or None (identity)
+    """
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    offers = (('br',) if HAS_BROTLI else ()) + ('gzip',)
+    best, best_q = None, 0.0
+    for coding in offers:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0 keeps output deterministic for identical bodies
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def should_compress(content_type, size):
+    return size >= MIN_COMPRESS_BYTES and (content_type or '').split(';')[0].strip() in COMPRESSIBLE_TYPES
+
+
+class PrecompressedCache:
+    def __init__(self, max_bytes=None):
+        """
+        Args:
+            max_bytes: Total size of compressed bodies kept (least recently used evicted first)
+        """
+        self.max_bytes = PRECOMPRESSED_CACHE_BYTES if max_bytes is None else max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag, encoding):
+        key = (etag, encoding)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, etag, encoding, body):
+        if len(body) > self.max_bytes:
+            return
+        key = (etag, encoding)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,38 @@
+"""
+Forward Decay
+Exponential time decay with O(1) updates: an event at time t is stored with
+weight g(t - L) = exp(rate * (t - L)) relative to a landmark L, and totals are
+read at time `now` by multiplying with exp(-rate * (now - L)). Stored weights
+never have to be touched as time passes, only rebased occasionally when the
+exponent grows large.
+
+See Cormode et al., "Forward Decay: A Practical Time Decay Model for
+Streaming Systems" (ICDE 2009).
+"""
+import math
+
+# Exponent past which stored weights are rebased onto a newer landmark
+# (exp(200) is far from float overflow but keeps precision comfortable)
+MAX_EXPONENT = 200.0
+
+
+class ForwardDecay:
+    def __init__(self, half_life_seconds):
+        """
+        Args:
+            half_life_seconds: Time after which an event counts half as much
+        """
+        self.half_life_seconds = half_life_seconds
+        self.rate = math.log(2) / half_life_seconds
+
+    def weight(self, timestamp, landmark):
+        """Stored weight of a unit event at timestamp"""
+        return math.exp(self.rate * (timestamp - landmark))
+
+    def scale(self, now, landmark):
+        """Factor turning stored weights into decayed values at now"""
+        return math.exp(-self.rate * (now - landmark))
+
+    def needs_rebase(self, timestamp, landmark):
+        """Whether weights for timestamp would grow too large against landmark"""
+        return self.rate * (timestamp - landmark) > MAX_EXPONENT
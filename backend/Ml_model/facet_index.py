@@ -0,0 +1,182 @@
+"""
+Facet Bitmap Index
+Bitmap indexes over article_metadata rows for the facets recommendations can be
+filtered by (topic, place, source_id, language_code). Each facet value keeps
+one bit per article row, packed 8 rows per byte with np.packbits, so a filter
+like "topic in (sports, tech) and language_code = en" is a few vectorized
+OR/AND passes over N/8 bytes, applied to the candidate rows before top-K
+selection.
+
+Built at training time next to article_metadata.csv (facet_index.npz) and
+rebuilt from the metadata when the file is missing or out of date.
+"""
+import hashlib
+import sys
+from pathlib import Path
+import logging
+
+import numpy as np
+import pandas as pd
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from article_store import normalize_facet
+
+logger = logging.getLogger(__name__)
+
+FACET_COLUMNS = ('topic', 'place', 'source_id', 'language_code')
+FACET_INDEX_FILE = 'facet_index.npz'
+
+
+def ids_digest(ids):
+    """Fingerprint of the article id order the bitmaps were built for"""
+    h = hashlib.sha1()
+    for article_id in ids:
+        h.update(str(article_id).encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def parse_facet_filters(params):
+    """
+    Facet filters from request parameters
+
+    Args:
+        params: dict with optional FACET_COLUMNS entries, each a value, a
+                comma-separated string or a list (values of one facet are OR-ed)
+
+    Returns:
+        dict column -> sorted tuple of normalized values (only facets that were given)
+    """
+    filters = {}
+    for column in FACET_COLUMNS:
+        raw = params.get(column)
+        if raw is None:
+            continue
+        items = raw if isinstance(raw, (list, tuple)) else [raw]
+        values = {normalize_facet(v) for item in items for v in str(item).split(',')}
+        values.discard(None)
+        if values:
+            filters[column] = tuple(sorted(values))
+    return filters
+
+
+def facet_key_fields(filters):
+    """build_cache_key() fields for facet filters, e.g. {'topic': 'sports|tech'}"""
+    return {column: '|'.join(values) for column, values in (filters or {}).items()}
+
+
+def filters_from_key_fields(key_fields):
+    """Facet filters back from the build_cache_key() fields of a request (inverse of facet_key_fields)"""
+    return {
+        column: tuple(str(key_fields[column]).split('|'))
+        for column in FACET_COLUMNS
+        if key_fields.get(column)
+    }
+
+
+def _value_bitmaps(values, n_rows):
+    """
+    Packed bitmap per distinct value, from one factorize pass over the rows
+
+    Rows are grouped by value code, so each bitmap only sets the bits of its
+    own rows instead of comparing every row against every value.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    order = np.argsort(codes, kind='stable')
+    # Missing values get code -1 and sort first; bounds[k]:bounds[k + 1] are code k's rows
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    bitmaps = {}
+    for code, value in enumerate(uniques):
+        rows = order[bounds[code]:bounds[code + 1]]
+        packed = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+        # Same layout as np.packbits(..., bitorder='little'): row r is bit r % 8 of byte r // 8
+        np.bitwise_or.at(packed, rows >> 3, (1 << (rows & 7)).astype(np.uint8))
+        bitmaps[value] = packed
+    return bitmaps
+
+
+class FacetIndex:
+    def __init__(self, n_rows, bitmaps, digest=None):
+        """
+        Args:
+            n_rows: Number of article rows the bitmaps cover
+            bitmaps: column -> {value: packed uint8 bitmap of n_rows bits}
+            digest: ids_digest() of the rows' article ids
+        """
+        self.n_rows = n_rows
+        self.bitmaps = bitmaps
+        self.digest = digest
+
+    @classmethod
+    def build(cls, metadata, columns=FACET_COLUMNS):
+        """Index the facet columns present in an article_metadata frame"""
+        n_rows = len(metadata)
+        bitmaps = {}
+        for column in columns:
+            if column not in metadata:
+                continue
+            values = [normalize_facet(v) for v in metadata[column]]
+            bitmaps[column] = _value_bitmaps(values, n_rows)
+        return cls(n_rows, bitmaps, ids_digest(metadata['id']))
+
+    def matches(self, metadata):
+        """Whether the bitmaps were built for this metadata's rows"""
+        return self.n_rows == len(metadata) and self.digest == ids_digest(metadata['id'])
+
+    def values(self, column):
+        return sorted(self.bitmaps.get(column, {}))
+
+    def _empty(self):
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def mask(self, filters):
+        """
+        Rows matching every facet filter (any of the values within a facet)
+
+        Args:
+            filters: dict column -> iterable of normalized values (see parse_facet_filters)
+
+        Returns:
+            Boolean array over rows, or None when there is nothing to filter
+        """
+        if not filters:
+            return None
+        packed = None
+        for column, values in filters.items():
+            column_bitmaps = self.bitmaps.get(column)
+            if column_bitmaps is None:
+                logger.warning(f"⚠️  No facet index for {column}; nothing matches")
+                return np.zeros(self.n_rows, dtype=bool)
+            either = self._empty()
+            for value in values:
+                bitmap = column_bitmaps.get(value)
+                if bitmap is not None:
+                    either |= bitmap
+            packed = either if packed is None else packed & either
+        return np.unpackbits(packed, count=self.n_rows, bitorder='little').astype(bool)
+
+    def save(self, path):
+        arrays = {'n_rows': np.array(self.n_rows), 'digest': np.array(self.digest or '')}
+        for column, column_bitmaps in self.bitmaps.items():
+            values = sorted(column_bitmaps)
+            arrays[f'{column}__values'] = np.array(values, dtype=str)
+            arrays[f'{column}__bits'] = (
+                np.stack([column_bitmaps[v] for v in values]) if values
+                else np.zeros((0, (self.n_rows + 7) // 8), dtype=np.uint8)
+            )
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            n_rows = int(data['n_rows'])
+            bitmaps = {}
+            for name in data.files:
+                if not name.endswith('__values'):
+                    continue
+                column = name[:-len('__values')]
+                bits = data[f'{column}__bits']
+                bitmaps[column] = {str(v): bits[i] for i, v in enumerate(data[name])}
+            return cls(n_rows, bitmaps, str(data['digest']) or None)
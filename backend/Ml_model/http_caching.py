@@ -0,0 +1,61 @@
+"""
+HTTP Caching
+ETags and Cache-Control for the non-personalized recommendation endpoints
+(similar articles, trending), shared by the Flask and ASGI apps.
+
+An ETag is derived from the served model version and the request's cache key,
+so it can be checked before touching Redis or the models: a matching
+If-None-Match is answered with 304 straight away. ETags are weak because the
+body also carries per-response fields such as from_cache.
+"""
+import hashlib
+import os
+import time
+
+CONTENT_MAX_AGE = int(os.getenv('ML_HTTP_CONTENT_MAX_AGE', 600))
+TRENDING_MAX_AGE = int(os.getenv('ML_HTTP_TRENDING_MAX_AGE', 120))
+
+NO_STORE = 'no-store'
+
+
+def cache_control(max_age):
+    return f'public, max-age={max_age}'
+
+
+def make_etag(model_version, *parts):
+    """
+    Weak ETag for a response identified by the model version and request parts
+
+    Returns:
+        Quoted ETag header value, or None when the model version is unknown
+    """
+    if not model_version:
+        return None
+    raw = '|'.join(str(p) for p in (model_version,) + parts)
+    return 'W/"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def trending_bucket(now=None):
+    """
+    Time bucket folded into trending ETags: the list shifts as articles age
+    out of the window even under the same model, so validators expire with max-age
+    """
+    now = time.time() if now is None else now
+    return int(now // TRENDING_MAX_AGE)
+
+
+def _opaque(tag):
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    return tag
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in if_none_match.split(','))
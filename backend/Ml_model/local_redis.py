@@ -0,0 +1,298 @@
+"""
+In-process Redis stand-in
+Implements the subset of the redis-py client API used by CacheManager
+(strings with TTLs, hashes, sets, MGET, pipelines, KEYS, INFO) with LRU eviction, so cache
+behaviour can be tested and benchmarked without a Redis server.
+
+Select it with REDIS_BACKEND=local.
+"""
+import threading
+import time
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+
+
+class LocalPipeline:
+    """Buffers commands and applies them in one go, like redis-py's Pipeline"""
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._commands = []
+
+    def __len__(self):
+        return len(self._commands)
+
+    def execute(self):
+        commands, self._commands = self._commands, []
+        with self._client._lock:
+            return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class LocalRedis:
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        """
+        Args:
+            max_keys: Keys kept before least-recently-used ones are evicted
+            clock: Monotonic time source in seconds (overridable in tests)
+        """
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> (value, expires_at or None); order is LRU -> MRU
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {
+            'keyspace_hits': 0,
+            'keyspace_misses': 0,
+            'expired_keys': 0,
+            'evicted_keys': 0,
+        }
+
+    def _live_entry(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at = entry[1]
+        if expires_at is not None and expires_at <= self._clock():
+            del self._data[key]
+            self._stats['expired_keys'] += 1
+            return None
+        return entry
+
+    def _store(self, key, value, expires_at):
+        # Hashes are kept as dicts of strings, sets as sets of strings; everything else as a string
+        self._data[key] = (value if isinstance(value, (dict, set)) else str(value), expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+            self._stats['evicted_keys'] += 1
+
+    # Connection -----------------------------------------------------------
+
+    def ping(self):
+        return True
+
+    def pipeline(self, transaction=True):
+        return LocalPipeline(self)
+
+    def close(self):
+        pass
+
+    # Strings --------------------------------------------------------------
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                self._stats['keyspace_misses'] += 1
+                return None
+            self._stats['keyspace_hits'] += 1
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def mget(self, keys, *args):
+        keys = list(keys) if not isinstance(keys, str) else [keys]
+        keys.extend(args)
+        with self._lock:
+            return [self.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self._lock:
+            if nx and self._live_entry(key) is not None:
+                return None
+            ttl = ex if ex is not None else (px / 1000.0 if px is not None else None)
+            self._store(key, value, self._clock() + ttl if ttl is not None else None)
+            return True
+
+    def setex(self, key, time_seconds, value):
+        return self.set(key, value, ex=time_seconds)
+
+    # Hashes ---------------------------------------------------------------
+
+    def _hash(self, key, create=False):
+        entry = self._live_entry(key)
+        if entry is None:
+            if not create:
+                return None
+            self._store(key, {}, None)
+            entry = self._data[key]
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def hget(self, key, field):
+        with self._lock:
+            fields = self._hash(key)
+            return fields.get(field) if fields is not None else None
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._hash(key) or {})
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        with self._lock:
+            items = dict(mapping or {})
+            if field is not None:
+                items[field] = value
+            fields = self._hash(key, create=True)
+            added = sum(1 for f in items if f not in fields)
+            fields.update({f: str(v) for f, v in items.items()})
+            return added
+
+    def hsetnx(self, key, field, value):
+        with self._lock:
+            fields = self._hash(key, create=True)
+            if field in fields:
+                return 0
+            fields[field] = str(value)
+            return 1
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            fields = self._hash(key, create=True)
+            value = int(fields.get(field, 0)) + int(amount)
+            fields[field] = str(value)
+            return value
+
+    def hincrbyfloat(self, key, field, amount=1.0):
+        with self._lock:
+            fields = self._hash(key, create=True)
+            value = float(fields.get(field, 0.0)) + float(amount)
+            fields[field] = repr(value)
+            return value
+
+    # Sets -----------------------------------------------------------------
+
+    def _set(self, key, create=False):
+        entry = self._live_entry(key)
+        if entry is None:
+            if not create:
+                return None
+            self._store(key, set(), None)
+            entry = self._data[key]
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def sadd(self, key, *members):
+        with self._lock:
+            members_set = self._set(key, create=True)
+            added = {str(m) for m in members} - members_set
+            members_set.update(added)
+            return len(added)
+
+    def srem(self, key, *members):
+        with self._lock:
+            members_set = self._set(key)
+            if members_set is None:
+                return 0
+            removed = {str(m) for m in members} & members_set
+            members_set.difference_update(removed)
+            if not members_set:
+                del self._data[key]
+            return len(removed)
+
+    def smembers(self, key):
+        with self._lock:
+            return set(self._set(key) or ())
+
+    # Keys -----------------------------------------------------------------
+
+    def delete(self, *keys):
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._live_entry(key) is not None:
+                    del self._data[key]
+                    removed += 1
+            return removed
+
+    def exists(self, *keys):
+        with self._lock:
+            return sum(1 for key in keys if self._live_entry(key) is not None)
+
+    def keys(self, pattern='*'):
+        with self._lock:
+            return [key for key in list(self._data) if fnmatchcase(key, pattern) and self._live_entry(key)]
+
+    def expire(self, key, time_seconds):
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return False
+            self._data[key] = (entry[0], self._clock() + time_seconds)
+            return True
+
+    def ttl(self, key):
+        """Remaining TTL in whole seconds, -1 without expiry, -2 if missing"""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                return -2
+            if entry[1] is None:
+                return -1
+            return max(0, int(round(entry[1] - self._clock())))
+
+    def dbsize(self):
+        with self._lock:
+            return len(self._data)
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+            return True
+
+    # Server ---------------------------------------------------------------
+
+    def info(self, section=None):
+        with self._lock:
+            return {**self._stats, 'keys': len(self._data), 'max_keys': self.max_keys}
+
+
+class AsyncLocalPipeline:
+    """Pipeline facade matching redis.asyncio: commands queue synchronously, execute is awaited"""
+
+    def __init__(self, pipeline):
+        self._pipeline = pipeline
+
+    def __getattr__(self, name):
+        command = getattr(self._pipeline, name)
+
+        def queue(*args, **kwargs):
+            command(*args, **kwargs)
+            return self
+        return queue
+
+    async def execute(self):
+        return self._pipeline.execute()
+
+
+class AsyncLocalRedis:
+    """redis.asyncio-style facade over LocalRedis for the ASGI app"""
+
+    def __init__(self, client=None, **kwargs):
+        self._client = client if client is not None else LocalRedis(**kwargs)
+
+    def __getattr__(self, name):
+        command = getattr(self._client, name)
+
+        async def call(*args, **kwargs):
+            return command(*args, **kwargs)
+        return call
+
+    def pipeline(self, transaction=True):
+        return AsyncLocalPipeline(self._client.pipeline(transaction))
+
+    async def aclose(self):
+        self._client.close()
@@ -0,0 +1,304 @@
+"""
+Prometheus-style Metrics
+Request latency histograms per route and recommendation method, in-flight
+gauges, scoring-stage timings, plus cache and model gauges rendered in the
+Prometheus text exposition format at /metrics.
+
+Updates never take a lock: every thread writes to its own shard of each
+metric, and shards are only summed when /metrics is scraped. When a thread
+exits, its shard is folded into a base shard, so short-lived threads do not
+pile up shards. Values are per
+process; with several gunicorn workers each worker reports its own series.
+"""
+import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from tracing import span
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; the Node side gives up after 5s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Recommendation methods used as label values; anything else is reported as 'other'
+KNOWN_METHODS = ('content', 'collaborative', 'hybrid', 'trending', 'coldstart', 'search')
+
+
+def method_label(method):
+    if not method:
+        return ''
+    return method if method in KNOWN_METHODS else 'other'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _add_cells(total, shard):
+    """Add a shard's label->cells into total, in place"""
+    for key, cells in shard.copy().items():
+        into = total.get(key)
+        if into is None:
+            total[key] = list(cells)
+        else:
+            for i, value in enumerate(cells):
+                into[i] += value
+
+
+class _ThreadToken:
+    """Kept in a thread-local; garbage once its thread has exited"""
+
+
+class _ShardedMetric:
+    """Per-thread label->cells dicts; only shard registration, retirement and scrapes take a lock"""
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # Cells of threads that have exited
+        self._base = {}
+        self._shards = [self._base]
+        # Re-entrant: a shard can be retired by garbage collection inside a locked section
+        self._shards_lock = threading.RLock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            # Thread-locals are dropped when their thread exits; fold the shard in then
+            self._local.token = token = _ThreadToken()
+            weakref.finalize(token, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._shards_lock:
+            # By identity: shards with equal contents are still different threads'
+            remaining = [s for s in self._shards if s is not shard]
+            if len(remaining) < len(self._shards):
+                _add_cells(self._base, shard)
+                self._shards = remaining
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def _merged(self):
+        """label values -> summed cells across every thread's shard"""
+        merged = {}
+        # Under the lock so a shard being retired is counted exactly once
+        with self._shards_lock:
+            for shard in list(self._shards):
+                _add_cells(merged, shard)
+        return merged
+
+    def reset(self):
+        with self._shards_lock:
+            for shard in list(self._shards):
+                shard.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, cells in sorted(self._merged().items()):
+            lines.extend(self._render_series(key, cells))
+        return lines
+
+
+class Counter(_ShardedMetric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        cells = shard.get(key)
+        if cells is None:
+            cells = shard[key] = [0]
+        cells[0] += amount
+
+    def value(self, **labels):
+        return self._merged().get(self._key(labels), [0])[0]
+
+    def _render_series(self, key, cells):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format(cells[0])}"]
+
+
+class Gauge(Counter):
+    """Up/down gauge (in-flight requests); per-thread deltas sum to the current value"""
+    type_name = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_ShardedMetric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        cells = shard.get(key)
+        if cells is None:
+            # One count per bucket plus +Inf, then the sum
+            cells = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        cells = self._merged().get(self._key(labels))
+        return sum(cells[:-1]) if cells else 0
+
+    def _render_series(self, key, cells):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), cells[:-1]):
+            cumulative += count
+            le = 'le="%s"' % _format(bound)
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format(cells[-1])}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    'newsxpress_ml_request_duration_seconds',
+    'HTTP request latency by route and recommendation method',
+    ('route', 'method'),
+)
+REQUESTS = Counter(
+    'newsxpress_ml_requests_total',
+    'HTTP requests by route, recommendation method and status code',
+    ('route', 'method', 'status'),
+)
+IN_FLIGHT = Gauge(
+    'newsxpress_ml_requests_in_flight',
+    'Requests currently being served by route',
+    ('route',),
+)
+STAGE_LATENCY = Histogram(
+    'newsxpress_ml_stage_duration_seconds',
+    'Time spent per request stage (cache_lookup, admission_wait, scoring, cache_store, serialize, compress)',
+    ('stage', 'method'),
+)
+
+SHED_REQUESTS = Counter(
+    'newsxpress_ml_shed_requests_total',
+    'Recommendation requests answered without scoring because the worker was over capacity',
+    ('reason', 'served'),
+)
+
+REGISTRY = (REQUEST_LATENCY, REQUESTS, IN_FLIGHT, STAGE_LATENCY, SHED_REQUESTS)
+
+
+@contextmanager
+def time_stage(stage, method=''):
+    """Time one request stage into the stage histogram and the current trace"""
+    with STAGE_LATENCY.time(stage=stage, method=method_label(method)), span(stage):
+        yield
+
+
+def observe_request(route, method, status, seconds):
+    method = method_label(method)
+    REQUEST_LATENCY.observe(seconds, route=route, method=method)
+    REQUESTS.inc(route=route, method=method, status=str(status))
+
+
+def _cache_lines(cache_stats):
+    """Gauges/counters derived from CacheManager.get_cache_stats()"""
+    lines = [
+        "# HELP newsxpress_ml_cache_enabled Whether the Redis cache is connected",
+        "# TYPE newsxpress_ml_cache_enabled gauge",
+        f"newsxpress_ml_cache_enabled {1 if cache_stats.get('enabled') else 0}",
+    ]
+    families = cache_stats.get('families') or {}
+    if families:
+        lines += [
+            "# HELP newsxpress_ml_cache_lookups_total Cache lookups by key family and result",
+            "# TYPE newsxpress_ml_cache_lookups_total counter",
+        ]
+        for family, counters in sorted(families.items()):
+            for result in ('hits', 'misses'):
+                lines.append(
+                    f"newsxpress_ml_cache_lookups_total{_labels(('family', 'result'), (family, result))} "
+                    f"{counters.get(result, 0)}"
+                )
+        lines += [
+            "# HELP newsxpress_ml_cache_hit_ratio Cache hit ratio by key family (0-1)",
+            "# TYPE newsxpress_ml_cache_hit_ratio gauge",
+        ]
+        for family, counters in sorted(families.items()):
+            lines.append(
+                f"newsxpress_ml_cache_hit_ratio{_labels(('family',), (family,))} "
+                f"{_format(round(counters.get('hit_rate', 0) / 100.0, 4))}"
+            )
+    return lines
+
+
+def _model_lines(models_loaded, model_version):
+    lines = [
+        "# HELP newsxpress_ml_models_loaded Whether the recommendation models are loaded",
+        "# TYPE newsxpress_ml_models_loaded gauge",
+        f"newsxpress_ml_models_loaded {1 if models_loaded else 0}",
+        "# HELP newsxpress_ml_model_info Currently served model version (training timestamp)",
+        "# TYPE newsxpress_ml_model_info gauge",
+        f"newsxpress_ml_model_info{_labels(('version',), (model_version or 'unknown',))} 1",
+    ]
+    return lines
+
+
+def render_metrics(cache_stats=None, models_loaded=None, model_version=None):
+    """Prometheus text exposition of every registered metric plus cache/model gauges"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    if cache_stats is not None:
+        lines.extend(_cache_lines(cache_stats))
+    if models_loaded is not None:
+        lines.extend(_model_lines(models_loaded, model_version))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,133 @@
+"""
+Near-Duplicate Detection
+MinHash signatures over word shingles of title + summary, bucketed with
+LSH banding so only articles sharing a whole band are compared. Candidate
+pairs whose estimated Jaccard similarity reaches the threshold are merged
+with union-find; every cluster is represented by its first article (the
+newest one, since the trainer loads articles newest first).
+
+Used by ModelTrainer to collapse the same story published by several
+sources into one row before the content index is built.
+"""
+import os
+import re
+import zlib
+
+import numpy as np
+
+# Estimated Jaccard similarity of shingle sets at which two articles are the same story
+NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', 0.5))
+NUM_PERMUTATIONS = 128
+# 32 bands of 4 rows: pairs above ~0.42 similarity share a band with high probability
+LSH_BANDS = 32
+SHINGLE_SIZE = 3
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """32-bit hashes of the word n-grams of a text (the whole text when shorter than size)"""
+    tokens = _TOKEN_RE.findall(str(text).lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    grams = {' '.join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERMUTATIONS, seed=1):
+        """
+        Args:
+            num_perm: Signature length (more = better Jaccard estimates)
+            seed: Seed of the hash family, so signatures are reproducible
+        """
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits, with odd a
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes):
+        """MinHash signature of a shingle hash set (None when the set is empty)"""
+        if len(hashes) == 0:
+            return None
+        permuted = (np.multiply.outer(hashes, self.a) + self.b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class _DisjointSet:
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        """Merge two sets; the smaller index stays the root"""
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def _band_keys(band):
+    """One 64-bit key per row of a (n x rows) uint32 band; equal bands give equal keys"""
+    keys = np.zeros(len(band), dtype=np.uint64)
+    for column in band.T:
+        keys = keys * np.uint64(0x100000001B3) ^ column.astype(np.uint64)
+    return keys
+
+
+def cluster_near_duplicates(texts, threshold=NEAR_DUP_THRESHOLD, num_perm=NUM_PERMUTATIONS, bands=LSH_BANDS):
+    """
+    Group near-duplicate texts
+
+    Args:
+        texts: Sequence of texts (e.g. title + summary per article)
+        threshold: Minimum estimated Jaccard similarity of two texts in one cluster
+        num_perm: MinHash signature length (a multiple of bands)
+        bands: Number of LSH bands
+
+    Returns:
+        int array with, for each text, the index of its cluster's first text
+    """
+    n = len(texts)
+    hasher = MinHasher(num_perm)
+    signatures = np.zeros((n, num_perm), dtype=np.uint32)
+    # Texts without words never match anything
+    valid = np.zeros(n, dtype=bool)
+    for i, text in enumerate(texts):
+        signature = hasher.signature(shingles(text))
+        if signature is not None:
+            signatures[i] = signature
+            valid[i] = True
+
+    clusters = _DisjointSet(n)
+    candidates = np.flatnonzero(valid)
+    rows = num_perm // bands
+    compared = set()
+    for band in range(bands):
+        keys = _band_keys(signatures[candidates, band * rows:(band + 1) * rows])
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Runs of equal keys are the buckets with more than one article
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], len(sorted_keys)]
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            members = candidates[order[start:end]]
+            for k, j in enumerate(members[1:], 1):
+                for i in members[:k]:
+                    if (i, j) in compared or clusters.find(i) == clusters.find(j):
+                        continue
+                    compared.add((i, j))
+                    if np.mean(signatures[i] == signatures[j]) >= threshold:
+                        clusters.union(i, j)
+                        break
+
+    return np.array([clusters.find(i) for i in range(n)], dtype=np.int64)
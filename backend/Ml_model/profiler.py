@@ -0,0 +1,247 @@
+"""
+Sampling Profiler
+Low-overhead wall-clock profiler for a running ML API worker. A background
+thread snapshots every thread's Python stack (sys._current_frames) at a fixed
+interval; nothing is hooked into the code being profiled, so the cost is one
+stack walk per thread per sample.
+
+Output is in collapsed-stack format ("frame;frame;frame count" per line),
+ready for flamegraph.pl or speedscope.
+
+Capture from a running server (the admin endpoints need ML_ADMIN_TOKEN):
+    python profiler.py --url http://localhost:5001 --seconds 10 -o worker.folded
+
+POST /api/admin/profile starts sampling the gunicorn worker that happens to
+serve it and returns at once, so that worker keeps serving requests (sync
+workers included) while it is being profiled. The result is published to the
+cache under profile:<id> and fetched with GET /api/admin/profile/<id>, which
+any worker can answer; DELETE on the worker that runs it stops it early.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = 0.01
+MAX_PROFILE_SECONDS = int(os.getenv('ML_PROFILE_MAX_SECONDS', 60))
+MAX_STACK_DEPTH = 128
+# How long finished profiles stay fetchable, and how many each worker keeps in memory
+PROFILE_RESULT_TTL = int(os.getenv('ML_PROFILE_RESULT_TTL', 600))
+PROFILE_HISTORY = 4
+
+# Leaf frames of threads parked waiting for work; dropped unless include_idle
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'accept'),
+    ('socketserver.py', 'serve_forever'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process"""
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    # One profile at a time per process; overlapping runs would double the overhead
+    _running = threading.Lock()
+
+    def __init__(self, interval=DEFAULT_INTERVAL_SECONDS, include_idle=False):
+        """
+        Args:
+            interval: Seconds between samples
+            include_idle: Keep samples of threads blocked waiting for work
+        """
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self.profile_id = None
+        self.finished = False
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and not self.finished
+
+    def _sample(self, skip_idents):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident in skip_idents:
+                continue
+            labels = []
+            leaf = frame
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if not self.include_idle:
+                code = leaf.f_code
+                if (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES:
+                    continue
+            labels.append(names.get(ident, f'thread-{ident}'))
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def start(self, seconds, skip_idents=(), on_done=None):
+        """
+        Sample every other thread for the given number of seconds in a background thread
+
+        Args:
+            seconds: Profile length (capped at MAX_PROFILE_SECONDS)
+            skip_idents: Thread idents not to sample besides the sampler itself
+            on_done: Called with the profiler from the sampler thread once it finishes
+
+        Raises:
+            ProfilerBusy: Another profile is already running in this process
+        """
+        seconds = min(float(seconds), MAX_PROFILE_SECONDS)
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running in this worker")
+        self.profile_id = f"{os.getpid()}-{int(time.time() * 1000)}"
+
+        def sampler():
+            try:
+                skip = {threading.get_ident(), *skip_idents}
+                started = time.perf_counter()
+                deadline = started + seconds
+                while not self._done.is_set():
+                    tick = time.perf_counter()
+                    if tick >= deadline:
+                        break
+                    self._sample(skip)
+                    self.samples += 1
+                    # Sleep off the rest of the interval so stack walking doesn't skew the rate
+                    self._done.wait(max(0.0, self.interval - (time.perf_counter() - tick)))
+                self.duration = time.perf_counter() - started
+            finally:
+                self.finished = True
+                self._done.set()
+                self._running.release()
+            if on_done is not None:
+                try:
+                    on_done(self)
+                except Exception as e:
+                    logger.warning(f"⚠️  Could not publish profile {self.profile_id}: {e}")
+
+        self._thread = threading.Thread(target=sampler, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """End a running profile early"""
+        self._done.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self, seconds):
+        """
+        Sample every other thread for the given number of seconds (blocking)
+
+        Returns:
+            Counter of collapsed stack -> sample count
+        """
+        self.start(seconds, skip_idents=(threading.get_ident(),))
+        self.join()
+        return self.stacks
+
+    def collapsed(self):
+        """Collapsed-stack text, heaviest stacks first"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, top=20):
+        """Sample counts and the functions most often on top of the stack"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            "profile_id": self.profile_id,
+            "status": "running" if self.running else "done",
+            "pid": os.getpid(),
+            "samples": self.samples,
+            "duration_seconds": round(self.duration, 3),
+            "interval_seconds": self.interval,
+            "distinct_stacks": len(self.stacks),
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in leaves.most_common(top)],
+        }
+
+
+def _admin_json(url, token, method='GET', timeout=30):
+    req = urllib.request.Request(url, method=method, headers={'X-Admin-Token': token})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+
+def capture(url, seconds, token, interval_ms=None, include_idle=False, timeout_margin=30, poll_seconds=0.5):
+    """
+    Start a profile on a running API server and poll until its result is published
+
+    Returns:
+        (worker_pid, collapsed_text)
+    """
+    base = f"{url.rstrip('/')}/api/admin/profile"
+    query = f"seconds={seconds}"
+    if interval_ms:
+        query += f"&interval_ms={interval_ms}"
+    if include_idle:
+        query += "&include_idle=1"
+    started = _admin_json(f"{base}?{query}", token, method='POST')
+
+    deadline = time.monotonic() + min(float(seconds), MAX_PROFILE_SECONDS) + timeout_margin
+    time.sleep(min(float(seconds), MAX_PROFILE_SECONDS))
+    while True:
+        result = _admin_json(f"{base}/{started['profile_id']}", token)
+        if result.get('status') == 'done':
+            return result.get('pid'), result.get('collapsed', '')
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Profile {started['profile_id']} did not finish in time")
+        time.sleep(poll_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Capture a collapsed-stack profile from a running ML API worker')
+    parser.add_argument('--url', default=os.getenv('ML_API_URL', 'http://localhost:5001'))
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--interval-ms', type=float, default=None)
+    parser.add_argument('--include-idle', action='store_true', help='Keep samples of threads waiting for work')
+    parser.add_argument('--token', default=os.getenv('ML_ADMIN_TOKEN'), help='Admin token (default: $ML_ADMIN_TOKEN)')
+    parser.add_argument('-o', '--output', default=None, help='Output file (default: profile-<pid>.folded)')
+    args = parser.parse_args()
+
+    if not args.token:
+        parser.error('an admin token is required (--token or ML_ADMIN_TOKEN)')
+    try:
+        pid, collapsed = capture(args.url, args.seconds, args.token, args.interval_ms, args.include_idle)
+    except urllib.error.HTTPError as e:
+        print(f"Profile request failed: {e.code} {e.read().decode('utf-8', 'replace')}", file=sys.stderr)
+        sys.exit(1)
+    except TimeoutError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    output = Path(args.output or f"profile-{pid or 'worker'}.folded")
+    output.write_text(collapsed, encoding='utf-8')
+    print(f"Wrote {len(collapsed.splitlines())} stacks from worker {pid} to {output}")
+    print(f"Render with: flamegraph.pl {output} > {output.with_suffix('.svg')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,375 @@
+"""
+Recommendation request handling shared by the Flask (api_server) and ASGI
+(asgi_server) apps: parameter parsing, cache keys, cold-start fallback and
+the candidate-list cache lookup
+"""
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+import logging
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from Recommender_Models import MAX_HYBRID_SEEDS
+from cache_manager import build_cache_key, cached_list_size, apply_exclusions
+from metrics import STAGE_LATENCY, method_label, time_stage
+from tracing import span
+from response_encoder import parse_fields
+from admission import Overloaded, current_deadline, deadline_expired
+from facet_index import facet_key_fields, filters_from_key_fields, parse_facet_filters
+from article_store import normalize_facet
+
+logger = logging.getLogger(__name__)
+
+# Short TTL for entries answering unknown users/articles with the cold-start list,
+# so ids picked up by the next retrain stop getting the fallback quickly
+NEGATIVE_CACHE_TTL = int(os.getenv('REC_NEGATIVE_CACHE_TTL', 120))
+COLD_START_CACHE_TTL = 300
+# Every computed list is also kept this long under stale:<key>, served when the
+# worker is over capacity (0 disables stale copies)
+STALE_TTL = int(os.getenv('REC_STALE_TTL', 86400))
+# Trending window used as the last-resort answer under load
+DEGRADED_TRENDING_DAYS = 7
+# Upper bound on client-requested list sizes
+MAX_TOP_N = int(os.getenv('REC_MAX_TOP_N', 100))
+# Longer search queries are truncated
+MAX_QUERY_LENGTH = 500
+
+
+def clamp_top_n(value, default=10):
+    """Client top_n as an int in [1, MAX_TOP_N]"""
+    top_n = int(value if value is not None else default)
+    return max(1, min(top_n, MAX_TOP_N))
+
+
+def parse_max_age_days(value):
+    """Client max_age_days as a positive float, or None for no recency filter"""
+    if value in (None, ''):
+        return None
+    max_age = float(value)
+    return max_age if max_age > 0 else None
+
+
+def parse_recency_boost(value):
+    """Client recency_boost clamped to [0, 1] (0 = rank by relevance only)"""
+    if value in (None, ''):
+        return 0.0
+    return max(0.0, min(float(value), 1.0))
+
+
+def normalize_query(query):
+    """Search text with whitespace collapsed and lowercased (what the vectorizer sees anyway)"""
+    return ' '.join(str(query or '')[:MAX_QUERY_LENGTH].split()).lower()
+
+
+def search_cache_key(query, top_n, filters=None):
+    """Cache key of a search; the query is hashed so any text fits in the key"""
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()[:16]
+    return build_cache_key('search', top_n=top_n, q=digest, **facet_key_fields(filters))
+
+
+def stale_key(cache_key):
+    return f"stale:{cache_key}"
+
+
+def recommendation_cache_key(key_fields, top_n, exclude_ids):
+    """
+    Cache key serve_recommendations() uses for a request
+
+    Returns:
+        (cache_key, exact) - exact keys already account for exclude_ids
+    """
+    n_cached = cached_list_size(top_n)
+    if n_cached == top_n:
+        # Exact mode: exclusions are part of the key
+        return build_cache_key(top_n=top_n, exclude_ids=exclude_ids, **key_fields), True
+    # Candidate mode: one unfiltered top-(n + slack) list serves every exclusion set
+    return build_cache_key(top_n=n_cached, **key_fields), False
+
+
+def is_unknown_subject(svc, method, user_id, article_id, recent_articles):
+    """Whether a request targets a user/article the models have no row for"""
+    if method == 'content' and article_id:
+        return not svc.is_known_article(article_id)
+    if method == 'collaborative' and user_id:
+        return not svc.is_known_user(user_id)
+    if method == 'hybrid' and user_id:
+        # Hybrid still has a content signal if any seed article is known
+        return not svc.is_known_user(user_id) and not any(
+            svc.is_known_article(a) for a in recent_articles
+        )
+    return False
+
+
+def preference_key_fields(topic=None, place=None):
+    """build_cache_key() fields for a cold-start topic/place preference (left out when unset)"""
+    return dict(pref_topic=topic, pref_place=place)
+
+
+def get_cold_start_recommendations(svc, cache, top_n, filters=None, topic=None, place=None):
+    """
+    Cold-start fallback list, shared by every unknown user/article with the same
+    facet filters and topic/place preference
+    """
+    if cache is None:
+        return svc.get_cold_start_recommendations(top_n=top_n, topic=topic, place=place, filters=filters)
+    cache_key = build_cache_key(
+        'coldstart', top_n=top_n, **preference_key_fields(topic, place), **facet_key_fields(filters)
+    )
+    cached_result = cache.get(cache_key)
+    if cached_result:
+        return cached_result
+    recommendations = svc.get_cold_start_recommendations(top_n=top_n, topic=topic, place=place, filters=filters)
+    cache.set(cache_key, recommendations, ttl_seconds=COLD_START_CACHE_TTL)
+    return recommendations
+
+
+def cold_start_compute(svc, cache, filters=None, topic=None, place=None):
+    """serve_recommendations() compute callable answering with the cold-start list"""
+    def compute(exclude, n):
+        exclude = exclude or []
+        recommendations = get_cold_start_recommendations(svc, cache, n + len(exclude), filters, topic, place)
+        return apply_exclusions(recommendations, exclude, n)
+    return compute
+
+
+class RecommendationRequest:
+    """Recommendation request parameters, independent of the web framework"""
+
+    def __init__(self, params):
+        """
+        Args:
+            params: dict of request parameters (query string merged with JSON body);
+                    'exclude' and 'recent_articles' are lists, 'fields' a list or
+                    comma-separated string
+        """
+        self.user_id = params.get('user_id')
+        self.article_id = params.get('article_id')
+        self.method = params.get('method', 'hybrid')
+        self.top_n = clamp_top_n(params.get('top_n', 10))
+        self.exclude_ids = params.get('exclude') or []
+        self.recent_articles = (params.get('recent_articles') or [])[:MAX_HYBRID_SEEDS]
+        self.days = int(params.get('days', 7))
+        # Recency filter/boost for content and hybrid results
+        self.max_age_days = parse_max_age_days(params.get('max_age_days'))
+        self.recency_boost = parse_recency_boost(params.get('recency_boost'))
+        # Facet filters (topic, place, source_id, language_code) applied to every method
+        self.filters = parse_facet_filters(params)
+        # Topic/place the user prefers (e.g. from their profile); unlike filters this
+        # only ranks matching articles first in the cold-start list
+        self.preferred_topic = normalize_facet(params.get('preferred_topic'))
+        self.preferred_place = normalize_facet(params.get('preferred_place'))
+        # Response projection only; never part of the cache key
+        self.fields = parse_fields(params.get('fields'))
+
+    def key_fields(self):
+        """Only the inputs that affect the result go into the cache key"""
+        method = self.method
+        # Left out of the key when unset so existing keys are unchanged
+        recency = dict(age=self.max_age_days, boost=self.recency_boost or None)
+        facets = facet_key_fields(self.filters)
+        if method == 'content' and self.article_id:
+            return dict(method=method, article_id=self.article_id, **recency, **facets)
+        if method == 'collaborative' and self.user_id:
+            return dict(method=method, user_id=self.user_id, **facets)
+        if method == 'hybrid' and self.user_id:
+            return dict(method=method, user_id=self.user_id, seed_ids=self.recent_articles, **recency, **facets)
+        if method == 'trending':
+            return dict(method=method, days=self.days, **facets)
+        return dict(method=method, **facets)
+
+    def compute_fn(self, svc):
+        """serve_recommendations() compute callable for the requested method"""
+        method, user_id, article_id = self.method, self.user_id, self.article_id
+
+        def compute(exclude, n):
+            # Route to appropriate method
+            if method == 'content' and article_id:
+                return svc.get_similar_articles(
+                    article_id=article_id,
+                    top_n=n,
+                    exclude_ids=exclude,
+                    max_age_days=self.max_age_days,
+                    recency_boost=self.recency_boost,
+                    filters=self.filters
+                )
+            if method == 'collaborative' and user_id:
+                return svc.get_collaborative_recommendations(
+                    user_id=user_id,
+                    top_n=n,
+                    exclude_ids=exclude,
+                    filters=self.filters
+                )
+            if method == 'hybrid' and user_id:
+                return svc.get_hybrid_recommendations(
+                    user_id=user_id,
+                    recent_article_ids=self.recent_articles,
+                    top_n=n,
+                    exclude_ids=exclude,
+                    max_age_days=self.max_age_days,
+                    recency_boost=self.recency_boost,
+                    filters=self.filters
+                )
+            if method == 'trending':
+                return svc.get_trending_articles(
+                    top_n=n,
+                    time_window_days=self.days,
+                    filters=self.filters
+                )
+            # Fallback to trending if invalid params
+            logger.warning(f"Invalid method/params: {method}, user_id={user_id}, article_id={article_id}")
+            return svc.get_trending_articles(top_n=n, filters=self.filters)
+        return compute
+
+    def plan(self, svc, cache=None):
+        """
+        Decide how to answer the request
+
+        Unknown ids skip the model path entirely: the request key becomes a
+        short-lived negative entry holding the shared cold-start list.
+
+        Args:
+            svc: RecommendationService
+            cache: CacheManager for the shared cold-start list (None to compute it directly)
+
+        Returns:
+            (key_fields, compute, ttl_seconds, fallback)
+        """
+        key_fields = self.key_fields()
+        # 15 min for personalized, 30 min for others
+        ttl = 900 if self.user_id else 1800
+
+        fallback = is_unknown_subject(svc, self.method, self.user_id, self.article_id, self.recent_articles)
+        if fallback:
+            key_fields.update(preference_key_fields(self.preferred_topic, self.preferred_place))
+            compute = cold_start_compute(svc, cache, self.filters, self.preferred_topic, self.preferred_place)
+            return key_fields, compute, NEGATIVE_CACHE_TTL, True
+        if self.user_id and self.method in ('collaborative', 'hybrid'):
+            # Tracked activity changes personalized results before their TTL runs out
+            profile_version = svc.profile_version(self.user_id)
+            if profile_version is not None:
+                key_fields['pv'] = profile_version
+        return key_fields, self.compute_fn(svc), ttl, False
+
+
+def serve_recommendations(cache, key_fields, compute, top_n, exclude_ids, ttl_seconds,
+                          admission=None, keep_stale=True):
+    """
+    Look up a recommendation list through the cache, computing it on a miss
+
+    Args:
+        cache: CacheManager
+        key_fields: build_cache_key() arguments describing the request inputs
+        compute: callable(exclude_ids, n) returning a fresh recommendation list
+        top_n: Number of recommendations the client asked for
+        exclude_ids: Article IDs the client wants excluded
+        ttl_seconds: TTL for newly cached lists
+        admission: AdmissionController gating computation (cache hits never wait)
+        keep_stale: Also store a long-lived stale copy for serve_degraded()
+
+    Returns:
+        (recommendations, from_cache)
+
+    Raises:
+        Overloaded: a miss could not be admitted; answer with serve_degraded()
+    """
+    uncached_compute = compute
+    method = key_fields['method']
+
+    def timed_compute(exclude, n):
+        # Miss cost feeds the per-family compute-time-saved estimate
+        start = time.perf_counter()
+        with span('scoring'):
+            recommendations = uncached_compute(exclude, n)
+        elapsed = time.perf_counter() - start
+        cache.stats.record_compute(method, elapsed)
+        STAGE_LATENCY.observe(elapsed, stage='scoring', method=method_label(method))
+        return recommendations
+
+    def compute(exclude, n):
+        if deadline_expired():
+            raise Overloaded('deadline')
+        if admission is None:
+            return timed_compute(exclude, n)
+        with time_stage('admission_wait', method):
+            admission.acquire()
+        try:
+            return timed_compute(exclude, n)
+        finally:
+            admission.release()
+
+    def store(cache_key, recommendations):
+        deadline = current_deadline()
+        if deadline is not None and deadline.degraded:
+            # Partial results from a request that ran out of time
+            return
+        with time_stage('cache_store', method):
+            cache.set(cache_key, recommendations, ttl_seconds=ttl_seconds)
+            if keep_stale and STALE_TTL > 0:
+                cache.set(stale_key(cache_key), recommendations, ttl_seconds=STALE_TTL)
+
+    cache_key, exact = recommendation_cache_key(key_fields, top_n, exclude_ids)
+    if exact:
+        with time_stage('cache_lookup', method):
+            cached_result = cache.get(cache_key)
+        if cached_result:
+            logger.info(f"Cache hit: {cache_key}")
+            return cached_result, True
+        recommendations = compute(exclude_ids, top_n)
+        store(cache_key, recommendations)
+        return recommendations, False
+
+    n_cached = cached_list_size(top_n)
+    with time_stage('cache_lookup', method):
+        candidates = cache.get(cache_key)
+    from_cache = bool(candidates)
+    if from_cache:
+        logger.info(f"Cache hit: {cache_key}")
+    else:
+        candidates = compute(None, n_cached)
+        store(cache_key, candidates)
+
+    recommendations = apply_exclusions(candidates, exclude_ids, top_n)
+    if len(recommendations) < top_n and len(candidates) >= n_cached:
+        # Exclusions removed more items than the slack covers; compute exactly
+        return compute(exclude_ids, top_n), False
+    return recommendations, from_cache
+
+
+def degraded_trending_plan(key_fields, top_n, exclude_ids):
+    """
+    Trending list an over-capacity request falls back to, under its facet filters
+
+    Returns:
+        (list size, facet filters, cache key)
+    """
+    n = top_n + len(exclude_ids or [])
+    filters = filters_from_key_fields(key_fields)
+    trending_key = build_cache_key('trending', top_n=n, days=DEGRADED_TRENDING_DAYS, **facet_key_fields(filters))
+    return n, filters, trending_key
+
+
+def serve_degraded(cache, svc, key_fields, top_n, exclude_ids):
+    """
+    Answer an over-capacity request without scoring
+
+    Serves the stale copy of the request's own list if one exists, otherwise
+    the (usually cached) trending list under the request's facet filters.
+
+    Returns:
+        (recommendations, degraded) with degraded 'stale' or 'trending'
+    """
+    cache_key, _ = recommendation_cache_key(key_fields, top_n, exclude_ids)
+    stale = cache.get(stale_key(cache_key))
+    if stale:
+        return apply_exclusions(stale, exclude_ids, top_n), 'stale'
+
+    n, filters, trending_key = degraded_trending_plan(key_fields, top_n, exclude_ids)
+    trending = cache.get(trending_key)
+    if not trending:
+        trending = svc.get_trending_articles(top_n=n, time_window_days=DEGRADED_TRENDING_DAYS, filters=filters)
+        cache.set(trending_key, trending, ttl_seconds=300)
+    return apply_exclusions(trending, exclude_ids, top_n), 'trending'
@@ -0,0 +1,94 @@
+"""
+Response Encoder
+JSON encoding for recommendation payloads shared by the Flask and ASGI apps.
+
+Recommendation lists are built from DataFrame rows (iloc[...].to_dict()), so
+they hold NumPy scalars, pandas Timestamps and NaN for missing values. orjson
+serializes these natively (NaN becomes null) and is used when installed;
+otherwise the stdlib encoder runs with a default hook for the same types
+(plain float NaN is then written as NaN, as jsonify does).
+"""
+import json
+import math
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+    HAS_ORJSON = False
+
+# Always returned when a client projects fields, so results stay addressable
+ALWAYS_INCLUDED_FIELDS = ('id',)
+
+
+def _default(value):
+    """Types neither encoder handles natively"""
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        # orjson only encodes exact datetimes natively; pandas isoformat() is several times slower
+        return value.to_pydatetime(warn=False) if HAS_ORJSON else value.isoformat()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+if HAS_ORJSON:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def encode(payload):
+        """Serialize a response payload to UTF-8 JSON bytes"""
+        return orjson.dumps(payload, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _stdlib_encoder = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    def encode(payload):
+        """Serialize a response payload to UTF-8 JSON bytes"""
+        return _stdlib_encoder.encode(payload).encode('utf-8')
+
+
+def parse_fields(value):
+    """
+    Requested field names from a fields= parameter
+
+    Args:
+        value: Comma-separated string, list of strings (repeated param or JSON body) or None
+
+    Returns:
+        Tuple of field names, or None when no projection was requested
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = [value]
+    fields = []
+    for item in value:
+        for name in str(item).split(','):
+            name = name.strip()
+            if name and name not in fields:
+                fields.append(name)
+    if not fields:
+        return None
+    for name in reversed(ALWAYS_INCLUDED_FIELDS):
+        if name not in fields:
+            fields.insert(0, name)
+    return tuple(fields)
+
+
+def project_fields(items, fields):
+    """Keep only the requested keys of each recommendation dict (no-op when fields is None)"""
+    if fields is None:
+        return items
+    return [{name: item[name] for name in fields if name in item} for item in items]
@@ -0,0 +1,138 @@
+"""
+Search Index
+Inverted index over the trained TF-IDF matrix for free-text article search.
+Each term keeps a posting list of (article row, TF-IDF weight) sorted by row,
+plus the largest weight in the list. A query is vectorised with the saved
+vectorizer and scored by dot product, which is cosine similarity since both
+sides are L2-normalised.
+
+Top-K retrieval follows MaxScore: query terms are visited from the largest
+score upper bound (query weight x max posting weight) down. Once the K-th
+best partial score exceeds what the remaining terms could add, no article
+missing from the candidates can still enter the top K. The remaining
+posting lists are then only probed for the surviving candidates, and
+candidates that can no longer reach the threshold are dropped along the way.
+
+Built at training time next to article_metadata.csv (search_index.npz).
+"""
+import numpy as np
+from scipy import sparse
+
+SEARCH_INDEX_FILE = 'search_index.npz'
+
+
+def _accumulate(docs, scores, new_docs, new_scores):
+    """Sum two (sorted rows, scores) lists into one"""
+    if len(docs) == 0:
+        return new_docs, new_scores
+    merged, inverse = np.unique(np.concatenate([docs, new_docs]), return_inverse=True)
+    totals = np.bincount(inverse, weights=np.concatenate([scores, new_scores]), minlength=len(merged))
+    return merged, totals
+
+
+def _kth_best(scores, k):
+    return np.partition(scores, len(scores) - k)[len(scores) - k]
+
+
+class SearchIndex:
+    def __init__(self, n_docs, indptr, docs, weights):
+        """
+        Args:
+            n_docs: Number of article rows indexed
+            indptr: Posting list of term t is docs/weights[indptr[t]:indptr[t + 1]]
+            docs: Article rows, sorted within each posting list
+            weights: TF-IDF weight of the term in each posted article
+        """
+        self.n_docs = n_docs
+        self.indptr = indptr
+        self.docs = docs
+        self.weights = weights
+        # Score upper bound of each term per unit of query weight
+        lengths = np.diff(indptr)
+        self.max_weight = np.zeros(len(lengths), dtype=np.float32)
+        nonempty = lengths > 0
+        self.max_weight[nonempty] = np.maximum.reduceat(weights, indptr[:-1][nonempty])
+
+    @classmethod
+    def build(cls, tfidf_matrix):
+        """Index a (articles x terms) TF-IDF matrix"""
+        csc = sparse.csc_matrix(tfidf_matrix, dtype=np.float32)
+        csc.sort_indices()
+        return cls(
+            csc.shape[0],
+            csc.indptr.astype(np.int64),
+            csc.indices.astype(np.int32),
+            csc.data.astype(np.float32),
+        )
+
+    def __len__(self):
+        return self.n_docs
+
+    def postings(self, term):
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.docs[start:end], self.weights[start:end]
+
+    def search(self, query_vector, top_k=10, mask=None):
+        """
+        Best-scoring articles for a vectorised query
+
+        Args:
+            query_vector: 1 x terms sparse row (e.g. from TfidfVectorizer.transform)
+            top_k: Number of articles to return
+            mask: Optional boolean array over article rows; others are never returned
+
+        Returns:
+            (rows, scores), best first; only articles sharing a term with the query
+        """
+        query = sparse.csr_matrix(query_vector)
+        terms, query_weights = query.indices, query.data.astype(np.float32)
+        keep = terms < len(self.max_weight)
+        terms, query_weights = terms[keep], query_weights[keep]
+        if top_k <= 0 or len(terms) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        bounds = query_weights * self.max_weight[terms]
+        order = np.argsort(-bounds, kind='stable')
+        terms, query_weights, bounds = terms[order], query_weights[order], bounds[order]
+        # Most the terms after i can still add to any article
+        remaining = np.append(np.cumsum(bounds[::-1])[::-1][1:], 0.0)
+
+        docs = np.empty(0, dtype=np.int32)
+        scores = np.empty(0, dtype=np.float64)
+        threshold = -np.inf
+        i = 0
+        # Union phase: any article can still make the top K
+        while i < len(terms):
+            new_docs, new_weights = self.postings(terms[i])
+            if mask is not None:
+                in_mask = mask[new_docs]
+                new_docs, new_weights = new_docs[in_mask], new_weights[in_mask]
+            docs, scores = _accumulate(docs, scores, new_docs, new_weights * query_weights[i])
+            i += 1
+            if len(scores) >= top_k:
+                threshold = _kth_best(scores, top_k)
+                if remaining[i - 1] < threshold:
+                    break
+
+        # Probe phase: only the candidates gathered so far can still make it
+        while i < len(terms) and len(docs):
+            alive = scores + bounds[i] + remaining[i] >= threshold
+            docs, scores = docs[alive], scores[alive]
+            posting_docs, posting_weights = self.postings(terms[i])
+            if len(posting_docs):
+                pos = np.minimum(np.searchsorted(posting_docs, docs), len(posting_docs) - 1)
+                hit = posting_docs[pos] == docs
+                scores[hit] += posting_weights[pos[hit]] * query_weights[i]
+            threshold = max(threshold, _kth_best(scores, top_k)) if len(scores) >= top_k else threshold
+            i += 1
+
+        best = np.argsort(-scores, kind='stable')[:top_k]
+        return docs[best].astype(np.int64), scores[best].astype(np.float32)
+
+    def save(self, path):
+        np.savez(path, n_docs=np.array(self.n_docs), indptr=self.indptr, docs=self.docs, weights=self.weights)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(int(data['n_docs']), data['indptr'], data['docs'], data['weights'])
@@ -0,0 +1,416 @@
+"""
+Heavy-hitter Sketches
+Bounded-memory trending counts for /api/track at high event rates: a
+Count-Min sketch estimates per-article activity and a Space-Saving summary
+keeps the candidate heavy hitters, one pair per time bucket for each sliding
+window (1h, 24h, 7d). Memory depends on the sketch sizes, not the catalog.
+
+Both structures are mergeable: Count-Min tables add up cell by cell and
+Space-Saving summaries merge as in Agarwal et al., "Mergeable Summaries"
+(PODS 2012). Each worker publishes its window summaries to Redis under its own
+key and lists that key in a registry set; any process (including the ASGI app,
+which sees no events) reads the registry (SMEMBERS + MGET, no KEYS scan) and
+merges all published summaries to rank articles across workers and nodes.
+
+Hashing uses blake2b so sketches built in different processes line up.
+"""
+import base64
+import hashlib
+import heapq
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+import logging
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from user_profiles import ACTIVITY_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+SKETCH_WIDTH = int(os.getenv('TRENDING_SKETCH_WIDTH', 2048))
+SKETCH_DEPTH = int(os.getenv('TRENDING_SKETCH_DEPTH', 4))
+HEAVY_HITTER_CAPACITY = int(os.getenv('TRENDING_SKETCH_CAPACITY', 512))
+# How often a worker publishes its summaries / how long a merged view is reused
+SKETCH_PUBLISH_SECONDS = float(os.getenv('TRENDING_SKETCH_PUBLISH_SECONDS', 30))
+
+# name -> (window seconds, number of buckets)
+WINDOWS = {
+    '1h': (3600, 12),
+    '24h': (86400, 24),
+    '7d': (7 * 86400, 28),
+}
+
+SKETCH_KEY_PREFIX = 'trending:sketch:'
+# Set of the sketch keys workers have published under
+SKETCH_REGISTRY_KEY = 'trending:sketches'
+
+
+def sketch_cache_key(host, pid):
+    return f"{SKETCH_KEY_PREFIX}{host}:{pid}"
+
+
+def _hash_pair(key):
+    digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+    # Odd second hash so double hashing visits distinct columns
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class CountMinSketch:
+    def __init__(self, width=None, depth=None, table=None):
+        """
+        Args:
+            width: Counters per row (estimates exceed the true count by at most e/width of the total)
+            depth: Rows (the bound holds with probability 1 - exp(-depth))
+            table: Existing depth x width counters to wrap
+        """
+        if table is not None:
+            self.table = table
+        else:
+            self.table = np.zeros((depth or SKETCH_DEPTH, width or SKETCH_WIDTH), dtype=np.float64)
+        self.depth, self.width = self.table.shape
+        self._rows = np.arange(self.depth)
+
+    def _columns(self, key):
+        h1, h2 = _hash_pair(key)
+        return np.array([(h1 + i * h2) % self.width for i in range(self.depth)])
+
+    def add(self, key, count=1.0):
+        self.table[self._rows, self._columns(key)] += count
+
+    def estimate(self, key):
+        return float(self.table[self._rows, self._columns(key)].min())
+
+    def merge(self, other):
+        """Add another sketch's counts into this one (same width and depth)"""
+        if self.table.shape != other.table.shape:
+            raise ValueError(f"Cannot merge sketches of shape {self.table.shape} and {other.table.shape}")
+        self.table += other.table
+        return self
+
+    def copy(self):
+        return CountMinSketch(table=self.table.copy())
+
+    def to_dict(self):
+        return {
+            'depth': self.depth,
+            'width': self.width,
+            'table': base64.b64encode(self.table.astype('<f8').tobytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        table = np.frombuffer(base64.b64decode(data['table']), dtype='<f8').astype(np.float64)
+        return cls(table=table.reshape(int(data['depth']), int(data['width'])))
+
+
+class SpaceSaving:
+    def __init__(self, capacity=None):
+        """
+        Args:
+            capacity: Keys tracked; any key with more than total/capacity weight is guaranteed to be kept
+        """
+        self.capacity = capacity or HEAVY_HITTER_CAPACITY
+        # key -> counted weight (an overestimate by at most errors[key])
+        self.counts = {}
+        self.errors = {}
+        # Lazy min-heap of (count, key); entries whose count is stale are skipped
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _rebuild_heap(self):
+        self._heap = [(c, key) for key, c in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        while self._heap:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key, count
+        raise KeyError('empty summary')
+
+    def min_count(self):
+        """Smallest tracked count once full (the bound for untracked keys), else 0"""
+        if len(self.counts) < self.capacity:
+            return 0.0
+        while self._heap:
+            count, key = self._heap[0]
+            if self.counts.get(key) == count:
+                return count
+            heapq.heappop(self._heap)
+        return 0.0
+
+    def add(self, key, count=1.0):
+        if key in self.counts:
+            self.counts[key] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0.0
+        else:
+            # Replace the smallest key; the newcomer inherits its count as error
+            evicted, floor = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[key] = floor + count
+            self.errors[key] = floor
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 2 * self.capacity + 64:
+            self._rebuild_heap()
+
+    def top(self, n=None):
+        """(key, count, error) by count, largest first"""
+        items = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        if n is not None:
+            items = items[:n]
+        return [(key, count, self.errors[key]) for key, count in items]
+
+    def merge(self, other):
+        """New summary holding both inputs' counts (capacity of the larger)"""
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        floor_self = self.min_count()
+        floor_other = other.min_count()
+        for key in set(self.counts) | set(other.counts):
+            merged.counts[key] = self.counts.get(key, floor_self) + other.counts.get(key, floor_other)
+            merged.errors[key] = self.errors.get(key, floor_self) + other.errors.get(key, floor_other)
+        if len(merged.counts) > merged.capacity:
+            keep = heapq.nlargest(merged.capacity, merged.counts.items(), key=lambda kv: kv[1])
+            merged.counts = dict(keep)
+            merged.errors = {key: merged.errors[key] for key in merged.counts}
+        merged._rebuild_heap()
+        return merged
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counts': self.counts, 'errors': self.errors}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(int(data['capacity']))
+        summary.counts = {str(k): float(v) for k, v in data['counts'].items()}
+        summary.errors = {str(k): float(data['errors'].get(k, 0.0)) for k in data['counts']}
+        summary._rebuild_heap()
+        return summary
+
+
+class WindowedHeavyHitters:
+    def __init__(self, window_seconds, buckets, width=None, depth=None, capacity=None):
+        """
+        Args:
+            window_seconds: Sliding window length
+            buckets: Time buckets the window is split into (its granularity)
+            width, depth: Count-Min sketch size per bucket
+            capacity: Space-Saving capacity per bucket
+        """
+        self.window_seconds = window_seconds
+        self.bucket_seconds = window_seconds / buckets
+        self.width = width or SKETCH_WIDTH
+        self.depth = depth or SKETCH_DEPTH
+        self.capacity = capacity or HEAVY_HITTER_CAPACITY
+        # ring slot -> (bucket number, sketch, summary); allocated on first write
+        self._ring = [None] * buckets
+
+    def _bucket(self, timestamp):
+        return int(timestamp // self.bucket_seconds)
+
+    def add(self, key, count, timestamp):
+        number = self._bucket(timestamp)
+        slot = number % len(self._ring)
+        entry = self._ring[slot]
+        if entry is None or entry[0] != number:
+            entry = (number, CountMinSketch(self.width, self.depth), SpaceSaving(self.capacity))
+            self._ring[slot] = entry
+        entry[1].add(key, count)
+        entry[2].add(key, count)
+
+    def summary(self, now):
+        """(CountMinSketch, SpaceSaving) over the buckets still inside the window"""
+        oldest = self._bucket(now) - len(self._ring) + 1
+        sketch = CountMinSketch(self.width, self.depth)
+        summary = SpaceSaving(self.capacity)
+        for entry in self._ring:
+            if entry is not None and entry[0] >= oldest:
+                sketch.merge(entry[1])
+                summary = summary.merge(entry[2])
+        return sketch, summary
+
+
+class HeavyHitterTracker:
+    def __init__(self, cache=None, windows=None, width=None, depth=None, capacity=None,
+                 publish_seconds=None, clock=time.time):
+        """
+        Args:
+            cache: CacheManager used to publish and merge summaries across workers (optional)
+            windows: name -> (window seconds, buckets), defaults to WINDOWS
+            width, depth, capacity: Sketch sizes per bucket
+            publish_seconds: Publish interval, also how long a merged view is reused
+            clock: Wall-clock time source in epoch seconds (overridable in tests)
+        """
+        self.cache = cache
+        self.publish_seconds = SKETCH_PUBLISH_SECONDS if publish_seconds is None else publish_seconds
+        self._clock = clock
+        self.windows = {
+            name: WindowedHeavyHitters(seconds, buckets, width, depth, capacity)
+            for name, (seconds, buckets) in (windows or WINDOWS).items()
+        }
+        self.cache_key = sketch_cache_key(socket.gethostname(), os.getpid())
+        self._lock = threading.Lock()
+        # Window name -> (merged at, sketch, summary)
+        self._merged = {}
+        self._merge_lock = threading.Lock()
+        self._last_publish = clock()
+        self._publishing = False
+        self.events = 0
+
+    def record(self, article_id, activity_type='view', timestamp=None, partitions=()):
+        """
+        Count one tracked activity in every window
+
+        Partitions are not tracked separately: top() filters the (capacity-bounded)
+        candidates with accept() instead.
+
+        Returns:
+            True if the activity counted (known activity type)
+        """
+        weight = ACTIVITY_WEIGHTS.get(activity_type)
+        if weight is None or not article_id:
+            return False
+        now = self._clock() if timestamp is None else timestamp
+        article_id = str(article_id)
+        with self._lock:
+            for window in self.windows.values():
+                window.add(article_id, weight, now)
+            self.events += 1
+
+        if self.cache is not None and now - self._last_publish >= self.publish_seconds:
+            self._publish_in_background()
+        return True
+
+    def window_for(self, window_seconds=None):
+        """Name of the smallest window covering window_seconds (the largest when None or longer)"""
+        by_length = sorted(self.windows, key=lambda name: self.windows[name].window_seconds)
+        if window_seconds is not None:
+            for name in by_length:
+                if self.windows[name].window_seconds >= window_seconds:
+                    return name
+        return by_length[-1]
+
+    def local_summary(self, name, now=None):
+        now = self._clock() if now is None else now
+        with self._lock:
+            return self.windows[name].summary(now)
+
+    def to_dict(self, now=None):
+        """This worker's summaries for every window, as published to the cache"""
+        now = self._clock() if now is None else now
+        data = {'published_at': now, 'windows': {}}
+        for name in self.windows:
+            sketch, summary = self.local_summary(name, now)
+            data['windows'][name] = {'sketch': sketch.to_dict(), 'summary': summary.to_dict()}
+        return data
+
+    def publish(self):
+        """Store this worker's summaries under its own cache key"""
+        if self.cache is None:
+            return False
+        now = self._clock()
+        self._last_publish = now
+        longest = int(max(window.window_seconds for window in self.windows.values()))
+        stored = self.cache.set(self.cache_key, self.to_dict(now), ttl_seconds=longest)
+        return stored and self.cache.register_key(SKETCH_REGISTRY_KEY, self.cache_key, ttl_seconds=longest)
+
+    def _publish_in_background(self):
+        with self._lock:
+            if self._publishing:
+                return
+            self._publishing = True
+            self._last_publish = self._clock()
+
+        def run():
+            try:
+                self.publish()
+            except Exception as e:
+                logger.warning(f"⚠️  Could not publish trending sketches: {e}")
+            finally:
+                self._publishing = False
+
+        threading.Thread(target=run, name='trending-sketch-publish', daemon=True).start()
+
+    def merged_summary(self, name):
+        """
+        (CountMinSketch, SpaceSaving) for a window over this worker and every published peer
+
+        Reused for publish_seconds, so results lag new events by at most that long.
+        While one thread refreshes an expired view, others keep serving the old one.
+        """
+        now = self._clock()
+        cached = self._merged.get(name)
+        if cached is not None and now - cached[0] < self.publish_seconds:
+            return cached[1], cached[2]
+        if not self._merge_lock.acquire(blocking=cached is None):
+            return cached[1], cached[2]
+        try:
+            return self._merge(name, now)
+        finally:
+            self._merge_lock.release()
+
+    def _merge(self, name, now):
+        sketch, summary = self.local_summary(name, now)
+        window_seconds = self.windows[name].window_seconds
+        if self.cache is not None:
+            for key, data in self.cache.get_registered(SKETCH_REGISTRY_KEY).items():
+                if key == self.cache_key or not data:
+                    continue
+                # A peer that stopped publishing a whole window ago has nothing left in it
+                if now - data.get('published_at', 0) > window_seconds:
+                    continue
+                peer = data.get('windows', {}).get(name)
+                if peer is None:
+                    continue
+                try:
+                    sketch.merge(CountMinSketch.from_dict(peer['sketch']))
+                    summary = summary.merge(SpaceSaving.from_dict(peer['summary']))
+                except (KeyError, ValueError) as e:
+                    logger.warning(f"⚠️  Skipping trending sketch {key}: {e}")
+
+        self._merged[name] = (now, sketch, summary)
+        return sketch, summary
+
+    def top(self, n, accept=None, window_seconds=None, partition=None):
+        """
+        Heaviest articles in the window covering window_seconds
+
+        Args:
+            n: Number of articles to return
+            accept: Optional predicate on article id; rejected articles are skipped
+            window_seconds: Time window wanted (the smallest tracked window covering it is used)
+            partition: Unused; accept() must check partition membership
+
+        Returns:
+            List of (article_id, estimated activity weight), best first
+        """
+        if n <= 0:
+            return []
+        sketch, summary = self.merged_summary(self.window_for(window_seconds))
+        # Both estimates only overcount, so the smaller one is the tighter
+        ranked = sorted(
+            ((key, min(count, sketch.estimate(key))) for key, count, _ in summary.top()),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        results = []
+        for article_id, estimate in ranked:
+            if accept is None or accept(article_id):
+                results.append((article_id, estimate))
+                if len(results) >= n:
+                    break
+        return results
+
+    def stats(self):
+        return {'events': self.events, 'windows': list(self.windows)}
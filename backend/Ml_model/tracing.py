@@ -0,0 +1,213 @@
+"""
+Request Tracing
+Lightweight spans for a per-stage timing breakdown of one request.
+
+A Trace is bound to the current context (contextvars), so code anywhere below
+the request handler - RecommendationService included - can open spans with
+tracing.span('name') without being handed the trace. Outside a trace span()
+is a no-op costing one context variable lookup.
+
+Requests slower than SLOW_REQUEST_MS are appended to a JSONL slow-log with
+their full span list.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Requests at or above this total duration go to the slow-log (0 disables it)
+SLOW_REQUEST_MS = float(os.getenv('ML_SLOW_REQUEST_MS', 500))
+SLOW_LOG_PATH = Path(os.getenv('ML_SLOW_LOG_PATH', BASE_DIR / 'data' / 'slow_requests.jsonl'))
+
+# Opt-in for returning the breakdown to the client
+DEBUG_HEADER = 'X-Debug-Timing'
+DEBUG_PARAM = 'debug_timing'
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_depth = contextvars.ContextVar('current_span_depth', default=0)
+
+
+def debug_requested(header_value, param_value):
+    """Whether the request header or query param asks for the timing breakdown"""
+    for value in (header_value, param_value):
+        if value is not None and str(value).lower() in ('1', 'true', 'yes', 'on'):
+            return True
+    return False
+
+
+class Trace:
+    def __init__(self, name, clock=time.perf_counter):
+        """
+        Args:
+            name: What is being traced (usually the route)
+            clock: Monotonic clock in seconds (injectable for tests)
+        """
+        self.name = name
+        self.clock = clock
+        self.started = clock()
+        self.finished = None
+        self.spans = []
+        self.tags = {}
+
+    def record(self, name, start, end, depth):
+        # list.append is atomic, so spans from scoring threads can land here too
+        self.spans.append((name, start - self.started, end - start, depth))
+
+    def finish(self):
+        if self.finished is None:
+            self.finished = self.clock()
+        return self.total_ms()
+
+    def total_ms(self):
+        end = self.finished if self.finished is not None else self.clock()
+        return (end - self.started) * 1000
+
+    def stages(self):
+        """Summed duration and call count per span name, e.g. three content_similar calls"""
+        stages = {}
+        for name, _, duration, _ in self.spans:
+            stage = stages.setdefault(name, {"ms": 0.0, "count": 0})
+            stage["ms"] += duration * 1000
+            stage["count"] += 1
+        for stage in stages.values():
+            stage["ms"] = round(stage["ms"], 3)
+        return stages
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "total_ms": round(self.total_ms(), 3),
+            "stages": self.stages(),
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round(start * 1000, 3),
+                    "ms": round(duration * 1000, 3),
+                    "depth": depth,
+                }
+                for name, start, duration, depth in sorted(self.spans, key=lambda s: s[1])
+            ],
+            **self.tags,
+        }
+
+    def server_timing(self):
+        """Server-Timing header value (browser devtools show it next to the request)"""
+        return ', '.join(
+            f'{name};dur={stage["ms"]};desc="x{stage["count"]}"'
+            for name, stage in self.stages().items()
+        )
+
+
+def start_trace(name):
+    """
+    Create a Trace and make it current for this context
+
+    Returns:
+        (trace, token) - pass the token to end_trace()
+    """
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def tag(**fields):
+    """Attach request details (method, user_id, ...) to the current trace"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.tags.update(fields)
+
+
+@contextmanager
+def _span(trace, name):
+    depth = _current_depth.get()
+    depth_token = _current_depth.set(depth + 1)
+    start = trace.clock()
+    try:
+        yield
+    finally:
+        trace.record(name, start, trace.clock(), depth)
+        _current_depth.reset(depth_token)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name):
+    """Context manager timing one stage of the current trace (no-op without a trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _span(trace, name)
+
+
+class SlowLog:
+    def __init__(self, path=None, threshold_ms=None):
+        """
+        Args:
+            path: JSONL file slow requests are appended to
+            threshold_ms: Minimum total duration to log (0 disables the log)
+        """
+        self.path = Path(path or SLOW_LOG_PATH)
+        self.threshold_ms = SLOW_REQUEST_MS if threshold_ms is None else threshold_ms
+        self._lock = threading.Lock()
+
+    def maybe_record(self, trace):
+        """
+        Append the trace if it exceeded the threshold
+
+        Returns:
+            True if the trace was logged
+        """
+        if self.threshold_ms <= 0:
+            return False
+        total_ms = trace.finish()
+        if total_ms < self.threshold_ms:
+            return False
+
+        entry = {"ts": datetime.now(timezone.utc).isoformat(), "pid": os.getpid(), **trace.to_dict()}
+        line = json.dumps(entry, default=str) + '\n'
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning(f"Could not write slow-log: {e}")
+            return False
+        logger.warning(f"🐢 Slow request {trace.name}: {total_ms:.1f}ms")
+        return True
+
+
+_slow_log = None
+
+
+def get_slow_log():
+    """Get or create the process-wide slow-log"""
+    global _slow_log
+    if _slow_log is None:
+        _slow_log = SlowLog()
+    return _slow_log
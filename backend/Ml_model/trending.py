@@ -0,0 +1,433 @@
+"""
+Activity-based Trending
+Per-article trending scores fed by /api/track events. Each event adds its
+activity weight (see user_profiles.ACTIVITY_WEIGHTS) with forward decay, so a
+score is an exponentially time-decayed count that is updated in O(log n) and
+never has to be recomputed as time passes.
+
+Since forward decay scales every stored weight by the same factor at read time,
+ranking by stored weight is ranking by decayed score. Top-N queries read a lazy
+max-heap of (weight, article) entries: an update pushes a new entry and
+superseded ones are skipped (and compacted away) when they surface.
+
+Articles can belong to partitions (e.g. 'topic=sports', 'place=india'). Each
+partition has its own lazy heap over the shared weights, so a per-topic top-K
+costs O(K log n) like the global one.
+
+Every worker only sees the events it receives itself, so each one snapshots
+its own counts to a JSON file of its own (<snapshot>.<host>-<pid>.json)
+periodically and on exit. Snapshots from the other workers are summed in as
+peer counts on start and whenever they change, so rankings cover every
+worker and a restart does not shrink them to one worker's share. Files left
+by workers that are gone are deleted once their scores have decayed away.
+
+At event rates where per-article state is too costly, TRENDING_BACKEND=sketch
+swaps in sketches.HeavyHitterTracker (windowed Count-Min + Space-Saving).
+"""
+import atexit
+import heapq
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+import logging
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from decay import ForwardDecay
+from sketches import HeavyHitterTracker
+from user_profiles import ACTIVITY_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+TRENDING_HALF_LIFE_SECONDS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 6)) * 3600
+TRENDING_SNAPSHOT_PATH = Path(os.getenv('TRENDING_SNAPSHOT_PATH', BASE_DIR / 'data' / 'trending_snapshot.json'))
+TRENDING_SNAPSHOT_SECONDS = float(os.getenv('TRENDING_SNAPSHOT_SECONDS', 300))
+# 'decay' (TrendingEngine) or 'sketch' (bounded-memory windowed heavy hitters for high event rates)
+TRENDING_BACKEND = os.getenv('TRENDING_BACKEND', 'decay').lower()
+# Articles decayed below this score are dropped on rebase/snapshot
+MIN_TRENDING_SCORE = 0.01
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class TrendingEngine:
+    def __init__(self, half_life_seconds=None, snapshot_path=None, snapshot_seconds=None, clock=time.time,
+                 worker_id=None):
+        """
+        Args:
+            half_life_seconds: Time after which an event counts half as much
+            snapshot_path: Base path of the per-worker JSON snapshots (None disables snapshots)
+            snapshot_seconds: Minimum time between periodic snapshots / peer reloads
+            clock: Wall-clock time source in epoch seconds (overridable in tests)
+            worker_id: Name of this worker's snapshot file (defaults to <host>-<pid>)
+        """
+        self.decay = ForwardDecay(half_life_seconds or TRENDING_HALF_LIFE_SECONDS)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.snapshot_seconds = TRENDING_SNAPSHOT_SECONDS if snapshot_seconds is None else snapshot_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._clock = clock
+
+        self.landmark = clock()
+        # article id -> stored (undecayed) weight of the events this worker recorded
+        self._own = {}
+        # article id -> stored weight summed over the other workers' snapshots
+        self._peers = {}
+        # article id -> own + peer weight, what rankings use
+        self._weights = {}
+        # Partition key (None = global) -> lazy max-heap of (-weight, article id);
+        # entries whose weight is stale are skipped
+        self._heaps = {None: []}
+        # article id -> partition keys it is listed under
+        self._partitions = {}
+        self._lock = threading.Lock()
+
+        self.events = 0
+        self._last_snapshot = clock()
+        self._last_peer_check = clock()
+        # Peer snapshot path -> mtime it was loaded at
+        self._peer_mtimes = {}
+        self._own_loaded = False
+        self._snapshotting = False
+
+    def __len__(self):
+        return len(self._weights)
+
+    @property
+    def worker_path(self):
+        """Snapshot file holding only this worker's events"""
+        if self.snapshot_path is None:
+            return None
+        path = self.snapshot_path
+        return path.with_name(f"{path.stem}.{self.worker_id}{path.suffix}")
+
+    def _snapshot_files(self):
+        path = self.snapshot_path
+        if path is None or not path.parent.exists():
+            return []
+        return sorted(path.parent.glob(f"{path.stem}.*{path.suffix}"))
+
+    def record(self, article_id, activity_type='view', timestamp=None, partitions=()):
+        """
+        Add one tracked activity to an article's score
+
+        Args:
+            article_id: Article the activity was on
+            activity_type: Key of ACTIVITY_WEIGHTS
+            timestamp: Event time in epoch seconds (defaults to now)
+            partitions: Partition keys the article is listed under besides the global list
+
+        Returns:
+            True if the activity counted (known activity type)
+        """
+        weight = ACTIVITY_WEIGHTS.get(activity_type)
+        if weight is None or not article_id:
+            return False
+        now = self._clock() if timestamp is None else timestamp
+        article_id = str(article_id)
+
+        with self._lock:
+            if self.decay.needs_rebase(now, self.landmark):
+                self._rebase(now)
+            increment = weight * self.decay.weight(now, self.landmark)
+            self._own[article_id] = self._own.get(article_id, 0.0) + increment
+            stored = self._weights.get(article_id, 0.0) + increment
+            self._weights[article_id] = stored
+            if partitions:
+                self._partitions[article_id] = tuple(partitions)
+            entry = (-stored, article_id)
+            for key in (None,) + self._partitions.get(article_id, ()):
+                heapq.heappush(self._heaps.setdefault(key, []), entry)
+            if len(self._heaps[None]) > 2 * len(self._weights) + 64:
+                self._rebuild_heap()
+            self.events += 1
+
+        if self.snapshot_path is not None and now - self._last_snapshot >= self.snapshot_seconds:
+            self._snapshot_in_background()
+        return True
+
+    def score(self, article_id, now=None):
+        """Decayed score of one article at now, over every worker (0 when never tracked)"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            return self._weights.get(str(article_id), 0.0) * self.decay.scale(now, self.landmark)
+
+    def top(self, n, accept=None, window_seconds=None, partition=None):
+        """
+        Highest-scoring articles
+
+        Args:
+            n: Number of articles to return
+            accept: Optional predicate on article id; rejected articles are skipped
+            window_seconds: Unused; decay already favours recent activity (see sketches.HeavyHitterTracker)
+            partition: Partition key to rank within (None for all articles)
+
+        Returns:
+            List of (article_id, decayed score), best first
+        """
+        if n <= 0:
+            return []
+        self._maybe_follow_snapshot()
+        now = self._clock()
+        with self._lock:
+            scale = self.decay.scale(now, self.landmark)
+            heap = self._heaps.get(partition, [])
+            popped = []
+            results = []
+            while heap and len(results) < n:
+                neg_weight, article_id = heapq.heappop(heap)
+                if self._weights.get(article_id) != -neg_weight:
+                    continue  # superseded by a later update
+                popped.append((neg_weight, article_id))
+                if accept is None or accept(article_id):
+                    results.append((article_id, -neg_weight * scale))
+            for entry in popped:
+                heapq.heappush(heap, entry)
+            return results
+
+    def _rebuild_heap(self):
+        heaps = {None: []}
+        for article_id, w in self._weights.items():
+            entry = (-w, article_id)
+            for key in (None,) + self._partitions.get(article_id, ()):
+                heaps.setdefault(key, []).append(entry)
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        self._heaps = heaps
+
+    def _combine(self):
+        """Recompute ranking weights from own + peer weights"""
+        weights = dict(self._peers)
+        for article_id, w in self._own.items():
+            weights[article_id] = weights.get(article_id, 0.0) + w
+        self._weights = weights
+        self._partitions = {
+            article_id: keys for article_id, keys in self._partitions.items() if article_id in weights
+        }
+        self._rebuild_heap()
+
+    def _rebase(self, now):
+        """Move stored weights onto landmark=now, dropping articles that decayed away"""
+        scale = self.decay.scale(now, self.landmark)
+
+        def rescaled(weights):
+            return {
+                article_id: w * scale
+                for article_id, w in weights.items()
+                if w * scale >= MIN_TRENDING_SCORE
+            }
+        self._own = rescaled(self._own)
+        self._peers = rescaled(self._peers)
+        self.landmark = now
+        self._combine()
+
+    def to_dict(self, now=None):
+        """This worker's decayed scores at now, landmarked at now"""
+        now = self._clock() if now is None else now
+        with self._lock:
+            scale = self.decay.scale(now, self.landmark)
+            scores = {
+                article_id: w * scale
+                for article_id, w in self._own.items()
+                if w * scale >= MIN_TRENDING_SCORE
+            }
+            partitions = {
+                article_id: list(keys) for article_id, keys in self._partitions.items() if article_id in scores
+            }
+        return {
+            'version': SNAPSHOT_FORMAT_VERSION,
+            'saved_at': now,
+            'half_life_seconds': self.decay.half_life_seconds,
+            'scores': scores,
+            'partitions': partitions,
+        }
+
+    def snapshot(self):
+        """Write this worker's scores to its own snapshot file atomically; returns True on success"""
+        if self.snapshot_path is None:
+            return False
+        try:
+            data = self.to_dict()
+            path = self.worker_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+            self._last_snapshot = data['saved_at']
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️  Could not write trending snapshot: {e}")
+            return False
+
+    def _snapshot_in_background(self):
+        with self._lock:
+            if self._snapshotting:
+                return
+            self._snapshotting = True
+            self._last_snapshot = self._clock()
+
+        def run():
+            try:
+                self.snapshot()
+            finally:
+                self._snapshotting = False
+
+        threading.Thread(target=run, name='trending-snapshot', daemon=True).start()
+
+    def _read_snapshot(self, path, now):
+        """
+        Scores and partitions of one snapshot file, rescaled to the current landmark
+
+        Returns:
+            (scores, partitions), or None if unreadable, of another format or fully decayed
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load trending snapshot {path.name}: {e}")
+            return None
+        if data.get('version') != SNAPSHOT_FORMAT_VERSION:
+            logger.warning(f"⚠️  Ignoring trending snapshot with version {data.get('version')}")
+            return None
+        saved_at = float(data['saved_at'])
+        scores = data.get('scores', {})
+        if not scores or max(scores.values()) * self.decay.scale(now, saved_at) < MIN_TRENDING_SCORE:
+            # Left behind by a worker that is gone and has decayed away
+            if path != self.worker_path:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            return None
+        # Scores were decayed to saved_at; express them against our landmark
+        factor = self.decay.weight(saved_at, self.landmark)
+        return (
+            {str(k): float(v) * factor for k, v in scores.items()},
+            {str(k): tuple(v) for k, v in data.get('partitions', {}).items()},
+        )
+
+    def load_snapshot(self):
+        """
+        Merge every worker's snapshot: this worker's own file (first load only)
+        becomes its own counts, the others are summed as peer counts
+
+        Returns:
+            True if any snapshot was loaded
+        """
+        files = self._snapshot_files()
+        if not files:
+            return False
+        now = self._clock()
+        with self._lock:
+            if self.decay.needs_rebase(now, self.landmark):
+                self._rebase(now)
+
+        own = None
+        peers = {}
+        partitions = {}
+        mtimes = {}
+        for path in files:
+            is_own = path == self.worker_path
+            if is_own and self._own_loaded:
+                continue
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                continue
+            loaded = self._read_snapshot(path, now)
+            if not is_own:
+                mtimes[path] = mtime
+            if loaded is None:
+                continue
+            scores, file_partitions = loaded
+            partitions.update(file_partitions)
+            if is_own:
+                own = scores
+            else:
+                for article_id, w in scores.items():
+                    peers[article_id] = peers.get(article_id, 0.0) + w
+
+        with self._lock:
+            if own is not None:
+                # Pick up where this worker slot left off (e.g. same pid after a restart)
+                for article_id, w in own.items():
+                    self._own[article_id] = self._own.get(article_id, 0.0) + w
+            self._own_loaded = True
+            self._peers = peers
+            self._peer_mtimes = mtimes
+            self._partitions.update(partitions)
+            self._combine()
+        loaded = own is not None or bool(peers)
+        if loaded:
+            logger.info(f"📈 Loaded trending snapshots ({len(mtimes) + (own is not None)} workers, "
+                        f"{len(self._weights)} articles)")
+        return loaded
+
+    def _maybe_follow_snapshot(self):
+        """Reload the other workers' snapshots when any of them changed"""
+        if self.snapshot_path is None:
+            return
+        now = self._clock()
+        if now - self._last_peer_check < self.snapshot_seconds:
+            return
+        self._last_peer_check = now
+        current = {}
+        for path in self._snapshot_files():
+            if path == self.worker_path:
+                continue
+            try:
+                current[path] = path.stat().st_mtime
+            except OSError:
+                pass
+        if current != self._peer_mtimes:
+            self.load_snapshot()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'articles': len(self._weights),
+                'heap_entries': len(self._heaps[None]),
+                'partitions': len(self._heaps) - 1,
+                'events': self.events,
+                'peer_snapshots': len(self._peer_mtimes),
+            }
+
+
+_trending_engine = None
+
+
+def _snapshot_on_exit(engine):
+    # Only workers that folded in events have anything new to save
+    if engine.events:
+        engine.snapshot()
+
+
+def _publish_on_exit(tracker):
+    if tracker.events:
+        tracker.publish()
+
+
+def get_trending_engine(cache=None):
+    """
+    Get or create the per-process trending engine for TRENDING_BACKEND
+    
+    Args:
+        cache: CacheManager the sketch backend publishes through (ignored by the decay backend)
+    """
+    global _trending_engine
+    if _trending_engine is None and TRENDING_BACKEND == 'sketch':
+        _trending_engine = HeavyHitterTracker(cache=cache)
+        atexit.register(_publish_on_exit, _trending_engine)
+    elif _trending_engine is None:
+        _trending_engine = TrendingEngine(snapshot_path=TRENDING_SNAPSHOT_PATH)
+        _trending_engine.load_snapshot()
+        atexit.register(_snapshot_on_exit, _trending_engine)
+    return _trending_engine
@@ -0,0 +1,260 @@
+"""
+Real-time Short-term User Profiles
+Folds /api/track events into per-user interest vectors over the collaborative
+model's feature vocabulary (the mlb_encoder topic/place/actor classes). Weights
+use forward decay, so an update only touches the few features of the article
+read, and collaborative/hybrid scoring can blend in what a user read minutes ago
+instead of waiting for the next retrain.
+
+With a cache manager attached, profiles live in Redis as one hash per user
+(profile:u=<user_id>: landmark, version and a w:<feature> weight per feature).
+Every worker applies events with atomic HINCRBYFLOAT/HINCRBY, and reuses its
+in-process copy only while that copy is at the version Redis has. Without
+Redis, profiles live in the in-process LRU only.
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+import logging
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from decay import ForwardDecay
+
+logger = logging.getLogger(__name__)
+
+# Relative strength of each tracked activity
+ACTIVITY_WEIGHTS = {
+    'view': 1.0,
+    'read': 1.5,
+    'like': 3.0,
+    'bookmark': 3.0,
+    'share': 4.0,
+}
+PROFILE_HALF_LIFE_SECONDS = float(os.getenv('REALTIME_PROFILE_HALF_LIFE_HOURS', 6)) * 3600
+PROFILE_MAX_USERS = int(os.getenv('REALTIME_PROFILE_MAX_USERS', 100000))
+# Profiles decayed below this total weight are treated as empty
+MIN_PROFILE_WEIGHT = 0.05
+# Hash field prefix of a feature weight in Redis
+WEIGHT_FIELD_PREFIX = 'w:'
+
+
+def profile_cache_key(user_id):
+    return f"profile:u={user_id}"
+
+
+class ShortTermProfile:
+    """Forward-decayed feature weights for one user"""
+    __slots__ = ('landmark', 'weights', 'version')
+
+    def __init__(self, landmark, weights=None, version=0):
+        self.landmark = landmark
+        # feature name -> stored (undecayed) weight
+        self.weights = weights or {}
+        self.version = version
+
+    def to_hash(self):
+        fields = {WEIGHT_FIELD_PREFIX + f: repr(w) for f, w in self.weights.items()}
+        return {**fields, 'landmark': repr(self.landmark), 'version': self.version}
+
+    @classmethod
+    def from_hash(cls, fields):
+        """Profile from its Redis hash, or None when the hash is missing"""
+        if not fields or 'landmark' not in fields:
+            return None
+        weights = {
+            name[len(WEIGHT_FIELD_PREFIX):]: float(value)
+            for name, value in fields.items() if name.startswith(WEIGHT_FIELD_PREFIX)
+        }
+        return cls(float(fields['landmark']), weights, int(fields.get('version', 0)))
+
+
+class ShortTermProfileStore:
+    def __init__(self, article_features, half_life_seconds=None, cache=None,
+                 max_users=None, clock=time.time):
+        """
+        Args:
+            article_features: DataFrame of article_id x feature (mlb_encoder classes)
+            half_life_seconds: Half-life of a tracked event's influence
+            cache: CacheManager holding the profiles shared by every worker (optional)
+            max_users: Profiles kept in memory before least-recently-used ones are dropped
+            clock: Wall-clock time source in epoch seconds (overridable in tests)
+        """
+        self.vocabulary = list(article_features.columns)
+        self._feature_index = {feature: i for i, feature in enumerate(self.vocabulary)}
+        # article_id -> feature names it carries; precomputed so updates skip the matrix
+        values = article_features.to_numpy()
+        self._article_features = {
+            article_id: [self.vocabulary[i] for i in np.flatnonzero(row)]
+            for article_id, row in zip(article_features.index, values)
+        }
+        self.decay = ForwardDecay(half_life_seconds or PROFILE_HALF_LIFE_SECONDS)
+        self.cache = cache
+        self.max_users = max_users or PROFILE_MAX_USERS
+        self._clock = clock
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ttl_seconds(self):
+        # After ~8 half-lives a profile has decayed below 0.5% of its weight
+        return int(self.decay.half_life_seconds * 8)
+
+    def _shared(self):
+        """Whether profiles live in Redis (the source of truth shared by every worker)"""
+        return self.cache is not None and getattr(self.cache, 'enabled', False)
+
+    def _get(self, user_id):
+        if not self._shared():
+            with self._lock:
+                profile = self._profiles.get(user_id)
+                if profile is not None:
+                    self._profiles.move_to_end(user_id)
+                return profile
+
+        # The local copy is only reused while it is at the version Redis has
+        key = profile_cache_key(user_id)
+        version = self.cache.hash_get(key, 'version')
+        if version is None:
+            with self._lock:
+                self._profiles.pop(user_id, None)
+            return None
+        with self._lock:
+            profile = self._profiles.get(user_id)
+        if profile is not None and profile.version == int(version):
+            return profile
+
+        profile = ShortTermProfile.from_hash(self.cache.hash_get_all(key))
+        if profile is None:
+            return None
+        self._remember(user_id, profile)
+        return profile
+
+    def _remember(self, user_id, profile):
+        with self._lock:
+            self._profiles[user_id] = profile
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_users:
+                self._profiles.popitem(last=False)
+
+    def update(self, user_id, article_id, activity_type='view', timestamp=None):
+        """
+        Fold one tracked event into the user's profile
+
+        Returns:
+            True if the profile changed (the article has known features)
+        """
+        features = self._article_features.get(article_id)
+        if not user_id or not features:
+            return False
+
+        now = self._clock() if timestamp is None else timestamp
+        weight = ACTIVITY_WEIGHTS.get(activity_type, 1.0)
+        if self._shared():
+            return self._update_shared(user_id, features, weight, now)
+
+        profile = self._get(user_id)
+        if profile is None:
+            profile = ShortTermProfile(landmark=now)
+
+        with self._lock:
+            if self.decay.needs_rebase(now, profile.landmark):
+                # Move the landmark forward; O(features) but only every ~200 half-lives
+                factor = self.decay.scale(now, profile.landmark)
+                profile.weights = {
+                    f: w * factor for f, w in profile.weights.items() if w * factor > 1e-9
+                }
+                profile.landmark = now
+
+            increment = weight * self.decay.weight(now, profile.landmark)
+            for feature in features:
+                profile.weights[feature] = profile.weights.get(feature, 0.0) + increment
+            profile.version += 1
+
+        self._remember(user_id, profile)
+        return True
+
+    def _update_shared(self, user_id, features, weight, now):
+        """
+        Apply an event to the Redis hash with atomic increments
+
+        Workers only ever add to the stored weights, relative to a landmark
+        fixed when the profile is created, so concurrent updates never
+        overwrite each other.
+        """
+        key = profile_cache_key(user_id)
+        ttl = self._ttl_seconds()
+        landmark = self.cache.hash_get(key, 'landmark')
+        if landmark is None:
+            self.cache.hash_update(key, set_if_missing={'landmark': now}, ttl_seconds=ttl)
+            landmark = self.cache.hash_get(key, 'landmark')
+            if landmark is None:
+                return False
+        landmark = float(landmark)
+
+        if self.decay.needs_rebase(now, landmark):
+            # Rare (~every 200 half-lives of continuous activity); events racing
+            # with the rewrite may be lost, which only matters for this one update
+            profile = ShortTermProfile.from_hash(self.cache.hash_get_all(key))
+            if profile is not None:
+                factor = self.decay.scale(now, profile.landmark)
+                profile.weights = {
+                    f: w * factor for f, w in profile.weights.items() if w * factor > 1e-9
+                }
+                profile.landmark = now
+                self.cache.hash_replace(key, profile.to_hash(), ttl_seconds=ttl)
+            landmark = now
+
+        increment = weight * self.decay.weight(now, landmark)
+        results = self.cache.hash_update(
+            key,
+            increments={WEIGHT_FIELD_PREFIX + f: increment for f in features},
+            counters={'version': 1},
+            ttl_seconds=ttl,
+        )
+        return results is not None
+
+    def has_profile(self, user_id):
+        if self._shared():
+            # One HGET instead of the whole hash; Redis expires the hash once
+            # the profile has decayed away (see _ttl_seconds)
+            return self.version(user_id) is not None
+        return self.get_vector(user_id) is not None
+
+    def version(self, user_id):
+        """Update counter for the user's profile (None without a profile)"""
+        if self._shared():
+            version = self.cache.hash_get(profile_cache_key(user_id), 'version')
+            return int(version) if version is not None else None
+        profile = self._get(user_id)
+        return profile.version if profile is not None else None
+
+    def get_vector(self, user_id, now=None):
+        """
+        Decayed, L2-normalized interest vector aligned with the feature vocabulary
+
+        Returns:
+            numpy array, or None if the user has no (or only a fully decayed) profile
+        """
+        profile = self._get(user_id)
+        if profile is None:
+            return None
+
+        now = self._clock() if now is None else now
+        scale = self.decay.scale(now, profile.landmark)
+        vector = np.zeros(len(self.vocabulary))
+        with self._lock:
+            weights = list(profile.weights.items())
+        for feature, weight in weights:
+            i = self._feature_index.get(feature)
+            if i is not None:
+                vector[i] = weight * scale
+
+        if vector.sum() < MIN_PROFILE_WEIGHT:
+            return None
+        return vector / np.linalg.norm(vector)
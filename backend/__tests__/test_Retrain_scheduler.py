@@ -247,3 +247,70 @@ def test_main_monthly(monkeypatch):
     rs.main()
 
     mock_sched.run_monthly.assert_called_once_with(day=10, hour=3, minute=20)
+
+
+# TC4 – Cache warming after successful retrain
+def test_retrain_models_warms_cache(monkeypatch):
+    """TC4: Successful retrain should warm caches with the trainer's data."""
+    mock_trainer = MagicMock()
+    mock_trainer.train_all.return_value = True
+    mock_warmer = MagicMock()
+    mock_warmer.warm.return_value = {"keys_warmed": 3}
+
+    monkeypatch.setattr(rs, "ModelTrainer", lambda: mock_trainer)
+    monkeypatch.setattr(rs, "get_cache_manager", lambda: MagicMock())
+    monkeypatch.setattr(rs, "CacheWarmer", lambda cache: mock_warmer)
+    monkeypatch.delenv("CACHE_WARM_ON_RETRAIN", raising=False)
+
+    scheduler = rs.RetrainingScheduler()
+    scheduler.retrain_models()
+
+    mock_warmer.warm.assert_called_once_with(
+        user_activities=mock_trainer.user_activities,
+        articles=mock_trainer.articles,
+    )
+
+
+# TC4 – Cache warming failure must not break retraining
+def test_warm_caches_failure(monkeypatch, caplog):
+    """TC4 (edge case): Warming errors are logged and swallowed."""
+    mock_warmer = MagicMock()
+    mock_warmer.warm.side_effect = Exception("redis down")
+
+    monkeypatch.setattr(rs, "CacheWarmer", lambda cache: mock_warmer)
+
+    scheduler = rs.RetrainingScheduler()
+    with caplog.at_level(rs.logging.WARNING):
+        assert scheduler.warm_caches() is None
+
+    assert "cache warming failed" in caplog.text.lower()
+
+
+# TC5 – Tracked activity is bulk loaded before training
+def test_retrain_loads_activity_first(monkeypatch):
+    """TC5: The activity bulk load runs before train_all."""
+    calls = []
+    mock_trainer = MagicMock()
+    mock_trainer.train_all.side_effect = lambda: calls.append("train") or False
+    mock_loader = MagicMock()
+    mock_loader.run.side_effect = lambda: calls.append("load") or {}
+
+    monkeypatch.setattr(rs, "ModelTrainer", lambda: mock_trainer)
+    monkeypatch.setattr(rs, "get_cache_manager", lambda: MagicMock())
+    monkeypatch.setattr(rs, "ActivityBulkLoader", lambda: mock_loader)
+    monkeypatch.delenv("ACTIVITY_LOAD_ON_RETRAIN", raising=False)
+
+    rs.RetrainingScheduler().retrain_models()
+    assert calls == ["load", "train"]
+
+
+# TC6 – Bulk load failure must not block retraining
+def test_load_activity_failure(monkeypatch, caplog):
+    """TC6 (edge case): Database errors are logged and swallowed."""
+    monkeypatch.setattr(rs, "ActivityBulkLoader", MagicMock(side_effect=Exception("db down")))
+
+    scheduler = rs.RetrainingScheduler()
+    with caplog.at_level(rs.logging.WARNING):
+        assert scheduler.load_activity() is None
+
+    assert "activity bulk load failed" in caplog.text.lower()
@@ -0,0 +1,99 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model.activity_compaction import (
+    ACTIVITY_DTYPE,
+    closed_segments,
+    compact_closed_segments,
+    compact_segment,
+    load_compacted_activities,
+    load_compacted_segment,
+)
+from backend.Ml_model.activity_log import segment_name
+from backend.Ml_model.Train_modules import ModelTrainer
+
+EVENTS = [
+    {"user_id": "u1", "article_id": "a1", "activity_type": "view",
+     "timestamp": "2025-01-01T10:00:00", "duration_seconds": 30, "scroll_percentage": 80},
+    {"user_id": "u2", "article_id": "a1", "activity_type": "like",
+     "timestamp": "2025-01-01T10:05:00", "duration_seconds": 12},
+    {"article_id": "a2", "activity_type": "view", "timestamp": "2025-01-01T10:06:00"},
+    {"user_id": "u1", "article_id": "a2", "activity_type": "view",
+     "timestamp": "2025-01-01T10:07:00", "duration_seconds": 2},
+]
+
+
+def write_segment(log_dir, window, events, pid=1):
+    path = log_dir / segment_name(window, "host", pid)
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+        f.write("not json\n")
+    return path
+
+
+# SUMMARY: A segment compacts to a structured .npy plus interned id tables.
+def test_compact_segment(tmp_path):
+    path = write_segment(tmp_path, 0, EVENTS)
+    assert compact_segment(path) == 4
+
+    table, ids = load_compacted_segment(path.with_suffix(".npy"))
+    assert table.dtype == ACTIVITY_DTYPE
+    assert isinstance(table, np.memmap)
+    assert ids["user_ids"] == ["u1", "u2"]
+    assert ids["article_ids"] == ["a1", "a2"]
+    assert ids["activity_types"] == ["view", "like"]
+    assert table["article"].tolist() == [0, 0, 1, 1]
+    assert table["timestamp"][0] == 1735725600000
+
+
+# SUMMARY: Only segments whose window (plus grace) has ended are compacted and removed.
+def test_compact_closed_segments_skips_open_window(tmp_path):
+    old = write_segment(tmp_path, 0, EVENTS)
+    current = write_segment(tmp_path, 7200, EVENTS, pid=2)
+
+    assert closed_segments(tmp_path, now=7300, segment_seconds=3600) == [old]
+    report = compact_closed_segments(tmp_path, now=7300, segment_seconds=3600)
+
+    assert report == {"segments_compacted": 1, "events_compacted": 4, "errors": 0}
+    assert not old.exists()
+    assert current.exists()
+
+
+# SUMMARY: Compacted segments decode back to an activity DataFrame.
+def test_load_compacted_activities(tmp_path):
+    compact_segment(write_segment(tmp_path, 0, EVENTS))
+    compact_segment(write_segment(tmp_path, 3600, EVENTS[:1], pid=2))
+
+    df = load_compacted_activities(tmp_path)
+    assert len(df) == 5
+    assert df["user_id"].tolist()[:2] == ["u1", "u2"]
+    assert pd.isna(df["user_id"][2])
+    assert df["activity_type"].tolist()[1] == "like"
+    assert np.isnan(df["duration_seconds"][2])
+
+
+# EDGE CASE: No compacted segments gives an empty frame with the expected columns.
+def test_load_compacted_activities_empty(tmp_path):
+    df = load_compacted_activities(tmp_path)
+    assert len(df) == 0
+    assert "article_id" in df.columns
+
+
+# SUMMARY: ModelTrainer merges logged reads (known users/articles, > 5s) into user_activities.
+# EDGE CASE: Events without a duration are dropped, as by the DB query's duration_seconds > 5.
+def test_trainer_load_activity_log(tmp_path):
+    no_duration = {"user_id": "u3", "article_id": "a1", "activity_type": "view", "timestamp": "2025-01-01T10:08:00"}
+    write_segment(tmp_path, 0, EVENTS + [no_duration])
+    trainer = ModelTrainer()
+    trainer.articles = pd.DataFrame({"id": ["a1", "a2"], "topic": ["sports", "tech"],
+                                     "place": ["india", "usa"], "actors": ["", ""]})
+    trainer.user_activities = pd.DataFrame({"user_id": ["u9"], "article_id": ["a2"]})
+
+    assert trainer.load_activity_log(tmp_path) == 2
+    logged = trainer.user_activities.iloc[1:]
+    assert logged["user_id"].tolist() == ["u2", "u1"]
+    assert logged["topic"].tolist() == ["sports", "sports"]
@@ -0,0 +1,136 @@
+import csv
+import json
+import uuid
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from backend.Ml_model.activity_compaction import (
+    compact_segment,
+    is_segment_loaded,
+    load_compacted_activities,
+    load_compacted_segment,
+)
+from backend.Ml_model.activity_loader import (
+    COPY_STAGING_SQL,
+    INSERT_FROM_STAGING_SQL,
+    ActivityBulkLoader,
+    prepare_rows,
+    rows_to_csv,
+)
+from backend.Ml_model.activity_log import segment_name
+
+USER = str(uuid.UUID(int=1))
+ARTICLE = str(uuid.UUID(int=2))
+
+
+def write_compacted(log_dir, window, events, pid=1):
+    path = log_dir / segment_name(window, "host", pid)
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+    compact_segment(path)
+    path.unlink()
+    return path.with_suffix(".npy")
+
+
+EVENTS = [
+    {"user_id": USER, "article_id": ARTICLE, "activity_type": "view",
+     "timestamp": "2025-01-01T10:00:00", "duration_seconds": 30.4},
+    # Client retry of the same event
+    {"user_id": USER, "article_id": ARTICLE, "activity_type": "view",
+     "timestamp": "2025-01-01T10:00:00", "duration_seconds": 30.4},
+    {"user_id": USER, "article_id": ARTICLE, "activity_type": "like",
+     "timestamp": "2025-01-01T10:01:00", "scroll_percentage": 55},
+    # Not loadable: anonymous, non-UUID article
+    {"article_id": ARTICLE, "activity_type": "view", "timestamp": "2025-01-01T10:02:00"},
+    {"user_id": USER, "article_id": "legacy-id", "activity_type": "view",
+     "timestamp": "2025-01-01T10:03:00"},
+]
+
+
+class FakeConnection:
+    """psycopg2-style connection recording executed SQL and COPY payloads"""
+    def __init__(self, loaded=()):
+        self.cursor_mock = MagicMock()
+        self.cursor_mock.__enter__.return_value = self.cursor_mock
+        self.cursor_mock.fetchall.return_value = [(name,) for name in loaded]
+        self.cursor_mock.rowcount = 2
+        self.copied = []
+        self.cursor_mock.copy_expert.side_effect = lambda sql, buf: self.copied.append(buf.getvalue())
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_mock
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def executed(self):
+        return [c.args[0] for c in self.cursor_mock.execute.call_args_list]
+
+
+# SUMMARY: Rows are decoded, filtered to UUID ids and de-duplicated before staging.
+def test_prepare_rows(tmp_path):
+    table, ids = load_compacted_segment(write_compacted(tmp_path, 0, EVENTS))
+    rows = prepare_rows(table, ids)
+
+    assert rows == [
+        (USER, ARTICLE, "view", 30, "", "2025-01-01T10:00:00+00:00"),
+        (USER, ARTICLE, "like", "", 55.0, "2025-01-01T10:01:00+00:00"),
+    ]
+
+
+# SUMMARY: COPY payload is CSV with empty fields for NULLs.
+def test_rows_to_csv_roundtrip():
+    rows = [(USER, ARTICLE, "view", 30, "", "2025-01-01T10:00:00+00:00")]
+    parsed = list(csv.reader(rows_to_csv(rows)))
+    assert parsed == [[USER, ARTICLE, "view", "30", "", "2025-01-01T10:00:00+00:00"]]
+
+
+# SUMMARY: Each new segment is COPYed, merged and checkpointed in one commit.
+def test_run_loads_and_checkpoints(tmp_path):
+    npy = write_compacted(tmp_path, 0, EVENTS)
+    conn = FakeConnection()
+
+    report = ActivityBulkLoader(connect=lambda: conn, log_dir=tmp_path, batch_rows=1).run()
+
+    assert report["segments_loaded"] == 1
+    assert report["rows_staged"] == 2
+    assert report["rows_inserted"] == 2
+    # batch_rows=1 -> one COPY per row
+    assert len(conn.copied) == 2
+    assert conn.cursor_mock.copy_expert.call_args.args[0] == COPY_STAGING_SQL
+    assert INSERT_FROM_STAGING_SQL in conn.executed()
+    checkpoint = conn.cursor_mock.execute.call_args_list[-1].args
+    assert "activity_ingest_checkpoints" in checkpoint[0]
+    assert checkpoint[1] == (npy.name, 2)
+    assert is_segment_loaded(npy)
+
+
+# EDGE CASE: Segments already in the checkpoint table are not loaded again.
+def test_run_skips_checkpointed_segments(tmp_path):
+    npy = write_compacted(tmp_path, 0, EVENTS)
+    conn = FakeConnection(loaded=[npy.name])
+
+    report = ActivityBulkLoader(connect=lambda: conn, log_dir=tmp_path).run()
+
+    assert report["segments_loaded"] == 0
+    assert conn.copied == []
+    assert is_segment_loaded(npy)
+
+
+# EDGE CASE: The trainer skips segments that are already in Postgres.
+def test_loaded_segments_excluded_from_training(tmp_path):
+    write_compacted(tmp_path, 0, EVENTS)
+    ActivityBulkLoader(connect=FakeConnection, log_dir=tmp_path).run()
+
+    assert len(load_compacted_activities(tmp_path)) > 0
+    assert len(load_compacted_activities(tmp_path, include_loaded=False)) == 0
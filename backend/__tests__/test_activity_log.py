@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+
+import pytest
+
+from backend.Ml_model.activity_log import ActivityLogWriter, parse_segment_window
+
+
+def read_events(writer):
+    with open(writer.segment_path) as f:
+        return [json.loads(line) for line in f]
+
+
+# FIXTURE: writer with a long interval so flushes only happen when asked
+@pytest.fixture
+def writer(tmp_path):
+    w = ActivityLogWriter(log_dir=tmp_path, flush_max_events=1000, flush_interval_seconds=60)
+    yield w
+    w.close()
+
+
+# SUMMARY: Events stay buffered until flush(), then land in one per-worker segment.
+def test_flush_writes_batch(writer):
+    for i in range(5):
+        writer.append({"article_id": f"a{i}", "activity_type": "view"})
+
+    assert not writer.segment_path.exists()
+    assert writer.flush() == 5
+    assert [e["article_id"] for e in read_events(writer)] == ["a0", "a1", "a2", "a3", "a4"]
+    assert writer.stats["flushes"] == 1
+    assert str(os.getpid()) in writer.segment_path.name
+
+
+# SUMMARY: close() writes out everything still buffered and rejects later appends.
+def test_close_flushes_pending(writer):
+    writer.append({"article_id": "a1", "activity_type": "click"})
+    writer.close()
+
+    assert len(read_events(writer)) == 1
+    with pytest.raises(RuntimeError):
+        writer.append({"article_id": "a2", "activity_type": "click"})
+
+
+# SUMMARY: A full batch wakes the background flusher without waiting for the interval.
+def test_background_flush_on_batch_size(tmp_path):
+    w = ActivityLogWriter(log_dir=tmp_path, flush_max_events=10, flush_interval_seconds=60)
+    for i in range(10):
+        w.append({"article_id": f"a{i}", "activity_type": "view"})
+
+    for _ in range(200):
+        if w.stats["events_written"] == 10:
+            break
+        threading.Event().wait(0.01)
+    assert w.stats["events_written"] == 10
+    w.close()
+
+
+# EDGE CASE: Hitting the buffer cap flushes inline so memory stays bounded.
+def test_backpressure_flushes_inline(tmp_path):
+    w = ActivityLogWriter(log_dir=tmp_path, flush_max_events=1000, flush_interval_seconds=60,
+                          max_buffer_events=3)
+    for i in range(3):
+        w.append({"article_id": f"a{i}", "activity_type": "view"})
+
+    assert w.stats["events_written"] == 3
+    w.close()
+
+
+# EDGE CASE: Concurrent appends from request threads are neither lost nor interleaved.
+def test_concurrent_appends(writer):
+    def produce(t):
+        for i in range(500):
+            writer.append({"article_id": f"{t}-{i}", "activity_type": "view"})
+
+    threads = [threading.Thread(target=produce, args=(t,)) for t in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.close()
+
+    events = read_events(writer)
+    assert len(events) == 2000
+    assert len({e["article_id"] for e in events}) == 2000
+
+
+# SUMMARY: Segments roll over when the clock crosses a window boundary.
+def test_segments_rotate_by_window(tmp_path):
+    now = [7200.0]
+    w = ActivityLogWriter(log_dir=tmp_path, flush_interval_seconds=60,
+                          segment_seconds=3600, clock=lambda: now[0])
+    w.append({"article_id": "a1", "activity_type": "view"})
+    w.flush()
+    first = w.segment_path
+
+    now[0] = 10800.0
+    w.append({"article_id": "a2", "activity_type": "view"})
+    w.flush()
+    w.close()
+
+    assert w.segment_path != first
+    assert sorted(p.name for p in tmp_path.glob("*.jsonl")) == sorted([first.name, w.segment_path.name])
+    assert parse_segment_window(first) == 7200
+
+
+# EDGE CASE: A failed write keeps the batch buffered and the next flush retries it;
+# while writes keep failing only events beyond the buffer cap are dropped, oldest first.
+def test_failed_write_is_retried(tmp_path):
+    now = [1000.0]
+    blocker = tmp_path / "logs"
+    blocker.write_text("not a directory")
+    w = ActivityLogWriter(log_dir=blocker, flush_max_events=1000, flush_interval_seconds=60,
+                          max_buffer_events=5, clock=lambda: now[0])
+    for i in range(3):
+        w.append({"article_id": f"a{i}", "activity_type": "view"})
+
+    assert w.flush() == 0
+    assert w.stats["write_errors"] == 1
+    # Retries wait a flush interval instead of hammering a failing disk
+    assert w.flush() == 0
+    assert w.stats["write_errors"] == 1
+
+    for i in range(3, 6):
+        w.append({"article_id": f"a{i}", "activity_type": "view"})
+    assert w.stats["events_dropped"] == 1
+
+    blocker.unlink()
+    now[0] += 61
+    assert w.flush() == 5
+    assert [e["article_id"] for e in read_events(w)] == ["a1", "a2", "a3", "a4", "a5"]
+    assert w.stats["events_written"] == 5
+    w.close()
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from backend.Ml_model.admission import (
+    REQUEST_BUDGET_MS,
+    AdmissionController,
+    Deadline,
+    Overloaded,
+    current_deadline,
+    deadline_expired,
+    end_deadline,
+    mark_degraded,
+    parse_budget_ms,
+    start_deadline,
+)
+
+
+def hold_slot(controller, started, release):
+    controller.acquire()
+    started.set()
+    release.wait()
+    controller.release()
+
+
+# TEST CASES
+
+def test_admits_up_to_max_concurrent():
+    """SUMMARY: Requests run immediately while slots are free"""
+    controller = AdmissionController(max_concurrent=2, max_queue=0, queue_timeout_ms=10)
+    controller.acquire()
+    controller.acquire()
+    assert controller.snapshot()["active"] == 2
+
+    with pytest.raises(Overloaded) as exc:
+        controller.acquire()
+    assert exc.value.reason == "queue_full"
+
+    controller.release()
+    controller.acquire()
+    assert controller.snapshot()["rejected"] == 1
+
+
+def test_queued_request_gets_released_slot():
+    """SUMMARY: A waiting request takes the slot as soon as it is released"""
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_ms=2000)
+    started, release = threading.Event(), threading.Event()
+    holder = threading.Thread(target=hold_slot, args=(controller, started, release))
+    holder.start()
+    started.wait()
+
+    threading.Timer(0.05, release.set).start()
+    t0 = time.monotonic()
+    assert controller.run(lambda: "scored") == "scored"
+    assert time.monotonic() - t0 < 1.0
+    holder.join()
+    assert controller.snapshot()["active"] == 0
+
+
+def test_queue_wait_times_out():
+    """EDGE CASE: Waiting longer than the queue timeout sheds the request"""
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout_ms=30)
+    controller.acquire()
+    with pytest.raises(Overloaded) as exc:
+        controller.acquire()
+    assert exc.value.reason == "queue_timeout"
+    assert controller.snapshot()["waiting"] == 0
+
+
+def test_deadline_caps_queue_wait():
+    """EDGE CASE: A request with no budget left is not queued at all"""
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout_ms=5000)
+    controller.acquire()
+    _, token = start_deadline(0)
+    try:
+        with pytest.raises(Overloaded) as exc:
+            controller.acquire()
+    finally:
+        end_deadline(token)
+    assert exc.value.reason == "deadline"
+
+
+def test_deadline_context():
+    """SUMMARY: The current deadline is visible to library code and records degradation"""
+    assert current_deadline() is None
+    assert deadline_expired() is False
+    mark_degraded()  # no-op outside a request
+
+    deadline, token = start_deadline(0)
+    try:
+        assert deadline_expired() is True
+        mark_degraded()
+        assert deadline.degraded is True
+    finally:
+        end_deadline(token)
+    assert current_deadline() is None
+
+
+def test_deadline_remaining_uses_clock():
+    """SUMMARY: Remaining time counts down from the budget"""
+    now = [100.0]
+    deadline = Deadline(250, clock=lambda: now[0])
+    assert deadline.remaining() == pytest.approx(0.25)
+    now[0] += 0.3
+    assert deadline.expired()
+
+
+def test_parse_budget_ms():
+    """EDGE CASE: Caller budgets are capped at the server budget; junk falls back to it"""
+    assert parse_budget_ms(None) == REQUEST_BUDGET_MS
+    assert parse_budget_ms("abc") == REQUEST_BUDGET_MS
+    assert parse_budget_ms("250") == 250
+    assert parse_budget_ms("-5") == 0
+    assert parse_budget_ms(str(REQUEST_BUDGET_MS * 10)) == REQUEST_BUDGET_MS
@@ -1,3 +1,5 @@
+import time
+
 import pytest
 from unittest.mock import MagicMock, patch
 from backend.Ml_model.api_server import create_app
@@ -8,7 +10,8 @@ from backend.Ml_model.api_server import create_app
 def client():
     """Create test client with mocked recommendation + cache managers."""
     with patch("backend.Ml_model.api_server.get_recommendation_service") as mock_reco_svc, \
-         patch("backend.Ml_model.api_server.get_cache_manager") as mock_cache_mgr:
+         patch("backend.Ml_model.api_server.get_cache_manager") as mock_cache_mgr, \
+         patch("backend.Ml_model.api_server.get_activity_writer") as mock_writer:
 
         # Mock recommendation service
         mock_svc = MagicMock()
@@ -315,3 +318,649 @@ def test_models_info_exception(client):
     assert resp.status_code == 500
     assert data["success"] is False
     assert "models info failure!" in data["error"]
+
+
+def test_personalized_uses_path_user_and_query_method(client):
+    """TC: Legacy POST route must key on the path user and honour query params"""
+    app = client.application
+    resp = client.post(
+        "/api/recommendations/personalized/u9?method=collaborative&top_n=4",
+        json={"exclude": ["x1"]}
+    )
+    assert resp.status_code == 200
+    app.recommendation_service.get_collaborative_recommendations.assert_called_with(
+        user_id="u9", top_n=4 + 20, exclude_ids=None, filters={}
+    )
+    cache_key = app.cache_manager.get.call_args[0][0]
+    assert cache_key.startswith("rec:collaborative:u=u9:")
+
+
+def test_cached_candidates_apply_exclusions(client):
+    """TC: Cached candidate lists are filtered by the request's exclusions"""
+    app = client.application
+    app.cache_manager.get.return_value = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+
+    resp = client.get("/api/recommendations/similar/100?top_n=2&exclude=b")
+    data = resp.get_json()
+
+    assert data["from_cache"] is True
+    assert [r["id"] for r in data["recommendations"]] == ["a", "c"]
+
+
+def test_candidates_exhausted_by_exclusions_recomputes(client):
+    """Edge TC: If exclusions consume the slack, the request is computed exactly"""
+    app = client.application
+    svc = app.recommendation_service
+    full = [{"id": f"x{i}"} for i in range(22)]
+    app.cache_manager.get.return_value = full
+
+    resp = client.get(
+        "/api/recommendations/similar/100?top_n=2&" + "&".join(f"exclude=x{i}" for i in range(21))
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()["from_cache"] is False
+    svc.get_similar_articles.assert_called_with(
+        article_id="100", top_n=2, exclude_ids=[f"x{i}" for i in range(21)],
+        max_age_days=None, recency_boost=0.0, filters={}
+    )
+
+
+def test_similar_recency_params_reach_service_and_key(client):
+    """TC: max_age_days/recency_boost are passed to scoring and kept apart in the cache key"""
+    app = client.application
+    svc = app.recommendation_service
+    client.get("/api/recommendations/similar/100?top_n=2&max_age_days=3&recency_boost=0.5")
+
+    kwargs = svc.get_similar_articles.call_args.kwargs
+    assert kwargs["max_age_days"] == 3.0
+    assert kwargs["recency_boost"] == 0.5
+    cache_key = app.cache_manager.get.call_args.args[0]
+    assert ":age=3.0" in cache_key and ":boost=0.5" in cache_key
+
+
+def test_similar_facet_filters_reach_service_and_key(client):
+    """TC: Facet params become normalized filters and are part of the cache key"""
+    app = client.application
+    svc = app.recommendation_service
+    client.get("/api/recommendations/similar/100?topic=Sports,Tech&source_id=7&language_code=EN")
+
+    assert svc.get_similar_articles.call_args.kwargs["filters"] == {
+        "topic": ("sports", "tech"), "source_id": ("7",), "language_code": ("en",)
+    }
+    cache_key = app.cache_manager.get.call_args.args[0]
+    assert ":language_code=en:source_id=7:topic=sports|tech" in cache_key
+
+
+def test_unknown_user_gets_cold_start_fallback(client):
+    """TC: Unknown users skip the model path and get a short-lived cold-start entry"""
+    app = client.application
+    svc = app.recommendation_service
+    cache = app.cache_manager
+    svc.is_known_user.return_value = False
+    svc.is_known_article.return_value = False
+    svc.get_cold_start_recommendations.return_value = [{"id": "cs1"}, {"id": "cs2"}]
+
+    resp = client.get("/api/recommendations/personalized/new-user?method=collaborative&topic=Sports")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert data["fallback"] == "cold_start"
+    assert [r["id"] for r in data["recommendations"]] == ["cs1", "cs2"]
+    svc.get_collaborative_recommendations.assert_not_called()
+    svc.get_cold_start_recommendations.assert_called_once_with(
+        top_n=30, topic=None, place=None, filters={"topic": ("sports",)}
+    )
+
+    ttls = {c.args[0]: c.kwargs["ttl_seconds"] for c in cache.set.call_args_list}
+    negative_key = next(k for k in ttls if k.startswith("rec:collaborative:u=new-user:"))
+    assert ttls[negative_key] == 120
+    assert any(k.startswith("rec:coldstart:") for k in ttls)
+
+
+def test_unknown_user_preferred_topic(client):
+    """TC: A preferred topic/place ranks the cold-start list without filtering it, and is part of its keys"""
+    app = client.application
+    svc = app.recommendation_service
+    cache = app.cache_manager
+    svc.is_known_user.return_value = False
+    svc.get_cold_start_recommendations.return_value = [{"id": "cs1"}]
+
+    data = client.get(
+        "/api/recommendations?method=hybrid&user_id=new-user&preferred_topic=Sports&preferred_place=UK"
+    ).get_json()
+
+    assert data["fallback"] == "cold_start"
+    svc.get_cold_start_recommendations.assert_called_once_with(top_n=30, topic="sports", place="uk", filters={})
+    keys = [c.args[0] for c in cache.set.call_args_list]
+    assert any(k.startswith("rec:coldstart:") and "pref_topic=sports" in k and "pref_place=uk" in k for k in keys)
+    assert any(k.startswith("rec:hybrid:u=new-user:") and "pref_topic=sports" in k for k in keys)
+
+
+def test_unknown_article_similar_fallback(client):
+    """Edge TC: Similar-articles for an id missing from the index returns the fallback"""
+    app = client.application
+    svc = app.recommendation_service
+    svc.is_known_article.return_value = False
+    svc.get_cold_start_recommendations.return_value = [{"id": "t1"}]
+
+    resp = client.get("/api/recommendations/similar/ghost")
+    data = resp.get_json()
+
+    assert data["fallback"] == "cold_start"
+    assert data["recommendations"] == [{"id": "t1"}]
+    svc.get_similar_articles.assert_not_called()
+
+
+def test_hybrid_unknown_user_with_known_seed_uses_model(client):
+    """Edge TC: Hybrid keeps the model path when a seed article is known"""
+    app = client.application
+    svc = app.recommendation_service
+    svc.is_known_user.return_value = False
+    svc.is_known_article.return_value = True
+
+    resp = client.post("/api/recommendations/personalized/u1", json={"recent_articles": ["r1"]})
+
+    assert "fallback" not in resp.get_json()
+    svc.get_hybrid_recommendations.assert_called_once()
+
+
+def test_compute_time_recorded_per_family(client):
+    """TC: Cache misses report their compute time under the request's family"""
+    app = client.application
+    client.get("/api/recommendations/similar/123")
+
+    family, seconds = app.cache_manager.stats.record_compute.call_args.args
+    assert family == "content"
+    assert seconds >= 0
+
+
+# Activity Tracking
+
+
+def test_track_activity_buffers_event(client):
+    """TC: /api/track hands the event to the buffered writer with a timestamp"""
+    resp = client.post("/api/track", json={"article_id": "a1", "activity_type": "view"})
+    assert resp.status_code == 200
+
+    writer = client.application.activity_writer
+    event = writer.append.call_args.args[0]
+    assert event["article_id"] == "a1"
+    assert "timestamp" in event
+
+
+def test_track_activity_missing_fields(client):
+    """TC: Missing required fields are rejected before buffering"""
+    resp = client.post("/api/track", json={"article_id": "a1"})
+    assert resp.status_code == 400
+    client.application.activity_writer.append.assert_not_called()
+
+
+def test_track_activity_updates_short_term_profile(client):
+    """TC: Tracked activity is folded into the user's short-term profile"""
+    client.post("/api/track", json={"user_id": "u1", "article_id": "a1", "activity_type": "like"})
+    svc = client.application.recommendation_service
+    svc.record_activity.assert_called_once_with("u1", "a1", "like")
+
+
+def test_track_activity_anonymous_feeds_trending(client):
+    """TC: Events without a user_id still reach the service for trending scores"""
+    client.post("/api/track", json={"article_id": "a1", "activity_type": "view"})
+    svc = client.application.recommendation_service
+    svc.record_activity.assert_called_once_with(None, "a1", "view")
+
+
+def test_profile_version_in_personalized_key(client):
+    """TC: Personalized cache keys carry the short-term profile version"""
+    svc = client.application.recommendation_service
+    svc.profile_version.return_value = 7
+    client.get("/api/recommendations?method=collaborative&user_id=u1")
+
+    cache_key = client.application.cache_manager.get.call_args.args[0]
+    assert cache_key.endswith(":pv=7")
+
+
+# Metrics
+
+
+def test_metrics_endpoint(client):
+    """TC: /metrics renders Prometheus text with per-route latency and cache/model gauges"""
+    app = client.application
+    app.cache_manager.stats.snapshot.return_value = {
+        "families": {"rec": {"hits": 3, "misses": 1, "hit_rate": 75.0}},
+        "tiers": {},
+    }
+    app.recommendation_service.model_version = "2025-01-01T00:00:00"
+
+    client.get("/api/recommendations/trending")
+    resp = client.get("/metrics")
+    text = resp.get_data(as_text=True)
+
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain")
+    assert 'newsxpress_ml_request_duration_seconds_bucket{route="/api/recommendations/trending",method="trending",le="+Inf"}' in text
+    assert 'newsxpress_ml_cache_lookups_total{family="rec",result="hits"} 3' in text
+    assert 'newsxpress_ml_cache_hit_ratio{family="rec"} 0.75' in text
+    assert 'newsxpress_ml_model_info{version="2025-01-01T00:00:00"} 1' in text
+
+
+def test_metrics_unmatched_route(client):
+    """EDGE CASE: Unknown paths share one 'unmatched' label instead of one series per path"""
+    client.get("/no/such/path/123")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'route="unmatched"' in text
+    assert "/no/such/path/123" not in text
+
+
+# Debug timing
+
+
+def test_debug_timing_breakdown(client):
+    """TC: X-Debug-Timing adds a per-stage breakdown and a Server-Timing header"""
+    resp = client.get(
+        "/api/recommendations?method=content&article_id=a1&top_n=2",
+        headers={"X-Debug-Timing": "1"},
+    )
+    data = resp.get_json()
+    assert resp.status_code == 200
+    stages = data["timing"]["stages"]
+    assert "cache_lookup" in stages
+    assert "scoring" in stages
+    assert data["timing"]["method"] == "content"
+    # Header is written after serialization, so it includes that stage
+    assert "serialize;dur=" in resp.headers["Server-Timing"]
+
+
+def test_debug_timing_off_by_default(client):
+    """TC: Without the header/param the response has no timing data"""
+    resp = client.get("/api/recommendations?method=content&article_id=a1&top_n=2")
+    assert "timing" not in resp.get_json()
+    assert "Server-Timing" not in resp.headers
+
+
+def test_slow_requests_logged(client, tmp_path, monkeypatch):
+    """TC: Requests over the slow threshold are written to the slow-log"""
+    from backend.Ml_model.tracing import SlowLog
+    slow_log = SlowLog(path=tmp_path / "slow.jsonl", threshold_ms=0.000001)
+    monkeypatch.setattr("backend.Ml_model.api_server.get_slow_log", lambda: slow_log)
+
+    client.get("/api/recommendations?method=content&article_id=a1&top_n=2&debug_timing=1")
+    lines = (tmp_path / "slow.jsonl").read_text().splitlines()
+    assert len(lines) == 1
+    assert '"method": "content"' in lines[0]
+
+
+# Admin profiler
+
+
+def test_profile_requires_admin_token(client, monkeypatch):
+    """TC: Profiling is refused without the admin token, and when no token is configured"""
+    monkeypatch.delenv("ML_ADMIN_TOKEN", raising=False)
+    assert client.post("/api/admin/profile?seconds=0.01", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setenv("ML_ADMIN_TOKEN", "s3cret")
+    assert client.post("/api/admin/profile?seconds=0.01").status_code == 403
+    assert client.post("/api/admin/profile?seconds=0.01", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def _wait_for_profile(client, profile_id, headers, query=""):
+    for _ in range(200):
+        resp = client.get(f"/api/admin/profile/{profile_id}{query}", headers=headers)
+        if resp.status_code != 202:
+            return resp
+        time.sleep(0.01)
+    raise AssertionError("profile did not finish")
+
+
+def test_profile_runs_in_background(client, monkeypatch):
+    """TC: Starting a profile returns at once; the result is polled by id as JSON or collapsed stacks"""
+    import os
+    monkeypatch.setenv("ML_ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    resp = client.post("/api/admin/profile?seconds=0.1&interval_ms=5&include_idle=1", headers=headers)
+    assert resp.status_code == 202
+    assert resp.headers["X-Worker-Pid"] == str(os.getpid())
+    profile_id = resp.get_json()["profile_id"]
+    # The request thread is free while sampling, so it is the one being profiled
+    assert client.get("/api/admin/profile/" + profile_id, headers=headers).get_json()["status"] == "running"
+
+    resp = _wait_for_profile(client, profile_id, headers, "?format=collapsed")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain")
+    data = client.get("/api/admin/profile/" + profile_id, headers=headers).get_json()
+    assert data["status"] == "done"
+    assert data["samples"] >= 1
+
+    # Published for polls that land on other workers
+    published = client.application.cache_manager.set.call_args_list[-1]
+    assert published.args[0] == f"cpu_profile:{profile_id}"
+    assert published.args[1]["status"] == "done"
+
+
+def test_profile_result_from_other_worker(client, monkeypatch):
+    """TC: Polls for a profile this worker did not run are answered from the cache"""
+    monkeypatch.setenv("ML_ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    cache = client.application.cache_manager
+    cache.get.side_effect = lambda key: (
+        {"status": "done", "pid": 4242, "samples": 3, "collapsed": "main;f 3\n"} if key == "cpu_profile:4242-1" else None
+    )
+    resp = client.get("/api/admin/profile/4242-1?format=collapsed", headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["X-Worker-Pid"] == "4242"
+    assert resp.get_data(as_text=True) == "main;f 3\n"
+    assert client.get("/api/admin/profile/missing", headers=headers).status_code == 404
+
+
+def test_profile_stop_early(client, monkeypatch):
+    """EDGE CASE: DELETE stops a running profile, freeing the worker for the next one"""
+    monkeypatch.setenv("ML_ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    profile_id = client.post("/api/admin/profile?seconds=30", headers=headers).get_json()["profile_id"]
+    assert client.post("/api/admin/profile?seconds=30", headers=headers).status_code == 409
+
+    resp = client.delete("/api/admin/profile/" + profile_id, headers=headers)
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "done"
+    assert resp.get_json()["duration_seconds"] < 30
+    second = client.post("/api/admin/profile?seconds=0.01", headers=headers)
+    assert second.status_code == 202
+    _wait_for_profile(client, second.get_json()["profile_id"], headers)
+
+
+def test_profile_rejects_bad_params(client, monkeypatch):
+    """EDGE CASE: Non-numeric or non-positive durations are a 400"""
+    monkeypatch.setenv("ML_ADMIN_TOKEN", "s3cret")
+    headers = {"X-Admin-Token": "s3cret"}
+    assert client.post("/api/admin/profile?seconds=abc", headers=headers).status_code == 400
+    assert client.post("/api/admin/profile?seconds=0", headers=headers).status_code == 400
+
+
+# Field projection
+
+
+def test_recommendations_fields_projection(client):
+    """TC: fields= trims each recommendation to the requested keys (plus id)"""
+    svc = client.application.recommendation_service
+    svc.get_similar_articles.return_value = [
+        {"id": "a1", "title": "A", "topic": "x", "similarity_score": 0.9},
+        {"id": "a2", "title": "B", "topic": "y", "similarity_score": 0.8},
+    ]
+    resp = client.get("/api/recommendations/similar/a0?top_n=2&fields=title,similarity_score")
+    data = resp.get_json()
+    assert resp.status_code == 200
+    assert data["recommendations"] == [
+        {"id": "a1", "title": "A", "similarity_score": 0.9},
+        {"id": "a2", "title": "B", "similarity_score": 0.8},
+    ]
+
+
+def test_trending_encodes_timestamps(client):
+    """TC: Trending rows holding pandas Timestamps and NumPy scores encode as JSON"""
+    import numpy as np
+    import pandas as pd
+    svc = client.application.recommendation_service
+    svc.get_trending_articles.return_value = [
+        {"id": "t1", "published_at": pd.Timestamp("2025-01-01", tz="UTC"), "score": np.float64(1.5)}
+    ]
+    data = client.get("/api/recommendations/trending?fields=published_at").get_json()
+    assert data["recommendations"] == [{"id": "t1", "published_at": "2025-01-01T00:00:00+00:00"}]
+
+
+# Admission control
+
+
+def _overload(app):
+    # Same class the server imported, so it raises the Overloaded the server catches
+    app.admission = type(app.admission)(max_concurrent=1, max_queue=0, queue_timeout_ms=10)
+    app.admission.acquire()
+
+
+def test_overloaded_serves_stale_copy(client):
+    """TC: Over capacity, a miss is answered from the stale copy of the same list"""
+    app = client.application
+    _overload(app)
+    stale = [{"id": "old1"}, {"id": "old2"}]
+    app.cache_manager.get.side_effect = lambda key: stale if key.startswith("stale:rec:content:") else None
+
+    data = client.get("/api/recommendations?method=content&article_id=a1&top_n=2").get_json()
+
+    assert data["degraded"] == "stale"
+    assert data["recommendations"] == stale
+    app.recommendation_service.get_similar_articles.assert_not_called()
+
+
+def test_overloaded_without_stale_serves_trending(client):
+    """TC: With no stale copy the shed request gets the trending list, minus exclusions"""
+    app = client.application
+    _overload(app)
+    app.recommendation_service.get_trending_articles.return_value = [{"id": "t1"}, {"id": "t2"}, {"id": "t3"}]
+
+    data = client.get("/api/recommendations?method=hybrid&user_id=u1&top_n=2&exclude=t1").get_json()
+
+    assert data["degraded"] == "trending"
+    assert [r["id"] for r in data["recommendations"]] == ["t2", "t3"]
+    app.recommendation_service.get_hybrid_recommendations.assert_not_called()
+
+
+def test_overloaded_trending_keeps_facet_filters(client):
+    """TC: The trending list a shed request falls back to honours its facet filters"""
+    app = client.application
+    _overload(app)
+    app.recommendation_service.get_trending_articles.return_value = [{"id": "s1"}]
+
+    data = client.get("/api/recommendations?method=collaborative&user_id=u1&topic=Sports,Tech&top_n=1").get_json()
+
+    assert data["degraded"] == "trending"
+    kwargs = app.recommendation_service.get_trending_articles.call_args.kwargs
+    assert kwargs["filters"] == {"topic": ("sports", "tech")}
+    trending_keys = [c.args[0] for c in app.cache_manager.set.call_args_list if c.args[0].startswith("rec:trending")]
+    assert trending_keys and all("sports|tech" in key for key in trending_keys)
+
+
+def test_spent_budget_skips_scoring(client):
+    """EDGE CASE: A caller budget of 0ms sheds the miss instead of scoring past the deadline"""
+    app = client.application
+    resp = client.get(
+        "/api/recommendations?method=content&article_id=a1&top_n=2",
+        headers={"X-Request-Budget-Ms": "0"},
+    )
+    assert resp.get_json()["degraded"] == "trending"
+    app.recommendation_service.get_similar_articles.assert_not_called()
+
+
+def test_computed_lists_keep_stale_copy(client):
+    """TC: Computed lists are also stored under stale:<key> with the long stale TTL"""
+    app = client.application
+    client.get("/api/recommendations?method=content&article_id=a1&top_n=2")
+    ttls = {c.args[0]: c.kwargs["ttl_seconds"] for c in app.cache_manager.set.call_args_list}
+    stale_keys = [k for k in ttls if k.startswith("stale:rec:content:")]
+    assert len(stale_keys) == 1
+    assert ttls[stale_keys[0]] == 86400
+
+
+# Conditional GET
+
+
+def test_similar_etag_and_304(client):
+    """TC: Similar articles carry an ETag; a matching If-None-Match is a 304 without any lookup"""
+    app = client.application
+    app.recommendation_service.model_version = "2025-01-01T00:00:00"
+
+    first = client.get("/api/recommendations/similar/a1?top_n=2")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert first.headers["Cache-Control"] == "public, max-age=600"
+
+    app.cache_manager.get.reset_mock()
+    app.recommendation_service.get_similar_articles.reset_mock()
+    second = client.get("/api/recommendations/similar/a1?top_n=2", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+    app.cache_manager.get.assert_not_called()
+    app.recommendation_service.get_similar_articles.assert_not_called()
+
+
+def test_similar_etag_changes_with_model_version(client):
+    """TC: A retrained model invalidates clients' validators"""
+    app = client.application
+    app.recommendation_service.model_version = "2025-01-01T00:00:00"
+    etag = client.get("/api/recommendations/similar/a1").headers["ETag"]
+
+    app.recommendation_service.model_version = "2025-01-02T00:00:00"
+    resp = client.get("/api/recommendations/similar/a1", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_similar_etag_varies_with_exclusions_and_fields(client):
+    """EDGE CASE: Different exclusions or projections are different representations"""
+    app = client.application
+    app.recommendation_service.model_version = "v1"
+    base = client.get("/api/recommendations/similar/a1").headers["ETag"]
+    assert client.get("/api/recommendations/similar/a1?exclude=x").headers["ETag"] != base
+    assert client.get("/api/recommendations/similar/a1?fields=title").headers["ETag"] != base
+
+
+def test_degraded_similar_not_cacheable(client):
+    """EDGE CASE: Shed responses get no ETag and Cache-Control: no-store"""
+    app = client.application
+    app.recommendation_service.model_version = "v1"
+    app.admission = type(app.admission)(max_concurrent=1, max_queue=0, queue_timeout_ms=10)
+    app.admission.acquire()
+
+    resp = client.get("/api/recommendations/similar/a1")
+    assert resp.get_json()["degraded"] == "trending"
+    assert "ETag" not in resp.headers
+    assert resp.headers["Cache-Control"] == "no-store"
+
+
+def test_cold_start_similar_not_cacheable(client):
+    """EDGE CASE: Cold-start answers for unknown articles get no ETag and Cache-Control: no-store"""
+    app = client.application
+    app.recommendation_service.model_version = "v1"
+    app.recommendation_service.is_known_article.return_value = False
+    app.recommendation_service.get_cold_start_recommendations.return_value = [{"id": "cs1"}]
+
+    resp = client.get("/api/recommendations/similar/ghost")
+    assert resp.get_json()["fallback"] == "cold_start"
+    assert "ETag" not in resp.headers
+    assert resp.headers["Cache-Control"] == "no-store"
+
+
+def test_trending_etag_and_304(client):
+    """TC: Trending honours If-None-Match with a 304 and a shorter max-age"""
+    app = client.application
+    app.recommendation_service.model_version = "v1"
+    first = client.get("/api/recommendations/trending?top_n=5")
+    assert first.headers["Cache-Control"] == "public, max-age=120"
+
+    resp = client.get("/api/recommendations/trending?top_n=5", headers={"If-None-Match": first.headers["ETag"]})
+    assert resp.status_code == 304
+
+
+def test_no_etag_without_model_version(client):
+    """EDGE CASE: Unknown model version disables validators"""
+    app = client.application
+    app.recommendation_service.model_version = None
+    resp = client.get("/api/recommendations/similar/a1")
+    assert "ETag" not in resp.headers
+    assert resp.headers["Cache-Control"] == "no-store"
+
+
+# Compression
+
+
+def _big_list(n=60):
+    return [{"id": f"a{i}", "title": "Lorem ipsum dolor sit amet consectetur", "similarity_score": 0.5} for i in range(n)]
+
+
+def test_large_response_gzipped(client):
+    """TC: Large JSON bodies are gzipped when the client accepts it"""
+    import gzip, json
+    app = client.application
+    app.recommendation_service.get_collaborative_recommendations.return_value = _big_list()
+
+    resp = client.get(
+        "/api/recommendations?method=collaborative&user_id=u1&top_n=60",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    data = json.loads(gzip.decompress(resp.data))
+    assert len(data["recommendations"]) == 60
+
+
+def test_small_or_identity_responses_not_compressed(client):
+    """EDGE CASE: Small bodies and clients without Accept-Encoding get identity responses"""
+    resp = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+
+    app = client.application
+    app.recommendation_service.get_collaborative_recommendations.return_value = _big_list()
+    resp = client.get("/api/recommendations?method=collaborative&user_id=u1&top_n=60")
+    assert "Content-Encoding" not in resp.headers
+    assert len(resp.get_json()["recommendations"]) == 60
+
+
+def test_precompressed_similar_hit(client):
+    """TC: A repeated similar-articles hit is served from the precompressed cache without Redis"""
+    import gzip, json
+    app = client.application
+    app.recommendation_service.model_version = "v1"
+    app.recommendation_service.get_similar_articles.return_value = _big_list()
+    headers = {"Accept-Encoding": "gzip"}
+
+    first = client.get("/api/recommendations/similar/a0?top_n=60", headers=headers)
+    assert first.headers["Content-Encoding"] == "gzip"
+
+    app.cache_manager.get.reset_mock()
+    second = client.get("/api/recommendations/similar/a0?top_n=60", headers=headers)
+    assert second.data == first.data
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert len(json.loads(gzip.decompress(second.data))["recommendations"]) == 60
+    app.cache_manager.get.assert_not_called()
+    assert app.precompressed.snapshot()["hits"] == 1
+
+
+def test_top_n_is_capped(client):
+    """EDGE CASE: Client top_n is clamped to REC_MAX_TOP_N before reaching the models"""
+    app = client.application
+    client.get("/api/recommendations/trending?top_n=100000")
+    app.recommendation_service.get_trending_articles.assert_called_with(
+        top_n=100, time_window_days=7, filters={}
+    )
+
+
+def test_trending_topic_and_place(client):
+    """TC: Trending accepts topic/place filters, normalized into the cache key"""
+    app = client.application
+    client.get("/api/recommendations/trending?topic=Sports&place=India")
+    app.recommendation_service.get_trending_articles.assert_called_with(
+        top_n=10, time_window_days=7, filters={"topic": ("sports",), "place": ("india",)}
+    )
+    cache_key = app.cache_manager.get.call_args.args[0]
+    assert cache_key.endswith(":place=india:topic=sports")
+
+
+def test_search(client):
+    """TC: /api/search normalizes the query, passes facet filters and caches by a query hash"""
+    app = client.application
+    svc = app.recommendation_service
+    svc.search_articles.return_value = [{"id": "s1", "title": "Cup final", "search_score": 0.8}]
+
+    resp = client.get("/api/search?q=  Cup   FINAL &top_n=3&language_code=en&fields=id")
+    data = resp.get_json()
+
+    assert resp.status_code == 200
+    assert data["results"] == [{"id": "s1"}]
+    svc.search_articles.assert_called_once_with("cup final", top_n=3, filters={"language_code": ("en",)})
+    cache_key = app.cache_manager.get.call_args.args[0]
+    assert cache_key.startswith("rec:search:n=3:") and "cup" not in cache_key
+
+
+def test_search_requires_query(client):
+    """EDGE CASE: A blank query is rejected before reaching the models"""
+    resp = client.get("/api/search?q=%20")
+    assert resp.status_code == 400
+    client.application.recommendation_service.search_articles.assert_not_called()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model.article_store import MISSING_EPOCH, ArticleStore, recency_blend
+
+
+@pytest.fixture
+def metadata():
+    now = pd.Timestamp.now()
+    return pd.DataFrame([
+        {"id": "d3", "published_at": now - pd.Timedelta(days=3)},
+        {"id": "d0", "published_at": now},
+        {"id": "bad", "published_at": None},
+        {"id": "d10", "published_at": now - pd.Timedelta(days=10)},
+        {"id": "d1", "published_at": now - pd.Timedelta(days=1)},
+    ])
+
+
+# SUMMARY: Window lookups return rows published since the cutoff, oldest first.
+def test_rows_since(metadata):
+    store = ArticleStore(metadata)
+    rows = store.rows_since(store.cutoff(7))
+    assert [metadata.iloc[r]["id"] for r in rows] == ["d3", "d1", "d0"]
+    assert [metadata.iloc[r]["id"] for r in store.newest(store.cutoff(2))] == ["d0", "d1"]
+
+
+# EDGE CASE: Rows without a publication date never fall inside a window
+def test_missing_dates_excluded(metadata):
+    store = ArticleStore(metadata)
+    assert store.epoch[store.row("bad")] == MISSING_EPOCH
+    assert "bad" not in {metadata.iloc[r]["id"] for r in store.newest()}
+    assert store.recency_weights([store.row("bad")])[0] == 0.0
+
+
+# SUMMARY: Recency weights halve every half-life.
+def test_recency_weights(metadata):
+    store = ArticleStore(metadata)
+    weights = store.recency_weights([store.row("d0"), store.row("d1")], half_life_days=1)
+    assert weights[0] == pytest.approx(1.0, abs=1e-3)
+    assert weights[1] == pytest.approx(0.5, abs=1e-3)
+    assert recency_blend(2.0, 0.5, 0.0) == 2.0
+    assert recency_blend(2.0, 0.5, 1.0) == 1.0
+
+
+# SUMMARY: Timezone-aware dates are compared with real UTC time and kept aware in records.
+def test_tz_aware_dates():
+    now = pd.Timestamp.now(tz="UTC")
+    store = ArticleStore(pd.DataFrame([
+        {"id": "a", "published_at": now - pd.Timedelta(hours=1)},
+        {"id": "b", "published_at": now - pd.Timedelta(days=9)},
+    ]))
+    rows = store.rows_since(store.cutoff(1))
+    records = store.records(rows, score=[1.5])
+    assert [r["id"] for r in records] == ["a"]
+    assert records[0]["published_at"].tzinfo is not None
+    assert records[0]["score"] == 1.5
+
+
+# EDGE CASE: Duplicate ids map to their first row
+def test_duplicate_ids():
+    store = ArticleStore(pd.DataFrame({"id": ["x", "x"], "published_at": ["2025-01-01", "2025-01-02"]}))
+    assert store.row("x") == 0
+    assert store.row("missing") is None
+    assert np.array_equal(store.by_time, [0, 1])
+
+
+# SUMMARY: Topic/place partitions keep rows in publication order with normalized keys.
+def test_partitions():
+    now = pd.Timestamp.now()
+    store = ArticleStore(pd.DataFrame([
+        {"id": "a", "topic": "Sports", "place": None, "published_at": now - pd.Timedelta(days=1)},
+        {"id": "b", "topic": "tech", "place": "India", "published_at": now},
+        {"id": "c", "topic": " sports", "place": "india", "published_at": now},
+    ]))
+    assert store.partitions(store.row("c")) == ("topic=sports", "place=india")
+    assert store.partitions(store.row("a")) == ("topic=sports",)
+    assert list(store.newest(partition="topic=sports")) == [2, 0]
+    assert list(store.rows_since(store.cutoff(0.5), "topic=sports")) == [2]
+    assert len(store.newest(partition="topic=unknown")) == 0
+    assert store.in_partition(store.row("b"), "place=india")
+    assert not store.in_partition(store.row("b"), "source_id=x")
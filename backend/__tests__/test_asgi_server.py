@@ -0,0 +1,392 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backend.Ml_model import asgi_server
+from backend.Ml_model.admission import AsyncAdmissionController
+from backend.Ml_model.asgi_server import RecommendationASGIApp, ScoringExecutor
+from backend.Ml_model.cache_manager import AsyncCacheManager
+from backend.Ml_model.local_redis import AsyncLocalRedis
+
+
+# HELPERS: drive the ASGI app without a server
+
+async def call(app, method, path, query=b"", body=b"", headers=None, raw=False):
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query,
+        "headers": headers or [],
+    }
+    await app(scope, receive, send)
+    start, payload = sent
+    body = payload["body"] if raw else json.loads(payload["body"])
+    return start["status"], dict(start["headers"]), body
+
+
+def request(app, *args, **kwargs):
+    return asyncio.run(call(app, *args, **kwargs))
+
+
+@pytest.fixture
+def svc():
+    mock_svc = MagicMock()
+    mock_svc.models_loaded = True
+    mock_svc.get_similar_articles.return_value = [{"id": "a1"}, {"id": "a2"}]
+    mock_svc.get_collaborative_recommendations.return_value = [{"id": "c1"}, {"id": "c2"}]
+    mock_svc.get_hybrid_recommendations.return_value = [{"id": "h1"}, {"id": "h2"}]
+    mock_svc.get_trending_articles.return_value = [{"id": "t1"}, {"id": "t2"}]
+    mock_svc.get_cold_start_recommendations.return_value = [{"id": "cs1"}, {"id": "cs2"}]
+    return mock_svc
+
+
+@pytest.fixture
+def app(svc):
+    cache = AsyncCacheManager()
+    with patch("backend.Ml_model.cache_manager.create_redis_client",
+               return_value=(AsyncLocalRedis(), "local")):
+        asgi_app = RecommendationASGIApp(svc, cache, ScoringExecutor(max_workers=2, max_pending=4))
+        asyncio.run(asgi_app._ensure_started())
+    yield asgi_app
+    asgi_app.executor.shutdown()
+
+
+# TEST CASES
+
+def test_health_check(app):
+    """TC: Health endpoint reports the ASGI server and a connected cache"""
+    status, headers, data = request(app, "GET", "/health")
+    assert status == 200
+    assert data["status"] == "healthy"
+    assert data["cache_enabled"] is True
+    assert data["server"] == "asgi"
+    assert headers[b"access-control-allow-origin"] == b"*"
+
+
+def test_recommendations_miss_then_hit(app, svc):
+    """TC: First request computes in the executor, second one is served from Redis"""
+    status, _, data = request(app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=u1&top_n=2")
+    assert status == 200
+    assert data["from_cache"] is False
+    assert [r["id"] for r in data["recommendations"]] == ["c1", "c2"]
+
+    _, _, data = request(app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=u1&top_n=2")
+    assert data["from_cache"] is True
+    assert svc.get_collaborative_recommendations.call_count == 1
+
+
+def test_recommendations_post_body(app, svc):
+    """TC: POST body supplies parameters like the Flask endpoint"""
+    body = json.dumps({"method": "hybrid", "user_id": "u1", "recent_articles": ["a9"]}).encode()
+    status, _, data = request(app, "POST", "/api/recommendations", body=body)
+    assert status == 200
+    assert data["method"] == "hybrid"
+    assert svc.get_hybrid_recommendations.call_args.kwargs["recent_article_ids"] == ["a9"]
+
+
+def test_candidate_exclusions(app, svc):
+    """TC: Exclusions are applied to the cached candidate list"""
+    request(app, "GET", "/api/recommendations/similar/123", query=b"top_n=2")
+    status, _, data = request(app, "GET", "/api/recommendations/similar/123", query=b"top_n=1&exclude=a1")
+    assert status == 200
+    assert [r["id"] for r in data["recommendations"]] == ["a2"]
+
+
+def test_personalized_path_user(app, svc):
+    """TC: Legacy personalized route takes the user from the path"""
+    status, _, data = request(app, "GET", "/api/recommendations/personalized/u7", query=b"method=collaborative")
+    assert status == 200
+    assert svc.get_collaborative_recommendations.call_args.kwargs["user_id"] == "u7"
+
+
+def test_unknown_user_cold_start(app, svc):
+    """TC: Unknown users get the cold-start list computed directly"""
+    svc.is_known_user.return_value = False
+    svc.is_known_article.return_value = False
+    status, _, data = request(app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=ghost")
+    assert status == 200
+    assert data["fallback"] == "cold_start"
+    svc.get_collaborative_recommendations.assert_not_called()
+
+
+def test_user_plan_runs_off_loop(app, svc):
+    """TC: Planning a user request (profile lookups) runs in the scoring executor"""
+    threads = []
+    svc.is_known_user.side_effect = lambda user_id: threads.append(threading.current_thread().name) or True
+    status, _, _ = request(app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=u1")
+    assert status == 200
+    assert threads and threads[0].startswith("scoring")
+
+
+def test_trending_topic_partition(app, svc):
+    """TC: topic/place reach the service normalized and get their own cache entry"""
+    request(app, "GET", "/api/recommendations/trending", query=b"top_n=2&topic=Sports&place=%20India")
+    svc.get_trending_articles.assert_called_once_with(2, 7, filters={"topic": ("sports",), "place": ("india",)})
+
+    request(app, "GET", "/api/recommendations/trending", query=b"top_n=2")
+    assert svc.get_trending_articles.call_count == 2
+
+
+def test_trending_cached(app, svc):
+    """TC: Trending is cached and compute time is recorded"""
+    request(app, "GET", "/api/recommendations/trending", query=b"top_n=2&days=3")
+    _, _, data = request(app, "GET", "/api/recommendations/trending", query=b"top_n=2&days=3")
+    assert data["from_cache"] is True
+    svc.get_trending_articles.assert_called_once_with(2, 3, filters={})
+
+    _, _, stats = request(app, "GET", "/api/cache/stats")
+    assert stats["stats"]["families"]["trending"]["hits"] == 1
+
+
+def test_search(app, svc):
+    """TC: Search runs on the executor with facet filters and is cached"""
+    svc.search_articles.return_value = [{"id": "s1"}]
+    status, _, data = request(app, "GET", "/api/search", query=b"q=Cup+Final&top_n=2&topic=sports")
+    assert status == 200
+    assert data["results"] == [{"id": "s1"}]
+    svc.search_articles.assert_called_once_with("cup final", 2, filters={"topic": ("sports",)})
+
+    _, _, data = request(app, "GET", "/api/search", query=b"q=cup%20final&top_n=2&topic=Sports")
+    assert data["from_cache"] is True
+
+    status, _, _ = request(app, "GET", "/api/search")
+    assert status == 400
+
+
+def test_not_found(app):
+    """TC: Unknown route returns JSON 404"""
+    status, _, data = request(app, "GET", "/api/nope")
+    assert status == 404
+    assert data["success"] is False
+
+
+def test_handler_error_returns_500(app, svc):
+    """TC: Service exceptions become JSON 500 responses"""
+    svc.get_trending_articles.side_effect = RuntimeError("boom")
+    status, _, data = request(app, "GET", "/api/recommendations/trending")
+    assert status == 500
+    assert data == {"success": False, "error": "boom"}
+
+
+def test_cors_allowed_origins(app):
+    """TC: Only configured origins are echoed back"""
+    app.allowed_origins = ["https://newsxpress.app"]
+    _, headers, _ = request(app, "GET", "/health", headers=[(b"origin", b"https://newsxpress.app")])
+    assert headers[b"access-control-allow-origin"] == b"https://newsxpress.app"
+
+    _, headers, _ = request(app, "GET", "/health", headers=[(b"origin", b"https://evil.example")])
+    assert b"access-control-allow-origin" not in headers
+
+
+def test_lifespan_connects_and_closes(svc):
+    """TC: Lifespan startup connects the cache, shutdown closes it"""
+    cache = AsyncCacheManager()
+    asgi_app = RecommendationASGIApp(svc, cache, ScoringExecutor(max_workers=1))
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    with patch("backend.Ml_model.cache_manager.create_redis_client",
+               return_value=(AsyncLocalRedis(), "local")):
+        asyncio.run(asgi_app({"type": "lifespan"}, receive, send))
+
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert cache.enabled is False
+
+
+def test_scoring_executor_bounds_pending():
+    """EDGE CASE: No more than max_pending jobs are handed to the pool at once"""
+    executor = ScoringExecutor(max_workers=4, max_pending=2)
+    running = []
+    peak = []
+
+    def job():
+        running.append(1)
+        peak.append(len(running))
+        time.sleep(0.02)
+        running.pop()
+
+    async def main():
+        await asyncio.gather(*(executor.run(job) for _ in range(6)))
+
+    asyncio.run(main())
+    executor.shutdown()
+    assert max(peak) <= 2
+
+
+def test_metrics_endpoint(app, svc):
+    """TC: /metrics exposes request histograms labelled by route template and method"""
+    svc.model_version = "2025-01-01T00:00:00"
+    request(app, "GET", "/api/recommendations/similar/a1")
+
+    status, headers, body = request(app, "GET", "/metrics", raw=True)
+    text = body.decode()
+    assert status == 200
+    assert headers[b"content-type"].startswith(b"text/plain")
+    assert 'route="/api/recommendations/similar/<article_id>",method="content"' in text
+    assert 'newsxpress_ml_model_info{version="2025-01-01T00:00:00"} 1' in text
+
+
+def test_debug_timing_breakdown(app, svc):
+    """TC: debug_timing=1 returns stage timings, including spans from the scoring thread"""
+    status, headers, data = request(
+        app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=u1&top_n=2&debug_timing=1"
+    )
+    assert status == 200
+    assert {"cache_lookup", "scoring", "cache_store"} <= set(data["timing"]["stages"])
+    assert b"serialize;dur=" in headers[b"server-timing"]
+
+
+def test_similar_conditional_get(app, svc):
+    """TC: ASGI similar articles returns an ETag and answers a matching If-None-Match with 304"""
+    svc.model_version = "v1"
+    status, headers, _ = request(app, "GET", "/api/recommendations/similar/a1")
+    assert status == 200
+    etag = headers[b"etag"]
+    assert headers[b"cache-control"] == b"public, max-age=600"
+
+    svc.get_similar_articles.reset_mock()
+    status, headers, body = request(
+        app, "GET", "/api/recommendations/similar/a1", headers=[(b"if-none-match", etag)], raw=True
+    )
+    assert status == 304
+    assert body == b""
+    svc.get_similar_articles.assert_not_called()
+
+
+def test_cold_start_similar_not_cacheable(app, svc):
+    """EDGE CASE: Cold-start answers for unknown articles get no ETag and Cache-Control: no-store"""
+    svc.model_version = "v1"
+    svc.is_known_article.return_value = False
+    status, headers, data = request(app, "GET", "/api/recommendations/similar/ghost")
+    assert status == 200
+    assert data["fallback"] == "cold_start"
+    assert b"etag" not in headers
+    assert headers[b"cache-control"] == b"no-store"
+
+
+def test_large_response_gzipped(app, svc):
+    """TC: ASGI compresses large JSON bodies for clients accepting gzip"""
+    import gzip
+    svc.get_collaborative_recommendations.return_value = [
+        {"id": f"c{i}", "title": "Lorem ipsum dolor sit amet consectetur"} for i in range(60)
+    ]
+    status, headers, body = request(
+        app, "GET", "/api/recommendations", query=b"method=collaborative&user_id=u1&top_n=60",
+        headers=[(b"accept-encoding", b"gzip")], raw=True,
+    )
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert int(headers[b"content-length"]) == len(body)
+    assert len(json.loads(gzip.decompress(body))["recommendations"]) == 60
+
+
+# Admission control and degraded answers
+
+
+def _overload(app):
+    # Same class the server imported, so it raises the Overloaded the server catches
+    app.admission = type(app.admission)(max_concurrent=1, max_queue=0)
+    app.admission.active = 1
+
+
+def test_computed_lists_keep_stale_copy_and_serve_it_when_shed(app, svc):
+    """TC: Computed lists are also stored under stale:<key>; a shed request is answered from it"""
+    request(app, "GET", "/api/recommendations/similar/123", query=b"top_n=2")
+
+    async def drop_fresh_copies():
+        redis = app.cache_manager.redis_client
+        keys = await redis.keys("rec:content:*")
+        assert keys and await redis.keys("stale:rec:content:*")
+        await redis.delete(*keys)
+    asyncio.run(drop_fresh_copies())
+
+    _overload(app)
+    status, headers, data = request(app, "GET", "/api/recommendations/similar/123", query=b"top_n=2&exclude=a1")
+    assert status == 200
+    assert data["degraded"] == "stale"
+    assert [r["id"] for r in data["recommendations"]] == ["a2"]
+    assert headers[b"cache-control"] == b"no-store"
+    assert b"etag" not in headers
+    assert svc.get_similar_articles.call_count == 1
+
+
+def test_shed_request_serves_filtered_trending(app, svc):
+    """TC: With no stale copy a shed request gets the trending list under its facet filters"""
+    _overload(app)
+    status, _, data = request(app, "GET", "/api/recommendations", query=b"method=hybrid&user_id=u1&topic=Sports&top_n=1")
+    assert status == 200
+    assert data["degraded"] == "trending"
+    assert [r["id"] for r in data["recommendations"]] == ["t1"]
+    assert svc.get_trending_articles.call_args.kwargs["filters"] == {"topic": ("sports",)}
+    svc.get_hybrid_recommendations.assert_not_called()
+    assert app.admission.snapshot()["rejected"] == 1
+
+
+def test_spent_budget_skips_scoring(app, svc):
+    """EDGE CASE: A caller budget of 0ms sheds the miss instead of scoring past the deadline"""
+    _, _, data = request(app, "GET", "/api/recommendations/similar/123", headers=[(b"x-request-budget-ms", b"0")])
+    assert data["degraded"] == "trending"
+    svc.get_similar_articles.assert_not_called()
+
+
+def test_deadline_reaches_scoring_thread(app, svc):
+    """EDGE CASE: Scoring in the executor sees the request deadline; partial results are not cached"""
+    # The admission module the server imported (the flat one, not backend.Ml_model.admission)
+    admission = sys.modules[asgi_server.Overloaded.__module__]
+
+    def similar(**kwargs):
+        assert admission.current_deadline() is not None
+        admission.mark_degraded()
+        return [{"id": "p1"}]
+    svc.get_similar_articles.side_effect = similar
+
+    _, _, data = request(app, "GET", "/api/recommendations/similar/123")
+    assert data["degraded"] == "partial"
+    assert data["from_cache"] is False
+    _, _, data = request(app, "GET", "/api/recommendations/similar/123")
+    assert data["from_cache"] is False
+    assert svc.get_similar_articles.call_count == 2
+    assert app.admission.snapshot()["active"] == 0
+
+
+def test_async_admission_queue_timeout():
+    """EDGE CASE: A request queued past the timeout is shed; a released slot admits the next one"""
+    from backend.Ml_model.admission import Overloaded
+
+    async def run():
+        admission = AsyncAdmissionController(max_concurrent=1, max_queue=1, queue_timeout_ms=20)
+        await admission.acquire()
+        with pytest.raises(Overloaded) as exc:
+            await admission.acquire()
+        assert exc.value.reason == "queue_timeout"
+
+        waiter = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0)
+        await admission.release()
+        await asyncio.wait_for(waiter, 1)
+        return admission.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["active"] == 1
+    assert snapshot["waiting"] == 0
+    assert snapshot["rejected"] == 1
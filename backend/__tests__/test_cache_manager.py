@@ -1,7 +1,13 @@
 import json
 import pytest
 from unittest.mock import MagicMock, patch
-from backend.Ml_model.cache_manager import CacheManager, get_cache_manager, cached
+from backend.Ml_model.cache_manager import (
+    CacheManager,
+    get_cache_manager,
+    cached,
+    build_cache_key,
+    apply_exclusions,
+)
 
 # FIXTURE: Mock redis client
 @pytest.fixture
@@ -98,6 +104,97 @@ def test_set_error(mock_redis):
     assert cm.set("k", {"x": 1}) is False
 
 
+# SUMMARY: Ensures connect() passes connection-pool tuning to redis.Redis.
+# EDGE CASE: Pool settings come from env vars shared by all worker threads.
+@patch("redis.Redis")
+def test_connect_pool_settings(mock_redis_class, mock_redis, monkeypatch):
+    monkeypatch.setenv("REDIS_MAX_CONNECTIONS", "8")
+    monkeypatch.setenv("REDIS_HEALTH_CHECK_INTERVAL", "15")
+    mock_redis_class.return_value = mock_redis
+
+    cm = CacheManager()
+
+    kwargs = mock_redis_class.call_args.kwargs
+    assert cm.enabled is True
+    assert kwargs["max_connections"] == 8
+    assert kwargs["health_check_interval"] == 15
+    assert kwargs["socket_keepalive"] is True
+
+
+# SUMMARY: Ensures connect() works with REDIS_URL.
+# EDGE CASE: URL mode must not depend on discrete host/port variables.
+@patch("redis.from_url")
+def test_connect_with_url(mock_from_url, mock_redis, monkeypatch):
+    monkeypatch.setenv("REDIS_URL", "redis://cache.internal:6380/0")
+    mock_from_url.return_value = mock_redis
+
+    cm = CacheManager()
+
+    assert cm.enabled is True
+    assert mock_from_url.call_args.kwargs["max_connections"] == 50
+
+
+# SUMMARY: Ensures get_many() fetches all keys with a single MGET.
+# EDGE CASE: Misses are reported as None alongside decoded hits.
+def test_get_many_success(mock_redis):
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+
+    mock_redis.mget.return_value = [json.dumps([1, 2]), None]
+
+    assert cm.get_many(["a", "b"]) == {"a": [1, 2], "b": None}
+    mock_redis.mget.assert_called_once_with(["a", "b"])
+
+
+# SUMMARY: Ensures get_many() degrades to all-miss on errors or when disabled.
+# EDGE CASE: redis.mget raises → every key maps to None.
+def test_get_many_error_and_disabled(mock_redis):
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+    mock_redis.mget.side_effect = Exception("boom")
+
+    assert cm.get_many(["a"]) == {"a": None}
+
+    cm.enabled = False
+    assert cm.get_many(["a", "b"]) == {"a": None, "b": None}
+
+
+# SUMMARY: Ensures set_many() pipelines SETEX with per-key TTLs.
+# EDGE CASE: Keys missing from the TTL dict fall back to the default TTL.
+def test_set_many_per_key_ttl(mock_redis):
+    pipe = MagicMock()
+    mock_redis.pipeline.return_value = pipe
+
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+
+    assert cm.set_many({"a": 1, "b": 2}, ttl_seconds={"a": 60}) is True
+    mock_redis.pipeline.assert_called_once_with(transaction=False)
+    pipe.setex.assert_any_call("a", 60, "1")
+    pipe.setex.assert_any_call("b", 3600, "2")
+    pipe.execute.assert_called_once()
+
+
+# SUMMARY: Ensures set_many() handles disabled cache and pipeline errors.
+# EDGE CASE: pipeline.execute raises → return False.
+def test_set_many_error(mock_redis):
+    pipe = MagicMock()
+    pipe.execute.side_effect = Exception("fail")
+    mock_redis.pipeline.return_value = pipe
+
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+
+    assert cm.set_many({"a": 1}) is False
+
+    cm.enabled = False
+    assert cm.set_many({"a": 1}) is False
+
+
 # SUMMARY: Ensures delete() respects disabled state.
 # EDGE CASE: enabled=False → no Redis call.
 def test_delete_disabled():
@@ -175,6 +272,23 @@ def test_delete_pattern_error(mock_redis):
     assert cm.delete_pattern("rec:*") is False
 
 
+# SUMMARY: Ensures get_registered() returns the values of every key listed in the registry set.
+# EDGE CASE: Keys that expired are left out and removed from the registry; errors → {}.
+def test_get_registered(mock_redis):
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+    mock_redis.smembers.return_value = {"trending:sketch:a", "trending:sketch:b"}
+    mock_redis.mget.return_value = [json.dumps({"n": 1}), None]
+
+    assert cm.get_registered("trending:sketches") == {"trending:sketch:a": {"n": 1}}
+    mock_redis.srem.assert_called_once_with("trending:sketches", "trending:sketch:b")
+    mock_redis.keys.assert_not_called()
+
+    mock_redis.smembers.side_effect = Exception("boom")
+    assert cm.get_registered("trending:sketches") == {}
+
+
 # SUMMARY: Ensures clear_user_cache deletes multiple patterns.
 # EDGE CASE: Must call delete_pattern for both hybrid and collab keys.
 def test_clear_user_cache(mock_redis):
@@ -304,3 +418,114 @@ def test_cached_builds_key_correctly(mock_redis, monkeypatch):
     assert "multiply" in cached_key
     assert "5" in cached_key
     assert "y=10" in cached_key
+
+
+# SUMMARY: Ensures build_cache_key keeps the u=/a= layout used by the clear_* patterns.
+# EDGE CASE: None fields are omitted rather than rendered as "None".
+def test_build_cache_key_layout():
+    assert build_cache_key("collaborative", user_id="u1", top_n=30) == "rec:collaborative:u=u1:n=30"
+    assert build_cache_key("content", article_id="A1", top_n=10) == "rec:content:a=A1:n=10"
+    assert build_cache_key("trending", top_n=10, days=7) == "rec:trending:n=10:days=7"
+
+
+# SUMMARY: Ensures exclusion and seed sets are canonicalised before hashing.
+# EDGE CASE: Order and duplicates must not change the key; different sets must.
+def test_build_cache_key_canonical_sets():
+    k1 = build_cache_key("hybrid", user_id="u1", top_n=10, exclude_ids=["b", "a"], seed_ids=["s2", "s1"])
+    k2 = build_cache_key("hybrid", user_id="u1", top_n=10, exclude_ids=["a", "b", "a"], seed_ids=["s1", "s2"])
+    k3 = build_cache_key("hybrid", user_id="u1", top_n=10, exclude_ids=["a"], seed_ids=["s1", "s2"])
+
+    assert k1 == k2
+    assert k1 != k3
+    assert k1.startswith("rec:hybrid:u=u1:")
+
+
+# SUMMARY: Ensures apply_exclusions filters cached candidates and truncates.
+# EDGE CASE: Non-dict entries are passed through untouched.
+def test_apply_exclusions():
+    candidates = [{"id": "a"}, {"id": "b"}, {"id": "c"}, "raw"]
+
+    assert apply_exclusions(candidates, ["b"], 2) == [{"id": "a"}, {"id": "c"}]
+    assert apply_exclusions(candidates, [], 10) == candidates
+
+
+# SUMMARY: Ensures lookups and stores are counted per key family and tier.
+# EDGE CASE: Hits and misses from different families must not mix.
+def test_in_process_stats_per_family(mock_redis):
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+    cm.stats.reset()
+
+    mock_redis.get.side_effect = [json.dumps([1, 2, 3]), None, None]
+    cm.get("rec:content:a=1:n=30")
+    cm.get("rec:content:a=2:n=30")
+    cm.get("rec:trending:n=10:days=7")
+    cm.set("rec:content:a=2:n=30", [1])
+    cm.stats.record_compute("content", 0.5)
+    cm.stats.record_tier("negative", True)
+
+    snap = cm.stats.snapshot()
+    content = snap["families"]["content"]
+    assert content["hits"] == 1
+    assert content["misses"] == 1
+    assert content["stores"] == 1
+    assert content["hit_rate"] == pytest.approx(50.0)
+    assert content["avg_payload_bytes"] == pytest.approx((len("[1, 2, 3]") + len("[1]")) / 2)
+    assert content["compute_time_saved_seconds"] == pytest.approx(0.5)
+    assert snap["families"]["trending"]["misses"] == 1
+    assert snap["tiers"]["redis"] == {"hits": 1, "misses": 2, "hit_rate": pytest.approx(100 / 3)}
+    assert snap["tiers"]["negative"]["hits"] == 1
+
+
+# SUMMARY: Ensures get_cache_stats exposes the in-process breakdown.
+# EDGE CASE: Global Redis counters are still reported alongside.
+def test_stats_include_families(mock_redis):
+    mock_redis.info.return_value = {"keyspace_hits": 1, "keyspace_misses": 1}
+    mock_redis.mget.return_value = [None]
+
+    cm = CacheManager()
+    cm.enabled = True
+    cm.redis_client = mock_redis
+    cm.stats.reset()
+    cm.get_many(["rec:hybrid:u=u1:n=30"])
+
+    stats = cm.get_cache_stats()
+    assert stats["keyspace_hits"] == 1
+    assert stats["families"]["hybrid"]["misses"] == 1
+    assert "redis" in stats["tiers"]
+
+
+# SUMMARY: Ensures REDIS_BACKEND=local wires the in-process stand-in.
+# EDGE CASE: Real pipelining/MGET paths run end to end without a server.
+def test_local_backend_round_trip(monkeypatch):
+    monkeypatch.setenv("REDIS_BACKEND", "local")
+
+    cm = CacheManager()
+
+    assert cm.enabled is True
+    assert type(cm.redis_client).__name__ == "LocalRedis"
+    assert cm.set_many({"rec:content:a=1:n=30": [1], "rec:trending:n=10:days=7": [2]}, ttl_seconds=60)
+    assert cm.get_many(["rec:content:a=1:n=30", "rec:missing"]) == {
+        "rec:content:a=1:n=30": [1],
+        "rec:missing": None,
+    }
+    assert cm.redis_client.ttl("rec:trending:n=10:days=7") == 60
+    cm.clear_article_cache("1")
+    assert cm.get("rec:content:a=1:n=30") is None
+
+
+# SUMMARY: Trending rows carry pandas Timestamps and NumPy scores; they must still be cacheable.
+# EDGE CASE: json.dumps would raise TypeError and the entry would silently never be stored.
+def test_set_dataframe_row_values(monkeypatch):
+    import numpy as np
+    import pandas as pd
+    monkeypatch.setenv("REDIS_BACKEND", "local")
+
+    cm = CacheManager()
+    row = {"id": "t1", "published_at": pd.Timestamp("2025-01-01", tz="UTC"), "score": np.float64(0.5)}
+
+    assert cm.set("rec:trending:n=1:days=7", [row], ttl_seconds=60) is True
+    assert cm.get("rec:trending:n=1:days=7") == [
+        {"id": "t1", "published_at": "2025-01-01T00:00:00+00:00", "score": 0.5}
+    ]
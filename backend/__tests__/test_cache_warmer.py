@@ -0,0 +1,146 @@
+import pandas as pd
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backend.Ml_model.cache_warmer import CacheWarmer
+from backend.Ml_model.cache_manager import CacheManager, build_cache_key, cached_list_size
+from backend.Ml_model.local_redis import LocalRedis
+from backend.Ml_model.recommendation_requests import RecommendationRequest, serve_recommendations
+
+
+# FIXTURE: Recommendation service with canned batch results
+@pytest.fixture
+def mock_service():
+    svc = MagicMock()
+    svc.is_known_user.return_value = True
+    svc.is_known_article.return_value = True
+    svc.profile_version.return_value = None
+    svc.get_trending_articles.return_value = [{"id": "t1"}]
+    svc.get_collaborative_recommendations_batch.side_effect = lambda ids, top_n: {
+        u: [{"id": "a1", "relevance_score": 0.5}] for u in ids
+    }
+    svc.get_similar_articles_batch.side_effect = lambda ids, top_n: {
+        a: [{"id": "x", "similarity_score": 0.9}] for a in ids
+    }
+    return svc
+
+
+@pytest.fixture
+def activities():
+    return pd.DataFrame({
+        "user_id": ["u1", "u2", "u1", "u1", "u2", "u3"],
+        "article_id": ["a1", "a1", "a2", "a1", "a3", "a1"],
+    })
+
+
+@pytest.fixture
+def articles():
+    return pd.DataFrame({
+        "id": ["old", "new"],
+        "published_at": ["2024-01-01", "2025-01-01"],
+    })
+
+
+# SUMMARY: Users are selected by activity count, most active first.
+def test_select_users_by_activity(activities):
+    warmer = CacheWarmer(MagicMock(), service=MagicMock(), top_users=2)
+    assert warmer.select_users(activities) == ["u1", "u2"]
+
+
+# SUMMARY: Articles combine most viewed and most recent, without duplicates.
+def test_select_articles_viewed_then_recent(activities, articles):
+    warmer = CacheWarmer(MagicMock(), service=MagicMock(), top_articles=4)
+    assert warmer.select_articles(activities, articles) == ["a1", "a2", "a3", "new"]
+
+
+# SUMMARY: warm() stores personalized, content and trending keys in batches.
+# EDGE CASE: Keys must match the ones api_server reads.
+def test_warm_stores_expected_keys(mock_service, activities, articles):
+    cache = MagicMock()
+    cache.enabled = True
+    warmer = CacheWarmer(cache, service=mock_service, top_users=2, top_articles=2, batch_size=10)
+
+    report = warmer.warm(user_activities=activities, articles=articles)
+
+    stored = {}
+    for call in cache.set_many.call_args_list:
+        stored.update(call.args[0])
+    n = cached_list_size(10)
+    assert build_cache_key("collaborative", user_id="u1", top_n=n) in stored
+    assert build_cache_key("hybrid", user_id="u2", top_n=n) in stored
+    assert build_cache_key("content", article_id="a1", top_n=n) in stored
+    cache.set.assert_called_once()
+    assert report["users_warmed"] == 2
+    assert report["articles_warmed"] == 2
+    assert report["keys_warmed"] == 7
+    assert report["budget_exhausted"] is False
+
+
+# SUMMARY: warm() stops as soon as the budget is spent.
+# EDGE CASE: Zero time budget → nothing but trending is computed.
+def test_warm_respects_budget(mock_service, activities, articles):
+    cache = MagicMock()
+    cache.enabled = True
+    warmer = CacheWarmer(cache, service=mock_service, time_budget_seconds=0)
+
+    report = warmer.warm(user_activities=activities, articles=articles)
+
+    assert report["budget_exhausted"] is True
+    mock_service.get_collaborative_recommendations_batch.assert_not_called()
+    mock_service.get_similar_articles_batch.assert_not_called()
+
+
+# SUMMARY: warm() is a no-op when caching is disabled.
+def test_warm_cache_disabled(mock_service):
+    cache = MagicMock()
+    cache.enabled = False
+
+    report = CacheWarmer(cache, service=mock_service).warm()
+
+    assert report["keys_warmed"] == 0
+    mock_service.get_trending_articles.assert_not_called()
+
+
+# SUMMARY: Users with a short-term profile are warmed through the request path, under the pv key.
+# EDGE CASE: Unknown users (cold-start fallback) are not warmed.
+def test_warm_profile_users_with_version(mock_service, activities):
+    mock_service.profile_version.side_effect = lambda user_id: 4 if user_id == "u1" else None
+    mock_service.is_known_user.side_effect = lambda user_id: user_id != "u3"
+    mock_service.get_collaborative_recommendations.return_value = [{"id": "rt", "relevance_score": 0.9}]
+    mock_service.get_hybrid_recommendations.return_value = [{"id": "rt", "hybrid_score": 0.5}]
+    cache = MagicMock()
+    cache.enabled = True
+
+    report = CacheWarmer(cache, service=mock_service, top_users=3, top_articles=0).warm(user_activities=activities)
+
+    stored = {}
+    for call in cache.set_many.call_args_list:
+        stored.update(call.args[0])
+    n = cached_list_size(10)
+    assert stored[build_cache_key("collaborative", user_id="u1", top_n=n, pv=4)] == [{"id": "rt", "relevance_score": 0.9}]
+    assert build_cache_key("hybrid", user_id="u1", top_n=n, pv=4) in stored
+    assert build_cache_key("collaborative", user_id="u1", top_n=n) not in stored
+    assert not any(":u=u3:" in key for key in stored)
+    mock_service.get_collaborative_recommendations_batch.assert_called_once_with(["u2"], top_n=n)
+    assert report["users_warmed"] == 2
+
+
+# SUMMARY: A warmed personalized key is the one a real request reads.
+def test_warmed_key_hit_by_request(mock_service, activities):
+    mock_service.profile_version.side_effect = lambda user_id: 2 if user_id == "u1" else None
+    mock_service.get_collaborative_recommendations.return_value = [{"id": "rt", "relevance_score": 0.9}]
+    mock_service.get_hybrid_recommendations.return_value = [{"id": "rt", "hybrid_score": 0.5}]
+    with patch("backend.Ml_model.cache_manager.create_redis_client", return_value=(LocalRedis(), "local")):
+        cache = CacheManager()
+    CacheWarmer(cache, service=mock_service, top_users=2, top_articles=0).warm(user_activities=activities)
+    mock_service.reset_mock(return_value=False, side_effect=False)
+
+    for user_id in ("u1", "u2"):
+        for method in ("collaborative", "hybrid"):
+            rec_request = RecommendationRequest({"method": method, "user_id": user_id})
+            key_fields, compute, ttl, _ = rec_request.plan(mock_service)
+            recs, from_cache = serve_recommendations(cache, key_fields, compute, rec_request.top_n, [], ttl)
+            assert from_cache is True, (user_id, method)
+            assert recs
+    mock_service.get_collaborative_recommendations.assert_not_called()
+    mock_service.get_hybrid_recommendations.assert_not_called()
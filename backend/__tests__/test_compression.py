@@ -0,0 +1,75 @@
+import gzip
+
+import pytest
+
+from backend.Ml_model import compression
+from backend.Ml_model.compression import PrecompressedCache, choose_encoding, compress, should_compress
+
+
+# TEST CASES
+
+def test_choose_encoding_gzip(monkeypatch):
+    """SUMMARY: gzip is chosen when offered; identity when nothing we support is accepted"""
+    monkeypatch.setattr(compression, "HAS_BROTLI", False)
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("br") is None
+    assert choose_encoding("") is None
+    assert choose_encoding(None) is None
+
+
+def test_choose_encoding_q_values(monkeypatch):
+    """EDGE CASE: q=0 refuses a coding; the wildcard covers unnamed codings; higher q wins"""
+    monkeypatch.setattr(compression, "HAS_BROTLI", True)
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") == "br"
+    assert choose_encoding("br;q=0.5, gzip") == "gzip"
+    assert choose_encoding("br, gzip;q=0.8") == "br"
+    assert choose_encoding("gzip;q=abc") is None
+
+
+def test_gzip_round_trip_is_deterministic():
+    """SUMMARY: gzip output decompresses to the input and is identical across calls"""
+    body = b'{"recommendations":[' + b'{"id":"a","title":"x"},' * 200 + b"{}]}"
+    packed = compress(body, "gzip")
+    assert gzip.decompress(packed) == body
+    assert packed == compress(body, "gzip")
+    assert len(packed) < len(body) // 5
+
+
+def test_unsupported_encoding_raises():
+    """EDGE CASE: Only codings choose_encoding can return are accepted"""
+    with pytest.raises(ValueError):
+        compress(b"x", "deflate")
+
+
+def test_should_compress_threshold_and_type():
+    """SUMMARY: Only JSON/text bodies at or above the threshold are compressed"""
+    size = compression.MIN_COMPRESS_BYTES
+    assert should_compress("application/json", size)
+    assert should_compress("text/plain; charset=utf-8", size)
+    assert not should_compress("application/json", size - 1)
+    assert not should_compress("image/png", size)
+    assert not should_compress(None, size)
+
+
+def test_precompressed_cache_lru_by_bytes():
+    """SUMMARY: Entries are evicted least-recently-used first once the byte budget is exceeded"""
+    cache = PrecompressedCache(max_bytes=10)
+    cache.put('W/"a"', "gzip", b"aaaa")
+    cache.put('W/"b"', "gzip", b"bbbb")
+    assert cache.get('W/"a"', "gzip") == b"aaaa"
+    cache.put('W/"c"', "gzip", b"cccc")
+
+    assert cache.get('W/"b"', "gzip") is None
+    assert cache.get('W/"a"', "gzip") == b"aaaa"
+    assert cache.get('W/"a"', "br") is None
+    snapshot = cache.snapshot()
+    assert snapshot["entries"] == 2 and snapshot["bytes"] == 8
+    assert snapshot["hits"] == 2 and snapshot["misses"] == 2
+
+
+def test_precompressed_cache_skips_oversized():
+    """EDGE CASE: A body larger than the whole budget is not cached"""
+    cache = PrecompressedCache(max_bytes=4)
+    cache.put('W/"a"', "gzip", b"too large")
+    assert cache.snapshot()["entries"] == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model.facet_index import FacetIndex, facet_key_fields, parse_facet_filters
+
+
+@pytest.fixture
+def metadata():
+    return pd.DataFrame([
+        {"id": "a", "topic": "Sports", "place": "India", "source_id": 1, "language_code": "en"},
+        {"id": "b", "topic": "Tech", "place": None, "source_id": 2, "language_code": "en"},
+        {"id": "c", "topic": " sports ", "place": "UK", "source_id": 2, "language_code": "hi"},
+        {"id": "d", "topic": None, "place": "india", "source_id": 3, "language_code": "en"},
+    ])
+
+
+# SUMMARY: Values within a facet are OR-ed, facets are AND-ed.
+def test_mask_intersections(metadata):
+    index = FacetIndex.build(metadata)
+    assert index.values("topic") == ["sports", "tech"]
+    assert list(index.mask({"topic": ("sports",)})) == [True, False, True, False]
+    assert list(index.mask({"topic": ("sports", "tech"), "language_code": ("en",)})) == [True, True, False, False]
+    assert list(index.mask({"place": ("india",), "source_id": ("3",)})) == [False, False, False, True]
+    assert index.mask({}) is None
+
+
+# EDGE CASE: Unknown values and unindexed facets match nothing
+def test_unknown_values(metadata):
+    index = FacetIndex.build(metadata[["id", "topic"]])
+    assert not index.mask({"topic": ("weather",)}).any()
+    assert not index.mask({"language_code": ("en",)}).any()
+
+
+# EDGE CASE: Bitmaps across byte boundaries match a per-value comparison, missing values set no bits.
+def test_bitmaps_match_rows():
+    rng = np.random.default_rng(0)
+    topics = [None if t == 0 else f"t{t}" for t in rng.integers(0, 12, 203)]
+    index = FacetIndex.build(pd.DataFrame({"id": range(203), "topic": topics}))
+    assert index.values("topic") == sorted(set(topics) - {None})
+    for value in index.values("topic"):
+        assert list(index.mask({"topic": (value,)})) == [t == value for t in topics]
+
+
+# SUMMARY: Bitmaps survive a save/load round trip and are tied to the rows they were built for.
+def test_save_load_round_trip(metadata, tmp_path):
+    index = FacetIndex.build(metadata)
+    index.save(tmp_path / "facets.npz")
+    loaded = FacetIndex.load(tmp_path / "facets.npz")
+    for filters in ({"topic": ("sports",)}, {"place": ("india", "uk"), "language_code": ("en",)}):
+        assert np.array_equal(loaded.mask(filters), index.mask(filters))
+    assert loaded.matches(metadata)
+    assert not loaded.matches(metadata.iloc[::-1])
+
+
+# SUMMARY: Request params become normalized filters and stable cache key fields.
+def test_parse_facet_filters():
+    filters = parse_facet_filters({"topic": "Tech, sports", "place": " ", "source_id": ["2", "1"], "user_id": "u"})
+    assert filters == {"topic": ("sports", "tech"), "source_id": ("1", "2")}
+    assert facet_key_fields(filters) == {"topic": "sports|tech", "source_id": "1|2"}
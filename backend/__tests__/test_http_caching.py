@@ -0,0 +1,49 @@
+from backend.Ml_model.http_caching import (
+    TRENDING_MAX_AGE,
+    cache_control,
+    etag_matches,
+    make_etag,
+    trending_bucket,
+)
+
+
+# TEST CASES
+
+def test_etag_depends_on_model_version_and_key():
+    """SUMMARY: Same model + key gives the same weak ETag; a retrain or other key changes it"""
+    etag = make_etag("2025-01-01", "rec:content:a=1:n=30")
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag("2025-01-01", "rec:content:a=1:n=30")
+    assert etag != make_etag("2025-01-02", "rec:content:a=1:n=30")
+    assert etag != make_etag("2025-01-01", "rec:content:a=2:n=30")
+
+
+def test_no_etag_without_model_version():
+    """EDGE CASE: Without a known model version responses cannot be validated"""
+    assert make_etag(None, "rec:content:a=1:n=30") is None
+    assert make_etag("", "rec:content:a=1:n=30") is None
+
+
+def test_etag_matches_weak_comparison():
+    """SUMMARY: If-None-Match lists, W/ prefixes and * all match per weak comparison"""
+    etag = make_etag("v1", "k")
+    opaque = etag[2:]
+    assert etag_matches(etag, etag)
+    assert etag_matches(opaque, etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(etag, None)
+
+
+def test_trending_bucket_rolls_with_max_age():
+    """EDGE CASE: Trending validators change once per max-age window"""
+    start = 1_700_000_000 - (1_700_000_000 % TRENDING_MAX_AGE)
+    assert trending_bucket(start) == trending_bucket(start + TRENDING_MAX_AGE - 1)
+    assert trending_bucket(start) != trending_bucket(start + TRENDING_MAX_AGE)
+
+
+def test_cache_control_value():
+    """SUMMARY: Shared caches may store the response for max_age seconds"""
+    assert cache_control(600) == "public, max-age=600"
@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from backend.Ml_model.local_redis import LocalRedis, AsyncLocalRedis
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# FIXTURE: LocalRedis driven by a controllable clock
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def client(clock):
+    return LocalRedis(max_keys=3, clock=clock)
+
+
+# SUMMARY: Basic string round trip and hit/miss accounting.
+def test_set_get_and_info(client):
+    assert client.ping() is True
+    client.set("a", "1")
+
+    assert client.get("a") == "1"
+    assert client.get("missing") is None
+    info = client.info("stats")
+    assert info["keyspace_hits"] == 1
+    assert info["keyspace_misses"] == 1
+
+
+# SUMMARY: Keys expire once their TTL has elapsed.
+# EDGE CASE: ttl() reports -1 for persistent keys and -2 for missing ones.
+def test_ttl_expiry(client, clock):
+    client.setex("k", 10, "v")
+    client.set("p", "v")
+
+    assert client.ttl("k") == 10
+    assert client.ttl("p") == -1
+    clock.now += 10
+    assert client.get("k") is None
+    assert client.ttl("k") == -2
+    assert client.info()["expired_keys"] == 1
+
+
+# SUMMARY: Least recently used keys are evicted beyond max_keys.
+# EDGE CASE: A read refreshes recency and protects the key.
+def test_lru_eviction(client):
+    for key in ("a", "b", "c"):
+        client.set(key, key)
+    client.get("a")
+    client.set("d", "d")
+
+    assert client.get("b") is None
+    assert client.mget(["a", "c", "d"]) == ["a", "c", "d"]
+    assert client.info()["evicted_keys"] == 1
+
+
+# SUMMARY: Pipelines queue commands and return results in order on execute().
+def test_pipeline(client):
+    pipe = client.pipeline(transaction=False)
+    pipe.setex("x", 5, "1")
+    pipe.get("x")
+    pipe.delete("x")
+
+    assert client.get("x") is None
+    assert pipe.execute() == [True, "1", 1]
+    assert len(pipe) == 0
+
+
+# SUMMARY: keys() follows Redis glob semantics used by delete_pattern.
+def test_keys_pattern(client):
+    client.set("rec:content:a=1:n=30", "x")
+    client.set("rec:hybrid:u=1:n=30", "y")
+
+    assert client.keys("rec:content:*a=1:*") == ["rec:content:a=1:n=30"]
+    assert client.delete(*client.keys("rec:*")) == 2
+    assert client.dbsize() == 0
+
+
+# SUMMARY: The asyncio facade awaits commands and pipelines against the same store.
+def test_async_facade(client):
+    async_client = AsyncLocalRedis(client)
+
+    async def run():
+        pipe = async_client.pipeline(transaction=False)
+        pipe.setex("k1", 5, "1").setex("k2", 5, "2")
+        await pipe.execute()
+        return await async_client.mget(["k1", "k2", "k3"])
+
+    assert asyncio.run(run()) == ["1", "2", None]
+    assert client.get("k1") == "1"
+
+
+# SUMMARY: Hash fields support HSETNX/HINCRBY/HINCRBYFLOAT and expire with their key.
+def test_hashes(client, clock):
+    assert client.hsetnx("h", "landmark", 5) == 1
+    assert client.hsetnx("h", "landmark", 6) == 0
+    assert client.hincrbyfloat("h", "w", 0.5) == 0.5
+    assert client.hincrbyfloat("h", "w", 1.0) == 1.5
+    assert client.hincrby("h", "version", 1) == 1
+    assert client.hgetall("h") == {"landmark": "5", "w": "1.5", "version": "1"}
+    assert client.hget("h", "missing") is None
+
+    pipe = client.pipeline()
+    pipe.delete("h").hset("h", mapping={"landmark": 7}).expire("h", 10)
+    pipe.execute()
+    assert client.hgetall("h") == {"landmark": "7"}
+    clock.now += 11
+    assert client.hgetall("h") == {}
+
+
+# SUMMARY: Sets support SADD/SREM/SMEMBERS; removing the last member removes the key.
+def test_sets(client, clock):
+    assert client.sadd("s", "a", "b") == 2
+    assert client.sadd("s", "b", "c") == 1
+    assert client.smembers("s") == {"a", "b", "c"}
+    assert client.srem("s", "a", "missing") == 1
+    assert client.smembers("missing") == set()
+
+    client.expire("s", 10)
+    clock.now += 11
+    assert client.smembers("s") == set()
+
+    client.sadd("t", "x")
+    client.srem("t", "x")
+    assert client.exists("t") == 0
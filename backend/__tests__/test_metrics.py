@@ -0,0 +1,96 @@
+import gc
+import threading
+
+from backend.Ml_model.metrics import Counter, Gauge, Histogram, method_label, render_metrics
+
+
+# TEST CASES
+
+def test_histogram_buckets_are_cumulative():
+    """SUMMARY: Rendered bucket counts are cumulative and end with +Inf == _count"""
+    hist = Histogram("t_latency_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value, route="/x")
+
+    lines = hist.render()
+    assert 't_latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 't_latency_seconds_bucket{route="/x",le="1"} 3' in lines
+    assert 't_latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 't_latency_seconds_count{route="/x"} 4' in lines
+    assert 't_latency_seconds_sum{route="/x"} 4.05' in lines
+
+
+def test_bucket_boundary_is_inclusive():
+    """EDGE CASE: A value equal to a bucket bound lands in that bucket (le = less or equal)"""
+    hist = Histogram("t_edge_seconds", "test", buckets=(0.1, 1.0))
+    hist.observe(0.1)
+    assert "t_edge_seconds_bucket{le=\"0.1\"} 1" in hist.render()
+
+
+def test_shards_merge_across_threads():
+    """SUMMARY: Each thread writes its own shard; scrapes see the sum"""
+    counter = Counter("t_requests_total", "test", ("status",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(status="200")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counter.value(status="200") == 8000
+    # Exited threads' shards are folded into the base shard
+    gc.collect()
+    assert len(counter._shards) == 1
+
+
+def test_exited_thread_shards_are_folded():
+    """EDGE CASE: Many short-lived threads leave one base shard behind, and no counts are lost"""
+    hist = Histogram("t_short_lived_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, route="/x")
+
+    for _ in range(20):
+        batch = [threading.Thread(target=hist.observe, args=(0.5,), kwargs={"route": "/x"}) for _ in range(10)]
+        for t in batch:
+            t.start()
+        for t in batch:
+            t.join()
+    gc.collect()
+
+    assert hist.count(route="/x") == 201
+    assert len(hist._shards) == 2  # base + the main thread's live shard
+    assert 't_short_lived_seconds_bucket{route="/x",le="+Inf"} 201' in hist.render()
+
+
+def test_gauge_tracks_in_progress():
+    """SUMMARY: In-flight gauge goes up inside the block and back to zero after"""
+    gauge = Gauge("t_in_flight", "test", ("route",))
+    with gauge.track_inprogress(route="/x"):
+        assert gauge.value(route="/x") == 1
+    assert gauge.value(route="/x") == 0
+
+
+def test_label_values_are_escaped():
+    """EDGE CASE: Quotes, backslashes and newlines in label values are escaped"""
+    counter = Counter("t_escaped_total", "test", ("route",))
+    counter.inc(route='a"b\\c\nd')
+    assert 't_escaped_total{route="a\\"b\\\\c\\nd"} 1' in counter.render()
+
+
+def test_method_label_bounds_cardinality():
+    """EDGE CASE: Unknown recommendation methods collapse to 'other'"""
+    assert method_label("hybrid") == "hybrid"
+    assert method_label("made-up") == "other"
+    assert method_label(None) == ""
+
+
+def test_render_metrics_model_gauges():
+    """SUMMARY: Model gauges report unknown version when no metadata was found"""
+    text = render_metrics(cache_stats={"enabled": False}, models_loaded=False, model_version=None)
+    assert "newsxpress_ml_cache_enabled 0" in text
+    assert "newsxpress_ml_models_loaded 0" in text
+    assert 'newsxpress_ml_model_info{version="unknown"} 1' in text
+    assert text.endswith("\n")
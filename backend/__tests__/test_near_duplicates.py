@@ -0,0 +1,35 @@
+import numpy as np
+
+from backend.Ml_model.near_duplicates import MinHasher, cluster_near_duplicates, shingles
+
+
+STORY = "India beat Australia by six wickets in the third test at Melbourne on Sunday to take the series lead"
+
+
+# SUMMARY: The same story from several sources collapses into the cluster of its first copy.
+def test_clusters_near_duplicates():
+    texts = [
+        STORY,
+        "Parliament passes the new budget bill after a long debate in the lower house",
+        STORY + " says Reuters",
+        "Breaking: " + STORY,
+        "Heavy rain floods streets across Mumbai as schools close for the day",
+    ]
+    assert list(cluster_near_duplicates(texts)) == [0, 1, 0, 0, 4]
+
+
+# EDGE CASE: Texts without words are never clustered together
+def test_empty_texts_stay_apart():
+    assert list(cluster_near_duplicates(["", "  ", STORY, "!!"])) == [0, 1, 2, 3]
+
+
+# SUMMARY: Matching signature positions estimate the Jaccard similarity of shingle sets.
+def test_signature_estimates_jaccard():
+    a = set(range(0, 300))
+    b = set(range(100, 400))
+    hasher = MinHasher(num_perm=512)
+    sig_a = hasher.signature(np.array(sorted(a), dtype=np.uint64))
+    sig_b = hasher.signature(np.array(sorted(b), dtype=np.uint64))
+    assert abs(np.mean(sig_a == sig_b) - 0.5) < 0.08
+    assert len(shingles("one two")) == 1
+    assert len(shingles("one two three four")) == 2
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from backend.Ml_model.profiler import ProfilerBusy, SamplingProfiler
+
+
+def busy_scoring_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_scoring_loop, args=(stop,), name="scoring-test")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+# TEST CASES
+
+def test_profiler_captures_busy_thread(busy_thread):
+    """SUMMARY: Samples of a CPU-bound thread show up as collapsed stacks rooted at the thread name"""
+    profiler = SamplingProfiler(interval=0.005)
+    stacks = profiler.run(0.2)
+
+    assert profiler.samples > 5
+    busy = [s for s in stacks if "busy_scoring_loop" in s]
+    assert busy
+    assert all(s.startswith("scoring-test;") for s in busy)
+
+    line = profiler.collapsed().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) >= 1 and ";" in stack
+
+
+def test_profiler_skips_idle_threads():
+    """EDGE CASE: Threads parked in Event.wait are dropped unless include_idle is set"""
+    stop = threading.Event()
+    idle = threading.Thread(target=stop.wait, name="idle-test")
+    idle.start()
+    try:
+        quiet = SamplingProfiler(interval=0.005).run(0.05)
+        noisy = SamplingProfiler(interval=0.005, include_idle=True).run(0.05)
+    finally:
+        stop.set()
+        idle.join()
+
+    assert not any(s.startswith("idle-test;") for s in quiet)
+    assert any(s.startswith("idle-test;") for s in noisy)
+
+
+def test_profiler_excludes_caller_thread():
+    """EDGE CASE: The thread waiting on run() is not sampled"""
+    stacks = SamplingProfiler(interval=0.005, include_idle=True).run(0.05)
+    assert not any("test_profiler_excludes_caller_thread" in s for s in stacks)
+
+
+def test_start_samples_the_starting_thread():
+    """SUMMARY: A background profile returns at once and samples the thread that started it (sync workers)"""
+    done = []
+    profiler = SamplingProfiler(interval=0.005).start(0.2, on_done=done.append)
+    assert profiler.running
+    stop = threading.Event()
+    threading.Timer(0.15, stop.set).start()
+    busy_scoring_loop(stop)
+    profiler.join()
+
+    assert done == [profiler]
+    assert not profiler.running
+    assert any("busy_scoring_loop" in s for s in profiler.stacks)
+
+
+def test_one_profile_at_a_time(busy_thread):
+    """EDGE CASE: A second concurrent profile is refused instead of doubling overhead"""
+    first = threading.Thread(target=SamplingProfiler().run, args=(0.3,))
+    first.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(ProfilerBusy):
+            SamplingProfiler().run(0.05)
+    finally:
+        first.join()
+
+
+def test_summary_top_frames(busy_thread):
+    """SUMMARY: Summary reports sample counts and the hottest leaf frames"""
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.run(0.1)
+    summary = profiler.summary(top=5)
+    assert summary["samples"] == profiler.samples
+    assert len(summary["top_frames"]) <= 5
+    assert summary["top_frames"][0]["samples"] >= summary["top_frames"][-1]["samples"]
@@ -679,3 +679,313 @@ def test_collab_auto_load_but_models_missing(monkeypatch):
 
     result = svc.get_collaborative_recommendations("user1")
     assert result == []  # early exit branch
+
+
+# EDGE CASE: Batch content scoring matches the single-article path
+def test_similar_articles_batch_matches_single(simple_sig_matrix, simple_indices, simple_article_metadata):
+    """
+    Test Case: get_similar_articles_batch() for several seeds.
+    Purpose: Ensures batch scoring returns the same ranking as get_similar_articles().
+    Importance: Cache warming stores batch results under the single-path keys.
+    """
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.sig_matrix = simple_sig_matrix
+    svc.indices = simple_indices
+    svc.article_metadata = simple_article_metadata
+
+    batch = svc.get_similar_articles_batch(["a", "b", "missing"], top_n=1)
+
+    assert set(batch) == {"a", "b"}
+    assert [r["id"] for r in batch["a"]] == [r["id"] for r in svc.get_similar_articles("a", top_n=1)]
+    assert batch["b"][0]["id"] == "a"
+
+
+# EDGE CASE: Batch CF scoring matches the single-user path
+def test_collaborative_batch_matches_single(
+    simple_user_sim_matrix, simple_user_features, simple_article_features, simple_article_metadata
+):
+    """
+    Test Case: get_collaborative_recommendations_batch() for several users.
+    Purpose: Ensures one matrix product reproduces the per-user scores.
+    Importance: Cache warming relies on the batch path being equivalent.
+    """
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.user_sim_matrix = simple_user_sim_matrix
+    svc.user_features = simple_user_features
+    svc.article_features = simple_article_features
+    svc.article_metadata = simple_article_metadata
+
+    batch = svc.get_collaborative_recommendations_batch(["user1", "user2", "ghost"], top_k=1, top_n=2)
+    single = svc.get_collaborative_recommendations("user1", top_k=1, top_n=2)
+
+    assert set(batch) == {"user1", "user2"}
+    assert [r["id"] for r in batch["user1"]] == [r["id"] for r in single]
+    assert batch["user1"][0]["relevance_score"] == pytest.approx(single[0]["relevance_score"])
+
+
+# EDGE CASE: Batch paths with missing models → empty dict
+def test_batch_paths_without_models():
+    """
+    Test Case: Batch methods when models are missing.
+    Purpose: Must return {} instead of raising.
+    Importance: Warming runs right after training, which may have failed partially.
+    """
+    svc = RecommendationService()
+    svc.models_loaded = True
+
+    assert svc.get_similar_articles_batch(["a"]) == {}
+    assert svc.get_collaborative_recommendations_batch(["user1"]) == {}
+
+
+# EDGE CASE: Membership checks used for negative caching
+def test_is_known_user_and_article(simple_user_sim_matrix, simple_indices):
+    """
+    Test Case: is_known_user() / is_known_article().
+    Purpose: API decides between model path and cold-start fallback with these.
+    Importance: Unknown ids must not reach the model code path.
+    """
+    svc = RecommendationService()
+    svc.models_loaded = True
+    assert svc.is_known_user("user1") is False
+
+    svc.user_sim_matrix = simple_user_sim_matrix
+    svc.indices = simple_indices
+    assert svc.is_known_user("user1") is True
+    assert svc.is_known_user("ghost") is False
+    assert svc.is_known_article("a") is True
+    assert svc.is_known_article("zzz") is False
+
+
+# EDGE CASE: Cold-start prefers the requested topic, then tops up with trending
+def test_cold_start_topic_then_trending():
+    """
+    Test Case: get_cold_start_recommendations() with a topic.
+    Purpose: Topic matches come first, trending fills the rest without duplicates.
+    Importance: New users should still see something relevant.
+    """
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.article_metadata = pd.DataFrame([
+        {"id": "s1", "topic": "Sports", "place": "uk", "published_at": now - pd.Timedelta(hours=2)},
+        {"id": "p1", "topic": "Politics", "place": "us", "published_at": now - pd.Timedelta(hours=1)},
+        {"id": "s2", "topic": "sports", "place": "us", "published_at": now},
+    ])
+
+    recs = svc.get_cold_start_recommendations(top_n=3, topic="SPORTS")
+    assert [r["id"] for r in recs] == ["s2", "s1", "p1"]
+
+    recs = svc.get_cold_start_recommendations(top_n=1, topic="sports", place="uk")
+    assert [r["id"] for r in recs] == ["s1"]
+
+
+# EDGE CASE: Tracked activity shifts collaborative scores before the next retrain
+def test_collaborative_blends_short_term_profile(
+    simple_user_sim_matrix,
+    simple_user_features,
+    simple_article_features,
+    simple_article_metadata,
+):
+    """
+    Test Case: Short-term profile blended into the collaborative profile.
+    Purpose: Articles matching recent reads gain relevance.
+    Importance: Real-time personalization between retrains.
+    """
+    from backend.Ml_model.user_profiles import ShortTermProfileStore
+
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.user_sim_matrix = simple_user_sim_matrix
+    svc.user_features = simple_user_features
+    svc.article_features = simple_article_features
+    svc.article_metadata = simple_article_metadata
+    svc.short_term_profiles = ShortTermProfileStore(simple_article_features)
+
+    before = {r["id"]: r["relevance_score"] for r in svc.get_collaborative_recommendations("user1", top_n=2)}
+    assert svc.record_activity("user1", "a", "share") is True
+    after = {r["id"]: r["relevance_score"] for r in svc.get_collaborative_recommendations("user1", top_n=2)}
+
+    assert after["a"] > before["a"]
+    assert svc.profile_version("user1") == 1
+
+
+# EDGE CASE: New user with tracked activity gets personalized results
+def test_unknown_user_with_short_term_profile(simple_article_features, simple_article_metadata):
+    """
+    Test Case: User missing from the similarity matrix but with recent reads.
+    Purpose: Recommendations come from the short-term profile alone.
+    Importance: New users stop falling back to cold start after their first reads.
+    """
+    from backend.Ml_model.user_profiles import ShortTermProfileStore
+
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.user_sim_matrix = pd.DataFrame()
+    svc.article_features = simple_article_features
+    svc.article_metadata = simple_article_metadata
+    svc.short_term_profiles = ShortTermProfileStore(simple_article_features)
+
+    assert svc.is_known_user("new") is False
+    svc.record_activity("new", "b")
+    assert svc.is_known_user("new") is True
+    recs = svc.get_collaborative_recommendations("new", top_n=1)
+    assert recs[0]["id"] == "b"
+
+
+def test_read_model_version(monkeypatch, tmp_path):
+    """
+    Test Case: Model version comes from trained_at in training_metadata.csv
+    Purpose: /metrics reports which training run is being served
+    Importance: A missing metadata file must not break model loading
+    """
+    import backend.Ml_model.Recommender_Models as rm
+
+    monkeypatch.setattr(rm, "MODELS_DIR", tmp_path)
+    service = RecommendationService()
+    assert service._read_model_version() is None
+
+    pd.DataFrame([{"trained_at": "2025-01-01T00:00:00", "n_articles": 2}]).to_csv(
+        tmp_path / "training_metadata.csv", index=False
+    )
+    assert service._read_model_version() == "2025-01-01T00:00:00"
+
+
+def test_hybrid_stops_at_deadline(monkeypatch):
+    """
+    Test Case: Hybrid skips remaining content seeds once the request deadline has passed
+    Purpose: A slow hybrid request answers with partial results instead of timing out
+    Importance: Partial results are flagged so they are not cached
+    """
+    import backend.Ml_model.Recommender_Models as rm
+
+    degraded = []
+    monkeypatch.setattr(rm, "deadline_expired", lambda: True)
+    monkeypatch.setattr(rm, "mark_degraded", lambda: degraded.append(True))
+
+    service = RecommendationService()
+    service.models_loaded = True
+    service.sig_matrix = np.eye(2)
+    monkeypatch.setattr(service, "get_collaborative_recommendations",
+                        lambda *a, **k: [{"id": "c1", "relevance_score": 1.0}])
+    similar = []
+    monkeypatch.setattr(service, "get_similar_articles",
+                        lambda article_id, **k: similar.append(article_id) or [])
+
+    recs = service.get_hybrid_recommendations("u1", recent_article_ids=["a", "b"])
+
+    assert [r["id"] for r in recs] == ["c1"]
+    assert similar == []
+    assert degraded == [True]
+
+
+# EDGE CASE: max_age_days drops old articles from content and hybrid results
+def test_recency_filter_content_and_hybrid(simple_user_sim_matrix, simple_user_features, simple_article_features):
+    """
+    Test Case: max_age_days on get_similar_articles() and get_hybrid_recommendations().
+    Purpose: Only articles inside the window are recommended.
+    Importance: The time-index lookup replaces per-call frame filtering.
+    """
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.article_metadata = pd.DataFrame([
+        {"id": "a", "published_at": now},
+        {"id": "b", "published_at": now - pd.Timedelta(days=10)},
+        {"id": "c", "published_at": now - pd.Timedelta(days=1)},
+    ])
+    svc.indices = pd.Series([0, 1, 2], index=["a", "b", "c"])
+    svc.sig_matrix = np.array([[1.0, 0.9, 0.5], [0.9, 1.0, 0.4], [0.5, 0.4, 1.0]])
+
+    assert [r["id"] for r in svc.get_similar_articles("a", top_n=5)] == ["b", "c"]
+    recs = svc.get_similar_articles("a", top_n=5, max_age_days=7)
+    assert [r["id"] for r in recs] == ["c"]
+    assert recs[0]["similarity_score"] == pytest.approx(0.5)
+
+    # Boosting freshness can reorder without filtering
+    boosted = svc.get_similar_articles("a", top_n=5, recency_boost=1.0)
+    assert [r["id"] for r in boosted] == ["c", "b"]
+
+    svc.get_collaborative_recommendations = lambda *a, **k: [
+        {"id": "b", "relevance_score": 1.0},
+        {"id": "c", "relevance_score": 0.2},
+    ]
+    hybrid = svc.get_hybrid_recommendations("user1", recent_article_ids=["a"], max_age_days=7)
+    assert [r["id"] for r in hybrid] == ["c"]
+
+
+# SUMMARY: Facet filters restrict content, collaborative and trending results before top-K
+def test_facet_filters_on_every_method(simple_user_sim_matrix, simple_user_features):
+    """
+    Test Case: filters on get_similar_articles(), get_collaborative_recommendations() and get_trending_articles().
+    Purpose: Only articles matching every facet (any value within a facet) are recommended.
+    Importance: Clients no longer over-fetch and filter by topic/source themselves.
+    """
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.article_metadata = pd.DataFrame([
+        {"id": "a", "topic": "Sports", "source_id": 1, "language_code": "en", "published_at": now},
+        {"id": "b", "topic": "Tech", "source_id": 1, "language_code": "en", "published_at": now},
+        {"id": "c", "topic": "sports", "source_id": 2, "language_code": "hi", "published_at": now},
+        {"id": "d", "topic": "Politics", "source_id": 2, "language_code": "en", "published_at": now},
+    ])
+    svc.indices = pd.Series([0, 1, 2, 3], index=["a", "b", "c", "d"])
+    svc.sig_matrix = np.array([
+        [1.0, 0.9, 0.5, 0.7], [0.9, 1.0, 0.4, 0.3], [0.5, 0.4, 1.0, 0.2], [0.7, 0.3, 0.2, 1.0]
+    ])
+
+    recs = svc.get_similar_articles("a", top_n=5, filters={"topic": ("sports",)})
+    assert [r["id"] for r in recs] == ["c"]
+    recs = svc.get_similar_articles("a", top_n=5, filters={"topic": ("tech", "politics"), "source_id": ("2",)})
+    assert [r["id"] for r in recs] == ["d"]
+
+    svc.user_sim_matrix = simple_user_sim_matrix
+    svc.user_features = simple_user_features
+    # "z" has no metadata, so it can never match a filter
+    svc.article_features = pd.DataFrame(
+        [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0], [0.5, 0.5], [2.0, 0.0]],
+        index=["a", "b", "c", "d", "z"], columns=["f1", "f2"],
+    )
+    recs = svc.get_collaborative_recommendations("user1", top_n=5, filters={"language_code": ("en",)})
+    assert {r["id"] for r in recs} <= {"a", "b", "d"}
+    assert "z" not in {r["id"] for r in recs}
+
+    recs = svc.get_trending_articles(top_n=5, filters={"language_code": ("hi",)})
+    assert [r["id"] for r in recs] == ["c"]
+    assert svc.get_trending_articles(top_n=5, filters={"language_code": ("fr",)}) == []
+
+
+# SUMMARY: Free-text search ranks articles by TF-IDF similarity to the query
+def test_search_articles():
+    """
+    Test Case: search_articles() with the vectorizer and inverted index built from the same corpus.
+    Purpose: The best-matching article comes first and facet filters apply.
+    Importance: /api/search serves queries from the trained model without scanning every article.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from backend.Ml_model.search_index import SearchIndex
+
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.article_metadata = pd.DataFrame([
+        {"id": "a", "topic": "sports", "published_at": now},
+        {"id": "b", "topic": "politics", "published_at": now},
+        {"id": "c", "topic": "sports", "published_at": now},
+    ])
+    svc.tfv = TfidfVectorizer()
+    matrix = svc.tfv.fit_transform([
+        "cricket world cup final", "election results parliament", "football league cup"
+    ])
+    svc.search_index = SearchIndex.build(matrix)
+
+    results = svc.search_articles("cup final", top_n=5)
+    assert [r["id"] for r in results] == ["a", "c"]
+    assert results[0]["search_score"] > results[1]["search_score"] > 0
+    assert svc.search_articles("election", top_n=5, filters={"topic": ("sports",)}) == []
+    assert svc.search_articles("weather", top_n=5) == []
+
+    svc.search_index = None
+    assert svc.search_articles("cup", top_n=5) == []
@@ -0,0 +1,65 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from backend.Ml_model.response_encoder import encode, parse_fields, project_fields
+
+
+# TEST CASES
+
+def test_encode_numpy_and_timestamps():
+    """SUMMARY: NumPy scalars/arrays and pandas Timestamps encode to plain JSON values"""
+    payload = {
+        "score": np.float64(0.25),
+        "count": np.int64(3),
+        "flags": np.array([1, 2]),
+        "published_at": pd.Timestamp("2025-01-01 10:00", tz="UTC"),
+    }
+    data = json.loads(encode(payload))
+    assert data == {
+        "score": 0.25,
+        "count": 3,
+        "flags": [1, 2],
+        "published_at": "2025-01-01T10:00:00+00:00",
+    }
+
+
+def test_encode_dataframe_rows():
+    """SUMMARY: Rows from DataFrame.iloc[...].to_dict() round-trip unchanged"""
+    frame = pd.DataFrame({"id": ["a", "b"], "views": [1, 2], "published_at": pd.to_datetime(["2025-01-01", "2025-01-02"])})
+    items = [frame.iloc[i].to_dict() for i in range(len(frame))]
+    data = json.loads(encode({"recommendations": items}))
+    assert [r["id"] for r in data["recommendations"]] == ["a", "b"]
+    assert data["recommendations"][1]["published_at"].startswith("2025-01-02T00:00:00")
+
+
+def test_encode_missing_values_as_null():
+    """EDGE CASE: NaT and NumPy NaN become null instead of invalid JSON"""
+    data = json.loads(encode({"when": pd.NaT, "score": np.float32("nan")}))
+    assert data == {"when": None, "score": None}
+
+
+def test_parse_fields():
+    """SUMMARY: Comma lists and repeated params merge, de-duplicate and always include id"""
+    assert parse_fields(None) is None
+    assert parse_fields([]) is None
+    assert parse_fields(" , ") is None
+    assert parse_fields("title,similarity_score") == ("id", "title", "similarity_score")
+    assert parse_fields(["title", "id,title"]) == ("title", "id")
+
+
+def test_project_fields():
+    """SUMMARY: Projection keeps requested keys only and skips keys an item lacks"""
+    items = [{"id": "a", "title": "A", "topic": "x"}, {"id": "b", "title": "B"}]
+    assert project_fields(items, None) is items
+    assert project_fields(items, ("id", "topic")) == [{"id": "a", "topic": "x"}, {"id": "b"}]
+
+
+def test_encode_is_compact_utf8():
+    """EDGE CASE: Output is compact UTF-8 bytes, non-ASCII titles are not escaped"""
+    body = encode({"title": "समाचार", "n": 1})
+    assert isinstance(body, bytes)
+    assert body.decode("utf-8") == '{"title":"समाचार","n":1}'
+    assert not math.isnan(json.loads(body)["n"])
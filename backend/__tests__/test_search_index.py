@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from backend.Ml_model.search_index import SearchIndex
+
+
+@pytest.fixture
+def tfidf():
+    return normalize(sparse.random(400, 120, density=0.05, random_state=7, format="csr", dtype=np.float32))
+
+
+def brute_force(matrix, query, k, mask=None):
+    scores = (matrix @ query.T).toarray().ravel()
+    if mask is not None:
+        scores = scores * mask
+    scores = scores[scores > 0]
+    return np.sort(scores)[::-1][:k]
+
+
+# SUMMARY: MaxScore pruning returns the same top-K scores as scoring every article.
+def test_matches_exhaustive_scoring(tfidf):
+    index = SearchIndex.build(tfidf)
+    for seed in range(50):
+        query = normalize(sparse.random(1, 120, density=0.05, random_state=seed, format="csr"))
+        rows, scores = index.search(query, top_k=5)
+        assert np.allclose(scores, brute_force(tfidf, query, 5), atol=1e-5)
+        assert np.allclose(scores, (tfidf[rows] @ query.T).toarray().ravel(), atol=1e-5)
+
+
+# SUMMARY: Masked rows are never returned and never take a top-K slot.
+def test_mask(tfidf):
+    index = SearchIndex.build(tfidf)
+    mask = np.arange(400) % 3 == 0
+    query = normalize(sparse.random(1, 120, density=0.1, random_state=1, format="csr"))
+    rows, scores = index.search(query, top_k=10, mask=mask)
+    assert mask[rows].all()
+    assert np.allclose(scores, brute_force(tfidf, query, 10, mask), atol=1e-5)
+
+
+# EDGE CASE: Queries without indexed terms find nothing
+def test_empty_query(tfidf):
+    index = SearchIndex.build(tfidf)
+    rows, scores = index.search(sparse.csr_matrix((1, 120)), top_k=5)
+    assert len(rows) == 0 and len(scores) == 0
+
+
+# SUMMARY: The index survives a save/load round trip.
+def test_save_load_round_trip(tfidf, tmp_path):
+    index = SearchIndex.build(tfidf)
+    index.save(tmp_path / "search.npz")
+    loaded = SearchIndex.load(tmp_path / "search.npz")
+    query = normalize(sparse.random(1, 120, density=0.05, random_state=3, format="csr"))
+    assert len(loaded) == 400
+    for a, b in zip(loaded.search(query, 5), index.search(query, 5)):
+        assert np.array_equal(a, b)
@@ -0,0 +1,188 @@
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model.Recommender_Models import RecommendationService
+from backend.Ml_model.cache_manager import CacheManager
+from backend.Ml_model.local_redis import LocalRedis
+from backend.Ml_model.sketches import (
+    SKETCH_REGISTRY_KEY,
+    CountMinSketch,
+    HeavyHitterTracker,
+    SpaceSaving,
+    WindowedHeavyHitters,
+    sketch_cache_key,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def shared_cache():
+    """CacheManager over one LocalRedis, standing in for the Redis all workers share"""
+    with patch("backend.Ml_model.cache_manager.create_redis_client", return_value=(LocalRedis(), "local")):
+        return CacheManager()
+
+
+# SUMMARY: Count-Min estimates never undercount and are exact without collisions.
+def test_count_min_estimates():
+    sketch = CountMinSketch(width=256, depth=4)
+    for i in range(50):
+        sketch.add(f"a{i}", i + 1)
+    estimates = [sketch.estimate(f"a{i}") for i in range(50)]
+    assert all(est >= i + 1 for i, est in enumerate(estimates))
+    assert sketch.estimate("never-seen") >= 0
+
+
+# SUMMARY: Count-Min sketches merge cell by cell and survive serialization.
+def test_count_min_merge_and_round_trip():
+    a, b = CountMinSketch(64, 3), CountMinSketch(64, 3)
+    a.add("x", 2)
+    b.add("x", 3)
+    merged = CountMinSketch.from_dict(a.copy().merge(b).to_dict())
+    assert merged.estimate("x") == pytest.approx(5)
+
+    with pytest.raises(ValueError):
+        a.merge(CountMinSketch(32, 3))
+
+
+# SUMMARY: Space-Saving keeps heavy hitters within a fixed capacity.
+def test_space_saving_keeps_heavy_hitters():
+    summary = SpaceSaving(capacity=5)
+    rng = np.random.default_rng(0)
+    for _ in range(2000):
+        summary.add("hot", 1)
+        summary.add(f"cold{rng.integers(1000)}", 1)
+
+    assert len(summary) == 5
+    key, count, error = summary.top(1)[0]
+    assert key == "hot"
+    assert count - error <= 2000 <= count
+
+
+# EDGE CASE: Merged summaries keep keys heavy in either input and honour capacity
+def test_space_saving_merge():
+    a, b = SpaceSaving(3), SpaceSaving(3)
+    for key, n in [("x", 10), ("y", 5), ("z", 1)]:
+        a.add(key, n)
+    for key, n in [("x", 4), ("w", 8), ("v", 2)]:
+        b.add(key, n)
+
+    merged = SpaceSaving.from_dict(a.merge(b).to_dict())
+    assert len(merged) == 3
+    assert [k for k, _, _ in merged.top(2)] == ["x", "w"]
+    assert merged.top(1)[0][1] == pytest.approx(14)
+
+
+# SUMMARY: Buckets older than the window stop counting.
+def test_window_slides(clock):
+    window = WindowedHeavyHitters(window_seconds=3600, buckets=4, width=64, depth=2, capacity=8)
+    window.add("old", 5, clock.now)
+    clock.now += 1800
+    window.add("new", 1, clock.now)
+
+    _, summary = window.summary(clock.now)
+    assert {k for k, _, _ in summary.top()} == {"old", "new"}
+
+    clock.now += 3600
+    sketch, summary = window.summary(clock.now)
+    assert summary.top() == []
+    assert sketch.estimate("old") == 0
+
+
+# SUMMARY: The tracker picks the smallest window covering the request.
+def test_window_for(clock):
+    tracker = HeavyHitterTracker(clock=clock, width=64, depth=2, capacity=8)
+    assert tracker.window_for(1800) == "1h"
+    assert tracker.window_for(86400) == "24h"
+    assert tracker.window_for(30 * 86400) == "7d"
+    assert tracker.window_for(None) == "7d"
+
+
+# SUMMARY: Top-N ranks by weighted activity within the window and honours accept().
+def test_tracker_top(clock):
+    tracker = HeavyHitterTracker(clock=clock, width=256, depth=4, capacity=16, publish_seconds=0)
+    tracker.record("a1", "share")
+    tracker.record("a2", "view")
+    tracker.record("a2", "view")
+    assert tracker.record("a3", "hover") is False
+
+    assert tracker.top(2) == [("a1", pytest.approx(4.0)), ("a2", pytest.approx(2.0))]
+    assert [a for a, _ in tracker.top(2, accept=lambda a: a != "a1")] == ["a2"]
+
+    # Two hours later only the 24h/7d windows still see the events
+    clock.now += 7200
+    assert tracker.top(2, window_seconds=3600) == []
+    assert [a for a, _ in tracker.top(2, window_seconds=86400)] == ["a1", "a2"]
+
+
+# SUMMARY: Summaries published by other workers are merged into the ranking.
+def test_tracker_merges_peers(clock, shared_cache):
+    cache = shared_cache
+    worker = HeavyHitterTracker(cache=cache, clock=clock, width=128, depth=3, capacity=16, publish_seconds=0)
+    worker.cache_key = sketch_cache_key("node-a", 1)
+    reader = HeavyHitterTracker(cache=cache, clock=clock, width=128, depth=3, capacity=16, publish_seconds=0)
+    reader.cache_key = sketch_cache_key("node-b", 2)
+
+    for _ in range(4):
+        worker.record("a1", "view")
+    worker.publish()
+    reader.record("a2", "like")
+
+    assert reader.top(2) == [("a1", pytest.approx(4.0)), ("a2", pytest.approx(3.0))]
+
+    # A peer silent for longer than the window no longer counts there
+    clock.now += 7200
+    assert reader.top(2, window_seconds=3600) == []
+
+
+# SUMMARY: Peers are found through the registry set, without a KEYS scan on the request path.
+# EDGE CASE: Registry entries whose summary expired are pruned.
+def test_tracker_reads_registry_not_keys(clock, shared_cache):
+    worker = HeavyHitterTracker(cache=shared_cache, clock=clock, width=128, depth=3, capacity=16, publish_seconds=0)
+    worker.cache_key = sketch_cache_key("node-a", 1)
+    worker.record("a1", "share")
+    assert worker.publish()
+    redis = shared_cache.redis_client
+    assert redis.smembers(SKETCH_REGISTRY_KEY) == {worker.cache_key}
+    redis.sadd(SKETCH_REGISTRY_KEY, sketch_cache_key("node-gone", 9))
+
+    reader = HeavyHitterTracker(cache=shared_cache, clock=clock, width=128, depth=3, capacity=16, publish_seconds=60)
+    with patch.object(redis, "keys", side_effect=AssertionError("KEYS on the request path")):
+        assert [a for a, _ in reader.top(1)] == ["a1"]
+    assert redis.smembers(SKETCH_REGISTRY_KEY) == {worker.cache_key}
+
+    # The merged view is reused within the publish interval
+    with patch.object(shared_cache, "get_registered") as get_registered:
+        reader.top(1)
+        get_registered.assert_not_called()
+
+
+# SUMMARY: get_trending_articles() uses the sketch window matching time_window_days.
+def test_service_trending_with_sketches(clock):
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.trending = HeavyHitterTracker(clock=clock, width=128, depth=3, capacity=16, publish_seconds=0)
+    svc.article_metadata = pd.DataFrame([
+        {"id": "new", "published_at": now},
+        {"id": "hot", "published_at": now - pd.Timedelta(days=1)},
+    ])
+    svc.record_activity(None, "hot", "like")
+
+    recs = svc.get_trending_articles(top_n=2, time_window_days=7)
+    assert [r["id"] for r in recs] == ["hot", "new"]
+    assert recs[0]["trending_score"] == pytest.approx(3.0)
@@ -0,0 +1,113 @@
+import json
+import threading
+
+from backend.Ml_model import tracing
+from backend.Ml_model.tracing import SlowLog, Trace, debug_requested, end_trace, span, start_trace, tag
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# TEST CASES
+
+def test_span_is_noop_without_trace():
+    """EDGE CASE: Library code can open spans outside any request"""
+    with span("scoring"):
+        pass
+    assert tracing.current_trace() is None
+
+
+def test_nested_spans_and_stage_totals():
+    """SUMMARY: Spans keep their nesting depth and repeated names are summed per stage"""
+    trace, token = start_trace("GET /api/recommendations")
+    try:
+        with span("scoring"):
+            for _ in range(3):
+                with span("content_similar"):
+                    pass
+        tag(method="hybrid", user_id="u1")
+    finally:
+        end_trace(token)
+
+    data = trace.to_dict()
+    assert data["method"] == "hybrid"
+    assert data["stages"]["content_similar"]["count"] == 3
+    assert [s["name"] for s in data["spans"]] == ["scoring"] + ["content_similar"] * 3
+    assert [s["depth"] for s in data["spans"]] == [0, 1, 1, 1]
+    assert tracing.current_trace() is None
+
+
+def test_span_durations_from_clock():
+    """SUMMARY: Span and total durations come from the trace clock"""
+    clock = FakeClock()
+    trace = Trace("t", clock=clock)
+    clock.now = 0.010
+    start = clock()
+    clock.now = 0.035
+    trace.record("cache_lookup", start, clock(), 0)
+    clock.now = 0.050
+
+    assert trace.finish() == 50.0
+    assert trace.stages() == {"cache_lookup": {"ms": 25.0, "count": 1}}
+    assert trace.server_timing() == 'cache_lookup;dur=25.0;desc="x1"'
+
+
+def test_spans_from_other_threads_join_the_trace():
+    """EDGE CASE: Scoring threads running in a copied context record into the request trace"""
+    import contextvars
+
+    trace, token = start_trace("t")
+    ctx = contextvars.copy_context()
+
+    def work():
+        with span("collaborative_sort"):
+            pass
+
+    t = threading.Thread(target=ctx.run, args=(work,))
+    t.start()
+    t.join()
+    end_trace(token)
+    assert trace.stages()["collaborative_sort"]["count"] == 1
+
+
+def test_debug_requested_values():
+    """SUMMARY: Header or query param opt in; anything else leaves timing off"""
+    assert debug_requested("1", None)
+    assert debug_requested(None, "true")
+    assert not debug_requested(None, None)
+    assert not debug_requested("0", "no")
+
+
+def test_slow_log_threshold(tmp_path):
+    """SUMMARY: Only traces at or above the threshold are appended as JSON lines"""
+    path = tmp_path / "slow.jsonl"
+    clock = FakeClock()
+    slow_log = SlowLog(path=path, threshold_ms=100)
+
+    fast = Trace("fast", clock=clock)
+    clock.now = 0.05
+    assert slow_log.maybe_record(fast) is False
+
+    slow = Trace("slow", clock=clock)
+    slow.tags["method"] = "hybrid"
+    clock.now = 0.30
+    assert slow_log.maybe_record(slow) is True
+
+    lines = path.read_text().splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry["name"] == "slow"
+    assert entry["method"] == "hybrid"
+    assert entry["total_ms"] == 250.0
+
+
+def test_slow_log_disabled(tmp_path):
+    """EDGE CASE: A zero threshold disables the slow-log"""
+    slow_log = SlowLog(path=tmp_path / "slow.jsonl", threshold_ms=0)
+    assert slow_log.maybe_record(Trace("t")) is False
+    assert not (tmp_path / "slow.jsonl").exists()
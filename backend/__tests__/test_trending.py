@@ -0,0 +1,295 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+
+from backend.Ml_model.Recommender_Models import RecommendationService
+from backend.Ml_model.trending import MIN_TRENDING_SCORE, TrendingEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def engine(clock):
+    return TrendingEngine(half_life_seconds=3600, clock=clock)
+
+
+# SUMMARY: Activity weights add up per article and rank the top-N.
+def test_record_and_top(engine):
+    engine.record("a1", "view")
+    engine.record("a2", "share")
+    engine.record("a1", "read")
+    engine.record("a3", "view")
+
+    top = engine.top(2)
+    assert [a for a, _ in top] == ["a2", "a1"]
+    assert top[0][1] == pytest.approx(4.0)
+    assert top[1][1] == pytest.approx(2.5)
+
+
+# EDGE CASE: Unknown activity types and empty ids are ignored
+def test_record_ignores_unknown(engine):
+    assert engine.record("a1", "hover") is False
+    assert engine.record("", "view") is False
+    assert engine.top(5) == []
+
+
+# SUMMARY: Older activity counts less than the same activity now.
+def test_scores_decay_with_half_life(engine, clock):
+    engine.record("old", "share")
+    clock.now += 3600
+    engine.record("new", "like")
+
+    assert engine.score("old") == pytest.approx(2.0)
+    assert engine.score("new") == pytest.approx(3.0)
+    assert [a for a, _ in engine.top(2)] == ["new", "old"]
+
+
+# EDGE CASE: Superseded heap entries are skipped and the heap is compacted
+def test_heap_stays_bounded(engine):
+    for _ in range(500):
+        engine.record("a1", "view")
+    engine.record("a2", "view")
+
+    assert [a for a, _ in engine.top(5)] == ["a1", "a2"]
+    assert engine.stats()["heap_entries"] <= 2 * len(engine) + 64
+    # Querying does not consume entries
+    assert [a for a, _ in engine.top(5)] == ["a1", "a2"]
+
+
+# SUMMARY: accept() filters articles while still returning n results when possible.
+def test_top_with_accept(engine):
+    for i, article in enumerate(["a1", "a2", "a3"]):
+        for _ in range(3 - i):
+            engine.record(article, "view")
+
+    assert [a for a, _ in engine.top(2, accept=lambda a: a != "a1")] == ["a2", "a3"]
+
+
+# EDGE CASE: Rebasing far in the future keeps rankings and drops decayed articles
+def test_rebase_drops_decayed(clock):
+    engine = TrendingEngine(half_life_seconds=1, clock=clock)
+    engine.record("stale", "view")
+    clock.now += 400
+    engine.record("fresh", "view")
+
+    assert engine.landmark == clock.now
+    assert engine.score("fresh") == pytest.approx(1.0)
+    assert engine.score("stale") == 0.0
+    assert len(engine) == 1
+
+
+# SUMMARY: Snapshots round-trip and keep decaying from when they were taken.
+def test_snapshot_round_trip(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    engine = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="w1")
+    engine.record("a1", "share")
+    engine.record("a2", "view")
+    assert engine.snapshot() is True
+    assert engine.worker_path == tmp_path / "trending.w1.json"
+    assert json.loads(engine.worker_path.read_text())["scores"]["a1"] == pytest.approx(4.0)
+
+    clock.now += 3600
+    restored = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="w1")
+    assert restored.load_snapshot() is True
+    assert restored.score("a1") == pytest.approx(2.0)
+    assert [a for a, _ in restored.top(2)] == ["a1", "a2"]
+
+
+# EDGE CASE: Missing or corrupt snapshots leave the engine empty
+def test_load_snapshot_missing_or_corrupt(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    engine = TrendingEngine(snapshot_path=path, clock=clock, worker_id="w1")
+    assert engine.load_snapshot() is False
+
+    (tmp_path / "trending.w2.json").write_text("{not json")
+    assert engine.load_snapshot() is False
+    assert len(engine) == 0
+
+
+# SUMMARY: Periodic snapshots are written once the interval has passed.
+def test_periodic_snapshot(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    engine = TrendingEngine(snapshot_path=path, snapshot_seconds=60, clock=clock)
+    engine.record("a1", "view")
+    assert not engine.worker_path.exists()
+
+    clock.now += 61
+    engine.record("a1", "view")
+    for _ in range(100):
+        if engine.worker_path.exists():
+            break
+        time.sleep(0.01)
+    assert "a1" in json.loads(engine.worker_path.read_text())["scores"]
+
+
+# SUMMARY: A process that records nothing follows snapshots written by other workers.
+def test_follows_newer_snapshot(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    writer = TrendingEngine(snapshot_path=path, clock=clock, worker_id="w1")
+    reader = TrendingEngine(snapshot_path=path, snapshot_seconds=60, clock=clock, worker_id="w2")
+
+    writer.record("a1", "like")
+    writer.snapshot()
+    clock.now += 61
+    assert [a for a, _ in reader.top(3)] == ["a1"]
+
+
+# EDGE CASE: Articles below the minimum score are left out of snapshots
+def test_snapshot_prunes_decayed(engine, clock):
+    engine.record("a1", "view")
+    clock.now += 3600 * 10
+    assert 1.0 / 1024 < MIN_TRENDING_SCORE
+    assert engine.to_dict()["scores"] == {}
+
+
+# SUMMARY: Trending combines activity scores with the time window and fills with newest articles.
+def test_service_trending_uses_activity(engine):
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.trending = engine
+    svc.article_metadata = pd.DataFrame([
+        {"id": "new", "title": "Newest", "published_at": now},
+        {"id": "hot", "title": "Hot", "published_at": now - pd.Timedelta(days=1)},
+        {"id": "old", "title": "Old but busy", "published_at": now - pd.Timedelta(days=30)},
+        {"id": "mid", "title": "Middle", "published_at": now - pd.Timedelta(days=2)},
+    ])
+    for _ in range(5):
+        svc.record_activity(None, "old", "share")
+    svc.record_activity("u1", "hot", "read")
+
+    recs = svc.get_trending_articles(top_n=3, time_window_days=7)
+    assert [r["id"] for r in recs] == ["hot", "new", "mid"]
+    assert recs[0]["trending_score"] == pytest.approx(1.5)
+    assert recs[1]["trending_score"] == 0.0
+    assert isinstance(recs[0]["published_at"], pd.Timestamp)
+
+
+# SUMMARY: Partition heaps rank within a topic without scanning other topics.
+def test_partition_top(engine):
+    engine.record("s1", "view", partitions=("topic=sports",))
+    engine.record("p1", "share", partitions=("topic=politics", "place=us"))
+    engine.record("s2", "like", partitions=("topic=sports", "place=us"))
+
+    assert [a for a, _ in engine.top(5, partition="topic=sports")] == ["s2", "s1"]
+    assert [a for a, _ in engine.top(5, partition="place=us")] == ["p1", "s2"]
+    assert engine.top(5, partition="topic=tech") == []
+    assert [a for a, _ in engine.top(1)] == ["p1"]
+    assert engine.stats()["partitions"] == 3
+
+
+# EDGE CASE: Partitions survive snapshots and heap compaction
+def test_partitions_persist(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    engine = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="w1")
+    for _ in range(200):
+        engine.record("s1", "view", partitions=("topic=sports",))
+    engine.record("t1", "share", partitions=("topic=tech",))
+    assert [a for a, _ in engine.top(5, partition="topic=sports")] == ["s1"]
+    engine.snapshot()
+
+    restored = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="w2")
+    restored.load_snapshot()
+    assert [a for a, _ in restored.top(5, partition="topic=tech")] == ["t1"]
+
+
+# SUMMARY: Every worker snapshots its own counts and a restarted worker ranks on their sum.
+def test_worker_snapshots_are_summed(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    workers = [
+        TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id=f"w{i}")
+        for i in range(3)
+    ]
+    for worker in workers:
+        worker.record("a1", "view")
+    workers[0].record("a2", "share")
+    for worker in workers:
+        assert worker.snapshot() is True
+    # The last writer does not replace the others' counts
+    assert len(list(tmp_path.glob("trending.*.json"))) == 3
+
+    restarted = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="w0")
+    assert restarted.load_snapshot() is True
+    assert restarted.score("a1") == pytest.approx(3.0)
+    assert restarted.score("a2") == pytest.approx(4.0)
+
+    # Its own snapshot holds only its own counts, so peers are not counted twice
+    restarted.record("a1", "view")
+    restarted.snapshot()
+    assert json.loads(restarted.worker_path.read_text())["scores"]["a1"] == pytest.approx(2.0)
+    assert restarted.score("a1") == pytest.approx(4.0)
+
+
+# EDGE CASE: Snapshots of gone workers are deleted once fully decayed
+def test_decayed_worker_snapshot_removed(tmp_path, clock):
+    path = tmp_path / "trending.json"
+    gone = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="gone")
+    gone.record("a1", "view")
+    gone.snapshot()
+
+    clock.now += 3600 * 20
+    engine = TrendingEngine(half_life_seconds=3600, snapshot_path=path, clock=clock, worker_id="w1")
+    assert engine.load_snapshot() is False
+    assert not gone.worker_path.exists()
+
+
+# SUMMARY: Per-topic/place trending ranks by activity, filters the other facet and fills with newest.
+def test_service_trending_by_topic_and_place(engine):
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.trending = engine
+    svc.article_metadata = pd.DataFrame([
+        {"id": "s-uk-new", "topic": "Sports", "place": "UK", "published_at": now},
+        {"id": "s-us-hot", "topic": "sports", "place": "US", "published_at": now - pd.Timedelta(days=1)},
+        {"id": "s-us-old", "topic": "Sports", "place": "US", "published_at": now - pd.Timedelta(days=2)},
+        {"id": "p-us", "topic": "Politics", "place": "US", "published_at": now},
+    ])
+    svc.record_activity(None, "s-us-hot", "share")
+    svc.record_activity(None, "p-us", "share")
+    svc.record_activity(None, "p-us", "share")
+
+    recs = svc.get_trending_articles(top_n=5, topic="SPORTS")
+    assert [r["id"] for r in recs] == ["s-us-hot", "s-uk-new", "s-us-old"]
+
+    recs = svc.get_trending_articles(top_n=5, topic="sports", place="us")
+    assert [r["id"] for r in recs] == ["s-us-hot", "s-us-old"]
+
+    recs = svc.get_trending_articles(top_n=5, place="US")
+    assert [r["id"] for r in recs] == ["p-us", "s-us-hot", "s-us-old"]
+
+
+# SUMMARY: Activity on a collapsed near-duplicate counts for the article representing its story.
+def test_duplicate_activity_counts_for_cluster(engine):
+    now = pd.Timestamp.now()
+    svc = RecommendationService()
+    svc.models_loaded = True
+    svc.trending = engine
+    svc.article_metadata = pd.DataFrame([
+        {"id": "bbc", "cluster_id": "bbc", "cluster_size": 2, "published_at": now},
+        {"id": "other", "cluster_id": "other", "cluster_size": 1, "published_at": now},
+    ])
+    # "cnn" was collapsed into "bbc" at training time
+    svc.indices = pd.Series([0, 1, 0], index=["bbc", "other", "cnn"])
+
+    assert svc.canonical_article_id("cnn") == "bbc"
+    assert svc.canonical_article_id("unknown") == "unknown"
+    svc.record_activity(None, "cnn", "share")
+    svc.record_activity(None, "other", "view")
+
+    recs = svc.get_trending_articles(top_n=2)
+    assert [r["id"] for r in recs] == ["bbc", "other"]
+    assert recs[0]["cluster_size"] == 2
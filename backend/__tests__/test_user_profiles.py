@@ -0,0 +1,170 @@
+import math
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.Ml_model.cache_manager import CacheManager
+from backend.Ml_model.decay import ForwardDecay, MAX_EXPONENT
+from backend.Ml_model.local_redis import LocalRedis
+from backend.Ml_model.user_profiles import ShortTermProfileStore, profile_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def shared_cache():
+    """CacheManager over one LocalRedis, standing in for the Redis all workers share"""
+    with patch("backend.Ml_model.cache_manager.create_redis_client", return_value=(LocalRedis(), "local")):
+        return CacheManager()
+
+
+@pytest.fixture
+def article_features():
+    return pd.DataFrame(
+        [[1, 0, 1], [0, 1, 0], [0, 0, 0]],
+        index=["a1", "a2", "a3"],
+        columns=["sports", "tech", "india"],
+    )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def store(article_features, clock):
+    return ShortTermProfileStore(article_features, half_life_seconds=3600, clock=clock)
+
+
+# SUMMARY: Forward decay halves an event's value every half-life.
+def test_forward_decay_half_life():
+    decay = ForwardDecay(half_life_seconds=10)
+    stored = decay.weight(100, landmark=0)
+    assert stored * decay.scale(110, landmark=0) == pytest.approx(0.5 * stored * decay.scale(100, landmark=0))
+    assert decay.needs_rebase(0 + (MAX_EXPONENT + 1) / decay.rate, landmark=0)
+
+
+# SUMMARY: An event adds weight only to the features of the article read.
+def test_update_builds_profile(store):
+    assert store.update("u1", "a1", "view") is True
+
+    vector = store.get_vector("u1")
+    assert vector == pytest.approx([1 / math.sqrt(2), 0, 1 / math.sqrt(2)])
+    assert store.version("u1") == 1
+
+
+# SUMMARY: Older reads fade relative to recent ones.
+def test_recent_activity_dominates(store, clock):
+    store.update("u1", "a1", "view")
+    clock.now += 4 * 3600
+    store.update("u1", "a2", "view")
+
+    vector = store.get_vector("u1")
+    assert vector[1] > 10 * vector[0]
+
+
+# SUMMARY: Stronger activities weigh more than views.
+def test_activity_weights(store):
+    store.update("u1", "a1", "view")
+    store.update("u1", "a2", "share")
+
+    vector = store.get_vector("u1")
+    assert vector[1] > vector[0]
+
+
+# EDGE CASE: Articles without features or unknown articles leave the profile untouched.
+def test_unknown_article_ignored(store):
+    assert store.update("u1", "a3") is False
+    assert store.update("u1", "zzz") is False
+    assert store.update(None, "a1") is False
+    assert store.get_vector("u1") is None
+    assert store.version("u1") is None
+
+
+# EDGE CASE: A fully decayed profile counts as no profile.
+def test_profile_expires(store, clock):
+    store.update("u1", "a1")
+    clock.now += 20 * 3600
+    assert store.has_profile("u1") is False
+
+
+# EDGE CASE: The landmark is rebased once exponents get large, without changing values.
+def test_rebase_keeps_values(store, clock):
+    store.update("u1", "a1")
+    clock.now += (MAX_EXPONENT / store.decay.rate) + 3600
+    store.update("u1", "a2")
+
+    profile = store._get("u1")
+    assert profile.landmark == clock.now
+    assert store.get_vector("u1")[1] == pytest.approx(1.0)
+
+
+# SUMMARY: Profiles live in the shared cache and are picked up by other workers.
+def test_cache_shared_between_stores(article_features, clock, shared_cache):
+    writer = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+    reader = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+
+    writer.update("u1", "a2", "like")
+    assert shared_cache.hash_get(profile_cache_key("u1"), "version") == "1"
+    assert reader.get_vector("u1") == pytest.approx([0, 1, 0])
+    assert reader.version("u1") == 1
+
+
+# EDGE CASE: Two workers updating one user both keep their events and agree on the version
+def test_concurrent_workers_do_not_overwrite(article_features, clock, shared_cache):
+    worker_a = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+    worker_b = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+
+    worker_a.update("u1", "a1", "view")
+    # Both workers now hold a local copy at version 1
+    assert worker_b.get_vector("u1") is not None
+    worker_b.update("u1", "a2", "like")
+    worker_a.update("u1", "a1", "view")
+
+    assert worker_a.version("u1") == worker_b.version("u1") == 3
+    # sports/india: 2 views, tech: 1 like (weight 3) -> equal raw weights
+    for store in (worker_a, worker_b):
+        assert store.get_vector("u1") == pytest.approx(np.array([2.0, 3.0, 2.0]) / math.sqrt(17))
+
+
+# SUMMARY: has_profile on a shared store reads one field, not the whole hash.
+def test_shared_has_profile_reads_version_only(article_features, clock, shared_cache):
+    writer = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+    reader = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+    writer.update("u1", "a1")
+
+    with patch.object(shared_cache, "hash_get_all", wraps=shared_cache.hash_get_all) as get_all:
+        assert reader.has_profile("u1") is True
+        assert reader.has_profile("ghost") is False
+    get_all.assert_not_called()
+
+
+# SUMMARY: Rebasing a shared profile keeps its decayed values and version.
+def test_shared_rebase(article_features, clock, shared_cache):
+    store = ShortTermProfileStore(article_features, half_life_seconds=3600, cache=shared_cache, clock=clock)
+    store.update("u1", "a2", "like")
+    clock.now += (MAX_EXPONENT / store.decay.rate) + 3600
+    store.update("u1", "a1", "view")
+
+    assert float(shared_cache.hash_get(profile_cache_key("u1"), "landmark")) == clock.now
+    assert store.version("u1") == 2
+    assert store.get_vector("u1") == pytest.approx(np.array([1, 0, 1]) / math.sqrt(2))
+
+
+# EDGE CASE: The in-memory LRU keeps at most max_users profiles.
+def test_lru_bound(article_features, clock):
+    store = ShortTermProfileStore(article_features, half_life_seconds=3600, max_users=2, clock=clock)
+    for user in ("u1", "u2", "u3"):
+        store.update(user, "a1")
+
+    assert store.get_vector("u1") is None
+    assert store.get_vector("u3") is not None